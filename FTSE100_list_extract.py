@@ -0,0 +1,101 @@
+import os
+import sys
+import argparse
+import pandas as pd
+
+from pipeline.utils import FTSE100_URL, get_ftse100_constituents
+
+OUT_PATH = "universes/ftse100.csv"
+
+# Universe files use GICS sectors (pipeline/sectors.py groups by them); Wikipedia lists
+# FTSE 100 members by ICB sector. Names are matched lower-case with "&" read as "and".
+ICB_TO_GICS = {
+    "software and computer services": "Information Technology",
+    "technology hardware and equipment": "Information Technology",
+    "telecommunications equipment": "Communication Services",
+    "telecommunications service providers": "Communication Services",
+    "media": "Communication Services",
+    "health care providers": "Health Care",
+    "medical equipment and services": "Health Care",
+    "pharmaceuticals and biotechnology": "Health Care",
+    "banks": "Financials",
+    "finance and credit services": "Financials",
+    "investment banking and brokerage services": "Financials",
+    "closed end investments": "Financials",
+    "open end and miscellaneous investment vehicles": "Financials",
+    "life insurance": "Financials",
+    "non-life insurance": "Financials",
+    "nonlife insurance": "Financials",
+    "real estate investment and services": "Real Estate",
+    "real estate investment trusts": "Real Estate",
+    "automobiles and parts": "Consumer Discretionary",
+    "consumer services": "Consumer Discretionary",
+    "household goods and home construction": "Consumer Discretionary",
+    "leisure goods": "Consumer Discretionary",
+    "personal goods": "Consumer Discretionary",
+    "retailers": "Consumer Discretionary",
+    "travel and leisure": "Consumer Discretionary",
+    "beverages": "Consumer Staples",
+    "food producers": "Consumer Staples",
+    "tobacco": "Consumer Staples",
+    "personal care drug and grocery stores": "Consumer Staples",
+    "construction and materials": "Industrials",
+    "aerospace and defence": "Industrials",
+    "aerospace and defense": "Industrials",
+    "electronic and electrical equipment": "Industrials",
+    "general industrials": "Industrials",
+    "industrial engineering": "Industrials",
+    "industrial support services": "Industrials",
+    "industrial transportation": "Industrials",
+    "industrial materials": "Materials",
+    "industrial metals and mining": "Materials",
+    "precious metals and mining": "Materials",
+    "chemicals": "Materials",
+    "oil gas and coal": "Energy",
+    "alternative energy": "Energy",
+    "electricity": "Utilities",
+    "gas water and multi-utilities": "Utilities",
+    "waste and disposal services": "Utilities",
+}
+
+
+def gics_sector(icb_sector):
+    key = str(icb_sector).lower().replace("&", "and").replace(",", "")
+    return ICB_TO_GICS.get(" ".join(key.split()), "")
+
+
+parser = argparse.ArgumentParser(description="Regenerate universes/ftse100.csv from the FTSE 100 constituents")
+parser.add_argument("--source", default=FTSE100_URL,
+                    help="Wikipedia page, a saved copy of it, or a CSV of its constituents table")
+args = parser.parse_args()
+
+# Load constituents
+current = get_ftse100_constituents(args.source)
+
+# Keep the sector (and sub-industry) already curated for existing members; map ICB for new ones
+previous = pd.read_csv(OUT_PATH, dtype=str).fillna("") if os.path.exists(OUT_PATH) else pd.DataFrame(
+    columns=["ticker", "company", "sector", "sub_industry"])
+known = previous.set_index("ticker")
+universe = pd.DataFrame({
+    "ticker": current["ticker"],
+    "company": current["company"],
+    "sector": [known.at[t, "sector"] if t in known.index else gics_sector(s)
+               for t, s in zip(current["ticker"], current["icb_sector"])],
+    "sub_industry": [known.at[t, "sub_industry"] if t in known.index else "" for t in current["ticker"]],
+}).sort_values("ticker")
+
+unmapped = universe.loc[universe["sector"] == "", "ticker"].tolist()
+if unmapped:
+    print(f"⚠️ No GICS sector for {', '.join(unmapped)}: add their ICB sector to ICB_TO_GICS")
+added = sorted(set(universe["ticker"]) - set(previous["ticker"]))
+removed = sorted(set(previous["ticker"]) - set(universe["ticker"]))
+if added or removed:
+    print(f"🔁 Joined: {', '.join(added) or 'none'}; left: {', '.join(removed) or 'none'}")
+if len(universe) != 100:
+    print(f"⚠️ {len(universe)} constituents (expected 100): check the source table")
+    sys.exit(1)
+
+# Save into universes/ftse100.csv (CRLF, like the other universe files)
+universe.to_csv(OUT_PATH, index=False, lineterminator="\r\n")
+
+print(f"✅ Saved {len(universe)} companies ({universe['sector'].nunique()} sectors) into {OUT_PATH}")
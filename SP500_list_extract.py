@@ -3,19 +3,16 @@ import pandas as pd
 # Load CSV
 df = pd.read_csv("constituents.csv")
 
-# Create dictionary
-SP500_COMPANIES = dict(zip(df["Symbol"], df["Security"]))
+# Universe file read by pipeline/universes.py (and pipeline/config_sp500.py):
+# ticker, company and GICS classification, used for the sector indices (pipeline/sectors.py)
+universe = pd.DataFrame({
+    "ticker": df["Symbol"],
+    "company": df["Security"],
+    "sector": df["GICS Sector"],
+    "sub_industry": df["GICS Sub-Industry"],
+})
 
-# Also create a plain list of tickers
-SP500_TICKERS = list(SP500_COMPANIES.keys())
+# Save into universes/sp500.csv
+universe.to_csv("universes/sp500.csv", index=False)
 
-# Save into config_sp500.py
-with open("config_sp500.py", "w", encoding="utf-8") as f:
-    f.write("# Auto-generated from constituents.csv\n\n")
-    f.write("SP500_COMPANIES = {\n")
-    for symbol, name in SP500_COMPANIES.items():
-        f.write(f'    "{symbol}": "{name}",\n')
-    f.write("}\n\n")
-    f.write("SP500_TICKERS = list(SP500_COMPANIES.keys())\n")
-
-print(f"✅ Saved {len(SP500_COMPANIES)} companies into config_sp500.py")
+print(f"✅ Saved {len(universe)} companies ({universe['sector'].nunique()} sectors) into universes/sp500.csv")
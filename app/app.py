@@ -4,39 +4,195 @@ import plotly.graph_objs as go
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-# Import company names mapping
-from pipeline.config_sp500 import SP500_COMPANIES  
-
-PROCESSED_DIR = "data/processed"
-FORECAST_DIR = "data/forecasts"
-FUNDAMENTALS_PATH = "data/fundamentals/fundamentals.parquet"
+from pipeline.storage import DATA_BACKEND, LocalStorage, get_storage
+from pipeline.profiling import SectionTimer
+from pipeline import analytics, backtest, charts, intraday, scheduler, sectors, universes
+
+# Dataset keys, relative to the storage root (local "data/" folder or the S3 bucket)
+PROCESSED_DIR = "processed"
+FORECAST_DIR = "forecasts"
+FUNDAMENTALS_PATH = "fundamentals/fundamentals.parquet"
+ALERTS_PATH = "alerts/alerts.parquet"
+ALERTS_SHOWN = 25
+SECTORS_DIR = "sectors"
+DEFAULT_UNIVERSE_LABEL = "Default"   # the DATA_ROOT / S3 data set
+INTRADAY_DIR = intraday.PROCESSED_PREFIX   # <dir>/<interval>/<ticker>/<YYYY-MM>.parquet
+INTRADAY_RANGES = {"1D": 1, "5D": 5, "1M": 21, "3M": 63, "All": None}   # sessions back from the last bar
+SECTOR_WINDOWS = {"1M": 21, "3M": 63, "6M": 126, "1Y": 252, "Full period": None}
+SQL_TAB = os.environ.get("DASHBOARD_SQL", "0") == "1"   # opt-in: ad-hoc SQL over the datasets (needs duckdb)
+VIEW_LOG = os.environ.get("DASHBOARD_VIEW_LOG", "1") != "0"   # company views feed the forecast scheduler's priorities
+CACHE_TTL = 300  # seconds; bounds staleness when the data root has no CURRENT snapshot
+CORRELATION_WINDOWS = {"1M": 21, "3M": 63, "6M": 126, "1Y": 252, "Full period": None}
+HEATMAP_MAX_TICKERS = 150  # larger selections show the pair tables only
 
 # ------------------------
 # Utility Functions
 # ------------------------
-def load_ticker_data(ticker):
+@st.cache_resource
+def _data_store(universe):
+    """Storage backend shared across sessions (DATA_BACKEND, or a published universe's local root)."""
+    if universe is None:
+        return get_storage()
+    return LocalStorage(universes.data_root(universe))
+
+def get_data_store():
+    return _data_store(UNIVERSE)
+
+def data_version():
+    """Universe and current snapshot id ("" for a flat data folder); part of every cache key below."""
+    snapshot = get_data_store().current_snapshot() or ""
+    return f"{UNIVERSE}/{snapshot}" if UNIVERSE else snapshot
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _ticker_index(version):
+    keys = get_data_store().list_keys(PROCESSED_DIR, ".parquet")
+    return [os.path.basename(k).replace(".parquet", "") for k in keys]
+
+def list_tickers():
+    """List tickers that have a processed Parquet file (listed once per data version)."""
+    return _ticker_index(data_version())
+
+def load_ticker_data(ticker, columns=None):
     """Load processed Parquet file for a given ticker."""
-    path = os.path.join(PROCESSED_DIR, f"{ticker}.parquet")
-    if not os.path.exists(path):
+    return get_data_store().read_parquet(f"{PROCESSED_DIR}/{ticker}.parquet", columns=columns)
+
+def load_forecast_data(ticker, interval="1d"):
+    """Load Prophet forecast CSV for a given ticker (intraday forecasts live under forecasts/<interval>/)."""
+    folder = FORECAST_DIR if interval == "1d" else f"{FORECAST_DIR}/{interval}"
+    return get_data_store().read_csv(f"{folder}/{ticker}_forecast.csv", parse_dates=["ds"])
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _intraday_chunks(ticker: str, interval: str, version: str):
+    keys = get_data_store().list_keys(f"{INTRADAY_DIR}/{interval}/{ticker}", ".parquet")
+    return sorted(os.path.basename(k).replace(".parquet", "") for k in keys)
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=32)
+def load_intraday(ticker: str, interval: str, sessions: int | None, version: str):
+    """Intraday bars for the last `sessions` sessions, reading only the monthly chunks in range."""
+    store = get_data_store()
+    chunks = _intraday_chunks(ticker, interval, version)
+    if not chunks:
         return None
-    return pd.read_parquet(path)
-
-def load_forecast_data(ticker):
-    """Load Prophet forecast CSV for a given ticker."""
-    path = os.path.join(FORECAST_DIR, f"{ticker}_forecast.csv")
-    if not os.path.exists(path):
+    folder = f"{INTRADAY_DIR}/{interval}/{ticker}"
+    last = store.read_parquet(f"{folder}/{chunks[-1]}.parquet")
+    while last.empty and len(chunks) > 1:   # a month with no clean bars is an empty chunk
+        chunks = chunks[:-1]
+        last = store.read_parquet(f"{folder}/{chunks[-1]}.parquet")
+    if last.empty:
         return None
-    return pd.read_csv(path, parse_dates=["ds"])
-
-def get_fundamentals(ticker: str):
-    """Fetch fundamentals for a given ticker from the parquet file."""
-    if not os.path.exists(FUNDAMENTALS_PATH):
+    if sessions is None:
+        start = None
+    else:
+        start = last.index[-1].normalize() - pd.offsets.BDay(sessions - 1)
+    parts = [store.read_parquet(f"{folder}/{c}.parquet") for c in intraday.chunks_in_range(chunks[:-1], start)]
+    return pd.concat([*parts, last]).loc[start:]
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _fundamentals_by_ticker(version):
+    fundamentals_df = get_data_store().read_parquet(FUNDAMENTALS_PATH)
+    if fundamentals_df is None:
+        return {}
+    return {r["Ticker"]: r for r in fundamentals_df.drop_duplicates("Ticker").to_dict("records")}
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=8)
+def load_close_panel(tickers: tuple, version: str):
+    """Aligned Close panel (dates × tickers); one column read per ticker."""
+    return analytics.load_price_panel(tickers, get_data_store())
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=8)
+def load_returns_panel(tickers: tuple, version: str):
+    """Aligned daily log returns for `tickers`."""
+    return analytics.log_returns(load_close_panel(tickers, version))
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner="Computing correlations...", max_entries=32)
+def correlation_view(tickers: tuple, window: int | None, version: str):
+    """Correlation / annualized covariance over the latest window plus the rolling average correlation."""
+    returns = load_returns_panel(tickers, version)
+    recent = returns if window is None else returns.iloc[-window:]
+    rolling_window = window or analytics.DEFAULT_WINDOW
+    avg = analytics.average_correlation(returns, rolling_window, step=max(1, len(tickers) // 100))
+    return analytics.correlation_matrix(recent), analytics.covariance_matrix(recent, annualize=True), avg
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=32)
+def rolling_correlation_view(tickers: tuple, reference: str, window: int, version: str):
+    return analytics.rolling_correlation(load_returns_panel(tickers, version), reference, window)
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner="Backtesting...", max_entries=32)
+def backtest_view(strategy: str, params: tuple, cost_bps: float, tickers: tuple, version: str):
+    return backtest.backtest(load_close_panel(tickers, version), strategy, dict(params), cost_bps)
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner="Running parameter sweep...", max_entries=8)
+def sweep_view(strategy: str, cost_bps: float, tickers: tuple, version: str):
+    # Threads rather than processes: NumPy releases the GIL and spawning inside Streamlit is costly
+    return backtest.sweep(load_close_panel(tickers, version), strategy, cost_bps=cost_bps, processes=False)
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_alerts(version: str):
+    """Alert feed written by pipeline/alerts.py, newest first (None when no scan has run)."""
+    feed = get_data_store().read_parquet(ALERTS_PATH)
+    if feed is None or feed.empty:
         return None
-    fundamentals_df = pd.read_parquet(FUNDAMENTALS_PATH)
-    record = fundamentals_df[fundamentals_df["Ticker"] == ticker]
-    if record.empty:
+    return feed.sort_values(["timestamp", "detected_at"], ascending=False, ignore_index=True)
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_sector_data(version: str):
+    """Sector indices and summaries written by pipeline/sectors.py (None when the stage has not run)."""
+    store = get_data_store()
+    indices = store.read_parquet(f"{SECTORS_DIR}/{sectors.INDICES_FILE}")
+    if indices is None:
         return None
-    return record.to_dict("records")[0]
+    return (indices, store.read_parquet(f"{SECTORS_DIR}/{sectors.SECTOR_SUMMARY_FILE}"),
+            store.read_parquet(f"{SECTORS_DIR}/{sectors.TICKER_SUMMARY_FILE}"))
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=64)
+def load_sector_relative(ticker: str, version: str):
+    """One ticker's performance relative to its sector index (a single column of the file)."""
+    try:
+        return get_data_store().read_parquet(f"{SECTORS_DIR}/{sectors.RELATIVE_FILE}", columns=[ticker])
+    except (KeyError, ValueError):   # ticker not in the last sector build
+        return None
+
+@st.cache_resource(max_entries=2)
+def get_sql_connection(version: str):
+    """
+    Sandboxed DuckDB connection over the current snapshot (data root only),
+    shared by every session: only SQL that passes query.check_read_only runs on it.
+    """
+    from pipeline import query
+    return query.connect(query.data_root(get_data_store()), sandbox=True)
+
+@st.cache_resource
+def _figure_cache():
+    """Chart figures shared by every session (LRU, DASHBOARD_FIGURE_CACHE_MB)."""
+    return charts.FigureCache()
+
+def source_versions(ticker, view, bars="1d"):
+    """Versions (ETag, or path:mtime:size) of the files a chart is drawn from: they change when a file is rewritten."""
+    if bars == "1d":
+        keys = [f"{PROCESSED_DIR}/{ticker}.parquet"]
+    else:
+        chunks = _intraday_chunks(ticker, bars, data_version())
+        keys = [f"{INTRADAY_DIR}/{bars}/{ticker}/{chunks[-1]}.parquet"] if chunks else []
+    if view == "forecast":
+        keys.append(f"{FORECAST_DIR if bars == '1d' else f'{FORECAST_DIR}/{bars}'}/{ticker}_forecast.csv")
+    store = get_data_store()
+    return tuple(store.version(k) for k in keys)
+
+def get_figure(ticker, view, frame, forecast_df=None, bars="1d", bar_range=None):
+    """
+    Chart figure for (ticker, view, bars/range, source file versions): built
+    once, then served from the shared cache, or from the pipeline's pre-rendered
+    spec for daily charts (pipeline/charts.py) when it was drawn from the same bars.
+    """
+    last = frame.index[-1] if len(frame) else None
+    key = (ticker, view, bars, bar_range, data_version(), *source_versions(ticker, view, bars), len(frame), last)
+    prerendered = f"{charts.FIGURE_PREFIX}/{ticker}/{view}.json" if bars == "1d" else None
+    return _figure_cache().get(key, lambda: charts.build(view, frame, forecast_df, bars, ticker), store=get_data_store(),
+                               prerendered_key=prerendered, expected=lambda: charts.stamp(frame, forecast_df))
+
+def get_fundamentals(ticker: str):
+    """Fetch fundamentals for a given ticker (the parquet file is read once per data version)."""
+    return _fundamentals_by_ticker(data_version()).get(ticker)
 
 # ------------------------
 # Streamlit Setup
@@ -44,11 +200,22 @@ def get_fundamentals(ticker: str):
 st.set_page_config(page_title="S&P 500 Dashboard", layout="wide")
 st.title("📊 S&P 500 Stock Insights Dashboard")
 
-# Sidebar
-all_tickers = [f.replace(".parquet", "") for f in os.listdir(PROCESSED_DIR) if f.endswith(".parquet")]
+# Per-rerun section timing (DASHBOARD_PROFILE=1, or PIPELINE_PROFILE for full profiles)
+timer = SectionTimer()
+
+# Sidebar: universes published under data/universes/ (pipeline/universes.py), when there are any
+published_universes = universes.published() if DATA_BACKEND == "local" else []
+UNIVERSE = None
+if published_universes:
+    choice = st.sidebar.selectbox("Universe", [DEFAULT_UNIVERSE_LABEL, *published_universes])
+    UNIVERSE = None if choice == DEFAULT_UNIVERSE_LABEL else choice
+
+with timer.section("load:ticker_list"):
+    all_tickers = list_tickers()
 
 # Create mapping: ticker -> "TICKER – Company Name"
-ticker_labels = {t: f"{t} – {SP500_COMPANIES.get(t, 'Unknown')}" for t in all_tickers}
+company_names = universes.company_map()
+ticker_labels = {t: f"{t} – {company_names.get(t, 'Unknown')}" for t in all_tickers}
 
 # Sidebar dropdown with full company names
 selected_label = st.sidebar.selectbox("Select a Company", sorted(ticker_labels.values()))
@@ -56,81 +223,87 @@ selected_label = st.sidebar.selectbox("Select a Company", sorted(ticker_labels.v
 # Reverse lookup: find ticker from selected label
 ticker = [t for t, lbl in ticker_labels.items() if lbl == selected_label][0]
 
-df = load_ticker_data(ticker)
+# One view per company selection (not per rerun)
+if VIEW_LOG and st.session_state.get("_viewed") != ticker:
+    st.session_state["_viewed"] = ticker
+    try:
+        scheduler.record_view(ticker)
+        if DATA_BACKEND == "s3":   # the pipeline host reads the views from the bucket
+            scheduler.publish_views()
+    except OSError:   # read-only deployment: priorities fall back to market cap and staleness
+        pass
+
+with timer.section("load:ticker_data"):
+    df = load_ticker_data(ticker)
+
+# Bar size: intraday options appear only for tickers with intraday chunks
+intervals = [i for i in intraday.INTERVALS if _intraday_chunks(ticker, i, data_version())]
+bars = st.sidebar.radio("Bars", ["1d", *intervals], horizontal=True) if intervals else "1d"
+chart_df, bar_range = df, None
+if bars != "1d":
+    bar_range = st.sidebar.radio("Range", list(INTRADAY_RANGES), index=1, horizontal=True)
+    with timer.section("load:intraday"):
+        chart_df = load_intraday(ticker, bars, INTRADAY_RANGES[bar_range], data_version())
+
+# Alert feed (indicator crossings found by the pipeline's alert scan)
+with timer.section("load:alerts"):
+    alert_feed = load_alerts(data_version())
+if alert_feed is not None:
+    latest_bar = alert_feed["timestamp"].max()
+    with st.sidebar.expander(f"🔔 Alerts ({(alert_feed['timestamp'] == latest_bar).sum()} on {latest_bar:%Y-%m-%d})"):
+        only_selected = st.checkbox("Only this company", value=False)
+        shown = alert_feed[alert_feed["ticker"] == ticker] if only_selected else alert_feed
+        st.dataframe(
+            shown.head(ALERTS_SHOWN)[["timestamp", "ticker", "rule", "value", "threshold"]]
+            .assign(timestamp=lambda d: d["timestamp"].dt.strftime("%Y-%m-%d")).round(2),
+            hide_index=True,
+        )
 
 if df is not None:
     # ------------------------
     # KPI Section
     # ------------------------
-    st.subheader(f"{ticker_labels[ticker]} Overview")
-    latest = df.iloc[-1]
-    prev = df.iloc[-2] if len(df) > 1 else latest
-    change = ((latest['Close'] - prev['Close']) / prev['Close']) * 100
+    with timer.section("kpis"):
+        st.subheader(f"{ticker_labels[ticker]} Overview")
+        latest = df.iloc[-1]
+        prev = df.iloc[-2] if len(df) > 1 else latest
+        change = ((latest['Close'] - prev['Close']) / prev['Close']) * 100
 
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Current Price", f"${latest['Close']:.2f}", f"{change:.2f}%")
-    col2.metric("52W High", f"${df['Close'].max():.2f}")
-    col3.metric("52W Low", f"${df['Close'].min():.2f}")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Current Price", f"${latest['Close']:.2f}", f"{change:.2f}%")
+        col2.metric("52W High", f"${df['Close'].max():.2f}")
+        col3.metric("52W Low", f"${df['Close'].min():.2f}")
 
     # ------------------------
     # Tabs
     # ------------------------
-    tab1, tab2, tab3, tab4 = st.tabs(
-        ["📈 Price & Indicators", "📊 Performance Summary", "🔮 Forecast", "📊 Multi-Ticker Comparison"]
-    )
+    tab_names = ["📈 Price & Indicators", "📊 Performance Summary", "🔮 Forecast", "📊 Multi-Ticker Comparison",
+                 "🔗 Correlation", "🧪 Backtest", "🏭 Sectors"]
+    if SQL_TAB:
+        tab_names.append("🦆 SQL")
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, *tab_sql = st.tabs(tab_names)
 
     # ---- Tab 1: Price, Indicators & Fundamentals ----
-    with tab1:
+    with tab1, timer.section("tab:price_indicators"):
         st.write("### Interactive Technical Chart")
 
-        viz_option = st.selectbox(
-            "Select Visualization",
-            ["Candlestick + EMA/VWAP", "Relative Strength Index (RSI)", "Volatility (ATR)"]
-        )
+        viz_option = st.selectbox("Select Visualization", list(charts.VIZ_VIEWS))
 
-        if viz_option == "Candlestick + EMA/VWAP":
-            fig = go.Figure()
-            fig.add_trace(go.Candlestick(
-                x=df.index,
-                open=df["Open"], high=df["High"],
-                low=df["Low"], close=df["Close"],
-                name="Price"
-            ))
-            if "EMA_20" in df.columns:
-                fig.add_trace(go.Scatter(x=df.index, y=df["EMA_20"], line=dict(color="blue", width=1), name="EMA 20"))
-            if "EMA_50" in df.columns:
-                fig.add_trace(go.Scatter(x=df.index, y=df["EMA_50"], line=dict(color="orange", width=1), name="EMA 50"))
-            if "VWAP" in df.columns:
-                fig.add_trace(go.Scatter(x=df.index, y=df["VWAP"], line=dict(color="green", width=1), name="VWAP"))
-            fig.update_layout(xaxis_rangeslider_visible=False, height=600)
+        view = charts.VIZ_VIEWS[viz_option]
+        with timer.section(f"figure:{view}"):
+            fig = get_figure(ticker, view, chart_df, bars=bars, bar_range=bar_range)
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True)
-
-        elif viz_option == "Relative Strength Index (RSI)":
-            if "RSI_14" in df.columns:
-                rsi_fig = go.Figure()
-                rsi_fig.add_trace(go.Scatter(x=df.index, y=df["RSI_14"], line=dict(color="purple", width=1), name="RSI"))
-                rsi_fig.add_hline(y=70, line=dict(color="red", dash="dash"))
-                rsi_fig.add_hline(y=30, line=dict(color="green", dash="dash"))
-                rsi_fig.update_layout(height=400, title="Relative Strength Index (14-day)")
-                st.plotly_chart(rsi_fig, use_container_width=True)
-            else:
-                st.warning("RSI not available for this ticker.")
-
-        elif viz_option == "Volatility (ATR)":
-            if "Volatility_ATR" in df.columns:
-                atr_fig = go.Figure()
-                atr_fig.add_trace(go.Scatter(x=df.index, y=df["Volatility_ATR"], line=dict(color="gray", width=1), name="ATR"))
-                atr_fig.update_layout(height=400, title="Volatility (ATR)")
-                st.plotly_chart(atr_fig, use_container_width=True)
-            else:
-                st.warning("ATR not available for this ticker.")
+        else:
+            st.warning(f"{viz_option} not available for this ticker.")
 
         # ------------------------
         # Fundamentals Snapshot
         # ------------------------
         st.write("### 📊 Fundamentals Snapshot")
 
-        fundamentals = get_fundamentals(ticker)
+        with timer.section("load:fundamentals"):
+            fundamentals = get_fundamentals(ticker)
 
         if fundamentals:
             col1, col2, col3, col4 = st.columns(4)
@@ -148,7 +321,7 @@ if df is not None:
             st.warning("No fundamentals available for this company.")
 
     # ---- Tab 2: Performance Summary ----
-    with tab2:
+    with tab2, timer.section("tab:performance"):
         st.write("### Returns Summary")
         returns = {
             "1W": df["Close"].pct_change(5).iloc[-1] * 100,
@@ -161,67 +334,42 @@ if df is not None:
         st.dataframe(perf_df.style.background_gradient(cmap="RdYlGn"))
 
     # ---- Tab 3: Forecast ----
-    with tab3:
-        st.write("### Prophet Forecast (Next 7 Days)")
-        forecast_df = load_forecast_data(ticker)
-
+    with tab3, timer.section("tab:forecast"):
+        st.write("### Prophet Forecast (Next 7 Days)" if bars == "1d" else f"### Prophet Forecast ({bars} bars)")
+        with timer.section("load:forecast"):
+            forecast_df = load_forecast_data(ticker, bars)
+
+        # A forecast starting at or before the latest bar was fitted on older prices (deferred by the scheduler)
+        if forecast_df is not None and bars == "1d" and forecast_df["ds"].min() <= df.index[-1]:
+            st.warning(f"⏳ Stale forecast: fitted on prices up to {forecast_df['ds'].min() - pd.Timedelta(days=1):%Y-%m-%d}, "
+                       f"before the latest close ({df.index[-1]:%Y-%m-%d}). It will be refreshed in a later forecast window.")
         if forecast_df is not None:
-            fig_fc = go.Figure()
-
-            # Historical data
-            fig_fc.add_trace(go.Scatter(
-                x=df.index,
-                y=df["Close"],
-                name="Historical",
-                line=dict(color="blue"),
-                hovertemplate="Date=%{x|%Y-%m-%d}<br>Close=%{y:.2f}<extra></extra>"
-            ))
-
-            # Forecast line + markers
-            fig_fc.add_trace(go.Scatter(
-                x=forecast_df["ds"],
-                y=forecast_df["yhat"],
-                mode="lines+markers",
-                name="Forecast",
-                line=dict(color="red"),
-                hovertemplate="Date=%{x|%Y-%m-%d}<br>Forecast=%{y:.2f}<extra></extra>"
-            ))
-
-            # Confidence interval shading
-            fig_fc.add_trace(go.Scatter(
-                x=pd.concat([forecast_df["ds"], forecast_df["ds"][::-1]]),
-                y=pd.concat([forecast_df["yhat_upper"], forecast_df["yhat_lower"][::-1]]),
-                fill="toself",
-                fillcolor="rgba(255,0,0,0.2)",
-                line=dict(color="rgba(255,255,255,0)"),
-                name="Confidence Interval",
-                hoverinfo="skip"
-            ))
-
-            fig_fc.update_layout(height=400, xaxis_title="Date", yaxis_title="Price", showlegend=True)
-            st.plotly_chart(fig_fc, use_container_width=True)
+            with timer.section("figure:forecast"):
+                fig = get_figure(ticker, "forecast", chart_df, forecast_df, bars=bars, bar_range=bar_range)
+            st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("No forecast available. Run forecast.py first.")
 
     # ---- Tab 4: Multi-Ticker Comparison ----
-    with tab4:
+    with tab4, timer.section("tab:comparison"):
         st.write("### Compare Multiple Companies")
         tickers_selected_labels = st.multiselect(
             "Select companies to compare", 
             sorted(ticker_labels.values()), 
-            default=[ticker_labels.get(ticker, ticker), "AAPL – Apple Inc.", "MSFT – Microsoft"]
+            default=list(dict.fromkeys(ticker_labels[t] for t in (ticker, "AAPL", "MSFT") if t in ticker_labels))
         )
 
         # Convert back from labels -> tickers
         tickers_selected = [t for t, lbl in ticker_labels.items() if lbl in tickers_selected_labels]
 
         data_dict = {}
-        for t in tickers_selected:
-            df_t = load_ticker_data(t)
-            if df_t is not None:
-                df_t = df_t[["Close"]].copy()
-                df_t["Normalized"] = df_t["Close"] / df_t["Close"].iloc[0] * 100
-                data_dict[t] = df_t
+        with timer.section("load:comparison"):
+            for t in tickers_selected:
+                df_t = load_ticker_data(t, columns=["Close"])
+                if df_t is not None:
+                    df_t = df_t.copy()
+                    df_t["Normalized"] = df_t["Close"] / df_t["Close"].iloc[0] * 100
+                    data_dict[t] = df_t
 
         if data_dict:
             compare_fig = go.Figure()
@@ -237,3 +385,221 @@ if df is not None:
             bar_fig = go.Figure([go.Bar(x=returns_df.index, y=returns_df["Return %"], marker_color="teal")])
             bar_fig.update_layout(height=400, title="Cumulative Return (%)")
             st.plotly_chart(bar_fig, use_container_width=True)
+
+    # ---- Tab 5: Correlation & Covariance ----
+    with tab5, timer.section("tab:correlation"):
+        st.write("### Return Correlation")
+        use_all = st.checkbox(f"Use all {len(all_tickers)} tickers", value=False)
+        if use_all:
+            corr_tickers = sorted(all_tickers)
+        else:
+            corr_labels = st.multiselect(
+                "Select companies",
+                sorted(ticker_labels.values()),
+                default=[ticker_labels[t] for t in tickers_selected],
+                key="corr_tickers",
+            )
+            corr_tickers = sorted(t for t, lbl in ticker_labels.items() if lbl in corr_labels)
+        window_label = st.radio("Window", list(CORRELATION_WINDOWS), index=1, horizontal=True)
+        window = CORRELATION_WINDOWS[window_label]
+
+        if len(corr_tickers) < 2:
+            st.info("Select at least two companies.")
+        else:
+            with timer.section("load:correlation"):
+                corr, cov, avg_corr = correlation_view(tuple(corr_tickers), window, data_version())
+
+            if len(corr) <= HEATMAP_MAX_TICKERS:
+                heat_fig = go.Figure(go.Heatmap(
+                    z=corr.values, x=corr.columns, y=corr.index,
+                    zmin=-1, zmax=1, colorscale="RdBu", reversescale=True,
+                    hovertemplate="%{y} / %{x}<br>ρ=%{z:.2f}<extra></extra>",
+                ))
+                heat_fig.update_layout(height=max(400, min(900, 18 * len(corr))),
+                                       title=f"Daily log-return correlation ({window_label})")
+                st.plotly_chart(heat_fig, use_container_width=True)
+            else:
+                st.info(f"Heatmap hidden for more than {HEATMAP_MAX_TICKERS} tickers; see the pair tables below.")
+
+            col1, col2 = st.columns(2)
+            col1.write("**Most correlated pairs**")
+            col1.dataframe(analytics.top_pairs(corr, 10).round(3), hide_index=True)
+            col2.write("**Least correlated pairs**")
+            col2.dataframe(analytics.top_pairs(corr, 10, ascending=True).round(3), hide_index=True)
+
+            rolling_window = window or analytics.DEFAULT_WINDOW
+            reference = st.selectbox("Rolling correlation against", corr_tickers,
+                                     index=corr_tickers.index(ticker) if ticker in corr_tickers else 0)
+            rolling = rolling_correlation_view(tuple(corr_tickers), reference, rolling_window, data_version())
+            others = [t for t in corr_tickers if t != reference][:10]
+            roll_fig = go.Figure()
+            for t in others:
+                roll_fig.add_trace(go.Scatter(x=rolling.index, y=rolling[t], name=t, line=dict(width=1)))
+            roll_fig.add_trace(go.Scatter(x=avg_corr.index, y=avg_corr, name="Selection average",
+                                          line=dict(color="black", width=2, dash="dash")))
+            roll_fig.update_layout(height=400, yaxis_range=[-1, 1],
+                                   title=f"{rolling_window}-day rolling correlation with {reference}")
+            st.plotly_chart(roll_fig, use_container_width=True)
+
+            with st.expander("Annualized covariance matrix"):
+                st.dataframe(cov.round(4))
+                st.download_button("Download correlation matrix (CSV)", corr.to_csv().encode("utf-8"),
+                                   file_name="correlation.csv", mime="text/csv")
+
+    # ---- Tab 6: Signal Backtest ----
+    with tab6, timer.section("tab:backtest"):
+        st.write("### Signal Backtest")
+        strategies = [s for s in backtest.STRATEGIES if s != "buy_and_hold"]
+        col1, col2, col3 = st.columns(3)
+        strategy = col1.selectbox("Strategy", strategies, format_func=lambda s: s.replace("_", " ").title())
+        # The selection by default: "All tickers" loads every ticker's Close (all of them from S3)
+        universe = col2.radio("Universe", ["Comparison selection", "All tickers"], horizontal=True,
+                              help="All tickers reads the Close column of the whole universe")
+        cost_bps = col3.number_input("Cost per trade (bps)", min_value=0.0, max_value=100.0,
+                                     value=backtest.COST_BPS, step=1.0)
+        defaults = backtest.STRATEGIES[strategy]["params"]
+        param_cols = st.columns(len(defaults))
+        params = tuple(
+            (name, col.number_input(name, min_value=1, max_value=400, value=int(value), key=f"bt_{strategy}_{name}"))
+            for col, (name, value) in zip(param_cols, defaults.items())
+        )
+        bt_tickers = tuple(sorted(all_tickers if universe == "All tickers" else tickers_selected))
+
+        if not bt_tickers:
+            st.info("Select companies in the comparison tab, or use all tickers.")
+        else:
+            with timer.section("load:backtest"):
+                result = backtest_view(strategy, params, cost_bps, bt_tickers, data_version())
+            stats, bench = result["stats"], result["benchmark_stats"]
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Total Return", f"{stats['total_return'] * 100:.1f}%",
+                        f"{(stats['total_return'] - bench['total_return']) * 100:.1f}% vs buy & hold")
+            col2.metric("Sharpe", f"{stats['sharpe']:.2f}", f"{stats['sharpe'] - bench['sharpe']:.2f}")
+            col3.metric("Max Drawdown", f"{stats['max_drawdown'] * 100:.1f}%",
+                        f"{(stats['max_drawdown'] - bench['max_drawdown']) * 100:.1f}%")
+            col4.metric("Exposure / Turnover", f"{stats['exposure'] * 100:.0f}%", f"{stats['turnover']:.1f}× per year",
+                        delta_color="off")
+
+            eq_fig = go.Figure()
+            eq_fig.add_trace(go.Scatter(x=result["equity"].index, y=result["equity"], name="Strategy"))
+            eq_fig.add_trace(go.Scatter(x=result["benchmark"].index, y=result["benchmark"],
+                                        name="Equal-weight buy & hold", line=dict(dash="dash")))
+            eq_fig.update_layout(height=400, title=f"Equity curve ({len(bt_tickers)} tickers, net of costs)")
+            st.plotly_chart(eq_fig, use_container_width=True)
+
+            dd_fig = go.Figure(go.Scatter(x=result["drawdown"].index, y=result["drawdown"] * 100,
+                                          fill="tozeroy", line=dict(color="firebrick", width=1), name="Drawdown"))
+            dd_fig.update_layout(height=250, title="Drawdown (%)")
+            st.plotly_chart(dd_fig, use_container_width=True)
+
+            per_ticker = result["per_ticker"][["total_return", "sharpe", "max_drawdown", "trades"]]
+            col1, col2 = st.columns(2)
+            col1.write("**Best tickers**")
+            col1.dataframe(per_ticker.sort_values("total_return", ascending=False).head(10).round(3))
+            col2.write("**Worst tickers**")
+            col2.dataframe(per_ticker.sort_values("total_return").head(10).round(3))
+
+            if st.checkbox("Run parameter sweep (strategy's default grid)"):
+                with timer.section("load:backtest_sweep"):
+                    grid = sweep_view(strategy, cost_bps, bt_tickers, data_version())
+                keys = list(backtest.STRATEGIES[strategy]["grid"])
+                if len(keys) >= 2 and not grid.empty:
+                    pivot = grid.pivot_table(index=keys[0], columns=keys[1], values="sharpe", aggfunc="max")
+                    sweep_fig = go.Figure(go.Heatmap(z=pivot.values, x=pivot.columns.astype(str),
+                                                     y=pivot.index.astype(str), colorscale="RdYlGn",
+                                                     hovertemplate=f"{keys[0]}=%{{y}} {keys[1]}=%{{x}}<br>"
+                                                                   "Sharpe=%{z:.2f}<extra></extra>"))
+                    sweep_fig.update_layout(height=400, title="Best Sharpe by parameters",
+                                            xaxis_title=keys[1], yaxis_title=keys[0])
+                    st.plotly_chart(sweep_fig, use_container_width=True)
+                st.dataframe(grid.round(4), hide_index=True)
+
+    # ---- Tab 7: Sectors ----
+    with tab7, timer.section("tab:sectors"):
+        st.write("### Sector Indices")
+        with timer.section("load:sectors"):
+            sector_data = load_sector_data(data_version())
+
+        if sector_data is None:
+            st.info("No sector indices available. Run `python -m pipeline.sectors` first.")
+        else:
+            indices, sector_summary, ticker_summary = sector_data
+            weighting = sector_summary["weighting"].iloc[0]
+            sector_window_label = st.radio("Period", list(SECTOR_WINDOWS), index=3, horizontal=True, key="sector_window")
+            sector_window = SECTOR_WINDOWS[sector_window_label]
+            shown = indices if sector_window is None else indices.iloc[-sector_window - 1:]
+            rebased = shown / shown.iloc[0] * 100
+
+            idx_fig = go.Figure()
+            for name in rebased.columns:
+                line = dict(color="black", width=2, dash="dash") if name == sectors.UNIVERSE else dict(width=1)
+                idx_fig.add_trace(go.Scatter(x=rebased.index, y=rebased[name], name=name, line=line))
+            idx_fig.update_layout(height=500, title=f"{weighting.title()}-weighted sector indices (rebased to 100)")
+            st.plotly_chart(idx_fig, use_container_width=True)
+
+            period_cols = [f"return_{p}" for p in sectors.PERIODS]
+            table = sector_summary[["members", "weight"] + period_cols].copy()
+            table[["weight"] + period_cols] *= 100
+            table.columns = ["Members", "Weight %"] + [f"{p} %" for p in sectors.PERIODS]
+            st.dataframe(table.round(2).style.background_gradient(cmap="RdYlGn", subset=[f"{p} %" for p in sectors.PERIODS]))
+
+            # ---- Selected ticker against its sector ----
+            if ticker in ticker_summary.index:
+                own = ticker_summary.loc[ticker]
+                st.write(f"### {ticker} vs {own['sector']}")
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Sector", own["sector"])
+                col2.metric("Weight in Sector", f"{own['weight_in_sector'] * 100:.2f}%")
+                col3.metric("1M vs Sector", f"{own['return_1M'] * 100:.2f}%", f"{own['excess_1M'] * 100:.2f}%")
+                col4.metric("1Y vs Sector", f"{own['return_1Y'] * 100:.2f}%", f"{own['excess_1Y'] * 100:.2f}%")
+
+                relative = load_sector_relative(ticker, data_version())
+                if relative is not None:
+                    rel = relative[ticker].reindex(shown.index).dropna()
+                    if not rel.empty:
+                        rel_fig = go.Figure(go.Scatter(x=rel.index, y=rel / rel.iloc[0] * 100, name="Relative strength",
+                                                       line=dict(color="teal")))
+                        rel_fig.add_hline(y=100, line=dict(color="gray", dash="dash"))
+                        rel_fig.update_layout(height=350, title=f"{ticker} relative to {own['sector']} "
+                                                                f"(above 100 = outperforming since the period start)")
+                        st.plotly_chart(rel_fig, use_container_width=True)
+
+                peers = ticker_summary[ticker_summary["sector"] == own["sector"]]
+                peer_cols = ["weight_in_sector"] + [f"excess_{p}" for p in ("1M", "3M", "1Y")]
+                st.write(f"**{own['sector']} members by 1Y excess return**")
+                st.dataframe((peers[peer_cols] * 100).round(2).sort_values("excess_1Y", ascending=False)
+                             .rename(columns=lambda c: c.replace("_", " ") + " %"))
+            else:
+                st.info(f"{ticker} is not in the last sector build.")
+
+    # ---- Tab 8 (optional): SQL ----
+    for tab8 in tab_sql:
+        with tab8, timer.section("tab:sql"):
+            from pipeline.query import EXAMPLE_QUERIES, MAX_ROWS, check_read_only
+            st.write("### Ad-hoc SQL")
+            st.caption("Views: `prices` (processed data), `forecasts`, `fundamentals`, `alerts`, `sectors` (per-ticker sector summary), and the `catalog` table.")
+            def load_example():
+                st.session_state["sql_text"] = EXAMPLE_QUERIES[st.session_state["sql_example"]].strip()
+            st.selectbox("Example", list(EXAMPLE_QUERIES), key="sql_example", on_change=load_example)
+            if "sql_text" not in st.session_state:
+                load_example()
+            sql = st.text_area("SQL", height=180, key="sql_text")
+            try:
+                con = get_sql_connection(data_version()).cursor()   # cursor: one per session thread
+                with timer.section("load:sql"):
+                    result = con.sql(check_read_only(sql))   # no DDL on the shared database
+                    result = result.limit(MAX_ROWS).df() if result is not None else None
+            except Exception as e:
+                st.error(f"{type(e).__name__}: {e}")
+            else:
+                if result is not None:
+                    st.caption(f"{len(result)} rows" + (f" (first {MAX_ROWS})" if len(result) == MAX_ROWS else ""))
+                    st.dataframe(result, hide_index=True)
+
+# ------------------------
+# Rerun timings (only when profiling is enabled)
+# ------------------------
+rerun_timings = timer.finish()
+if rerun_timings:
+    with st.sidebar.expander("⏱️ Rerun timings"):
+        st.dataframe(pd.DataFrame.from_dict(rerun_timings, orient="index", columns=["seconds"]).sort_values("seconds", ascending=False))
@@ -0,0 +1,171 @@
+# Load test for the read-only data API (pipeline/api.py): requests/s and latency percentiles
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+os.environ.setdefault("PIPELINE_METRICS", "0")
+
+from benchmarks.run import RESULTS_DIR, git_revision, workdir, _quiet
+from benchmarks.load_test import _percentiles
+
+# ------------------------
+# Config
+# ------------------------
+CLIENTS = [1, 4, 16]              # concurrent keep-alive clients per step
+REQUESTS = 300                    # requests per client per step
+TICKERS = 200                     # synthetic universe size
+HOT_SHARE = 0.8                   # share of requests that go to the hot tickers ...
+HOT_TICKERS = 0.1                 # ... which are this share of the universe
+CONDITIONAL_SHARE = 0.3           # requests revalidating a previous response with If-None-Match
+API_RESULTS_DIR = os.path.join(RESULTS_DIR, "api")
+
+# Request mix, with relative weights
+ENDPOINTS = {"bars": 6, "bars_columns": 2, "forecast": 1, "fundamentals": 1}
+FORMAT_WEIGHTS = {"arrow": 4, "parquet": 2, "json": 2}
+RANGES = ["2025-08-01", "2025-01-01", None]     # ~1 month, ~9 months, full history
+
+
+def make_request(rng, tickers, hot):
+    ticker = rng.choice(hot) if rng.random() < HOT_SHARE else rng.choice(tickers)
+    fmt = rng.choices(list(FORMAT_WEIGHTS), weights=FORMAT_WEIGHTS.values())[0]
+    kind = rng.choices(list(ENDPOINTS), weights=ENDPOINTS.values())[0]
+    if kind.startswith("bars"):
+        start = rng.choice(RANGES)
+        path = f"/bars/{ticker}?format={fmt}" + (f"&start={start}" if start else "")
+        if kind == "bars_columns":
+            path += "&columns=Close,RSI_14,EMA_20"
+    elif kind == "forecast":
+        path = f"/forecasts/{ticker}?format={fmt}"
+    else:
+        path = f"/fundamentals/{ticker}?format={fmt}"
+    return kind, path
+
+
+def run_client(port, seed, n, tickers, hot, out, lock):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    etags, rows = {}, []
+    for _ in range(n):
+        kind, path = make_request(rng, tickers, hot)
+        headers = {}
+        if path in etags and rng.random() < CONDITIONAL_SHARE:
+            headers["If-None-Match"] = etags[path]
+        t0 = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        resp = conn.getresponse()
+        body = resp.read()
+        rows.append((kind, resp.status, time.perf_counter() - t0, len(body)))
+        if resp.status == 200 and resp.getheader("ETag"):
+            etags[path] = resp.getheader("ETag")
+    conn.close()
+    with lock:
+        out.extend(rows)
+
+
+def run_step(port, clients, requests, tickers, hot, seed=0):
+    out, lock = [], threading.Lock()
+    threads = [threading.Thread(target=run_client, args=(port, seed * 1000 + i, requests, tickers, hot, out, lock),
+                                daemon=True) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies = [r[2] for r in out]
+    return {
+        "clients": clients,
+        "requests": len(out),
+        "errors": sum(r[1] >= 400 for r in out),
+        "not_modified": sum(r[1] == 304 for r in out),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(out) / elapsed, 1),
+        "mb_per_s": round(sum(r[3] for r in out) / elapsed / 1e6, 2),
+        "latency": _percentiles(latencies),
+        "by_endpoint": {k: _percentiles([r[2] for r in out if r[0] == k]) for k in ENDPOINTS},
+    }
+
+
+def print_step(row, label):
+    lat = row["latency"]
+    print(f"   {label:<9} {row['clients']:>3} clients  {row['rps']:>7.1f} req/s  p50 {lat['p50_ms']:>6.1f}ms  "
+          f"p99 {lat['p99_ms']:>6.1f}ms  304 {row['not_modified'] / row['requests']:.0%}  "
+          f"{row['mb_per_s']:.1f} MB/s  errors {row['errors']}")
+
+
+def reparse_baseline(tickers, n=200, seed=0):
+    """What consumers do today: read and slice the Parquet file themselves, per request."""
+    import pandas as pd
+    rng = random.Random(seed)
+    times = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        pd.read_parquet(os.path.join("data", "processed", f"{rng.choice(tickers)}.parquet")).loc["2025-01-01":]
+        times.append(time.perf_counter() - t0)
+    return _percentiles(times)
+
+
+def bench_api(clients=CLIENTS, requests=REQUESTS, n_tickers=TICKERS, save=True, results_dir=API_RESULTS_DIR):
+    """
+    Serve a synthetic universe from an in-process API server and ramp keep-alive
+    clients over a skewed request mix (HOT_SHARE of requests on HOT_TICKERS of the
+    universe, a third of repeats revalidated with If-None-Match). Each step runs
+    with the hot cache, and the largest step once more with the cache disabled.
+    """
+    from pipeline import api
+    from pipeline.storage import LocalStorage
+    from pipeline.transform import run_transformation
+
+    report = {"timestamp": time.strftime("%Y%m%dT%H%M%S"), "git_rev": git_revision(), "cpus": os.cpu_count(),
+              "tickers": n_tickers, "requests_per_client": requests, "steps": []}
+    with workdir(n_tickers) as tickers:
+        _quiet(run_transformation)()
+        hot = tickers[:max(1, int(len(tickers) * HOT_TICKERS))]
+        report["reparse_baseline"] = reparse_baseline(tickers)
+        print(f"🌐 Data API load test: {n_tickers} tickers, {requests} requests per client "
+              f"(direct read_parquet p50 {report['reparse_baseline']['p50_ms']}ms, "
+              f"p99 {report['reparse_baseline']['p99_ms']}ms)")
+
+        for label, cache_mb in (("hot cache", api.HOT_CACHE_MB), ("no cache", 0)):
+            server = api.DataAPIServer(("127.0.0.1", 0), api.DataService(LocalStorage("data"),
+                                                                         api.HotCache(cache_mb * 1024 * 1024)))
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                steps = clients if cache_mb else clients[-1:]
+                for i, n in enumerate(steps):
+                    row = run_step(server.server_port, n, requests, tickers, hot, seed=i)
+                    row["cache"] = server.service.cache.stats() if cache_mb else None
+                    row["label"] = label
+                    print_step(row, label)
+                    report["steps"].append(row)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    if save:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = os.path.join(results_dir, f"{report['timestamp']}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved API load test → {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the read-only data API: requests/s and p99 latency")
+    parser.add_argument("--clients", default=",".join(map(str, CLIENTS)), help="comma-separated ramp steps")
+    parser.add_argument("--requests", type=int, default=REQUESTS, help="requests per client per step")
+    parser.add_argument("--tickers", type=int, default=TICKERS, help="synthetic universe size")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    bench_api([int(c) for c in args.clients.split(",")], args.requests, args.tickers, save=not args.no_save)
@@ -0,0 +1,125 @@
+# Daily refresh latency: a cold batch run (main.py) vs an incremental refresh of the warm pipeline daemon
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+os.environ.setdefault("PIPELINE_METRICS", "0")
+
+import pandas as pd
+
+from benchmarks.run import RESULTS_DIR, git_revision, _quiet, use_synthetic_source
+from benchmarks.universes import _Silenced
+
+# ------------------------
+# Config
+# ------------------------
+TICKERS = 100
+REFRESHES = 3                       # consecutive trading days refreshed by the daemon
+MAIN_PATH = os.path.join(REPO_ROOT, "main.py")
+DAEMON_RESULTS_DIR = os.path.join(RESULTS_DIR, "daemon")
+# main.py with the synthetic source swapped in: argv[0] is the script, the rest its arguments
+SYNTHETIC_MAIN = ("import sys, runpy; sys.path.insert(0, sys.argv[2]); "
+                  "from benchmarks.run import use_synthetic_source; use_synthetic_source(); "
+                  "sys.argv = [sys.argv[1], *sys.argv[3:]]; runpy.run_path(sys.argv[0], run_name='__main__')")
+
+
+def next_day(end: str, day: int) -> str:
+    """
+    Extraction end date for the `day`-th refresh after `end`, one new bar each: the
+    synthetic source draws busday_count(start, end) bars (end excluded) dated up to `end`.
+    """
+    return (pd.Timestamp(end) + pd.offsets.BDay(2 * day)).date().isoformat()
+
+
+def cold_batch(end, stages):
+    """What a nightly job does today: a fresh process re-extracting, transforming and forecasting everything."""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", SYNTHETIC_MAIN, MAIN_PATH, REPO_ROOT, "--stages", ",".join(stages), "--refresh", "--end", end,
+                    "--no-alerts", "--no-sectors"], capture_output=True, text=True, check=True)
+    return round(time.perf_counter() - t0, 2)
+
+
+def bench_daemon(n_tickers=TICKERS, refreshes=REFRESHES, save=True, results_dir=DAEMON_RESULTS_DIR):
+    """
+    Synthetic universe in a temporary folder. Times one cold batch run for the
+    next trading day, then starts the daemon over the same data and times
+    `refreshes` incremental refreshes, one new bar each, through to a published
+    snapshot.
+    """
+    from pipeline import daemon
+    from pipeline.synthetic import DEFAULT_END, write_universe
+    from pipeline.transform import run_transformation
+
+    use_synthetic_source()
+    forecasting = importlib.util.find_spec("prophet") is not None
+    stages = ["extract", "transform"] + (["forecast"] if forecasting else [])
+    if not forecasting:
+        print("⏭️ forecasts skipped (prophet is not installed)")
+    report = {"timestamp": time.strftime("%Y%m%dT%H%M%S"), "git_rev": git_revision(), "cpus": os.cpu_count(),
+              "tickers": n_tickers, "stages": stages, "refreshes": []}
+    old_cwd = os.getcwd()
+    path = tempfile.mkdtemp(prefix="sp500_daemon_")
+    try:
+        os.chdir(path)
+        _quiet(lambda: write_universe("data", n_tickers, forecasts=False))()
+        _quiet(run_transformation)()
+        report["cold_batch_s"] = cold_batch(next_day(DEFAULT_END, 1), stages)
+
+        # Back to the same starting point for the daemon
+        shutil.rmtree("data")
+        _quiet(lambda: write_universe("data", n_tickers, forecasts=False))()
+        _quiet(run_transformation)()
+        d = daemon.PipelineDaemon(every=None)
+        t0 = time.perf_counter()
+        with _Silenced():
+            d.start()
+        report["startup_s"] = round(time.perf_counter() - t0, 2)
+        try:
+            for day in range(1, refreshes + 1):
+                with _Silenced():
+                    summary = d.refresh(end=next_day(DEFAULT_END, day))
+                report["refreshes"].append({k: summary[k] for k in ("seconds", "updated", "new_bars", "forecasts", "steps")})
+            report["status"] = d.status()
+        finally:
+            d.stop()
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(path, ignore_errors=True)
+
+    warm = sorted(r["seconds"] for r in report["refreshes"])
+    report["warm_refresh_p50_s"] = warm[len(warm) // 2]
+    report["speedup"] = round(report["cold_batch_s"] / max(report["warm_refresh_p50_s"], 1e-6), 1)
+    print(f"⏱️  {n_tickers} tickers, one new bar per refresh ({' → '.join(stages)} → publish)")
+    print(f"   cold batch (main.py)      {report['cold_batch_s']:>7.2f}s")
+    print(f"   daemon start-up           {report['startup_s']:>7.2f}s  (once: load panel, warm forecast workers)")
+    for i, r in enumerate(report["refreshes"], start=1):
+        steps = "  ".join(f"{k[:-2]} {v:.2f}s" for k, v in r["steps"].items())
+        print(f"   warm refresh {i}            {r['seconds']:>7.2f}s  ({r['updated']} updated; {steps})")
+    print(f"   → {report['speedup']}× faster than the cold batch")
+
+    if save:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = os.path.join(results_dir, f"{report['timestamp']}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"💾 Saved daemon benchmark → {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare a cold batch run with warm incremental daemon refreshes")
+    parser.add_argument("--tickers", type=int, default=TICKERS)
+    parser.add_argument("--refreshes", type=int, default=REFRESHES)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    bench_daemon(args.tickers, args.refreshes, save=not args.no_save)
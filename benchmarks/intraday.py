@@ -0,0 +1,125 @@
+# Intraday-scale benchmark: chunked build, incremental append, range reads, peak memory
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+
+import pandas as pd
+
+from benchmarks.run import RESULTS_DIR, git_revision, _quiet
+from pipeline import intraday
+from pipeline.synthetic import generate_intraday, pick_tickers
+
+# ------------------------
+# Config
+# ------------------------
+TICKERS = 50
+INTERVAL = "5m"
+DAYS = 120                          # sessions of history per ticker (~4 monthly chunks)
+RANGE_SESSIONS = 5                  # the app's default range
+INTRADAY_RESULTS_DIR = os.path.join(RESULTS_DIR, "intraday")
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def _peak_mb(fn):
+    """Peak traced Python/numpy allocation while running `fn`."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def _dir_mb(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files) / 1e6
+
+
+def bench_intraday(n_tickers=TICKERS, interval=INTERVAL, days=DAYS, save=True, results_dir=INTRADAY_RESULTS_DIR):
+    """
+    Synthetic `days` sessions of `interval` bars for `n_tickers` tickers, written
+    to monthly chunks in a temporary folder. Times the full build, a one-session
+    incremental update, range reads, and compares peak memory of the chunked
+    transform with whole-history indicators (transform.add_indicators).
+    """
+    intraday.check_interval(interval)
+    freq = intraday.INTERVALS[interval]["freq"]
+    tickers = pick_tickers(n_tickers)
+    old_cwd = os.getcwd()
+    path = tempfile.mkdtemp(prefix="sp500_intraday_")
+    report = {"timestamp": time.strftime("%Y%m%dT%H%M%S"), "git_rev": git_revision(), "tickers": n_tickers,
+              "interval": interval, "sessions": days}
+    try:
+        os.chdir(path)
+        # History up to the second-to-last session; the last one is the incremental update
+        history = {t: generate_intraday(t, freq, days + 1) for t in tickers}
+        bars_per_day = len(next(iter(history.values()))) // (days + 1)
+        report["bars"] = bars_per_day * days * n_tickers
+
+        _, report["append_s"] = _timed(lambda: [intraday.append_raw(df.iloc[:-bars_per_day], t, interval)
+                                                for t, df in history.items()])
+        _, report["build_s"] = _timed(_quiet(lambda: [intraday.process_ticker(t, interval) for t in tickers]))
+        report["processed_mb"] = round(_dir_mb(intraday.PROCESSED_ROOT), 1)
+
+        def update():
+            for t, df in history.items():
+                intraday.append_raw(df.iloc[-bars_per_day:], t, interval)
+                intraday.process_ticker(t, interval)
+        _, report["update_s"] = _timed(_quiet(update))
+
+        last = history[tickers[0]].index[-1].normalize()
+        start = last - pd.offsets.BDay(RANGE_SESSIONS - 1)
+        _, report["read_range_s"] = _timed(lambda: [intraday.read_range(t, interval, start) for t in tickers])
+        _, report["read_all_s"] = _timed(lambda: [intraday.read_range(t, interval) for t in tickers])
+
+        # Peak memory for one ticker: chunk-at-a-time vs the whole history in one frame
+        from pipeline.transform import add_indicators, clean_columns
+        t = tickers[0]
+        shutil.rmtree(intraday.chunk_dir(intraday.PROCESSED_ROOT, interval, t))
+        report["peak_chunked_mb"] = round(_peak_mb(_quiet(lambda: intraday.process_ticker(t, interval))), 1)
+        report["peak_full_mb"] = round(_peak_mb(lambda: add_indicators(clean_columns(history[t]))), 1)
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(path, ignore_errors=True)
+
+    for key in ("append_s", "build_s", "update_s", "read_range_s", "read_all_s"):
+        report[key] = round(report[key], 3)
+    print(f"⏱️  {n_tickers} tickers × {days} sessions of {interval} bars ({report['bars']:,} bars, "
+          f"{report['processed_mb']} MB processed)")
+    print(f"   build {report['build_s']:.2f}s  ({report['bars'] / report['build_s']:,.0f} bars/s)")
+    print(f"   +1 session append+transform {report['update_s']:.2f}s  ({report['update_s'] / n_tickers * 1e3:.1f} ms/ticker)")
+    print(f"   read last {RANGE_SESSIONS} sessions {report['read_range_s'] * 1e3 / n_tickers:.1f} ms/ticker  "
+          f"vs full history {report['read_all_s'] * 1e3 / n_tickers:.1f} ms/ticker")
+    print(f"   peak memory, one ticker: chunked {report['peak_chunked_mb']} MB  vs whole history {report['peak_full_mb']} MB")
+
+    if save:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = os.path.join(results_dir, f"{report['timestamp']}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved intraday benchmark → {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the chunked intraday store on synthetic bars")
+    parser.add_argument("--tickers", type=int, default=TICKERS)
+    parser.add_argument("--interval", choices=list(intraday.INTERVALS), default=INTERVAL)
+    parser.add_argument("--days", type=int, default=DAYS, help="sessions of history per ticker")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    bench_intraday(args.tickers, args.interval, args.days, save=not args.no_save)
@@ -0,0 +1,258 @@
+# Concurrent-session load test for the Streamlit dashboard (headless, via AppTest)
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import statistics
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")   # hide per-thread "missing ScriptRunContext" warnings
+
+from benchmarks.run import RESULTS_DIR, git_revision, workdir, _quiet, _silence_streamlit
+
+# ------------------------
+# Config
+# ------------------------
+APP_PATH = os.path.join(REPO_ROOT, "app", "app.py")
+SESSIONS = [1, 4, 8, 16]           # concurrent sessions per ramp step
+RERUNS = 20                        # interactions per session per step
+TICKERS = 50                       # synthetic universe size
+THINK_TIME = 0.0                   # seconds between a session's interactions
+SLO_MS = 1000                      # p95 rerun latency considered acceptable
+RSS_SAMPLE_INTERVAL = 0.1
+LOAD_RESULTS_DIR = os.path.join(RESULTS_DIR, "load")
+
+# What a user does between reruns, with relative weights
+ACTIONS = {"ticker": 4, "viz": 3, "compare": 2}
+VIZ_LABEL = "Select Visualization"
+TICKER_LABEL = "Select a Company"
+COMPARE_LABEL = "Select companies to compare"
+
+
+# ------------------------
+# Memory
+# ------------------------
+def rss_mb():
+    """Current resident set size of this process (psutil, /proc, or peak RSS as a last resort)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1e6 if sys.platform == "darwin" else 1e3)
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+# ------------------------
+# Sessions
+# ------------------------
+def _widget(elements, label):
+    return next(w for w in elements if w.label == label)
+
+
+def run_session(seed, reruns, think_time, latencies, errors, lock):
+    """One simulated user: open the app, then switch tickers, charts and comparison sets."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    actions, weights = zip(*ACTIONS.items())
+    t0 = time.perf_counter()
+    at = AppTest.from_file(APP_PATH, default_timeout=120).run()
+    first = time.perf_counter() - t0
+
+    own = []
+    for _ in range(reruns):
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+        action = rng.choices(actions, weights)[0]
+        try:
+            if action == "ticker":
+                w = _widget(at.sidebar.selectbox, TICKER_LABEL)
+                w.select(rng.choice(w.options))
+            elif action == "viz":
+                w = _widget(at.selectbox, VIZ_LABEL)
+                w.select(rng.choice(w.options))
+            else:
+                w = _widget(at.multiselect, COMPARE_LABEL)
+                w.set_value(rng.sample(w.options, min(len(w.options), rng.randint(2, 5))))
+            t = time.perf_counter()
+            at.run()
+            own.append((action, time.perf_counter() - t))
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+        except Exception as e:
+            with lock:
+                errors.append(f"{action}: {type(e).__name__}: {e}")
+    with lock:
+        latencies["first"].append(first)
+        for action, seconds in own:
+            latencies["rerun"].append(seconds)
+            latencies.setdefault(action, []).append(seconds)
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 1),
+        "p90_ms": round(pick(0.90) * 1000, 1),
+        "p95_ms": round(pick(0.95) * 1000, 1),
+        "p99_ms": round(pick(0.99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+        "mean_ms": round(statistics.fmean(values) * 1000, 1),
+    }
+
+
+def run_step(sessions, reruns=RERUNS, think_time=THINK_TIME, seed=0):
+    """Run `sessions` concurrent users to completion; return latency, throughput and memory stats."""
+    latencies, errors, lock = {"first": [], "rerun": []}, [], threading.Lock()
+    sampler = RssSampler()
+    rss_start = rss_mb()
+    sampler.start()
+    threads = [
+        threading.Thread(target=run_session, args=(seed * 1000 + i, reruns, think_time, latencies, errors, lock),
+                         name=f"session-{i}", daemon=True)
+        for i in range(sessions)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    peak = sampler.stop()
+    rss_end = rss_mb()
+
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies["rerun"]),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies["rerun"]) / elapsed, 2) if elapsed else None,
+        "rerun": _percentiles(latencies["rerun"]),
+        "first_render": _percentiles(latencies["first"]),
+        "by_action": {a: _percentiles(latencies[a]) for a in ACTIONS if a in latencies},
+        "rss_start_mb": round(rss_start, 1),
+        "rss_end_mb": round(rss_end, 1),
+        "rss_peak_mb": round(peak, 1),
+        "rss_growth_mb": round(rss_end - rss_start, 1),
+    }
+
+
+def print_step(row, slo_ms=SLO_MS):
+    r = row["rerun"]
+    flag = "⚠️" if not r or r["p95_ms"] > slo_ms or row["errors"] else "✅"
+    print(f"{flag} {row['sessions']:>3} sessions  {row['reruns']:>5} reruns  "
+          f"p50 {r.get('p50_ms', 0):>7.1f}ms  p95 {r.get('p95_ms', 0):>7.1f}ms  p99 {r.get('p99_ms', 0):>7.1f}ms  "
+          f"{row['throughput_rps']:>6.1f} reruns/s  RSS {row['rss_start_mb']:.0f}→{row['rss_end_mb']:.0f}MB "
+          f"(peak {row['rss_peak_mb']:.0f})  errors {row['errors']}")
+
+
+# ------------------------
+# Driver
+# ------------------------
+def load_test(sessions=SESSIONS, reruns=RERUNS, n_tickers=TICKERS, think_time=THINK_TIME, slo_ms=SLO_MS,
+              data_dir=None, save=True, results_dir=LOAD_RESULTS_DIR):
+    """
+    Ramp through `sessions` concurrent users against app/app.py. All sessions share
+    one process, like a single Streamlit server, so st.cache_* is shared between them.
+    Uses a synthetic universe of `n_tickers` unless `data_dir` points at a real data root.
+    """
+    os.environ.setdefault("PIPELINE_METRICS", "0")
+    report = {
+        "timestamp": time.strftime("%Y%m%dT%H%M%S"),
+        "git_rev": git_revision(),
+        "cpus": os.cpu_count(),
+        "tickers": n_tickers,
+        "reruns_per_session": reruns,
+        "think_time_s": think_time,
+        "slo_p95_ms": slo_ms,
+        "steps": [],
+    }
+
+    def ramp():
+        from pipeline.transform import run_transformation
+        if not os.path.isdir(os.path.join("data", "processed")):
+            _quiet(run_transformation)()
+        _silence_streamlit()
+        print(f"👥 Load test: {','.join(map(str, sessions))} concurrent sessions × {reruns} reruns")
+        for i, n in enumerate(sessions):
+            row = run_step(n, reruns, think_time, seed=i)
+            print_step(row, slo_ms)
+            report["steps"].append(row)
+
+    if data_dir:
+        old_cwd = os.getcwd()
+        os.chdir(os.path.dirname(os.path.abspath(data_dir)))
+        try:
+            ramp()
+        finally:
+            os.chdir(old_cwd)
+    else:
+        with workdir(n_tickers):
+            ramp()
+
+    over = [s["sessions"] for s in report["steps"] if not s["rerun"] or s["rerun"]["p95_ms"] > slo_ms]
+    report["saturated_at"] = over[0] if over else None
+    if over:
+        print(f"📉 p95 exceeds {slo_ms}ms from {over[0]} concurrent sessions")
+
+    if save:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = os.path.join(results_dir, f"{report['timestamp']}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved load test → {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions and report rerun latency")
+    parser.add_argument("--sessions", default=",".join(map(str, SESSIONS)), help="comma-separated ramp steps")
+    parser.add_argument("--reruns", type=int, default=RERUNS, help="interactions per session per step")
+    parser.add_argument("--tickers", type=int, default=TICKERS, help="synthetic universe size")
+    parser.add_argument("--think-time", type=float, default=THINK_TIME, help="mean seconds between interactions")
+    parser.add_argument("--slo-ms", type=float, default=SLO_MS, help="p95 rerun latency budget")
+    parser.add_argument("--data", default=None, help="use an existing data root (e.g. ./data) instead of synthetic data")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    load_test(
+        sessions=[int(s) for s in args.sessions.split(",")],
+        reruns=args.reruns,
+        n_tickers=args.tickers,
+        think_time=args.think_time,
+        slo_ms=args.slo_ms,
+        data_dir=args.data,
+        save=not args.no_save,
+    )
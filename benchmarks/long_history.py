@@ -0,0 +1,185 @@
+# Long-history check: out-of-core transform and windowed forecasts on a synthetic multi-decade universe
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import importlib.util
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+os.environ.setdefault("PIPELINE_METRICS", "0")
+
+import pandas as pd
+
+from benchmarks.run import RESULTS_DIR, git_revision, _quiet
+from benchmarks.load_test import RssSampler
+from benchmarks.universes import tree_rss_mb, _Silenced
+
+# ------------------------
+# Config
+# ------------------------
+TICKERS = 500
+YEARS = 30
+TRADING_DAYS_PER_YEAR = 252
+WORKER_MEMORY_MB = 512              # per transform worker (--worker-memory-mb)
+CHECK_TICKERS = 5                   # chunked vs in-memory output compared on this many tickers
+FORECAST_TICKERS = 5                # fitted with the full history, the default window and a weekly series
+LONG_HISTORY_RESULTS_DIR = os.path.join(RESULTS_DIR, "long_history")
+
+
+class WorkerRssSampler(RssSampler):
+    """Peak RSS of the process tree, and of the largest single worker process."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.worker_peak = 0.0
+
+    def run(self):
+        import psutil
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, tree_rss_mb())
+            for p in psutil.Process().children(recursive=True):
+                try:
+                    self.worker_peak = max(self.worker_peak, p.memory_info().rss / 1e6)
+                except psutil.Error:   # worker exited between listing and reading
+                    pass
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def check_outputs(tickers, chunk_rows):
+    """Largest difference between chunked and in-memory transform output (same files otherwise)."""
+    from pipeline import transform
+    worst = 0.0
+    for t in tickers:
+        path = os.path.join(transform.RAW_DIR, f"{t}_raw.csv")
+        full = pd.read_parquet(_quiet(lambda: transform.process_file(path, "check/full"))())
+        chunked = pd.read_parquet(_quiet(lambda: transform.process_file_chunked(path, "check/chunked", chunk_rows))())
+        pd.testing.assert_frame_equal(full, chunked, check_exact=False, rtol=1e-9)
+        worst = max(worst, float((full - chunked).abs().max().max()))
+    shutil.rmtree("check", ignore_errors=True)
+    return worst
+
+
+def run_transform(long_history, memory_mb):
+    """One streamed transform over the universe; wall time and peak RSS (tree and largest worker)."""
+    from pipeline import runner
+    sampler = WorkerRssSampler()
+    sampler.start()
+    with _Silenced():
+        results, seconds = _timed(lambda: runner.run_pipeline(stages=["transform"], scan_alerts=False,
+                                                              build_sectors=False, long_history=long_history,
+                                                              memory_mb=memory_mb))
+    tree_peak = sampler.stop()
+    return {
+        "seconds": round(seconds, 2),
+        "ok": sum(r["status"] == "ok" for r in results),
+        "failed": [f"{r['ticker']}: {r['error']}" for r in results if r["status"] == "failed"],
+        "peak_tree_mb": round(tree_peak, 1),
+        "peak_worker_mb": round(sampler.worker_peak, 1),
+    }
+
+
+def forecast_inputs(tickers, fit):
+    """Rows fed to Prophet (and fit seconds, when it is installed) for the full history, the window and weekly bars."""
+    from pipeline import forecast
+    out = {}
+    for label, window, resample in (("full", None, None), ("window", forecast.LONG_HISTORY_WINDOW_DAYS, None),
+                                    ("weekly", None, "W")):
+        rows, read_s = [], []
+        for t in tickers:
+            df, seconds = _timed(lambda: forecast.load_history(os.path.join(forecast.PROCESSED_DIR, f"{t}.parquet"),
+                                                               window, resample))
+            rows.append(len(df))
+            read_s.append(seconds)
+        row = {"rows": int(sum(rows) / len(rows)), "read_ms": round(sum(read_s) / len(read_s) * 1e3, 2)}
+        if fit:
+            _, seconds = _timed(_quiet(lambda: [forecast.forecast_ticker(t, 7, window, resample) for t in tickers]))
+            row["fit_s"] = round(seconds / len(tickers), 2)
+        out[label] = row
+    return out
+
+
+def bench_long_history(n_tickers=TICKERS, years=YEARS, memory_mb=WORKER_MEMORY_MB, save=True,
+                       results_dir=LONG_HISTORY_RESULTS_DIR):
+    """
+    Synthetic `years` of daily bars for `n_tickers` tickers in a temporary folder.
+    Checks that the out-of-core transform matches the in-memory one, runs the
+    whole universe through it under the per-worker RSS cap (and once in memory
+    for comparison), and measures what Prophet is fed with the default trailing
+    window and with weekly bars.
+    """
+    from pipeline import transform
+    from pipeline.synthetic import write_universe
+
+    report = {"timestamp": time.strftime("%Y%m%dT%H%M%S"), "git_rev": git_revision(), "cpus": os.cpu_count(),
+              "tickers": n_tickers, "years": years, "worker_memory_mb": memory_mb,
+              "chunk_rows": transform.CHUNK_ROWS}
+    old_cwd = os.getcwd()
+    path = tempfile.mkdtemp(prefix="sp500_long_history_")
+    try:
+        os.chdir(path)
+        tickers, report["write_s"] = _timed(_quiet(lambda: write_universe(
+            "data", n_tickers, years * TRADING_DAYS_PER_YEAR, forecasts=False, fundamentals=False)))
+        report["bars"] = n_tickers * years * TRADING_DAYS_PER_YEAR
+        report["raw_mb"] = round(sum(os.path.getsize(os.path.join(transform.RAW_DIR, f))
+                                     for f in os.listdir(transform.RAW_DIR)) / 1e6, 1)
+        print(f"🧪 {n_tickers} tickers × {years} years ({report['bars']:,} bars, {report['raw_mb']} MB of raw CSV)")
+
+        # Small chunks, so every indicator crosses several chunk boundaries
+        report["max_abs_diff"] = check_outputs(tickers[:CHECK_TICKERS], chunk_rows=TRADING_DAYS_PER_YEAR)
+        print(f"   chunked vs in-memory output on {CHECK_TICKERS} tickers: max |diff| {report['max_abs_diff']:.2e}")
+
+        report["in_memory"] = run_transform(False, memory_mb)
+        report["out_of_core"] = run_transform(True, memory_mb)
+        import pyarrow.parquet as pq
+        report["row_groups"] = pq.ParquetFile(os.path.join(transform.PROCESSED_DIR, f"{tickers[0]}.parquet")
+                                              ).metadata.num_row_groups
+        for label in ("in_memory", "out_of_core"):
+            row = report[label]
+            print(f"   {label:<12} {row['seconds']:>7.1f}s  ok {row['ok']}  failed {len(row['failed'])}  "
+                  f"peak RSS: largest worker {row['peak_worker_mb']:.0f} MB, tree {row['peak_tree_mb']:.0f} MB")
+
+        fit = importlib.util.find_spec("prophet") is not None
+        if not fit:
+            print("⏭️ forecast fits skipped (prophet is not installed)")
+        report["forecast"] = forecast_inputs(tickers[:FORECAST_TICKERS], fit)
+        for label, row in report["forecast"].items():
+            print(f"   forecast input {label:<7} {row['rows']:>6} rows  read {row['read_ms']:.1f} ms"
+                  + (f"  fit {row['fit_s']:.2f}s" if "fit_s" in row else ""))
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(path, ignore_errors=True)
+
+    ooc = report["out_of_core"]
+    report["within_cap"] = not ooc["failed"] and ooc["peak_worker_mb"] <= memory_mb
+    print(f"{'✅' if report['within_cap'] else '⚠️'} out-of-core transform: {ooc['ok']}/{n_tickers} tickers, "
+          f"largest worker {ooc['peak_worker_mb']:.0f} MB (cap {memory_mb:.0f} MB), {report['row_groups']} row groups per file")
+
+    if save:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = os.path.join(results_dir, f"{report['timestamp']}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved long-history check → {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the out-of-core long-history mode on a synthetic universe")
+    parser.add_argument("--tickers", type=int, default=TICKERS)
+    parser.add_argument("--years", type=int, default=YEARS)
+    parser.add_argument("--worker-memory-mb", type=float, default=WORKER_MEMORY_MB)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    report = bench_long_history(args.tickers, args.years, args.worker_memory_mb, save=not args.no_save)
+    sys.exit(0 if report["within_cap"] else 1)
@@ -0,0 +1,137 @@
+# Data-quality stage: detection, repair and run time on a synthetic universe with injected defects
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+os.environ.setdefault("PIPELINE_METRICS", "0")
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.run import RESULTS_DIR, git_revision, _quiet
+
+# ------------------------
+# Config
+# ------------------------
+TICKERS = 500
+DEFECT_SHARE = 0.2                  # share of tickers given one injected defect
+SEED = 7
+QUALITY_RESULTS_DIR = os.path.join(RESULTS_DIR, "quality")
+
+# Injected defect → status the stage should end with
+EXPECTED = {
+    "gaps": "quarantined",          # 10% of trading days missing
+    "stale": "quarantined",         # last 15 bars frozen
+    "zero_volume": "repaired",
+    "split": "repaired",            # 4:1 split the prices were not adjusted for
+    "ohlc": "repaired",             # High below the bar's Open / Close
+    "spike": "repaired",            # one bad tick, +60%
+}
+
+
+def inject_defects(raw_dir, tickers, share=DEFECT_SHARE, seed=SEED) -> dict:
+    """Damage the raw CSVs of a `share` of `tickers`, one defect each; returns {ticker: defect}."""
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(tickers, int(len(tickers) * share), replace=False)
+    defects = {t: list(EXPECTED)[i % len(EXPECTED)] for i, t in enumerate(sorted(picked))}
+    for t, defect in defects.items():
+        path = os.path.join(raw_dir, f"{t}_raw.csv")
+        df = pd.read_csv(path, index_col="date")
+        n = len(df)
+        rows = rng.choice(np.arange(60, n - 20), 5, replace=False)
+        if defect == "gaps":
+            df = df.drop(df.index[rng.choice(np.arange(1, n - 1), n // 10, replace=False)])
+        elif defect == "stale":
+            df.iloc[-15:, df.columns.get_indexer(["open", "high", "low", "close", "adjclose"])] = df["close"].iloc[-16]
+        elif defect == "zero_volume":
+            df.iloc[rows, df.columns.get_loc("volume")] = 0
+        elif defect == "split":
+            k = int(rows[0])
+            cols = df.columns.get_indexer(["open", "high", "low", "close", "adjclose"])
+            df.iloc[:k, cols] = df.iloc[:k, cols] * 4
+            df.iloc[k, df.columns.get_loc("splits")] = 4.0
+        elif defect == "ohlc":
+            df.iloc[rows, df.columns.get_loc("high")] = df[["open", "close"]].iloc[rows].min(axis=1) * 0.99
+        elif defect == "spike":
+            k = int(rows[0])
+            df.iloc[k, df.columns.get_indexer(["high", "close"])] = df["close"].iloc[k] * 1.6
+        df.to_csv(path)
+    return defects
+
+
+def bench_quality(n_tickers=TICKERS, save=True, results_dir=QUALITY_RESULTS_DIR):
+    """
+    Synthetic universe in a temporary folder, a share of it damaged, then
+    transformed. Times the quality stage over the whole universe and compares
+    each ticker's status with the defect it was given (clean tickers should
+    stay ok).
+    """
+    from pipeline import quality
+    from pipeline.synthetic import write_universe
+    from pipeline.transform import RAW_DIR, run_transformation
+
+    report = {"timestamp": time.strftime("%Y%m%dT%H%M%S"), "git_rev": git_revision(), "cpus": os.cpu_count(),
+              "tickers": n_tickers, "repairs": list(quality.parse_repairs())}
+    old_cwd = os.getcwd()
+    path = tempfile.mkdtemp(prefix="sp500_quality_")
+    try:
+        os.chdir(path)
+        tickers = _quiet(lambda: write_universe("data", n_tickers, forecasts=False, fundamentals=False))()
+        defects = inject_defects(RAW_DIR, tickers)
+        _quiet(run_transformation)()
+
+        t0 = time.perf_counter()
+        result = _quiet(lambda: quality.validate(tickers))()
+        report["seconds"] = round(time.perf_counter() - t0, 2)
+        t0 = time.perf_counter()
+        _quiet(lambda: quality.validate(tickers))()
+        report["rerun_seconds"] = round(time.perf_counter() - t0, 2)
+        rerun = quality.read_report()
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(path, ignore_errors=True)
+
+    expected = pd.Series({t: EXPECTED.get(defects.get(t), "ok") for t in result.index})
+    defect = pd.Series({t: defects.get(t, "clean") for t in result.index})
+    hits = result["status"] == expected
+    report["by_defect"] = {d: {"tickers": int((defect == d).sum()), "expected": EXPECTED.get(d, "ok"),
+                               "matched": int(hits[defect == d].sum())} for d in ["clean", *EXPECTED]}
+    report["mismatches"] = {t: f"{defect[t]}: {result.at[t, 'status']} ({result.at[t, 'reasons']})"
+                            for t in result.index[~hits]}
+    # After repairs, a second pass should find nothing left to fix
+    report["clean_on_rerun"] = bool((rerun["repaired_rows"] == 0).all())
+    report["passed"] = bool(hits.all()) and report["clean_on_rerun"]
+
+    print(f"⏱️  Quality stage over {len(result)} tickers: {report['seconds']:.2f}s "
+          f"(second pass {report['rerun_seconds']:.2f}s)")
+    for d, row in report["by_defect"].items():
+        print(f"   {d:<12} {row['matched']:>4}/{row['tickers']:<4} → {row['expected']}")
+    for t, text in list(report["mismatches"].items())[:10]:
+        print(f"   ⚠️ {t}: {text}")
+    print(f"{'✅' if report['passed'] else '⚠️'} statuses as expected: {int(hits.sum())}/{len(hits)}, "
+          f"nothing left to repair on the second pass: {report['clean_on_rerun']}")
+
+    if save:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = os.path.join(results_dir, f"{report['timestamp']}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved quality benchmark → {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the data-quality stage on a damaged synthetic universe")
+    parser.add_argument("--tickers", type=int, default=TICKERS)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    report = bench_quality(args.tickers, save=not args.no_save)
+    sys.exit(0 if report["passed"] else 1)
@@ -0,0 +1,461 @@
+# Offline benchmark suite over synthetic data (no Yahoo / AWS access needed)
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+import importlib.util
+from contextlib import contextmanager
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+
+from pipeline.synthetic import write_universe
+
+# ------------------------
+# Config
+# ------------------------
+SIZES = [10, 50, 200]              # universe sizes (tickers)
+REPEATS = 3
+FORECAST_LIMIT = 5                 # Prophet fits per size (each takes seconds)
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+REGRESSION_THRESHOLD = 1.25        # flag cases >25% slower than the previous results file
+STARTUP_TIMEOUT = 60               # seconds to wait for the Streamlit server to report healthy
+CASES = ["transform", "forecast", "app", "s3", "startup", "analytics", "backtest", "alerts", "sectors", "figures"]
+
+
+# ------------------------
+# Helpers
+# ------------------------
+def timeit(fn, repeats=REPEATS):
+    """Run `fn` `repeats` times; return min/median seconds."""
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"min_s": round(min(times), 5), "median_s": round(statistics.median(times), 5), "repeats": repeats}
+
+
+@contextmanager
+def workdir(size):
+    """Temporary working directory holding a synthetic universe of `size` tickers under ./data."""
+    old_cwd = os.getcwd()
+    path = tempfile.mkdtemp(prefix=f"sp500_bench_{size}_")
+    try:
+        os.chdir(path)
+        tickers = write_universe("data", n_tickers=size)
+        yield tickers
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _quiet(fn):
+    """Silence the pipeline's per-ticker prints while timing."""
+    def wrapped():
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                return fn()
+            finally:
+                sys.stdout = stdout
+    return wrapped
+
+
+def use_synthetic_source():
+    """Swap the Yahoo download for offline synthetic bars in this process (the extract stage runs in threads)."""
+    from pipeline import extract, synthetic
+    extract.download_ticker = synthetic.download_prices
+    extract.REQUEST_SLEEP = 0
+
+
+def _result(case, size, timing, per=None):
+    row = {"case": case, "size": size, **timing}
+    if per:
+        row["per_item_ms"] = round(timing["median_s"] / per * 1000, 3)
+    print(f"   {case:<32} n={size:<5} median {timing['median_s']:.4f}s  min {timing['min_s']:.4f}s"
+          + (f"  ({row['per_item_ms']:.2f} ms/item)" if per else ""))
+    return row
+
+
+# ------------------------
+# Cases
+# ------------------------
+def bench_transform(size, tickers, repeats):
+    from pipeline.transform import RAW_DIR, process_file, run_transformation
+    first = os.path.join(RAW_DIR, f"{tickers[0]}_raw.csv")
+    return [
+        _result("transform.process_file", size, timeit(_quiet(lambda: process_file(first)), repeats), per=1),
+        _result("transform.run_transformation", size, timeit(_quiet(run_transformation), repeats), per=size),
+    ]
+
+
+def bench_forecast(size, tickers, repeats):
+    if importlib.util.find_spec("prophet") is None:
+        print("   ⏭️ forecast skipped (prophet is not installed)")
+        return []
+    from pipeline.forecast import forecast_ticker, run_forecasts
+    subset = tickers[:FORECAST_LIMIT]
+    return [
+        _result("forecast.forecast_ticker", size, timeit(_quiet(lambda: forecast_ticker(subset[0])), 1), per=1),
+        _result(f"forecast.run_forecasts[{len(subset)}]", size,
+                timeit(_quiet(lambda: run_forecasts(subset)), 1), per=len(subset)),
+    ]
+
+
+def _load_app_module():
+    """Import app/app.py as a module (Streamlit runs it in bare mode, without a server)."""
+    spec = importlib.util.spec_from_file_location("sp500_app", os.path.join(REPO_ROOT, "app", "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    # Streamlit logs bare-mode warnings straight to fd 2 while the script runs
+    stderr_fd = os.dup(2)
+    try:
+        with open(os.devnull, "w") as devnull:
+            os.dup2(devnull.fileno(), 2)
+            _quiet(lambda: spec.loader.exec_module(module))()
+    finally:
+        os.dup2(stderr_fd, 2)
+        os.close(stderr_fd)
+    _silence_streamlit()
+    return module
+
+
+def _silence_streamlit():
+    """Hide Streamlit's bare-mode 'missing ScriptRunContext' warnings."""
+    import logging
+    import streamlit  # noqa: F401  (registers its loggers)
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+
+def bench_app(size, tickers, repeats):
+    try:
+        import streamlit  # noqa: F401
+    except ImportError as e:
+        print(f"   ⏭️ app skipped ({e})")
+        return []
+    if not os.path.isdir("data/processed"):
+        from pipeline.transform import run_transformation
+        _quiet(run_transformation)()
+    app = _load_app_module()
+    return [
+        _result("app.load_ticker_data", size, timeit(lambda: [app.load_ticker_data(t) for t in tickers], repeats), per=size),
+        _result("app.load_forecast_data", size, timeit(lambda: [app.load_forecast_data(t) for t in tickers], repeats), per=size),
+        _result("app.get_fundamentals", size, timeit(lambda: [app.get_fundamentals(t) for t in tickers], repeats), per=size),
+    ]
+
+
+def bench_s3(size, tickers, repeats):
+    try:
+        import boto3
+        from moto import mock_aws
+    except ImportError as e:
+        print(f"   ⏭️ s3 skipped ({e})")
+        return []
+    from pipeline import upload_to_s3 as u
+    if not os.path.isdir("data/processed"):
+        from pipeline.transform import run_transformation
+        _quiet(run_transformation)()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    rows = []
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        bucket = "sp500-bench"
+        s3.create_bucket(Bucket=bucket)
+        dirs = {"processed": "data/processed", "forecasts": "data/forecasts", "fundamentals": "data/fundamentals"}
+
+        def full_sync():
+            for prefix in dirs:
+                u.delete_keys(s3, list(u.list_remote(s3, prefix, bucket=bucket)), bucket=bucket)
+            for prefix, folder in dirs.items():
+                u.sync_directory_to_s3(folder, prefix, s3, bucket=bucket)
+
+        def noop_sync():
+            for prefix, folder in dirs.items():
+                u.sync_directory_to_s3(folder, prefix, s3, bucket=bucket)
+
+        rows.append(_result("s3.sync_full_upload", size, timeit(_quiet(full_sync), repeats), per=size))
+        rows.append(_result("s3.sync_unchanged", size, timeit(_quiet(noop_sync), repeats), per=size))
+        rows.append(_result("s3.publish_snapshot", size,
+                            timeit(_quiet(lambda: u.publish_snapshot(s3, dirs, bucket=bucket)), 1), per=size))
+    return rows
+
+
+def _cold(*args):
+    """A fresh interpreter running `args`, started from the current (synthetic) working directory."""
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+    def fn():
+        subprocess.run([sys.executable, *args], check=True, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return fn
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _streamlit_ready():
+    """Start `streamlit run app/app.py` (the container's CMD) and wait for /_stcore/health."""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(REPO_ROOT, "app", "app.py"),
+         f"--server.port={port}", "--server.headless=true", "--browser.gatherUsageStats=false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    try:
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                    if r.status == 200:
+                        return
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError(f"streamlit not healthy after {STARTUP_TIMEOUT}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def bench_startup(size, tickers, repeats):
+    """Cold-start costs: each measurement is a fresh process, so nothing is cached in memory."""
+    rows = [
+        _result("startup.import_pipeline", size, timeit(_cold("-c", "import pipeline"), repeats)),
+        _result("startup.import_entrypoints", size, timeit(_cold(
+            "-c", "from pipeline import run_extraction, run_transformation, run_forecasts, run_pipeline"), repeats)),
+        _result("startup.cli_help", size, timeit(_cold(os.path.join(REPO_ROOT, "main.py"), "--help"), repeats)),
+    ]
+    if importlib.util.find_spec("streamlit") is None:
+        print("   ⏭️ streamlit startup skipped (streamlit is not installed)")
+        return rows
+    if not os.path.isdir("data/processed"):
+        from pipeline.transform import run_transformation
+        _quiet(run_transformation)()
+    rows.append(_result("startup.streamlit_healthy", size, timeit(_streamlit_ready, repeats)))
+    rows.append(_result("startup.app_first_render", size, timeit(_cold(
+        "-c", "from streamlit.testing.v1 import AppTest; "
+        f"AppTest.from_file({os.path.join(REPO_ROOT, 'app', 'app.py')!r}, default_timeout=60).run()"), repeats)))
+    return rows
+
+
+def bench_analytics(size, tickers, repeats):
+    from pipeline import analytics
+    from pipeline.storage import LocalStorage
+    if not os.path.isdir("data/processed"):
+        from pipeline.transform import run_transformation
+        _quiet(run_transformation)()
+    store = LocalStorage("data")
+    panel = analytics.load_price_panel(tickers, store)
+    returns = analytics.log_returns(panel)
+    return [
+        _result("analytics.load_price_panel", size, timeit(lambda: analytics.load_price_panel(tickers, store), repeats),
+                per=size),
+        _result("analytics.correlation_matrix", size, timeit(lambda: analytics.correlation_matrix(returns), repeats)),
+        _result("analytics.covariance_matrix", size, timeit(lambda: analytics.covariance_matrix(returns), repeats)),
+        _result("analytics.rolling_correlation", size,
+                timeit(lambda: analytics.rolling_correlation(returns, tickers[0]), repeats)),
+        _result("analytics.average_correlation", size,
+                timeit(lambda: analytics.average_correlation(returns, step=max(1, size // 100)), repeats)),
+    ]
+
+
+def bench_backtest(size, tickers, repeats):
+    import pandas as pd
+    from pipeline import backtest
+    from pipeline.synthetic import generate_prices
+    close = pd.concat({t: generate_prices(t)["close"] for t in tickers}, axis=1)
+    return [
+        _result("backtest.ema_crossover", size, timeit(lambda: backtest.backtest(close, "ema_crossover"), repeats),
+                per=size),
+        _result("backtest.rsi_threshold", size, timeit(lambda: backtest.backtest(close, "rsi_threshold"), repeats),
+                per=size),
+        _result("backtest.sweep[ema_crossover]", size,
+                timeit(lambda: backtest.sweep(close, "ema_crossover", processes=False), 1)),
+    ]
+
+
+def bench_alerts(size, tickers, repeats):
+    from pipeline import alerts
+    if not os.path.isdir("data/processed"):
+        from pipeline.transform import run_transformation
+        _quiet(run_transformation)()
+
+    def full_scan():
+        shutil.rmtree("data/state", ignore_errors=True)
+        shutil.rmtree("data/alerts", ignore_errors=True)
+        alerts.scan(backfill=1)
+
+    return [
+        _result("alerts.scan_first", size, timeit(_quiet(full_scan), repeats), per=size),
+        _result("alerts.scan_unchanged", size, timeit(_quiet(alerts.scan), repeats), per=size),
+    ]
+
+
+def bench_sectors(size, tickers, repeats):
+    from pipeline import sectors
+    if not os.path.isdir("data/processed"):
+        from pipeline.transform import run_transformation
+        _quiet(run_transformation)()
+    return [_result("sectors.build", size, timeit(_quiet(sectors.build), repeats), per=size)]
+
+
+def bench_figures(size, tickers, repeats):
+    """One ticker's four charts as st.plotly_chart receives them: built, from the figure cache, or pre-rendered."""
+    import plotly
+    import plotly.io as pio
+    import pandas as pd
+    from pipeline import charts
+    from pipeline.storage import LocalStorage
+    if not os.path.isdir("data/processed"):
+        from pipeline.transform import run_transformation
+        _quiet(run_transformation)()
+    ticker = tickers[0]
+    df = pd.read_parquet(f"data/processed/{ticker}.parquet")
+    forecast_df = pd.read_csv(f"data/forecasts/{ticker}_forecast.csv", parse_dates=["ds"])
+    version = LocalStorage("data").version(f"processed/{ticker}.parquet")
+
+    def chart(fig_or_spec):   # what st.plotly_chart does with its argument
+        pio.to_json(plotly.tools.return_figure_from_figure_or_data(fig_or_spec, validate_figure=True), validate=False)
+
+    def render(cache, store=None):
+        for view in charts.VIEWS:
+            fc = forecast_df if view == "forecast" else None
+            key = (ticker, view, version, len(df), df.index[-1])
+            chart(cache.get(key, lambda: charts.build(view, df, fc), store=store,
+                            prerendered_key=f"figures/{ticker}/{view}.json", expected=lambda: charts.stamp(df, fc)))
+
+    warm = charts.FigureCache()
+    render(warm)
+    _quiet(lambda: charts.prerender([ticker]))()
+    return [
+        _result("figures.build", size, timeit(lambda: [chart(charts.build(v, df, forecast_df)) for v in charts.VIEWS],
+                                              repeats), per=len(charts.VIEWS)),
+        _result("figures.cached", size, timeit(lambda: render(warm), repeats), per=len(charts.VIEWS)),
+        _result("figures.prerendered", size, timeit(lambda: render(charts.FigureCache(), LocalStorage("data")),
+                                                    repeats), per=len(charts.VIEWS)),
+    ]
+
+
+BENCHES = {
+    "transform": bench_transform,
+    "forecast": bench_forecast,
+    "app": bench_app,
+    "s3": bench_s3,
+    "startup": bench_startup,
+    "analytics": bench_analytics,
+    "backtest": bench_backtest,
+    "alerts": bench_alerts,
+    "sectors": bench_sectors,
+    "figures": bench_figures,
+}
+
+
+# ------------------------
+# Results
+# ------------------------
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(results_dir=RESULTS_DIR):
+    if not os.path.isdir(results_dir):
+        return None
+    files = sorted(f for f in os.listdir(results_dir) if f.endswith(".json"))
+    if not files:
+        return None
+    with open(os.path.join(results_dir, files[-1]), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Return [(case, size, old, new, ratio)] for cases slower than `threshold`× the baseline."""
+    old = {(r["case"], r["size"]): r["median_s"] for r in baseline["results"]}
+    slow = []
+    for r in current["results"]:
+        key = (r["case"], r["size"])
+        if key in old and old[key] > 0:
+            ratio = r["median_s"] / old[key]
+            if ratio > threshold:
+                slow.append((r["case"], r["size"], old[key], r["median_s"], round(ratio, 2)))
+    return slow
+
+
+def run(sizes=SIZES, cases=CASES, repeats=REPEATS, results_dir=RESULTS_DIR, baseline=None,
+        threshold=REGRESSION_THRESHOLD, save=True):
+    os.environ.setdefault("PIPELINE_METRICS", "0")
+    report = {
+        "timestamp": time.strftime("%Y%m%dT%H%M%S"),
+        "git_rev": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": [],
+    }
+    for size in sizes:
+        print(f"\n🧪 Universe of {size} tickers")
+        with workdir(size) as tickers:
+            for case in cases:
+                report["results"].extend(BENCHES[case](size, tickers, repeats))
+
+    if baseline is None:
+        baseline = previous_results(results_dir)
+    if save:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = os.path.join(results_dir, f"{report['timestamp']}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Saved results → {out_path}")
+
+    regressions = compare(report, baseline, threshold) if baseline else []
+    if baseline:
+        print(f"🔁 Compared with {baseline.get('timestamp')} ({baseline.get('git_rev')}): "
+              f"{len(regressions)} regressions over {threshold}×")
+        for case, size, old, new, ratio in regressions:
+            print(f"   ⚠️ {case} n={size}: {old:.4f}s → {new:.4f}s ({ratio}×)")
+    return report, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite on synthetic S&P 500-shaped data")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma-separated universe sizes")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma-separated subset of {','.join(CASES)}")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--baseline", default=None, help="results JSON to compare against (default: latest saved)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any case regressed")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    _, regressions = run(
+        sizes=[int(s) for s in args.sizes.split(",")],
+        cases=[c.strip() for c in args.cases.split(",")],
+        repeats=args.repeats,
+        baseline=baseline,
+        threshold=args.threshold,
+        save=not args.no_save,
+    )
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
@@ -0,0 +1,220 @@
+# Universe scaling check: extract → transform → forecast and dashboard listing at up to 5,000 tickers
+
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+os.environ.setdefault("PIPELINE_METRICS", "0")
+
+from benchmarks.run import RESULTS_DIR, git_revision, _silence_streamlit, use_synthetic_source
+from benchmarks.load_test import RssSampler
+
+# ------------------------
+# Config
+# ------------------------
+SIZES = [500, 1000, 2500, 5000]
+MEMORY_BUDGET_MB = 2048            # peak RSS of the runner and its workers, at any size
+LINEARITY_TOLERANCE = 1.3          # per-ticker cost at the largest size vs the smallest
+APP_PATH = os.path.join(REPO_ROOT, "app", "app.py")
+UNIVERSE_RESULTS_DIR = os.path.join(RESULTS_DIR, "universes")
+SECTORS = ["Information Technology", "Health Care", "Financials", "Consumer Discretionary", "Industrials",
+           "Communication Services", "Consumer Staples", "Energy", "Utilities", "Real Estate", "Materials"]
+
+
+def tree_rss_mb():
+    """RSS of this process plus its worker processes."""
+    import psutil
+    proc = psutil.Process()
+    total = 0
+    for p in [proc, *proc.children(recursive=True)]:
+        try:
+            total += p.memory_info().rss
+        except psutil.Error:   # worker exited between listing and reading
+            pass
+    return total / 1e6
+
+
+class TreeRssSampler(RssSampler):
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, tree_rss_mb())
+
+
+class _Silenced:
+    """Redirect stdout at the file-descriptor level, so spawned workers are quiet too."""
+
+    def __enter__(self):
+        sys.stdout.flush()
+        self._saved = os.dup(1)
+        self._devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(self._devnull, 1)
+
+    def __exit__(self, *exc):
+        sys.stdout.flush()
+        os.dup2(self._saved, 1)
+        os.close(self._saved)
+        os.close(self._devnull)
+
+
+def write_universe_file(folder, name, tickers):
+    """Universe CSV for synthetic tickers (real S&P names keep their sector)."""
+    from pipeline import universes
+    known, names = universes.sector_map(), universes.company_map()
+    with open(os.path.join(folder, f"{name}.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(universes.COLUMNS)
+        for i, t in enumerate(tickers):
+            writer.writerow([t, names.get(t, f"Synthetic {t}"), known.get(t, SECTORS[i % len(SECTORS)]), ""])
+
+
+def run_size(size, stages, universe_dir):
+    """Fresh data folder; one streamed run over a `size`-ticker universe, then publish and list it."""
+    from pipeline import runner, universes
+    from pipeline.storage import LocalStorage
+    from pipeline.synthetic import pick_tickers
+
+    name = f"synthetic{size}"
+    write_universe_file(universe_dir, name, pick_tickers(size))
+    universes.load.cache_clear()
+    universes._merged.cache_clear()
+
+    row = {"size": size, "stages": stages}
+    sampler = TreeRssSampler()
+    sampler.start()
+    t0 = time.perf_counter()
+    with _Silenced():
+        results = runner.run_pipeline(universe=name, stages=stages)
+    row["pipeline_s"] = round(time.perf_counter() - t0, 2)
+    for stage in stages:
+        rows = [r for r in results if r["stage"] == stage]
+        row[f"{stage}_ok"] = sum(r["status"] == "ok" for r in rows)
+        row[f"{stage}_ms_per_ticker"] = round(sum(r["seconds"] for r in rows) / max(1, len(rows)) * 1e3, 2)
+
+    t0 = time.perf_counter()
+    with _Silenced():
+        universes.publish(name)
+    row["publish_s"] = round(time.perf_counter() - t0, 2)
+
+    # Dashboard listing: what the sidebar does on a cold cache
+    t0 = time.perf_counter()
+    store = LocalStorage(universes.data_root(name))
+    listed = [os.path.basename(k)[:-len(".parquet")] for k in store.list_keys("processed", ".parquet")]
+    names = universes.company_map()
+    labels = sorted(f"{t} – {names.get(t, 'Unknown')}" for t in listed)
+    row["listing_ms"] = round((time.perf_counter() - t0) * 1e3, 2)
+    row["listed"] = len(labels)
+
+    if importlib.util.find_spec("streamlit") is not None:
+        # Separate process: a fresh st.cache, and AppTest replaces __main__, which later spawned workers re-run
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--render", name],
+                             capture_output=True, text=True, check=True)
+        row["app_first_render_s"] = round(time.perf_counter() - t0, 2)
+        row["app_errors"] = json.loads(out.stdout.strip().splitlines()[-1])["errors"]
+    row["peak_rss_mb"] = round(sampler.stop(), 1)
+    return row
+
+
+def render(universe):
+    """First dashboard render with `universe` selected (run in a child process by run_size)."""
+    from streamlit.testing.v1 import AppTest
+    _silence_streamlit()
+    at = AppTest.from_file(APP_PATH, default_timeout=600).run()
+    at.sidebar.selectbox[0].set_value(universe).run()
+    print(json.dumps({"errors": [str(e.value) for e in at.exception]}))
+
+
+def shared_rerun(universe, stages):
+    """A second universe whose members were all processed already: nothing is fetched or recomputed."""
+    from pipeline import runner
+    t0 = time.perf_counter()
+    with _Silenced():
+        runner.run_pipeline(universe=universe, stages=stages, scan_alerts=False, build_sectors=False)
+    return round(time.perf_counter() - t0, 2)
+
+
+def bench_universes(sizes=SIZES, budget_mb=MEMORY_BUDGET_MB, save=True, results_dir=UNIVERSE_RESULTS_DIR):
+    use_synthetic_source()
+    stages = ["extract", "transform"]
+    if importlib.util.find_spec("prophet") is not None:
+        stages.append("forecast")
+    else:
+        print("⏭️ forecast stage skipped (prophet is not installed)")
+
+    report = {"timestamp": time.strftime("%Y%m%dT%H%M%S"), "git_rev": git_revision(), "cpus": os.cpu_count(),
+              "budget_mb": budget_mb, "rows": []}
+    old_cwd = os.getcwd()
+    path = tempfile.mkdtemp(prefix="sp500_universes_")
+    universe_dir = os.path.join(path, "universes")
+    shutil.copytree(os.path.join(REPO_ROOT, "universes"), universe_dir)
+    os.environ["UNIVERSE_DIR"] = universe_dir     # read at import by the runner's worker processes
+    try:
+        from pipeline import universes
+        universes.UNIVERSE_DIR = universe_dir
+        for size in sizes:
+            workdir = os.path.join(path, f"n{size}")
+            os.makedirs(workdir)
+            os.chdir(workdir)
+            row = run_size(size, stages, universe_dir)
+            report["rows"].append(row)
+            print(f"   n={size:<5} pipeline {row['pipeline_s']:>7.1f}s  "
+                  + "  ".join(f"{s} {row[f'{s}_ms_per_ticker']:.1f} ms/t" for s in stages)
+                  + f"  listing {row['listing_ms']:.0f} ms  app {row.get('app_first_render_s', float('nan')):.1f}s"
+                  f"  peak RSS {row['peak_rss_mb']:.0f} MB"
+                  + (f"  ❌ app errors: {row['app_errors']}" if row.get("app_errors") else ""))
+            if size == sizes[-1]:
+                shared = len(set(universes.tickers("sp500")) & set(universes.tickers(f"synthetic{size}")))
+                report["sp500_shared"] = shared
+                report["sp500_shared_rerun_s"] = shared_rerun("sp500", stages)
+                print(f"   sp500 after synthetic{size} ({shared} of {len(universes.tickers('sp500'))} symbols shared): "
+                      f"{report['sp500_shared_rerun_s']:.1f}s")
+            os.chdir(old_cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(path, ignore_errors=True)
+
+    first, last = report["rows"][0], report["rows"][-1]
+    report["per_ticker_ratio"] = {
+        s: round(last[f"{s}_ms_per_ticker"] / first[f"{s}_ms_per_ticker"], 2) for s in stages
+    }
+    report["wall_per_ticker_ratio"] = round((last["pipeline_s"] / last["size"]) / (first["pipeline_s"] / first["size"]), 2)
+    report["linear"] = all(r <= LINEARITY_TOLERANCE for r in [*report["per_ticker_ratio"].values(),
+                                                              report["wall_per_ticker_ratio"]])
+    report["within_budget"] = all(r["peak_rss_mb"] <= budget_mb for r in report["rows"])
+    print(f"{'✅' if report['linear'] else '⚠️'} per-ticker cost n={last['size']} vs n={first['size']}: "
+          f"{report['per_ticker_ratio']} (wall {report['wall_per_ticker_ratio']}×, tolerance {LINEARITY_TOLERANCE}×)")
+    print(f"{'✅' if report['within_budget'] else '⚠️'} peak RSS {max(r['peak_rss_mb'] for r in report['rows']):.0f} MB "
+          f"(budget {budget_mb} MB)")
+
+    if save:
+        os.makedirs(results_dir, exist_ok=True)
+        out_path = os.path.join(results_dir, f"{report['timestamp']}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved universe scaling check → {out_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the pipeline and dashboard listing scale linearly by universe size")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma-separated universe sizes")
+    parser.add_argument("--budget-mb", type=float, default=MEMORY_BUDGET_MB)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--render", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.render:
+        render(args.render)
+        sys.exit(0)
+    bench_universes([int(s) for s in args.sizes.split(",")], args.budget_mb, save=not args.no_save)
@@ -1,20 +1,24 @@
-from pipeline import run_extraction, run_transformation, run_forecasts, SP500_TICKERS
-import os
+from pipeline.runner import build_arg_parser, run_from_args
+from pipeline.snapshots import publish_local_snapshot
+from pipeline import universes
 
 if __name__ == "__main__":
     print("🚀 Starting pipeline")
 
-    # 1. Extract raw data (skip if already downloaded)
-    # print("\n📥 Extracting raw stock data...")
-    # run_extraction(SP500_TICKERS)
+    # Extract → transform → forecast, streamed per ticker.
+    # Extraction is off by default (raw data already downloaded): pass
+    # --stages extract,transform,forecast to fetch missing tickers too.
+    args = build_arg_parser().parse_args()
+    results = run_from_args(args)
 
-    # 2. Transform raw → processed
-    print("\n🔧 Transforming raw data...")
-    run_transformation()
-
-    # 3. Forecast (Prophet → next 7 days)
-    print("\n🔮 Running forecasts...")
-    tickers = [t.replace(".parquet", "") for t in os.listdir("data/processed") if t.endswith(".parquet")]
-    run_forecasts(tickers, days=7)
+    # Publish an immutable snapshot and flip CURRENT (the universe's own with --universe)
+    if not any(r["status"] == "ok" for r in results):
+        print("\n⏭️ Nothing new to publish: no ticker went through a stage")
+    elif args.universe:
+        print(f"\n📸 Publishing {args.universe} snapshot...")
+        universes.publish(args.universe)
+    else:
+        print("\n📸 Publishing snapshot...")
+        publish_local_snapshot()
 
     print("\n✅ Pipeline complete! Dashboard is ready → run: streamlit run app/app.py")
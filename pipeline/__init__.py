@@ -1,14 +1,30 @@
 # pipeline/__init__.py
+#
+# Entry points are resolved lazily (PEP 562) so `import pipeline` stays cheap:
+# prophet, ta and yahooquery are only imported when their stage actually runs.
 
-# from .extract import run_extraction
-# from .transform import run_transformation
-# from .forecast import run_forecasts
-from .config_sp500 import SP500_TICKERS
+import importlib
 
-__all__ = [
-    "SP500_TICKERS",
-]
+_LAZY_ATTRS = {
+    "run_extraction": ".extract",
+    "run_transformation": ".transform",
+    "run_forecasts": ".forecast",
+    "run_pipeline": ".runner",
+    "batch_fetch_fundamentals": ".fundamentals",
+    "SP500_TICKERS": ".config_sp500",
+    "SP500_COMPANIES": ".config_sp500",
+}
 
-# "run_extraction", "run_transformation","run_forecasts" add this above when you are actually trying to streamline and compute everything
-    
-    
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+        globals()[name] = value  # cache: later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,254 @@
+# Incremental alert scanner: indicator threshold / crossover rules over the processed universe
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ------------------------
+# Config
+# ------------------------
+PROCESSED_DIR = "data/processed"
+ALERTS_DIR = "data/alerts"
+FEED_PATH = os.path.join(ALERTS_DIR, "alerts.parquet")      # published with the other datasets
+STATE_PATH = "data/state/alerts_state.parquet"              # last bar seen per ticker (not published)
+FEED_MAX_ROWS = 20000          # the feed keeps only the newest alerts
+BACKFILL_BARS = 1              # bars evaluated for a ticker the scanner has never seen
+
+# Declarative rules. `column` is compared with either a constant `value` or
+# another column `other`; ops fire once, on the bar where the condition flips.
+#   crosses_above / crosses_below     – left crosses the right-hand side
+#   abs_pct_change_above              – |bar-over-bar % change of column| > value
+DEFAULT_RULES = [
+    {"name": "rsi_overbought", "column": "RSI_14", "op": "crosses_above", "value": 70},
+    {"name": "rsi_oversold", "column": "RSI_14", "op": "crosses_below", "value": 30},
+    {"name": "ema_golden_cross", "column": "EMA_20", "op": "crosses_above", "other": "EMA_50"},
+    {"name": "ema_death_cross", "column": "EMA_20", "op": "crosses_below", "other": "EMA_50"},
+    {"name": "large_move", "column": "Close", "op": "abs_pct_change_above", "value": 8},
+]
+RULE_OPS = {"crosses_above", "crosses_below", "abs_pct_change_above"}
+FEED_COLUMNS = ["ticker", "rule", "timestamp", "column", "value", "threshold", "detected_at"]
+
+
+def load_rules(path: str | None = None) -> list[dict]:
+    """Rules from a JSON file (a list shaped like DEFAULT_RULES), or the defaults."""
+    path = path or os.environ.get("ALERT_RULES")
+    rules = DEFAULT_RULES
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            rules = json.load(f)
+    for rule in rules:
+        if rule.get("op") not in RULE_OPS:
+            raise ValueError(f"Rule {rule.get('name')!r}: unknown op {rule.get('op')!r} (choose from {sorted(RULE_OPS)})")
+        if ("value" in rule) == ("other" in rule) and rule["op"] != "abs_pct_change_above":
+            raise ValueError(f"Rule {rule['name']!r}: give exactly one of 'value' or 'other'")
+    return rules
+
+
+def rule_columns(rules) -> list[str]:
+    cols = []
+    for rule in rules:
+        for c in (rule["column"], rule.get("other")):
+            if c and c not in cols:
+                cols.append(c)
+    return cols
+
+
+# ------------------------
+# State
+# ------------------------
+def read_state(path: str = STATE_PATH) -> pd.DataFrame:
+    """Per ticker: processed file signature (size, mtime_ns) and the last bar timestamp scanned."""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["size", "mtime_ns", "last_ts"]).rename_axis("ticker")
+    return pd.read_parquet(path)
+
+
+def _write_atomic(df: pd.DataFrame, path: str, **kwargs):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp, **kwargs)
+    os.replace(tmp, path)
+
+
+# ------------------------
+# Scan
+# ------------------------
+def _read_new_bars(path, columns, prior, backfill):
+    """
+    (timestamps, {column: values}) for the bars after `prior` plus the bar at `prior`
+    itself (the comparison point for crossings). Row groups that end before `prior`
+    are skipped using the Parquet footer statistics.
+    """
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+    date_col = next((c for c in ("date", "Date") if c in names), None)
+    if date_col is None:
+        raise ValueError(f"{path} has no date column")
+    groups = list(range(pf.num_row_groups))
+    if prior is not None:
+        date_idx = pf.metadata.schema.names.index(date_col)
+        keep = []
+        for i in groups:
+            stats = pf.metadata.row_group(i).column(date_idx).statistics
+            if stats is None or not stats.has_min_max or pd.Timestamp(stats.max) >= prior:
+                keep.append(i)   # includes the group ending exactly at `prior`
+        groups = keep or groups[-1:]
+    table = pf.read_row_groups(groups, columns=[c for c in columns if c in names] + [date_col], use_threads=False)
+    n = table.num_rows
+    dates = table.column(date_col).to_numpy()
+    values = {
+        c: table.column(c).to_numpy(zero_copy_only=False).astype("float64") if c in names else np.full(n, np.nan)
+        for c in columns
+    }
+    start = max(0, n - backfill - 1) if prior is None else int(np.searchsorted(dates, np.datetime64(prior), "left"))
+    return dates[start:], {c: v[start:] for c, v in values.items()}
+
+
+def evaluate(bars: pd.DataFrame, rules) -> pd.DataFrame:
+    """
+    Vectorized rule evaluation over a long frame of bars (ticker, timestamp, is_new,
+    rule columns) sorted by ticker then time. Each bar is compared with the previous
+    bar of the same ticker; only bars flagged is_new can fire.
+    """
+    if bars.empty:
+        return pd.DataFrame(columns=FEED_COLUMNS)
+    tickers = bars["ticker"].to_numpy()
+    same = np.zeros(len(bars), dtype=bool)
+    same[1:] = tickers[1:] == tickers[:-1]
+    fires = same & bars["is_new"].to_numpy()
+
+    def prev(a):
+        out = np.empty_like(a)
+        out[0] = np.nan
+        out[1:] = a[:-1]
+        return out
+
+    frames = []
+    for rule in rules:
+        left = bars[rule["column"]].to_numpy(dtype="float64")
+        if "other" in rule:
+            right = bars[rule["other"]].to_numpy(dtype="float64")
+        else:
+            right = np.full(len(bars), float(rule.get("value", np.nan)))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if rule["op"] == "crosses_above":
+                hit = (left > right) & (prev(left) <= prev(right))
+            elif rule["op"] == "crosses_below":
+                hit = (left < right) & (prev(left) >= prev(right))
+            else:
+                change = np.abs(left / prev(left) - 1) * 100
+                hit = change > right
+                left = change
+        hit &= fires
+        if hit.any():
+            frames.append(pd.DataFrame({
+                "ticker": tickers[hit],
+                "rule": rule["name"],
+                "timestamp": bars["timestamp"].to_numpy()[hit],
+                "column": rule["column"],
+                "value": left[hit],
+                "threshold": right[hit],
+            }))
+    if not frames:
+        return pd.DataFrame(columns=FEED_COLUMNS)
+    alerts = pd.concat(frames, ignore_index=True)
+    alerts["detected_at"] = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    return alerts[FEED_COLUMNS].sort_values(["timestamp", "ticker", "rule"], ignore_index=True)
+
+
+def scan(tickers=None, rules=None, processed_dir: str = PROCESSED_DIR, feed_path: str = FEED_PATH,
+         state_path: str = STATE_PATH, backfill: int = BACKFILL_BARS) -> pd.DataFrame:
+    """
+    Scan processed files for new bars and append any alerts to the feed.
+    Files whose size and mtime match the stored state are skipped without being
+    opened; changed files are read (rule columns only) and only bars after the
+    last one seen are evaluated. Returns the new alerts.
+    """
+    t0 = time.perf_counter()
+    rules = rules or load_rules()
+    columns = rule_columns(rules)
+    state = read_state(state_path)
+
+    if tickers is None:
+        if not os.path.isdir(processed_dir):
+            return pd.DataFrame(columns=FEED_COLUMNS)
+        tickers = sorted(f[:-len(".parquet")] for f in os.listdir(processed_dir) if f.endswith(".parquet"))
+
+    changed = []
+    for t in tickers:
+        path = os.path.join(processed_dir, f"{t}.parquet")
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if t in state.index and state.at[t, "size"] == st.st_size and state.at[t, "mtime_ns"] == st.st_mtime_ns:
+            continue
+        changed.append((t, path, st))
+
+    parts, new_state = [], {}
+    for t, path, st in changed:
+        prior = state.at[t, "last_ts"] if t in state.index else None
+        prior = None if prior is None or pd.isna(prior) else pd.Timestamp(prior)
+        dates, values = _read_new_bars(path, columns, prior, backfill)
+        if len(dates) == 0:
+            continue
+        parts.append((t, dates, values, prior))
+        new_state[t] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "last_ts": pd.Timestamp(dates[-1])}
+
+    # One long frame for all tickers, built from arrays (no per-ticker DataFrames)
+    if parts:
+        timestamps = np.concatenate([d for _, d, _, _ in parts])
+        bars = pd.DataFrame({
+            "ticker": np.repeat([t for t, *_ in parts], [len(d) for _, d, _, _ in parts]),
+            "timestamp": timestamps,
+            "is_new": np.concatenate([d > np.datetime64(p) if p is not None else np.ones(len(d), bool)
+                                      for _, d, _, p in parts]),
+            **{c: np.concatenate([v[c] for _, _, v, _ in parts]) for c in columns},
+        })
+    else:
+        bars = pd.DataFrame()
+    alerts = evaluate(bars, rules)
+
+    if new_state:
+        updates = pd.DataFrame.from_dict(new_state, orient="index").rename_axis("ticker")
+        state = updates if state.empty else pd.concat([state.drop(updates.index, errors="ignore"), updates])
+        _write_atomic(state.sort_index(), state_path)
+    if not alerts.empty or not os.path.exists(feed_path):
+        feed = read_feed(feed_path)
+        feed = alerts if feed.empty else pd.concat([feed, alerts], ignore_index=True)
+        feed = feed.drop_duplicates(["ticker", "rule", "timestamp"], keep="first").tail(FEED_MAX_ROWS)
+        _write_atomic(feed.reset_index(drop=True), feed_path, index=False)
+
+    print(f"🔔 Alert scan: {len(changed)}/{len(tickers)} tickers changed, {len(bars)} bars, "
+          f"{len(alerts)} new alerts in {time.perf_counter() - t0:.2f}s")
+    return alerts
+
+
+def read_feed(path: str = FEED_PATH) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=FEED_COLUMNS)
+    return pd.read_parquet(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan processed data for indicator alerts")
+    parser.add_argument("--tickers", default=None, help="comma-separated tickers (default: all processed)")
+    parser.add_argument("--rules", default=None, help="JSON rules file (default: DEFAULT_RULES or $ALERT_RULES)")
+    parser.add_argument("--backfill", type=int, default=BACKFILL_BARS,
+                        help="bars to evaluate for tickers without stored state")
+    parser.add_argument("--show", type=int, default=20, help="print the newest N alerts in the feed")
+    args = parser.parse_args()
+
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers else None
+    scan(tickers, load_rules(args.rules), backfill=args.backfill)
+    feed = read_feed()
+    if args.show and not feed.empty:
+        print(feed.tail(args.show).to_string(index=False))
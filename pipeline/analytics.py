@@ -0,0 +1,180 @@
+# Cross-sectional analytics: return correlation / covariance matrices over the price panel
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ------------------------
+# Config
+# ------------------------
+PROCESSED_DIR = "processed"        # storage key prefix, as in app/app.py
+TRADING_DAYS = 252
+DEFAULT_WINDOW = 63                # ~3 months of trading days
+MIN_PERIODS = 20                   # fewer overlapping returns than this → NaN
+REBASE_EVERY = 256                 # rolling steps between exact recomputes (bounds float drift)
+LOAD_WORKERS = 8
+
+
+# ------------------------
+# Price Panel
+# ------------------------
+def load_price_panel(tickers, store=None, column: str = "Close", max_workers: int = LOAD_WORKERS) -> pd.DataFrame:
+    """
+    Aligned price panel (dates × tickers) read from processed Parquet files.
+    Only `column` is read; tickers without data are dropped. Dates are the union,
+    so a ticker that listed later simply has NaN before its first bar.
+    """
+    if store is None:
+        from pipeline.storage import get_storage
+        store = get_storage()
+
+    def read(ticker):
+        df = store.read_parquet(f"{PROCESSED_DIR}/{ticker}.parquet", columns=[column])
+        return ticker, None if df is None else df[column]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        series = {t: s for t, s in pool.map(read, tickers) if s is not None}
+    if not series:
+        return pd.DataFrame()
+    panel = pd.concat(series, axis=1).sort_index()
+    return panel[~panel.index.duplicated(keep="last")]
+
+
+def log_returns(panel: pd.DataFrame) -> pd.DataFrame:
+    """Daily log returns; the first row (no previous close) is dropped."""
+    values = panel.to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = np.diff(np.log(values), axis=0)
+    rets[~np.isfinite(rets)] = np.nan
+    return pd.DataFrame(rets, index=panel.index[1:], columns=panel.columns)
+
+
+# ------------------------
+# Full-period Matrices
+# ------------------------
+def _pairwise_moments(x: np.ndarray):
+    """
+    Pairwise-complete sums for every column pair of `x` (rows × columns), in four
+    matrix products: counts, Σx_i, Σx_j, Σx_i², Σx_j² and Σx_i·x_j over rows where both are present.
+    """
+    valid = ~np.isnan(x)
+    m = valid.astype("float64")
+    x0 = np.where(valid, x, 0.0)
+    n = m.T @ m
+    sx = x0.T @ m                  # [i, j] = Σ x_i over rows where j is also present
+    sxx = (x0 * x0).T @ m
+    sxy = x0.T @ x0
+    return n, sx, sx.T, sxx, sxx.T, sxy
+
+
+def _cov_corr(n, sx, sy, sxx, syy, sxy, min_periods: int):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (sxy - sx * sy / n) / (n - 1)
+        var_x = (sxx - sx * sx / n) / (n - 1)
+        var_y = (syy - sy * sy / n) / (n - 1)
+        corr = cov / np.sqrt(var_x * var_y)
+    short = n < max(min_periods, 2)
+    cov[short] = np.nan
+    corr[short] = np.nan
+    np.clip(corr, -1.0, 1.0, out=corr)
+    return cov, corr
+
+
+def covariance_matrix(returns: pd.DataFrame, min_periods: int = MIN_PERIODS, annualize: bool = False) -> pd.DataFrame:
+    """Pairwise-complete covariance of returns (optionally × 252)."""
+    cov, _ = _cov_corr(*_pairwise_moments(returns.to_numpy(dtype="float64")), min_periods)
+    if annualize:
+        cov = cov * TRADING_DAYS
+    return pd.DataFrame(cov, index=returns.columns, columns=returns.columns)
+
+
+def correlation_matrix(returns: pd.DataFrame, min_periods: int = MIN_PERIODS) -> pd.DataFrame:
+    """Pairwise-complete Pearson correlation of returns (matches DataFrame.corr, vectorized)."""
+    _, corr = _cov_corr(*_pairwise_moments(returns.to_numpy(dtype="float64")), min_periods)
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+    return pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+
+
+# ------------------------
+# Rolling Windows
+# ------------------------
+def iter_rolling_correlation(returns: pd.DataFrame, window: int = DEFAULT_WINDOW, min_periods: int = MIN_PERIODS,
+                             step: int = 1):
+    """
+    Yield (date, correlation matrix ndarray) for every `step`-th full window, updating
+    the pairwise sums incrementally: rows entering the window are added and rows leaving
+    it subtracted, O(step·N²) per update instead of O(window·N²).
+    The sums are recomputed exactly every REBASE_EVERY updates to bound drift.
+    """
+    x = returns.to_numpy(dtype="float64")
+    valid = ~np.isnan(x)
+    x0 = np.where(valid, x, 0.0)
+    m = valid.astype("float64")
+    x2 = x0 * x0
+    dates = returns.index
+
+    def sums(rows):
+        mm, xx = m[rows], x0[rows]
+        return mm.T @ mm, xx.T @ mm, x2[rows].T @ mm, xx.T @ xx
+
+    prev_end = None
+    for k, end in enumerate(range(window, len(x) + 1, step)):
+        if k % REBASE_EVERY == 0 or step >= window:
+            n, sx, sxx, sxy = sums(slice(end - window, end))
+        else:
+            entering = sums(slice(prev_end, end))
+            leaving = sums(slice(prev_end - window, end - window))
+            for total, add, sub in zip((n, sx, sxx, sxy), entering, leaving):
+                total += add
+                total -= sub
+        prev_end = end
+        _, corr = _cov_corr(n, sx, sx.T, sxx, sxx.T, sxy, min_periods)
+        yield dates[end - 1], corr
+
+
+def rolling_correlation(returns: pd.DataFrame, reference: str, window: int = DEFAULT_WINDOW,
+                        min_periods: int = MIN_PERIODS) -> pd.DataFrame:
+    """
+    Rolling correlation of every column with `reference` (dates × tickers).
+    Uses running (cumulative) sums, so each window is an O(1) difference per pair.
+    """
+    x = returns.to_numpy(dtype="float64")
+    y = returns[reference].to_numpy(dtype="float64")[:, None]
+    both = ~np.isnan(x) & ~np.isnan(y)
+    xb, yb = np.where(both, x, 0.0), np.where(both, y, 0.0)
+
+    def window_sum(a):
+        c = np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+        return c[window:] - c[:-window]
+
+    n = window_sum(both.astype("float64"))
+    sx, sy = window_sum(xb), window_sum(yb)
+    sxx, syy, sxy = window_sum(xb * xb), window_sum(yb * yb), window_sum(xb * yb)
+    _, corr = _cov_corr(n, sx, sy, sxx, syy, sxy, min_periods)
+    return pd.DataFrame(corr, index=returns.index[window - 1:], columns=returns.columns)
+
+
+def average_correlation(returns: pd.DataFrame, window: int = DEFAULT_WINDOW, min_periods: int = MIN_PERIODS,
+                        step: int = 1) -> pd.Series:
+    """Mean off-diagonal rolling correlation: how tightly the selection moves together over time."""
+    k = returns.shape[1]
+    off_diag = ~np.eye(k, dtype=bool)
+    dates, values = [], []
+    for date, corr in iter_rolling_correlation(returns, window, min_periods, step):
+        pairs = corr[off_diag]
+        dates.append(date)
+        values.append(np.nanmean(pairs) if k > 1 and not np.isnan(pairs).all() else np.nan)
+    return pd.Series(values, index=pd.Index(dates, name=returns.index.name), name="avg_correlation")
+
+
+def top_pairs(corr: pd.DataFrame, n: int = 10, ascending: bool = False) -> pd.DataFrame:
+    """Most (or least) correlated distinct pairs from a correlation matrix."""
+    values = corr.to_numpy()
+    i, j = np.triu_indices(len(values), k=1)
+    pairs = pd.DataFrame({"Ticker A": corr.index[i], "Ticker B": corr.columns[j], "Correlation": values[i, j]})
+    return pairs.dropna().sort_values("Correlation", ascending=ascending).head(n).reset_index(drop=True)
@@ -0,0 +1,310 @@
+# Read-only HTTP data API: bars, indicators, forecasts and fundamentals as Arrow IPC, Parquet or JSON
+
+import io
+import os
+import sys
+import re
+import json
+import hashlib
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.storage import HotCache, get_storage
+
+# ------------------------
+# Config
+# ------------------------
+API_HOST = os.environ.get("DATA_API_HOST", "127.0.0.1")    # local consumers only by default
+API_PORT = int(os.environ.get("DATA_API_PORT", "8502"))
+HOT_CACHE_MB = int(os.environ.get("DATA_API_CACHE_MB", "256"))
+ACCESS_LOG = os.environ.get("DATA_API_ACCESS_LOG", "0") == "1"
+
+# Dataset keys, relative to the storage root (same layout the dashboard reads)
+PROCESSED_DIR = "processed"
+FORECAST_DIR = "forecasts"
+FUNDAMENTALS_PATH = "fundamentals/fundamentals.parquet"
+
+FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "json": "application/json",
+}
+PARQUET_COMPRESSION = "zstd"
+MAX_TICKERS = 1000             # per multi-ticker request
+TICKER_PATTERN = re.compile(r"^[A-Za-z0-9^=][A-Za-z0-9.\-^=]{0,19}$")   # Yahoo symbols (BRK-B, BT-A.L, ^GSPC)
+
+
+class APIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ------------------------
+# Data access
+# ------------------------
+class DataService:
+    """Reads datasets through the storage backend (local folder or S3 snapshot) with a hot cache."""
+
+    def __init__(self, store=None, cache: HotCache | None = None):
+        self.store = store or get_storage()
+        self.cache = cache or HotCache(HOT_CACHE_MB * 1024 * 1024)
+
+    def _frame(self, key: str, version: str) -> pd.DataFrame | None:
+        cached = self.cache.get(("frame", version))
+        if cached is not None:
+            return cached
+        if key.endswith(".csv"):
+            df = self.store.read_csv(key, parse_dates=["ds"])
+        else:
+            df = self.store.read_parquet(key)
+        if df is not None:
+            self.cache.put(("frame", version), df, int(df.memory_usage(deep=True).sum()))
+        return df
+
+    def versions(self, keys) -> list[str]:
+        versions = [self.store.version(k) for k in keys]
+        missing = [k for k, v in zip(keys, versions) if v is None]
+        if missing:
+            raise APIError(404, f"Not found: {', '.join(missing[:10])}")
+        return versions
+
+    def tickers(self) -> list[str]:
+        snapshot = self.store.current_snapshot()
+        cached = self.cache.get(("tickers", snapshot)) if snapshot else None
+        if cached is None:
+            cached = sorted(os.path.basename(k)[:-len(".parquet")]
+                            for k in self.store.list_keys(PROCESSED_DIR, ".parquet"))
+            if snapshot:
+                self.cache.put(("tickers", snapshot), cached, 64 * len(cached))
+        return cached
+
+    def forecast_tickers(self) -> list[str]:
+        return sorted(os.path.basename(k)[:-len("_forecast.csv")]
+                      for k in self.store.list_keys(FORECAST_DIR, "_forecast.csv"))
+
+    def bars(self, ticker: str, version: str, start=None, end=None, columns=None) -> pd.DataFrame:
+        df = self._frame(f"{PROCESSED_DIR}/{ticker}.parquet", version)
+        df = df.loc[start:end]
+        if columns:
+            df = df[_checked(df, [c for c in columns if c != df.index.name])]
+        return df.reset_index()
+
+    def forecasts(self, tickers, versions) -> pd.DataFrame:
+        frames = [self._frame(f"{FORECAST_DIR}/{t}_forecast.csv", v).assign(ticker=t)
+                  for t, v in zip(tickers, versions)]
+        df = pd.concat(frames, ignore_index=True)
+        return df[["ticker", *[c for c in df.columns if c != "ticker"]]]
+
+    def fundamentals(self, version: str, tickers=None, columns=None) -> pd.DataFrame:
+        df = self._frame(FUNDAMENTALS_PATH, version)
+        if tickers:
+            df = df[df["Ticker"].isin(tickers)]
+        if columns:
+            df = df[["Ticker", *_checked(df, [c for c in columns if c != "Ticker"])]]
+        return df.reset_index(drop=True)
+
+
+def _checked(df: pd.DataFrame, columns: list[str]) -> list[str]:
+    unknown = [c for c in columns if c not in df.columns]
+    if unknown:
+        raise APIError(400, f"Unknown column(s) {unknown} (available: {list(df.columns)})")
+    return columns
+
+
+# ------------------------
+# Encoding
+# ------------------------
+def encode(df: pd.DataFrame, fmt: str) -> bytes:
+    if fmt == "json":
+        return df.to_json(orient="records", date_format="iso").encode("utf-8")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    buf = io.BytesIO()
+    if fmt == "arrow":
+        with pa.ipc.new_stream(buf, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, buf, compression=PARQUET_COMPRESSION)
+    return buf.getvalue()
+
+
+def negotiate(params: dict, accept: str | None) -> str:
+    """?format= wins; otherwise the Accept header; JSON by default."""
+    fmt = params.get("format")
+    if fmt:
+        if fmt not in FORMATS:
+            raise APIError(400, f"Unknown format {fmt!r} (choose from {list(FORMATS)})")
+        return fmt
+    for name, mime in FORMATS.items():
+        if accept and mime in accept:
+            return name
+    return "json"
+
+
+def make_etag(versions, params: dict, fmt: str) -> str:
+    h = hashlib.sha1()
+    for v in versions:
+        h.update(v.encode("utf-8"))
+    h.update(json.dumps(sorted(params.items())).encode("utf-8"))
+    h.update(fmt.encode("utf-8"))
+    return f'"{h.hexdigest()[:32]}"'
+
+
+def _list(value: str | None) -> list[str]:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def _date(value: str | None, name: str):
+    if not value:
+        return None
+    try:
+        return pd.Timestamp(value)
+    except ValueError:
+        raise APIError(400, f"Bad {name} date {value!r} (use YYYY-MM-DD)")
+
+
+# ------------------------
+# Routes
+# ------------------------
+def route(service: DataService, path: str, params: dict):
+    """
+    Resolve a request to (object versions, build) where build() returns the
+    response frame. Versions are known before any data is read, so a matching
+    If-None-Match is answered without touching the files.
+    """
+    parts = [p for p in path.split("/") if p]
+    if len(parts) == 2 and not TICKER_PATTERN.match(parts[1]):
+        raise APIError(400, f"Bad ticker {parts[1]!r}")
+    if not parts or parts == ["health"]:
+        return None, lambda: {"status": "ok", "snapshot": service.store.current_snapshot(),
+                              "cache": service.cache.stats()}
+    if parts == ["tickers"]:
+        return None, service.tickers
+
+    if parts[0] == "bars" and len(parts) == 2:
+        ticker = parts[1]
+        versions = service.versions([f"{PROCESSED_DIR}/{ticker}.parquet"])
+        start, end = _date(params.get("start"), "start"), _date(params.get("end"), "end")
+        columns = _list(params.get("columns"))
+        return versions, lambda: service.bars(ticker, versions[0], start, end, columns)
+
+    if parts[0] == "forecasts" and len(parts) <= 2:
+        tickers = [parts[1]] if len(parts) == 2 else (_list(params.get("tickers")) or service.forecast_tickers())
+        if any(not TICKER_PATTERN.match(t) for t in tickers):
+            raise APIError(400, "Bad ticker in tickers=")
+        if len(tickers) > MAX_TICKERS:
+            raise APIError(400, f"At most {MAX_TICKERS} tickers per request")
+        if not tickers:
+            raise APIError(404, "No forecasts published")
+        versions = service.versions([f"{FORECAST_DIR}/{t}_forecast.csv" for t in tickers])
+        return versions, lambda: service.forecasts(tickers, versions)
+
+    if parts[0] == "fundamentals" and len(parts) <= 2:
+        tickers = [parts[1]] if len(parts) == 2 else _list(params.get("tickers"))
+        columns = _list(params.get("columns"))
+        versions = service.versions([FUNDAMENTALS_PATH])
+
+        def build():
+            df = service.fundamentals(versions[0], tickers, columns)
+            if len(parts) == 2 and df.empty:
+                raise APIError(404, f"No fundamentals for {parts[1]}")
+            return df
+        return versions, build
+
+    raise APIError(404, f"Unknown endpoint {path!r} (try /bars/<ticker>, /forecasts, /fundamentals, /tickers)")
+
+
+class DataAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"          # keep-alive: clients reuse one connection for many requests
+    disable_nagle_algorithm = True         # headers and body go out as separate writes: don't wait on delayed ACKs
+    server_version = "SP500DataAPI/1.0"
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _method_not_allowed(self):
+        self._send(405, b'{"error": "read-only API"}', "application/json", extra={"Allow": "GET, HEAD"})
+
+    do_POST = do_PUT = do_DELETE = do_PATCH = _method_not_allowed
+
+    def _serve(self, send_body):
+        service = self.server.service
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            fmt = negotiate(params, self.headers.get("Accept"))
+            params.pop("format", None)
+            versions, build = route(service, url.path, params)
+            if versions is None:   # small JSON endpoints, never cached
+                body = json.dumps(build(), default=str).encode("utf-8")
+                return self._send(200, body, "application/json", send_body=send_body)
+
+            etag = make_etag(versions, params, fmt)
+            if etag in _list(self.headers.get("If-None-Match")) or self.headers.get("If-None-Match") == "*":
+                return self._send(304, b"", FORMATS[fmt], extra={"ETag": etag}, send_body=False)
+            body = service.cache.get(("body", etag))
+            if body is None:
+                body = encode(build(), fmt)
+                service.cache.put(("body", etag), body, len(body))
+            self._send(200, body, FORMATS[fmt], extra={"ETag": etag, "Cache-Control": "no-cache"},
+                       send_body=send_body)
+        except APIError as e:
+            self._send(e.status, json.dumps({"error": str(e)}).encode("utf-8"), "application/json",
+                       send_body=send_body)
+        except Exception as e:   # one bad file must not take the service down
+            self._send(500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8"), "application/json",
+                       send_body=send_body)
+
+    def _send(self, status, body, content_type, extra=None, send_body=True):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body and body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if ACCESS_LOG:
+            super().log_message(format, *args)
+
+
+class DataAPIServer(ThreadingHTTPServer):
+    """One thread per connection; all threads share the storage backend and the hot cache."""
+    daemon_threads = True
+
+    def __init__(self, address, service: DataService | None = None):
+        super().__init__(address, DataAPIHandler)
+        self.service = service or DataService()
+
+
+def serve(host: str = API_HOST, port: int = API_PORT, store=None):
+    server = DataAPIServer((host, port), DataService(store))
+    snapshot = server.service.store.current_snapshot()
+    print(f"🌐 Data API on http://{host}:{server.server_port} "
+          f"(snapshot {snapshot or 'flat layout'}, hot cache {server.service.cache.max_bytes // 2**20} MB)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve processed bars, forecasts and fundamentals over HTTP (read-only)")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,251 @@
+# Vectorized signal backtests over the whole universe (date × ticker panels)
+
+import os
+import sys
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import analytics
+
+# ------------------------
+# Config
+# ------------------------
+TRADING_DAYS = 252
+COST_BPS = 5.0                     # per unit of turnover (one-way), in basis points
+SWEEP_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+
+# ------------------------
+# Indicators (same definitions as the `ta` columns written by transform.add_indicators)
+# ------------------------
+def ema(close: pd.DataFrame, span: int) -> pd.DataFrame:
+    return close.ewm(span=span, min_periods=span, adjust=False).mean()
+
+
+def rsi(close: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    diff = close.diff()
+    listed = close.notna()   # like ta, the first bar counts as a zero move; before listing stays NaN
+    up = diff.where(diff > 0, 0.0).where(listed).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    down = (-diff.where(diff < 0, 0.0)).where(listed).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    out = 100 - 100 / (1 + up / down)
+    return out.where(down != 0, 100.0).where(up.notna())
+
+
+# ------------------------
+# Strategies: close panel → target positions panel (1 long, 0 flat, -1 short)
+# ------------------------
+def ema_crossover(close: pd.DataFrame, fast: int = 20, slow: int = 50, allow_short: bool = False) -> pd.DataFrame:
+    """Long while EMA(fast) is above EMA(slow); short (or flat) below."""
+    fast_ema, slow_ema = ema(close, fast), ema(close, slow)
+    below = -1.0 if allow_short else 0.0
+    pos = np.where(fast_ema > slow_ema, 1.0, below)
+    return pd.DataFrame(pos, index=close.index, columns=close.columns).where(slow_ema.notna(), 0.0)
+
+
+def rsi_threshold(close: pd.DataFrame, window: int = 14, lower: float = 30, upper: float = 70) -> pd.DataFrame:
+    """Mean reversion: enter long when RSI drops below `lower`, exit once it rises above `upper`."""
+    r = rsi(close, window)
+    events = pd.DataFrame(np.nan, index=close.index, columns=close.columns)
+    events = events.mask(r < lower, 1.0).mask(r > upper, 0.0)
+    return events.ffill().fillna(0.0)
+
+
+def buy_and_hold(close: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(1.0, index=close.index, columns=close.columns).where(close.notna(), 0.0)
+
+
+STRATEGIES = {
+    "ema_crossover": {
+        "fn": ema_crossover,
+        "params": {"fast": 20, "slow": 50},
+        "grid": {"fast": [5, 10, 20, 30], "slow": [50, 100, 150, 200]},
+    },
+    "rsi_threshold": {
+        "fn": rsi_threshold,
+        "params": {"window": 14, "lower": 30, "upper": 70},
+        "grid": {"window": [7, 14, 21], "lower": [20, 25, 30, 35], "upper": [60, 70, 80]},
+    },
+    "buy_and_hold": {"fn": buy_and_hold, "params": {}, "grid": {}},
+}
+
+
+# ------------------------
+# Engine
+# ------------------------
+def _drawdown(equity: np.ndarray) -> np.ndarray:
+    return equity / np.maximum.accumulate(equity, axis=0) - 1
+
+
+def _stats(daily: np.ndarray, exposure, turnover) -> dict:
+    """Summary statistics for a daily return series (or, column-wise, a panel of them)."""
+    equity = np.cumprod(1 + daily, axis=0)
+    years = len(daily) / TRADING_DAYS
+    vol = np.std(daily, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    mean = np.mean(daily, axis=0) * TRADING_DAYS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(vol > 0, mean / vol, np.nan)
+        cagr = equity[-1] ** (1 / years) - 1 if years > 0 else np.nan
+    return {
+        "total_return": equity[-1] - 1,
+        "cagr": cagr,
+        "volatility": vol,
+        "sharpe": sharpe,
+        "max_drawdown": _drawdown(equity).min(axis=0),
+        "exposure": exposure,
+        "turnover": turnover,          # annualized, in multiples of capital
+    }
+
+
+def run_backtest(close: pd.DataFrame, positions: pd.DataFrame, cost_bps: float = COST_BPS) -> dict:
+    """
+    Backtest target positions on the close panel, all tickers at once.
+    Positions decided at close t are held over t→t+1; trades pay `cost_bps`
+    per unit of turnover. The portfolio splits capital equally across tickers
+    that have a price that day (flat tickers sit in cash).
+    Returns equity curves, portfolio stats and a per-ticker stats table.
+    """
+    price = close.to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = price[1:] / price[:-1] - 1
+    listed = np.isfinite(rets)
+    rets = np.where(listed, rets, 0.0)
+
+    held = positions.reindex_like(close).fillna(0.0).to_numpy(dtype="float64")[:-1]
+    held = np.where(listed, held, 0.0)
+    trades = np.abs(np.diff(held, axis=0, prepend=0.0))
+    net = held * rets - trades * cost_bps / 1e4
+
+    n_listed = listed.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        portfolio = np.where(n_listed > 0, net.sum(axis=1) / np.maximum(n_listed, 1), 0.0)
+        benchmark = np.where(n_listed > 0, rets.sum(axis=1) / np.maximum(n_listed, 1), 0.0)
+
+    years = len(rets) / TRADING_DAYS
+    exposure = np.abs(held).sum() / max(listed.sum(), 1)
+    turnover = trades.sum(axis=1) / np.maximum(n_listed, 1)
+    stats = _stats(portfolio, exposure, turnover.sum() / years if years else np.nan)
+    bench_stats = _stats(benchmark, 1.0, 0.0)
+
+    with np.errstate(invalid="ignore"):
+        per_ticker = pd.DataFrame(
+            _stats(net, np.abs(held).sum(axis=0) / np.maximum(listed.sum(axis=0), 1),
+                   trades.sum(axis=0) / years if years else np.nan),
+            index=close.columns,
+        )
+    per_ticker["trades"] = (trades > 0).sum(axis=0)
+
+    dates = close.index[1:]
+    return {
+        "equity": pd.Series(np.cumprod(1 + portfolio), index=dates, name="strategy"),
+        "benchmark": pd.Series(np.cumprod(1 + benchmark), index=dates, name="buy_and_hold"),
+        "drawdown": pd.Series(_drawdown(np.cumprod(1 + portfolio)), index=dates, name="drawdown"),
+        "stats": {k: float(v) for k, v in stats.items()},
+        "benchmark_stats": {k: float(v) for k, v in bench_stats.items()},
+        "per_ticker": per_ticker,
+    }
+
+
+def backtest(close: pd.DataFrame, strategy: str = "ema_crossover", params: dict | None = None,
+             cost_bps: float = COST_BPS) -> dict:
+    """Run a named strategy from STRATEGIES with `params` over the close panel."""
+    spec = STRATEGIES[strategy]
+    params = {**spec["params"], **(params or {})}
+    result = run_backtest(close, spec["fn"](close, **params), cost_bps)
+    result["strategy"], result["params"] = strategy, params
+    return result
+
+
+# ------------------------
+# Parameter Sweeps
+# ------------------------
+_SWEEP_CLOSE = None
+
+
+def _init_sweep_worker(close):
+    global _SWEEP_CLOSE
+    _SWEEP_CLOSE = close
+
+
+def _sweep_one(strategy, params, cost_bps, close=None):
+    stats = backtest(_SWEEP_CLOSE if close is None else close, strategy, params, cost_bps)["stats"]
+    return {**params, **stats}
+
+
+def param_grid(grid: dict) -> list[dict]:
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def sweep(close: pd.DataFrame, strategy: str = "ema_crossover", grid: dict | None = None,
+          cost_bps: float = COST_BPS, workers: int = SWEEP_WORKERS, processes: bool = True) -> pd.DataFrame:
+    """
+    Backtest every parameter combination in `grid` (default: the strategy's grid) in
+    parallel and return one stats row per combination, best Sharpe first.
+    Worker processes receive the close panel once, at start-up. Use processes=False
+    inside Streamlit, where NumPy's GIL-free kernels make threads good enough.
+    """
+    combos = param_grid(grid or STRATEGIES[strategy]["grid"])
+    if strategy == "ema_crossover":
+        combos = [p for p in combos if p.get("fast", 0) < p.get("slow", 1)]
+    if strategy == "rsi_threshold":
+        combos = [p for p in combos if p.get("lower", 0) < p.get("upper", 100)]
+    if not combos:
+        return pd.DataFrame()
+
+    if processes and workers > 1:
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=spawn,
+                                 initializer=_init_sweep_worker, initargs=(close,)) as pool:
+            rows = list(pool.map(_sweep_one, [strategy] * len(combos), combos, [cost_bps] * len(combos)))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(lambda p: _sweep_one(strategy, p, cost_bps, close), combos))
+    return pd.DataFrame(rows).sort_values("sharpe", ascending=False).reset_index(drop=True)
+
+
+# ------------------------
+# CLI
+# ------------------------
+def _parse_grid(items):
+    grid = {}
+    for item in items or []:
+        key, values = item.split("=", 1)
+        grid[key] = [float(v) if "." in v else int(v) for v in values.split(",")]
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest indicator signals across the processed universe")
+    parser.add_argument("--strategy", choices=list(STRATEGIES), default="ema_crossover")
+    parser.add_argument("--tickers", default=None, help="comma-separated tickers (default: every processed ticker)")
+    parser.add_argument("--cost-bps", type=float, default=COST_BPS)
+    parser.add_argument("--param", nargs="*", default=None, help="strategy parameters, e.g. fast=10 slow=100")
+    parser.add_argument("--sweep", nargs="*", default=None,
+                        help="sweep a grid, e.g. fast=5,10,20 slow=50,100 (no values: the strategy's default grid)")
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    args = parser.parse_args()
+
+    from pipeline.storage import get_storage
+    store = get_storage()
+    if args.tickers:
+        tickers = [t.strip() for t in args.tickers.split(",") if t.strip()]
+    else:
+        tickers = [os.path.basename(k)[:-len(".parquet")] for k in store.list_keys(analytics.PROCESSED_DIR, ".parquet")]
+    close = analytics.load_price_panel(tickers, store)
+    print(f"🧪 {args.strategy}: {close.shape[1]} tickers × {close.shape[0]} days, costs {args.cost_bps} bps")
+
+    if args.sweep is not None:
+        table = sweep(close, args.strategy, _parse_grid(args.sweep) or None, args.cost_bps, args.workers)
+        print(table.head(20).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    else:
+        params = {k: v[0] for k, v in _parse_grid(args.param).items()}
+        result = backtest(close, args.strategy, params, args.cost_bps)
+        for name, stats in (("Strategy", result["stats"]), ("Buy & hold", result["benchmark_stats"])):
+            print(f"📈 {name:<11} " + "  ".join(f"{k} {v:.4f}" for k, v in stats.items()))
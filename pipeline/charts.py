@@ -0,0 +1,259 @@
+# Dashboard chart figures: builders, a shared figure cache, and pre-rendering for the most-viewed tickers
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.storage import HotCache
+
+# ------------------------
+# Config
+# ------------------------
+FIGURE_DIR = "data/figures"             # pre-rendered specs: <dir>/<ticker>/<view>.json (published)
+FIGURE_PREFIX = "figures"               # the same, relative to the storage root
+CACHE_MB = int(os.environ.get("DASHBOARD_FIGURE_CACHE_MB", "64"))
+PRERENDER_TOP = 50                      # tickers pre-rendered by default (most viewed, then largest)
+
+VIEWS = ["candlestick", "rsi", "atr", "forecast"]
+VIZ_VIEWS = {                           # Price & Indicators selector label → view
+    "Candlestick + EMA/VWAP": "candlestick",
+    "Relative Strength Index (RSI)": "rsi",
+    "Volatility (ATR)": "atr",
+}
+REQUIRED_COLUMNS = {"candlestick": ["Open", "High", "Low", "Close"], "rsi": ["RSI_14"], "atr": ["Volatility_ATR"],
+                    "forecast": ["Close"]}
+
+
+# ------------------------
+# Builders
+# ------------------------
+def session_breaks(ticker: str | None = None) -> list:
+    """Plotly rangebreaks hiding weekends and the hours outside `ticker`'s exchange session."""
+    from pipeline.universes import exchange
+    hours = exchange(ticker)
+    open_, close = (pd.Timedelta(f"{hours[k]}:00") / pd.Timedelta(hours=1) for k in ("open", "close"))
+    return [dict(bounds=["sat", "mon"]), dict(bounds=[close, open_], pattern="hour")]
+
+
+def price_figure(df: pd.DataFrame, bars: str = "1d", ticker: str | None = None):
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(
+        x=df.index,
+        open=df["Open"], high=df["High"],
+        low=df["Low"], close=df["Close"],
+        name="Price"
+    ))
+    if "EMA_20" in df.columns:
+        fig.add_trace(go.Scatter(x=df.index, y=df["EMA_20"], line=dict(color="blue", width=1), name="EMA 20"))
+    if "EMA_50" in df.columns:
+        fig.add_trace(go.Scatter(x=df.index, y=df["EMA_50"], line=dict(color="orange", width=1), name="EMA 50"))
+    if "VWAP" in df.columns:
+        fig.add_trace(go.Scatter(x=df.index, y=df["VWAP"], line=dict(color="green", width=1), name="VWAP"))
+    fig.update_layout(xaxis_rangeslider_visible=False, height=600)
+    if bars != "1d":   # hide nights and weekends so sessions sit side by side
+        fig.update_xaxes(rangebreaks=session_breaks(ticker))
+    return fig
+
+
+def rsi_figure(df: pd.DataFrame, bars: str = "1d"):
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df.index, y=df["RSI_14"], line=dict(color="purple", width=1), name="RSI"))
+    fig.add_hline(y=70, line=dict(color="red", dash="dash"))
+    fig.add_hline(y=30, line=dict(color="green", dash="dash"))
+    fig.update_layout(height=400, title="Relative Strength Index (14-day)" if bars == "1d" else f"Relative Strength Index (14 × {bars})")
+    return fig
+
+
+def atr_figure(df: pd.DataFrame, bars: str = "1d"):
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df.index, y=df["Volatility_ATR"], line=dict(color="gray", width=1), name="ATR"))
+    fig.update_layout(height=400, title="Volatility (ATR)")
+    return fig
+
+
+def forecast_figure(df: pd.DataFrame, forecast_df: pd.DataFrame, bars: str = "1d"):
+    import plotly.graph_objs as go
+    fig = go.Figure()
+
+    # Historical data
+    fig.add_trace(go.Scatter(
+        x=df.index,
+        y=df["Close"],
+        name="Historical",
+        line=dict(color="blue"),
+        hovertemplate="Date=%{x|%Y-%m-%d}<br>Close=%{y:.2f}<extra></extra>"
+    ))
+
+    # Forecast line + markers
+    fig.add_trace(go.Scatter(
+        x=forecast_df["ds"],
+        y=forecast_df["yhat"],
+        mode="lines+markers",
+        name="Forecast",
+        line=dict(color="red"),
+        hovertemplate="Date=%{x|%Y-%m-%d}<br>Forecast=%{y:.2f}<extra></extra>"
+    ))
+
+    # Confidence interval shading: upper band forward, lower band back
+    ds = forecast_df["ds"].to_numpy()
+    fig.add_trace(go.Scatter(
+        x=np.concatenate([ds, ds[::-1]]),
+        y=np.concatenate([forecast_df["yhat_upper"].to_numpy(), forecast_df["yhat_lower"].to_numpy()[::-1]]),
+        fill="toself",
+        fillcolor="rgba(255,0,0,0.2)",
+        line=dict(color="rgba(255,255,255,0)"),
+        name="Confidence Interval",
+        hoverinfo="skip"
+    ))
+
+    fig.update_layout(height=400, xaxis_title="Date", yaxis_title="Price", showlegend=True)
+    return fig
+
+
+BUILDERS = {"candlestick": price_figure, "rsi": rsi_figure, "atr": atr_figure, "forecast": forecast_figure}
+
+
+def build(view: str, df: pd.DataFrame, forecast_df: pd.DataFrame | None = None, bars: str = "1d",
+          ticker: str | None = None):
+    """Figure for one view, or None when its columns (or the forecast) are missing."""
+    if any(c not in df.columns for c in REQUIRED_COLUMNS[view]):
+        return None
+    if view == "forecast":
+        return None if forecast_df is None else forecast_figure(df, forecast_df, bars)
+    if view == "candlestick":
+        return price_figure(df, bars, ticker)   # intraday: session hours of the ticker's exchange
+    return BUILDERS[view](df, bars)
+
+
+def digest(df: pd.DataFrame) -> str:
+    """Fingerprint of a frame's index and values: changes when bars are rewritten in place."""
+    return hashlib.sha1(pd.util.hash_pandas_object(df).to_numpy()).hexdigest()[:16]
+
+
+def stamp(df: pd.DataFrame, forecast_df: pd.DataFrame | None = None) -> dict:
+    """What a figure was drawn from: row count, last bar and digest (plus the forecast's first date and digest)."""
+    out = {"rows": len(df), "last": df.index[-1].isoformat() if len(df) else None, "digest": digest(df)}
+    if forecast_df is not None:
+        out["forecast_start"] = pd.Timestamp(forecast_df["ds"].iloc[0]).isoformat()
+        out["forecast_digest"] = digest(forecast_df)
+    return out
+
+
+def to_spec(fig) -> str:
+    """Serialized figure (Plotly JSON): the pre-rendered file format and the cache's size measure."""
+    return fig.to_json()
+
+
+# ------------------------
+# Cache
+# ------------------------
+class FigureCache:
+    """
+    Figures keyed by (ticker, view, bars/range, versions of the source files),
+    LRU-evicted under a byte cap (measured on the serialized spec) and shared by
+    every dashboard session. Misses fall back to specs pre-rendered by the
+    pipeline (when their stamp matches the bars on screen), then to building the
+    figure. Cached entries
+    are validated Figure objects: st.plotly_chart re-validates plain dict specs
+    on every call, which costs more than building the figure again.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MB * 1024 * 1024):
+        self.figures = HotCache(max_bytes)
+        self.built = 0
+        self.prerendered = 0
+
+    def get(self, key: tuple, build_fn, store=None, prerendered_key: str | None = None, expected=None):
+        """
+        Figure for `key` (treat as read-only: it is shared); None when the view
+        cannot be drawn. `expected` is the stamp a pre-rendered spec must carry,
+        or a function returning it (only called when there is such a spec).
+        """
+        fig = self.figures.get(key)
+        if fig is not None:
+            return fig
+        spec = None
+        if store is not None and prerendered_key:
+            text = store.read_text(prerendered_key)
+            doc = json.loads(text) if text is not None else None
+            if doc is not None and callable(expected):
+                expected = expected()
+            if doc is not None and doc.get("stamp") == expected:
+                import plotly.graph_objs as go
+                # written by prerender() from a built figure: already valid, so skip re-validation
+                fig, spec = go.Figure(doc["figure"], _validate=False), text
+                self.prerendered += 1
+        if fig is None:
+            fig = build_fn()
+            if fig is None:
+                return None
+            self.built += 1
+        self.figures.put(key, fig, len(spec or to_spec(fig)))
+        return fig
+
+    def stats(self) -> dict:
+        return {**self.figures.stats(), "built": self.built, "prerendered": self.prerendered}
+
+
+# ------------------------
+# Pre-rendering
+# ------------------------
+def prerender_tickers(top: int = PRERENDER_TOP, tickers=None) -> list[str]:
+    """Most-viewed tickers (dashboard view log), topped up by market cap."""
+    from pipeline import scheduler
+    available = set(t[:-len(".parquet")] for t in os.listdir(scheduler.PROCESSED_DIR) if t.endswith(".parquet")) \
+        if os.path.isdir(scheduler.PROCESSED_DIR) else set()
+    if tickers:
+        return [t for t in tickers if t in available]
+    views = scheduler.view_counts()
+    ranked = [t for t in views.sort_values(ascending=False).index if t in available]
+    caps = scheduler.market_caps()
+    ranked += [t for t in caps.sort_values(ascending=False).index if t in available and t not in ranked]
+    ranked += sorted(available - set(ranked))
+    return ranked[:top]
+
+
+def prerender(tickers, out_dir: str = FIGURE_DIR) -> int:
+    """Write daily specs for every view of `tickers` to <out_dir>/<ticker>/<view>.json."""
+    from pipeline import scheduler
+    written = 0
+    for ticker in tickers:
+        df = pd.read_parquet(os.path.join(scheduler.PROCESSED_DIR, f"{ticker}.parquet"))
+        forecast_path = os.path.join(scheduler.FORECAST_DIR, f"{ticker}_forecast.csv")
+        forecast_df = pd.read_csv(forecast_path, parse_dates=["ds"]) if os.path.exists(forecast_path) else None
+        folder = os.path.join(out_dir, ticker)
+        os.makedirs(folder, exist_ok=True)
+        for view in VIEWS:
+            fig = build(view, df, forecast_df)
+            path = os.path.join(folder, f"{view}.json")
+            if fig is None:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            doc = {"stamp": stamp(df, forecast_df if view == "forecast" else None), "figure": json.loads(to_spec(fig))}
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(doc, f)
+            os.replace(tmp, path)
+            written += 1
+    print(f"🖼️  Pre-rendered {written} figures for {len(tickers)} tickers → {out_dir}")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render dashboard figures for the most-viewed tickers")
+    parser.add_argument("--top", type=int, default=PRERENDER_TOP, help="tickers to pre-render (by views, then market cap)")
+    parser.add_argument("--tickers", default=None, help="comma-separated tickers instead of the top N")
+    args = parser.parse_args()
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers else None
+    prerender(prerender_tickers(args.top, tickers))
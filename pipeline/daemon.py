@@ -0,0 +1,511 @@
+# Long-running pipeline daemon: warm price panel and forecast workers, scheduled incremental refreshes,
+# and a local control endpoint
+
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import datetime
+import threading
+import multiprocessing
+import importlib.util
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import metrics
+from pipeline.intraday import OHLCV, TAIL_ROWS, add_indicators_incremental
+from pipeline.transform import RAW_DIR, PROCESSED_DIR, clean_columns
+
+# ------------------------
+# Config
+# ------------------------
+DAEMON_HOST = os.environ.get("PIPELINE_DAEMON_HOST", "127.0.0.1")   # control endpoint: local only by default
+DAEMON_PORT = int(os.environ.get("PIPELINE_DAEMON_PORT", "8503"))
+REFRESH_EVERY = "24h"
+EXTRACT_WORKERS = 4                     # downloads are I/O-bound (threads), as in the runner
+FORECAST_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+HISTORY = 50                            # refresh summaries kept for /metrics
+WARMUP_ROWS = 60                        # synthetic series each forecast worker fits once at start-up
+
+
+# ------------------------
+# Forecast Workers (top-level so they can run in worker processes)
+# ------------------------
+def _warm_worker():
+    """Import prophet and fit a tiny series once, so real fits pay no import or first-fit cost."""
+    import logging
+    from pipeline import forecast  # noqa: F401 (warm import)
+    if importlib.util.find_spec("prophet") is None:
+        return
+    from prophet import Prophet
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    ds = pd.date_range("2020-01-01", periods=WARMUP_ROWS)
+    Prophet().fit(pd.DataFrame({"ds": ds, "y": np.linspace(1.0, 2.0, WARMUP_ROWS)}))
+
+
+def _ping():
+    return os.getpid()
+
+
+def _forecast(ticker, days, run_id):
+    from pipeline.forecast import save_forecast
+    metrics.start_run(run_id)   # the warm workers outlive every refresh: log under the one that sent the job
+    return save_forecast(ticker, days)
+
+
+# ------------------------
+# Price Panel
+# ------------------------
+def processed_path(ticker: str) -> str:
+    return os.path.join(PROCESSED_DIR, f"{ticker}.parquet")
+
+
+def raw_path(ticker: str) -> str:
+    return os.path.join(RAW_DIR, f"{ticker}_raw.csv")
+
+
+def daily_index(index) -> pd.DatetimeIndex:
+    """Downloaded bar dates as naive midnight timestamps, like the parsed raw CSVs."""
+    index = pd.to_datetime(index, utc=True).tz_convert(None).normalize()
+    return index.rename("date")
+
+
+class Panel:
+    """
+    Processed bars of every ticker, held in memory with the indicator state at
+    each one's last bar, so new bars only cost their own indicators. A file
+    rewritten by another process (e.g. a batch run) is reloaded on next use.
+    """
+
+    def __init__(self):
+        self.frames, self.states, self.mtimes = {}, {}, {}
+
+    def load(self, ticker: str) -> bool:
+        path = processed_path(ticker)
+        if not os.path.exists(path):
+            self.frames.pop(ticker, None)
+            return False
+        df = pd.read_parquet(path)
+        _, state = add_indicators_incremental(df[OHLCV])   # state at the last bar (values as stored)
+        self.frames[ticker], self.states[ticker] = df, state
+        self.mtimes[ticker] = os.stat(path).st_mtime_ns
+        return True
+
+    def get(self, ticker: str) -> pd.DataFrame | None:
+        path = processed_path(ticker)
+        if not os.path.exists(path):
+            return None
+        if ticker not in self.frames or os.stat(path).st_mtime_ns != self.mtimes.get(ticker):
+            self.load(ticker)
+        return self.frames.get(ticker)
+
+    def append(self, ticker: str, raw: pd.DataFrame) -> int:
+        """Add newly downloaded bars: indicators continue from the stored state; the file is rewritten atomically."""
+        df = self.get(ticker)
+        bars = clean_columns(raw).dropna(subset=OHLCV)
+        bars = bars[bars.index > df.index[-1]]
+        if bars.empty:
+            return 0
+        bars, state = add_indicators_incremental(bars, df[OHLCV].tail(TAIL_ROWS), self.states[ticker])
+        df = pd.concat([df, bars.reindex(columns=df.columns)])
+        path = processed_path(ticker)
+        tmp = f"{path}.tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+        self.frames[ticker], self.states[ticker] = df, state
+        self.mtimes[ticker] = os.stat(path).st_mtime_ns
+        return len(bars)
+
+    def memory_mb(self) -> float:
+        return float(sum(df.memory_usage(index=True).sum() for df in self.frames.values())) / 1e6
+
+
+def raw_last_date(ticker: str) -> pd.Timestamp | None:
+    """Date of the raw CSV's last row, read from the end of the file (None if it has no rows)."""
+    path = raw_path(ticker)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    try:
+        return pd.Timestamp(lines[-1].split(b",")[0].decode()).normalize()
+    except (IndexError, ValueError):   # header only
+        return None
+
+
+def append_raw(ticker: str, raw: pd.DataFrame) -> int:
+    """Append new bars to the raw CSV, in its existing column order; dates it already holds are left out."""
+    path = raw_path(ticker)
+    last = raw_last_date(ticker)
+    if last is not None:
+        raw = raw[raw.index > last]
+    columns = pd.read_csv(path, nrows=0).columns
+    raw.reindex(columns=columns[1:]).to_csv(path, mode="a", header=False)
+    return len(raw)
+
+
+# ------------------------
+# Daemon
+# ------------------------
+class PipelineDaemon:
+    """
+    Keeps the price panel and a pool of warm forecast workers resident and runs
+    incremental refreshes: new bars → indicators → data-quality check →
+    forecasts (quarantined series skipped) → alerts, sector indices and a
+    published snapshot. Refreshes run one at a time, on the
+    schedule (`every`, or daily `at` HH:MM local time) or when requested.
+    """
+
+    def __init__(self, tickers=None, universe=None, days=7, every=REFRESH_EVERY, at=None,
+                 forecast_workers=FORECAST_WORKERS, publish=True, validate=True, repairs=None):
+        from pipeline.scheduler import parse_duration
+        self.universe, self.days, self.publish = universe, days, publish
+        self.validate, self.repairs = validate, repairs
+        self.every = parse_duration(every) if every else None
+        self.at = datetime.time.fromisoformat(at) if at else None
+        self.tickers = list(tickers) if tickers else self._discover()
+        self.panel = Panel()
+        self.forecast_workers = forecast_workers
+        self.pool = None
+        self.forecasting = importlib.util.find_spec("prophet") is not None
+        self.jobs = queue.Queue()
+        self.history = deque(maxlen=HISTORY)
+        self.state = "starting"
+        self.started_at = time.time()
+        self.next_refresh = None
+        self.refreshes = 0
+        self.run_id = None                      # metrics run of the current (or last) refresh
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _discover(self):
+        if self.universe:
+            from pipeline import universes
+            return universes.tickers(self.universe)
+        if not os.path.isdir(PROCESSED_DIR):
+            return []
+        return sorted(f[:-len(".parquet")] for f in os.listdir(PROCESSED_DIR) if f.endswith(".parquet"))
+
+    # ---- Start-up ----
+    def start(self):
+        t0 = time.perf_counter()
+        loaded = sum(self.panel.load(t) for t in self.tickers)
+        load_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        if self.forecasting:
+            self.pool = ProcessPoolExecutor(max_workers=self.forecast_workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_warm_worker)
+            pids = {f.result() for f in [self.pool.submit(_ping) for _ in range(self.forecast_workers)]}
+            print(f"🔥 {len(pids)} forecast workers warm ({time.perf_counter() - t0:.1f}s)")
+        else:
+            print("⏭️ Forecasts off (prophet is not installed)")
+        self.warm_s = round(time.perf_counter() - t0, 2)
+        self.load_s = round(load_s, 2)
+        print(f"📦 Loaded {loaded} of {len(self.tickers)} tickers ({self.panel.memory_mb():.0f} MB) in {load_s:.1f}s")
+        self.state = "idle"
+        self._schedule()
+
+    def _schedule(self, now=None):
+        now = now or datetime.datetime.now()
+        if self.at is not None:
+            nxt = datetime.datetime.combine(now.date(), self.at)
+            self.next_refresh = (nxt if nxt > now else nxt + datetime.timedelta(days=1)).timestamp()
+        elif self.every:
+            self.next_refresh = now.timestamp() + self.every
+        else:
+            self.next_refresh = None
+
+    # ---- Refresh ----
+    def _download(self, ticker, end):
+        from pipeline.extract import download_ticker
+        df = self.panel.get(ticker)
+        if df is None or df.empty:
+            return None
+        # The raw CSV is the record of what was downloaded: repairs can drop the processed file's last bars
+        last = raw_last_date(ticker)
+        last = df.index[-1] if last is None else last
+        start = (last + pd.Timedelta(days=1)).date()
+        end_date = datetime.date.fromisoformat(end) if end else datetime.date.today()
+        if start > end_date:
+            return None
+        with metrics.track("extract", ticker) as m:
+            raw = download_ticker(ticker, start=start.isoformat(), end=end_date.isoformat())
+            if raw is None or raw.empty:
+                m.status = "skipped"
+                return None
+            raw.index = daily_index(raw.index)
+            raw = raw[raw.index > last]
+            m.rows = len(raw)
+        return raw if len(raw) else None
+
+    def refresh(self, tickers=None, end=None, trigger="manual") -> dict:
+        """
+        One incremental refresh of `tickers` (default: all) with bars up to `end`
+        (default: today). Each refresh is its own metrics run.
+        """
+        with self._lock:
+            self.state = "refreshing"
+            self.run_id = metrics.start_run()
+            tickers = list(tickers) if tickers else self.tickers
+            summary = {"id": self.refreshes + 1, "run_id": self.run_id, "trigger": trigger, "started_at": time.time(),
+                       "tickers": len(tickers),
+                       "updated": 0, "new_bars": 0, "forecasts": 0, "quarantined": [], "failed": [], "snapshot": None,
+                       "steps": {}}
+            t_start = t0 = time.perf_counter()
+            try:
+                with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+                    futures = {t: pool.submit(self._download, t, end) for t in tickers}
+                new = {}
+                for t, f in futures.items():
+                    try:
+                        raw = f.result()
+                    except Exception as e:
+                        summary["failed"].append(f"{t}[extract]: {type(e).__name__}: {e}")
+                        continue
+                    if raw is not None:
+                        new[t] = raw
+                summary["steps"]["extract_s"] = round(time.perf_counter() - t0, 3)
+
+                t0 = time.perf_counter()
+                updated = []
+                for t, raw in new.items():
+                    try:
+                        with metrics.track("transform", t) as m:
+                            m.rows = self.panel.append(t, raw)
+                            append_raw(t, raw)   # only once the processed file has them: a retry downloads them again
+                        if m.rows:
+                            updated.append(t)
+                            summary["new_bars"] += m.rows
+                    except Exception as e:
+                        summary["failed"].append(f"{t}[transform]: {type(e).__name__}: {e}")
+                summary["updated"] = len(updated)
+                summary["steps"]["transform_s"] = round(time.perf_counter() - t0, 3)
+
+                t0 = time.perf_counter()
+                if self.validate and updated:
+                    # Repaired files are rewritten on disk: the panel reloads them on next use
+                    # The rest of the panel gives the trading calendar, as in the runner's quality gate
+                    from pipeline.runner import QUALITY_BATCH, run_validation
+                    reference = [t for t in self.tickers if t not in set(updated)]
+                    summary["quarantined"] = sorted(run_validation(updated, self.repairs, reference[-QUALITY_BATCH:]))
+                summary["steps"]["validate_s"] = round(time.perf_counter() - t0, 3)
+
+                t0 = time.perf_counter()
+                healthy = [t for t in updated if t not in summary["quarantined"]]
+                if self.pool is not None and healthy:
+                    futures = {t: self.pool.submit(_forecast, t, self.days, self.run_id) for t in healthy}
+                    for t, f in futures.items():
+                        try:
+                            summary["forecasts"] += bool(f.result())
+                        except Exception as e:
+                            summary["failed"].append(f"{t}[forecast]: {type(e).__name__}: {e}")
+                summary["steps"]["forecast_s"] = round(time.perf_counter() - t0, 3)
+
+                t0 = time.perf_counter()
+                if updated and self.publish:
+                    from pipeline.runner import run_universe_steps
+                    run_universe_steps(updated, self.universe)
+                    if self.universe:
+                        from pipeline import universes
+                        summary["snapshot"] = universes.publish(self.universe)
+                    else:
+                        from pipeline.snapshots import publish_local_snapshot
+                        summary["snapshot"] = publish_local_snapshot()
+                summary["steps"]["publish_s"] = round(time.perf_counter() - t0, 3)
+            finally:
+                summary["seconds"] = round(time.perf_counter() - t_start, 3)
+                self.refreshes += 1
+                self.history.append(summary)
+                self.state = "idle"
+        print(f"🔄 Refresh {summary['id']} ({trigger}): {summary['updated']}/{summary['tickers']} tickers, "
+              f"{summary['new_bars']} new bars, {summary['forecasts']} forecasts in {summary['seconds']:.1f}s"
+              + (f", {len(summary['failed'])} failed" if summary["failed"] else ""))
+        return summary
+
+    def request(self, tickers=None, end=None, wait=False):
+        """Queue a refresh for the daemon loop; with `wait`, block until it has run and return its summary."""
+        job = {"tickers": tickers, "end": end, "done": threading.Event(), "summary": None}
+        self.jobs.put(job)
+        if wait:
+            job["done"].wait()
+            return job["summary"]
+        return None
+
+    def reload(self) -> int:
+        with self._lock:
+            self.tickers = self._discover() if not self.universe else self.tickers
+            return sum(self.panel.load(t) for t in self.tickers)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            timeout = None if self.next_refresh is None else max(0.0, self.next_refresh - time.time())
+            try:
+                job = self.jobs.get(timeout=timeout)
+            except queue.Empty:
+                job = None
+            if self._stop.is_set():
+                break
+            try:
+                if job is None:
+                    self._schedule()
+                    self.refresh(trigger="schedule")
+                else:
+                    job["summary"] = self.refresh(job["tickers"], job["end"])
+            except Exception as e:   # keep serving: the failure is in the summary history and the log
+                print(f"❌ Refresh failed: {type(e).__name__}: {e}")
+            finally:
+                if job is not None:
+                    job["done"].set()
+        while not self.jobs.empty():   # release callers still waiting on queued refreshes
+            job = self.jobs.get()
+            if job is not None:
+                job["done"].set()
+
+    def stop(self):
+        self._stop.set()
+        self.jobs.put(None)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+    # ---- Status ----
+    def status(self) -> dict:
+        last = self.history[-1] if self.history else None
+        return {
+            "state": self.state,
+            "run_id": self.run_id,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "tickers": len(self.tickers),
+            "loaded": len(self.panel.frames),
+            "panel_mb": round(self.panel.memory_mb(), 1),
+            "rss_mb": round(metrics.current_rss_mb(), 1),
+            "forecast_workers": self.forecast_workers if self.pool is not None else 0,
+            "queued": self.jobs.qsize(),
+            "refreshes": self.refreshes,
+            "last_refresh": last,
+            "next_refresh": (datetime.datetime.fromtimestamp(self.next_refresh).isoformat(timespec="seconds")
+                             if self.next_refresh else None),
+        }
+
+    def report(self) -> dict:
+        """Start-up costs, recent refresh summaries and per-step latency percentiles."""
+        rows = list(self.history)
+        steps = {}
+        for name in ("extract_s", "transform_s", "forecast_s", "publish_s"):
+            values = [r["steps"][name] for r in rows if name in r["steps"]]
+            if values:
+                steps[name] = {"p50": round(float(np.percentile(values, 50)), 3), "max": round(max(values), 3)}
+        seconds = [r["seconds"] for r in rows]
+        return {
+            "startup": {"load_s": self.load_s, "warm_workers_s": self.warm_s},
+            "refresh_p50_s": round(float(np.percentile(seconds, 50)), 3) if seconds else None,
+            "steps": steps,
+            "refreshes": rows,
+        }
+
+
+# ------------------------
+# Control Endpoint
+# ------------------------
+class ControlHandler(BaseHTTPRequestHandler):
+    """GET /status, /metrics; POST /refresh[?tickers=A,B&end=YYYY-MM-DD&wait=1], /reload, /stop."""
+    server_version = "SP500PipelineDaemon/1.0"
+
+    def do_GET(self):
+        daemon = self.server.daemon
+        path = urlsplit(self.path).path.rstrip("/")
+        if path in ("", "/status", "/health"):
+            return self._json(200, daemon.status())
+        if path == "/metrics":
+            return self._json(200, daemon.report())
+        self._json(404, {"error": f"Unknown endpoint {path!r} (GET /status, /metrics)"})
+
+    def do_POST(self):
+        daemon = self.server.daemon
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if path == "/refresh":
+            tickers = [t.strip() for t in params["tickers"].split(",") if t.strip()] if params.get("tickers") else None
+            unknown = sorted(set(tickers or []) - set(daemon.tickers))
+            if unknown:
+                return self._json(400, {"error": f"Unknown tickers: {', '.join(unknown)}"})
+            if params.get("wait") == "1":
+                return self._json(200, daemon.request(tickers, params.get("end"), wait=True))
+            daemon.request(tickers, params.get("end"))
+            return self._json(202, {"queued": daemon.jobs.qsize()})
+        if path == "/reload":
+            return self._json(200, {"loaded": daemon.reload()})
+        if path == "/stop":
+            self._json(200, {"stopping": True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return daemon.stop()
+        self._json(404, {"error": f"Unknown endpoint {path!r} (POST /refresh, /reload, /stop)"})
+
+    def _json(self, status, payload):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ControlServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, daemon: PipelineDaemon):
+        super().__init__(address, ControlHandler)
+        self.daemon = daemon
+
+
+def serve(daemon: PipelineDaemon, host: str = DAEMON_HOST, port: int = DAEMON_PORT, refresh_now: bool = False):
+    """Start the daemon, its control endpoint (in a thread) and the refresh loop (in this thread)."""
+    daemon.start()
+    server = ControlServer((host, port), daemon)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🛰️  Pipeline daemon on http://{host}:{server.server_port} (next refresh {daemon.status()['next_refresh']})")
+    if refresh_now:
+        daemon.request()
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the pipeline warm and refresh it incrementally on a schedule")
+    parser.add_argument("--tickers", default=None, help="comma-separated tickers (default: every processed file)")
+    parser.add_argument("--universe", default=None, help="this universe's members; publishes under its root")
+    parser.add_argument("--every", default=REFRESH_EVERY, help="refresh interval, e.g. 15m, 6h, 24h")
+    parser.add_argument("--at", default=None, help="refresh daily at this local time instead, e.g. 22:30")
+    parser.add_argument("--days", type=int, default=7, help="forecast horizon in days")
+    parser.add_argument("--forecast-workers", type=int, default=FORECAST_WORKERS)
+    parser.add_argument("--no-publish", action="store_true", help="skip alerts, sector indices and the snapshot")
+    parser.add_argument("--no-validate", action="store_true", help="skip the data-quality check before forecasting")
+    parser.add_argument("--repairs", default=None, help="data-quality repairs (see pipeline/quality.py), or none")
+    parser.add_argument("--refresh-now", action="store_true", help="run one refresh right after start-up")
+    parser.add_argument("--host", default=DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    args = parser.parse_args()
+
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers else None
+    serve(PipelineDaemon(tickers, args.universe, args.days, args.every, args.at, args.forecast_workers,
+                         publish=not args.no_publish, validate=not args.no_validate, repairs=args.repairs),
+          args.host, args.port, args.refresh_now)
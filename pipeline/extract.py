@@ -1,13 +1,19 @@
 # pipeline/extract.py
 import os
+import sys
 import time
 import datetime
 import pandas as pd
-from yahooquery import Ticker
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import metrics, profiling
 
 DATA_DIR = "data/raw"
 YEARS = 2
+INTERVAL = "1d"              # "1h" / "5m" switch to the chunked intraday store (pipeline/intraday.py)
 LOG_FILE = "logs/missing_stocks.txt"
+EXCHANGE_SUFFIXES = {"L"}    # Yahoo exchange suffixes kept as-is (BP.L, BT-A.L)
 
 # throttling / resilience
 MAX_RETRIES = 3
@@ -19,8 +25,13 @@ BATCH_PAUSE_SECS = 5         # seconds to pause
 def to_yahoo_symbol(symbol: str) -> str:
     """
     Convert symbols like 'BRK.B' -> 'BRK-B' for Yahoo, strip spaces.
+    Exchange suffixes ('.L' for London) are kept.
     """
-    return symbol.replace(".", "-").strip()
+    symbol = symbol.strip()
+    base, dot, suffix = symbol.rpartition(".")
+    if dot and suffix in EXCHANGE_SUFFIXES:
+        return f"{base.replace('.', '-')}.{suffix}"
+    return symbol.replace(".", "-")
 
 def log_missing(ticker: str):
     os.makedirs("logs", exist_ok=True)
@@ -33,20 +44,24 @@ def save_raw(df: pd.DataFrame, ticker: str, folder: str = DATA_DIR):
     df.to_csv(path)
     print(f"✅ Saved {ticker} → {path}")
 
-def download_ticker(ticker: str, years: int = YEARS) -> pd.DataFrame | None:
+def download_ticker(ticker: str, years: int = YEARS, start: str | None = None, end: str | None = None,
+                    interval: str = INTERVAL) -> pd.DataFrame | None:
     """
-    Download 2y daily history for a single ticker via yahooquery.
+    Download `years` of daily history (default 2) for a single ticker via yahooquery.
+    `start`/`end` (ISO dates) override the default `years` window.
+    Intraday intervals ("1h", "5m") return exchange-local bar timestamps.
     Returns DataFrame (indexed by date) or None on failure/empty.
     """
-    end = datetime.date.today()
-    start = end - datetime.timedelta(days=365 * years)
+    end = datetime.date.fromisoformat(end) if end else datetime.date.today()
+    start = datetime.date.fromisoformat(start) if start else end - datetime.timedelta(days=365 * years)
+    from yahooquery import Ticker  # deferred: slow to import
     ysym = to_yahoo_symbol(ticker)
 
     for attempt in range(1, MAX_RETRIES + 1):
         try:
             tk = Ticker(ysym)
             # history accepts ISO dates; returns DataFrame or empty
-            df = tk.history(start=start.isoformat(), end=end.isoformat(), interval="1d")
+            df = tk.history(start=start.isoformat(), end=end.isoformat(), interval=interval)
 
             # yahooquery may return a Series with an error payload
             if isinstance(df, pd.Series):
@@ -70,6 +85,9 @@ def download_ticker(ticker: str, years: int = YEARS) -> pd.DataFrame | None:
                 if "date" in df.columns:
                     df = df.set_index(pd.to_datetime(df["date"]))
                     df = df.drop(columns=["date"], errors="ignore")
+            if interval != INTERVAL:
+                from pipeline.intraday import to_exchange_time
+                df.index = to_exchange_time(df.index, ticker)
             df = df.sort_index()
 
             # Keep common OHLCV fields if present (yahooquery is lower-case)
@@ -83,9 +101,72 @@ def download_ticker(ticker: str, years: int = YEARS) -> pd.DataFrame | None:
             if attempt == MAX_RETRIES:
                 print(f"❌ {ticker}: {e}")
                 return None
+            metrics.add(retries=1)
             time.sleep(RETRY_SLEEP * attempt)
 
+def extract_intraday(ticker: str, interval: str, start: str | None = None, end: str | None = None) -> str | None:
+    """
+    Download only the bars newer than the last stored one (or the longest history
+    Yahoo serves for `interval`) and append them to the ticker's monthly chunks.
+    Returns the ticker's chunk folder, or None when nothing is stored.
+    """
+    from pipeline import intraday
+    intraday.check_interval(interval)
+    folder = intraday.chunk_dir(intraday.RAW_ROOT, interval, ticker)
+    with metrics.track("extract", ticker) as m, profiling.profile("extract", ticker):
+        last = intraday.last_timestamp(ticker, interval)
+        if start is None:
+            earliest = datetime.date.today() - datetime.timedelta(days=intraday.INTERVALS[interval]["max_days"])
+            start = max(last.date(), earliest).isoformat() if last is not None else earliest.isoformat()
+        df = download_ticker(ticker, start=start, end=end, interval=interval)
+        time.sleep(REQUEST_SLEEP)  # polite throttling
+        if df is not None and last is not None:
+            df = df[df.index > last]
+        if df is None or df.empty:
+            m.status = "skipped" if last is None else "ok"
+            if last is None:
+                print(f"⚠️ No {interval} data for {ticker}")
+                log_missing(ticker)
+                return None
+            print(f"⏭️  {ticker}: no new {interval} bars")
+            return folder
+        chunks = intraday.append_raw(df, ticker, interval)
+        m.rows = len(df)
+    print(f"✅ Appended {len(df)} {interval} bars for {ticker} → {folder} ({', '.join(chunks)})")
+    return folder
+
+def extract_ticker(ticker: str, skip_existing: bool = True, start: str | None = None, end: str | None = None,
+                   interval: str = INTERVAL, years: int = YEARS) -> str | None:
+    """
+    Download and save one ticker. Returns the raw CSV path (existing or new),
+    or None when no data came back. Intraday intervals always append the bars
+    missing since the last run (`skip_existing` does not apply).
+    """
+    if interval != INTERVAL:
+        return extract_intraday(ticker, interval, start, end)
+    out_path = os.path.join(DATA_DIR, f"{ticker}_raw.csv")
+    if skip_existing and os.path.exists(out_path):
+        print(f"⏭️  Skipping {ticker} (already exists)")
+        return out_path
+
+    with metrics.track("extract", ticker) as m, profiling.profile("extract", ticker):
+        df = download_ticker(ticker, years, start=start, end=end)
+        time.sleep(REQUEST_SLEEP)  # polite throttling
+        if df is None or df.empty:
+            print(f"⚠️ No data for {ticker}")
+            log_missing(ticker)
+            m.status = "skipped"
+            return None
+        save_raw(df, ticker)
+        m.rows = len(df)
+        m.bytes_written = os.path.getsize(out_path)
+    return out_path
+
 def run_extraction(tickers: list[str], skip_existing: bool = True):
+    with profiling.profile("extract"):
+        _run_extraction(tickers, skip_existing)
+
+def _run_extraction(tickers: list[str], skip_existing: bool = True):
     success = 0
     fail = 0
 
@@ -94,17 +175,11 @@ def run_extraction(tickers: list[str], skip_existing: bool = True):
         if skip_existing and os.path.exists(out_path):
             print(f"⏭️  Skipping {ticker} (already exists)")
         else:
-            df = download_ticker(ticker)
-            if df is not None and not df.empty:
-                save_raw(df, ticker)
+            if extract_ticker(ticker, skip_existing=False):
                 success += 1
             else:
-                print(f"⚠️ No data for {ticker}")
-                log_missing(ticker)
                 fail += 1
 
-            # polite throttling
-            time.sleep(REQUEST_SLEEP)
             if i % BATCH_PAUSE_EVERY == 0:
                 print(f"⏸️  Pausing {BATCH_PAUSE_SECS}s after {i} tickers to avoid rate limits...")
                 time.sleep(BATCH_PAUSE_SECS)
@@ -1,19 +1,72 @@
 # Prophet forecast
 
 import os
+import sys
 import pandas as pd
-from prophet import Prophet
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import metrics, profiling, quality
 
 PROCESSED_DIR = "data/processed"
 FORECAST_DIR = "data/forecasts"
+INTRADAY_LOOKBACK_DAYS = 60   # intraday models train on a trailing window, not the full chunk history
+# Long histories: train daily models on a trailing window and/or a downsampled series ("W", "M").
+# Read from the environment so the runner's spawned workers pick them up (runner --long-history).
+WINDOW_DAYS = int(os.environ.get("FORECAST_WINDOW_DAYS", "0")) or None
+RESAMPLE = os.environ.get("FORECAST_RESAMPLE") or None
+LONG_HISTORY_WINDOW_DAYS = 365 * 5   # default window with --long-history
 
-def forecast_ticker(ticker, days=7):
+def _last_date(parquet_file):
+    """(index column, newest date) from the footer statistics: no data pages are read."""
+    index = (parquet_file.schema_arrow.pandas_metadata or {}).get("index_columns", [])
+    if not index or not isinstance(index[0], str):
+        return None, None
+    meta, newest = parquet_file.metadata, None
+    for i in range(meta.num_row_groups):
+        for j in range(meta.num_columns):
+            column = meta.row_group(i).column(j)
+            if column.path_in_schema == index[0] and column.statistics is not None and column.statistics.has_min_max:
+                newest = column.statistics.max if newest is None else max(newest, column.statistics.max)
+    return index[0], newest
+
+def load_history(path, window_days=None, resample=None):
+    """
+    (ds, Close) history from a processed file. With `window_days`, only the
+    trailing window is read (row groups before it are skipped); with `resample`,
+    one bar per period is kept (its last close, at its own date).
+    """
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    if "Close" not in parquet_file.schema_arrow.names:
+        return None
+    filters = None
+    if window_days:
+        name, newest = _last_date(parquet_file)
+        if newest is not None:
+            filters = [(name, ">=", pd.Timestamp(newest) - pd.Timedelta(days=window_days))]
+    df = pd.read_parquet(path, columns=["Close"], filters=filters)
+    df = df.reset_index()  # ensure index is a column
+    if resample:
+        ds = df.columns[0]
+        df = df.dropna().groupby(df[ds].dt.to_period(resample)).last().reset_index(drop=True)
+    return df
+
+def forecast_ticker(ticker, days=7, window_days=None, resample=None):
     path = os.path.join(PROCESSED_DIR, f"{ticker}.parquet")
     if not os.path.exists(path):
         return None
+    if ticker in quality.quarantined():
+        print(f"⚠️ Skipping {ticker}: quarantined by the data-quality check (see {quality.REPORT_PATH})")
+        return None
 
-    df = pd.read_parquet(path).copy()
-    df = df.reset_index()  # ensure index is a column
+    metrics.add(bytes_read=os.path.getsize(path))
+    df = load_history(path, window_days or WINDOW_DAYS, resample or RESAMPLE)
+
+    # Ensure we have 'Close' -> 'y'
+    if df is None:
+        print(f"⚠️ Skipping {ticker}: no Close column found")
+        return None
 
     # Try to detect the date column
     if "Date" in df.columns:
@@ -23,11 +76,6 @@ def forecast_ticker(ticker, days=7):
     else:
         df = df.rename(columns={df.columns[0]: "ds"})  # fallback: assume first column is date
 
-    # Ensure we have 'Close' -> 'y'
-    if "Close" not in df.columns:
-        print(f"⚠️ Skipping {ticker}: no Close column found")
-        return None
-
     df = df.rename(columns={"Close": "y"})
     df = df[["ds", "y"]].dropna()
 
@@ -35,7 +83,10 @@ def forecast_ticker(ticker, days=7):
         print(f"⚠️ Skipping {ticker}: not enough data points ({len(df)})")
         return None
 
-    # Train Prophet
+    metrics.add(rows=len(df))
+
+    # Train Prophet (imported here: loading prophet/cmdstan is the slowest import in the pipeline)
+    from prophet import Prophet
     model = Prophet(daily_seasonality=True)
     model.fit(df)
 
@@ -46,17 +97,69 @@ def forecast_ticker(ticker, days=7):
     forecast_df = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(days)
     return forecast_df
 
-def run_forecasts(tickers, days=7):
+def forecast_intraday(ticker, interval, days=1, lookback_days=INTRADAY_LOOKBACK_DAYS):
+    """Forecast the next `days` sessions of `interval` bars from a trailing window of processed chunks."""
+    from pipeline import intraday
+    last = intraday.last_timestamp(ticker, interval, root=intraday.PROCESSED_ROOT)
+    if last is None:
+        return None
+    start = last.normalize() - pd.Timedelta(days=lookback_days)
+    df = intraday.read_range(ticker, interval, start=start, columns=["Close"])
+    df = df.reset_index().rename(columns={df.index.name or "index": "ds", "Close": "y"}).dropna()
+    if len(df) < 30:
+        print(f"⚠️ Skipping {ticker}: not enough {interval} bars ({len(df)})")
+        return None
+    metrics.add(rows=len(df))
+
+    from prophet import Prophet
+    model = Prophet(daily_seasonality=True)
+    model.fit(df)
+
+    # Predict on session bars only (no overnight/weekend timestamps)
+    bars = intraday.future_bars(pd.DatetimeIndex(df["ds"]), days * intraday.bars_per_day(interval, ticker))
+    forecast = model.predict(pd.DataFrame({"ds": bars}))
+    return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+def forecast_path(ticker, interval="1d"):
+    if interval == "1d":
+        return os.path.join(FORECAST_DIR, f"{ticker}_forecast.csv")
+    return os.path.join(FORECAST_DIR, interval, f"{ticker}_forecast.csv")
+
+def save_forecast(ticker, days=7, interval="1d", window_days=None, resample=None):
+    """
+    Forecast one ticker and write its CSV. Daily fits train on the last
+    `window_days` and/or a `resample`d series (default: FORECAST_WINDOW_DAYS /
+    FORECAST_RESAMPLE). Returns the output path or None.
+    """
+    with metrics.track("forecast", ticker) as m, profiling.profile("forecast", ticker):
+        if interval == "1d":
+            forecast_df = forecast_ticker(ticker, days, window_days, resample)
+        else:
+            forecast_df = forecast_intraday(ticker, interval, days)
+        if forecast_df is None:
+            m.status = "skipped"
+            return None
+        out_path = forecast_path(ticker, interval)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        tmp = f"{out_path}.tmp"   # a fit stopped mid-write (scheduler deadline) keeps the previous forecast
+        forecast_df.to_csv(tmp, index=False)
+        os.replace(tmp, out_path)
+        m.bytes_written = os.path.getsize(out_path)
+    print(f"✅ Saved forecast for {ticker} → {out_path}")
+    return out_path
+
+def run_forecasts(tickers, days=7, deadline=None, weights=None):
+    """Forecast every ticker in order, or with `deadline` (seconds) the most important ones that fit (pipeline/scheduler.py)."""
     os.makedirs(FORECAST_DIR, exist_ok=True)
-    for ticker in tickers:
-        try:
-            forecast_df = forecast_ticker(ticker, days)
-            if forecast_df is not None:
-                out_path = os.path.join(FORECAST_DIR, f"{ticker}_forecast.csv")
-                forecast_df.to_csv(out_path, index=False)
-                print(f"✅ Saved forecast for {ticker} → {out_path}")
-        except Exception as e:
-            print(f"❌ Error forecasting {ticker}: {e}")
+    if deadline is not None:
+        from pipeline import scheduler
+        return scheduler.run_scheduled(tickers, deadline, weights, days=days)
+    with profiling.profile("forecast"):
+        for ticker in tickers:
+            try:
+                save_forecast(ticker, days)
+            except Exception as e:
+                print(f"❌ Error forecasting {ticker}: {e}")
 
 if __name__ == "__main__":
     tickers = [f.replace(".parquet", "") for f in os.listdir(PROCESSED_DIR) if f.endswith(".parquet")]
@@ -1,4 +1,3 @@
-import yfinance as yf
 import pandas as pd
 import os
 import sys
@@ -9,36 +8,44 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Import tickers from config
 from pipeline.config_sp500 import SP500_COMPANIES  
+from pipeline import universes
+from pipeline import metrics, profiling
 
 FUND_DIR = "data/fundamentals"
-os.makedirs(FUND_DIR, exist_ok=True)
 
 def fetch_fundamentals(ticker, retries=3):
     """Fetch fundamentals for a single ticker with retries."""
-    for attempt in range(retries):
-        try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            return {
-                "Ticker": ticker,
-                "Company": SP500_COMPANIES.get(ticker, "Unknown"),
-                "PE_Ratio": info.get("trailingPE"),
-                "Forward_PE": info.get("forwardPE"),
-                "EPS": info.get("trailingEps"),
-                "Dividend_Yield": info.get("dividendYield"),
-                "Market_Cap": info.get("marketCap"),
-                "Beta": info.get("beta"),
-                "52W_High": info.get("fiftyTwoWeekHigh"),
-                "52W_Low": info.get("fiftyTwoWeekLow"),
-            }
-        except Exception as e:
-            print(f"⚠️ Attempt {attempt+1} failed for {ticker}: {e}")
-            time.sleep(2)  # short wait before retry
+    import yfinance as yf  # deferred: slow to import
+    with metrics.track("fundamentals", ticker) as m, profiling.profile("fundamentals", ticker):
+        for attempt in range(retries):
+            try:
+                stock = yf.Ticker(ticker)
+                info = stock.info
+                m.rows = 1
+                return {
+                    "Ticker": ticker,
+                    "Company": universes.company_map().get(ticker, "Unknown"),
+                    "PE_Ratio": info.get("trailingPE"),
+                    "Forward_PE": info.get("forwardPE"),
+                    "EPS": info.get("trailingEps"),
+                    "Dividend_Yield": info.get("dividendYield"),
+                    "Market_Cap": info.get("marketCap"),
+                    "Beta": info.get("beta"),
+                    "52W_High": info.get("fiftyTwoWeekHigh"),
+                    "52W_Low": info.get("fiftyTwoWeekLow"),
+                }
+            except Exception as e:
+                print(f"⚠️ Attempt {attempt+1} failed for {ticker}: {e}")
+                m.retries += 1
+                time.sleep(2)  # short wait before retry
+        m.status = "failed"
+        m.error = f"{retries} failed attempts"
     print(f"❌ Skipping {ticker} after {retries} failed attempts")
     return None
 
 def batch_fetch_fundamentals(tickers, batch_size=25, delay=(1,3)):
     """Fetch fundamentals in batches with throttling."""
+    os.makedirs(FUND_DIR, exist_ok=True)
     all_data = []
     for i in range(0, len(tickers), batch_size):
         batch = tickers[i:i+batch_size]
@@ -65,8 +72,8 @@ def batch_fetch_fundamentals(tickers, batch_size=25, delay=(1,3)):
 
 
 if __name__ == "__main__":
-    # Use the ticker list from config_sp500.py
-    tickers = list(SP500_COMPANIES.keys())
+    # Use the ticker list from config_sp500.py, or a universe file given on the command line
+    tickers = universes.tickers(sys.argv[1]) if len(sys.argv) > 1 else list(SP500_COMPANIES.keys())
     df_fundamentals = batch_fetch_fundamentals(tickers, batch_size=20, delay=(1,3))
     print(df_fundamentals.head())
     print("Fundamentals fetching complete.")
\ No newline at end of file
@@ -0,0 +1,298 @@
+# Intraday bars (1h, 5m): append-only monthly chunks and incremental indicators
+
+import os
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.transform import clean_columns
+from pipeline.universes import exchange
+
+# ------------------------
+# Config
+# ------------------------
+DAILY = "1d"
+# Yahoo only serves limited intraday history: ~730 days of 1h bars, 60 days of 5m bars
+INTERVALS = {
+    "1h": {"freq": "h", "minutes": 60, "max_days": 729},
+    "5m": {"freq": "5min", "minutes": 5, "max_days": 59},
+}
+RAW_ROOT = "data/raw_intraday"               # <root>/<interval>/<ticker>/<YYYY-MM>.parquet
+PROCESSED_ROOT = "data/processed_intraday"   # same layout, with indicators
+PROCESSED_PREFIX = "processed_intraday"      # storage key prefix, as in app/app.py
+CHUNK_FORMAT = "%Y-%m"                       # one chunk per ticker and calendar month
+STATE_KEY = b"pipeline.indicators"           # Parquet footer metadata on processed chunks
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+
+# Indicator windows, as in transform.add_indicators
+EMA_SPANS = {"EMA_20": 20, "EMA_50": 50}
+RSI_WINDOW = 14
+ATR_WINDOW = 14
+VWAP_WINDOW = 14
+TAIL_ROWS = 50                               # bars carried into the next chunk (longest window)
+INDICATORS = [*EMA_SPANS, "RSI_14", "Volatility_ATR", "VWAP"]
+
+
+def check_interval(interval: str):
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown intraday interval {interval!r} (choose from {list(INTERVALS)})")
+
+
+def bars_per_day(interval: str, ticker: str | None = None) -> int:
+    """Bars in one regular session of the exchange `ticker` trades on (the last one may be partial)."""
+    check_interval(interval)
+    hours = exchange(ticker)
+    minutes = (pd.Timedelta(f"{hours['close']}:00") - pd.Timedelta(f"{hours['open']}:00")).total_seconds() // 60
+    return int(-(-minutes // INTERVALS[interval]["minutes"]))
+
+
+# ------------------------
+# Chunk Files
+# ------------------------
+def chunk_dir(root: str, interval: str, ticker: str) -> str:
+    return os.path.join(root, interval, ticker)
+
+
+def list_chunks(root: str, interval: str, ticker: str) -> list[str]:
+    """Chunk ids ("2025-09", ...) for one ticker, oldest first."""
+    folder = chunk_dir(root, interval, ticker)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(f[:-len(".parquet")] for f in os.listdir(folder) if f.endswith(".parquet"))
+
+
+def list_tickers(root: str, interval: str) -> list[str]:
+    folder = os.path.join(root, interval)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(t for t in os.listdir(folder) if list_chunks(root, interval, t))
+
+
+def chunks_in_range(chunks, start=None, end=None) -> list[str]:
+    """Chunk ids overlapping [start, end]; chunk ids sort like the months they hold."""
+    lo = pd.Timestamp(start).strftime(CHUNK_FORMAT) if start is not None else None
+    hi = pd.Timestamp(end).strftime(CHUNK_FORMAT) if end is not None else None
+    return [c for c in chunks if (lo is None or c >= lo) and (hi is None or c <= hi)]
+
+
+def _write_atomic(table: pa.Table, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def to_exchange_time(index, ticker: str | None = None) -> pd.DatetimeIndex:
+    """yahooquery returns tz-aware (sometimes mixed-offset) timestamps; store naive local time of `ticker`'s exchange."""
+    index = pd.to_datetime(index, utc=True)
+    return index.tz_convert(exchange(ticker)["tz"]).tz_localize(None).rename("date")
+
+
+def append_raw(df: pd.DataFrame, ticker: str, interval: str, root: str = RAW_ROOT) -> list[str]:
+    """
+    Merge newly downloaded bars into the monthly chunks they fall in. Only those
+    chunks are rewritten (normally just the current month); older chunks are
+    never touched, so history is append-only at chunk granularity.
+    Returns the chunk ids written.
+    """
+    check_interval(interval)
+    if df is None or df.empty:
+        return []
+    df = df.sort_index()
+    written = []
+    for chunk, part in df.groupby(df.index.strftime(CHUNK_FORMAT)):
+        path = os.path.join(chunk_dir(root, interval, ticker), f"{chunk}.parquet")
+        if os.path.exists(path):
+            part = pd.concat([pd.read_parquet(path), part])
+            part = part[~part.index.duplicated(keep="last")].sort_index()
+        _write_atomic(pa.Table.from_pandas(part), path)
+        written.append(chunk)
+    return written
+
+
+def last_timestamp(ticker: str, interval: str, root: str = RAW_ROOT) -> pd.Timestamp | None:
+    """Newest stored bar (only the last chunk's index is read)."""
+    chunks = list_chunks(root, interval, ticker)
+    if not chunks:
+        return None
+    index = pd.read_parquet(os.path.join(chunk_dir(root, interval, ticker), f"{chunks[-1]}.parquet"), columns=[]).index
+    return index.max() if len(index) else None
+
+
+def read_range(ticker: str, interval: str, start=None, end=None, columns=None,
+               root: str = PROCESSED_ROOT) -> pd.DataFrame | None:
+    """Bars in [start, end], reading only the chunks that overlap the range."""
+    chunks = chunks_in_range(list_chunks(root, interval, ticker), start, end)
+    if not chunks:
+        return None
+    folder = chunk_dir(root, interval, ticker)
+    df = pd.concat([pd.read_parquet(os.path.join(folder, f"{c}.parquet"), columns=columns) for c in chunks])
+    return df.loc[start:end]
+
+
+def chunk_state(path: str) -> dict | None:
+    """Indicator state stored in a processed chunk's footer (None if missing)."""
+    if not os.path.exists(path):
+        return None
+    meta = pq.read_schema(path).metadata or {}
+    return json.loads(meta[STATE_KEY]) if STATE_KEY in meta else None
+
+
+# ------------------------
+# Incremental Indicators
+# ------------------------
+def _ewm(values: np.ndarray, alpha: float, prev=None) -> np.ndarray:
+    """adjust=False exponential average, continuing from `prev` (or starting at the first value)."""
+    if prev is None:
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return pd.Series(np.concatenate([[prev], values])).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def _indicators(bars: pd.DataFrame, state: dict | None, vwap_prefix: pd.DataFrame | None):
+    """Indicator columns for `bars`, continuing from `state` (None: `bars` starts the history)."""
+    high, low, close, volume = (bars[c].to_numpy(dtype="float64") for c in ("High", "Low", "Close", "Volume"))
+    n0 = state["n"] if state else 0
+    seen = n0 + np.arange(1, len(bars) + 1)          # bars of history up to and including each row
+    prev_close = np.concatenate([[state["close"] if state else np.nan], close[:-1]])
+    out, new_state = {}, {"n": int(n0 + len(bars)), "close": float(close[-1])}
+
+    for name, span in EMA_SPANS.items():
+        ema = _ewm(close, 2 / (span + 1), state[name] if state else None)
+        out[name] = np.where(seen >= span, ema, np.nan)
+        new_state[name] = float(ema[-1])
+
+    with np.errstate(invalid="ignore"):
+        diff = close - prev_close
+        up = np.where(diff > 0, diff, 0.0)
+        down = np.where(diff < 0, -diff, 0.0)
+    avg_up = _ewm(up, 1 / RSI_WINDOW, state["rsi_up"] if state else None)
+    avg_down = _ewm(down, 1 / RSI_WINDOW, state["rsi_down"] if state else None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_down == 0, 100.0, 100 - 100 / (1 + avg_up / avg_down))
+    out["RSI_14"] = np.where(seen >= RSI_WINDOW, rsi, np.nan)
+    new_state["rsi_up"], new_state["rsi_down"] = float(avg_up[-1]), float(avg_down[-1])
+
+    # ATR as `ta` computes it: zeros, then the mean of the first window, then Wilder smoothing
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    if state:
+        atr = _ewm(true_range, 1 / ATR_WINDOW, state["atr"])
+    else:
+        atr = np.zeros(len(bars))
+        if len(bars) >= ATR_WINDOW:
+            atr[ATR_WINDOW - 1] = true_range[:ATR_WINDOW].mean()
+            atr[ATR_WINDOW:] = _ewm(true_range[ATR_WINDOW:], 1 / ATR_WINDOW, atr[ATR_WINDOW - 1])
+    out["Volatility_ATR"] = atr
+    new_state["atr"] = float(atr[-1])
+
+    # Rolling VWAP needs the previous VWAP_WINDOW - 1 bars
+    frame = bars[["High", "Low", "Close", "Volume"]]
+    if vwap_prefix is not None and len(vwap_prefix):
+        frame = pd.concat([vwap_prefix[["High", "Low", "Close", "Volume"]], frame])
+    typical_volume = (frame["High"] + frame["Low"] + frame["Close"]) / 3 * frame["Volume"]
+    vwap = (typical_volume.rolling(VWAP_WINDOW, min_periods=VWAP_WINDOW).sum()
+            / frame["Volume"].rolling(VWAP_WINDOW, min_periods=VWAP_WINDOW).sum())
+    out["VWAP"] = vwap.to_numpy()[-len(bars):]
+    return out, new_state
+
+
+def add_indicators_incremental(bars: pd.DataFrame, tail: pd.DataFrame | None = None, state: dict | None = None):
+    """
+    The columns of transform.add_indicators (same values as `ta` over the whole
+    history) for `bars` only. `tail` holds the last TAIL_ROWS cleaned bars before
+    them and `state` the indicator state at the end of `tail`. Returns
+    (bars with indicators, state at the end of `bars`).
+    """
+    bars = bars.copy()
+    if state is None or state["n"] < TAIL_ROWS:
+        # Short history: the tail is all of it, so recompute from the first bar
+        full = bars if tail is None or tail.empty else pd.concat([tail[OHLCV], bars[OHLCV]])
+        columns, new_state = _indicators(full, None, None)
+        columns = {k: v[-len(bars):] for k, v in columns.items()}
+    else:
+        columns, new_state = _indicators(bars, state, tail.iloc[-(VWAP_WINDOW - 1):])
+    for name, values in columns.items():
+        bars[name] = values
+    return bars, new_state
+
+
+# ------------------------
+# Transform
+# ------------------------
+def _read_tail(folder: str, chunks: list[str], rows: int = TAIL_ROWS) -> pd.DataFrame | None:
+    """Last `rows` processed bars before a chunk, walking back over as many chunks as needed."""
+    parts, have = [], 0
+    for chunk in reversed(chunks):
+        part = pd.read_parquet(os.path.join(folder, f"{chunk}.parquet"), columns=OHLCV)
+        parts.append(part.tail(rows - have))
+        have += len(parts[-1])
+        if have >= rows:
+            break
+    return pd.concat(reversed(parts)) if parts else None
+
+
+def process_ticker(ticker: str, interval: str, raw_root: str = RAW_ROOT, out_root: str = PROCESSED_ROOT) -> dict:
+    """
+    Bring a ticker's processed chunks up to date with its raw chunks. Starts at the
+    first raw chunk whose row count differs from what its processed chunk was built
+    from, resumes indicator state from the chunk before it, and processes one chunk
+    at a time, so memory stays bounded by the chunk size whatever the history length.
+    A raw chunk with no bars left after cleaning gets an empty processed chunk
+    carrying the state forward, so it is not recomputed on every run.
+    Returns counts of chunks processed / unchanged and rows written.
+    """
+    check_interval(interval)
+    raw_dir, out_dir = chunk_dir(raw_root, interval, ticker), chunk_dir(out_root, interval, ticker)
+    raw_chunks = list_chunks(raw_root, interval, ticker)
+    stats = {"chunks": 0, "unchanged": 0, "rows": 0, "bytes_read": 0, "bytes_written": 0}
+
+    start = len(raw_chunks)
+    for i, chunk in enumerate(raw_chunks):
+        done = chunk_state(os.path.join(out_dir, f"{chunk}.parquet"))
+        if done is None or done.get("raw_rows") != pq.ParquetFile(os.path.join(raw_dir, f"{chunk}.parquet")).metadata.num_rows:
+            start = i
+            break
+    stats["unchanged"] = start
+
+    state = chunk_state(os.path.join(out_dir, f"{raw_chunks[start - 1]}.parquet")) if start else None
+    tail = _read_tail(out_dir, raw_chunks[:start]) if start else None
+    for chunk in raw_chunks[start:]:
+        raw_path = os.path.join(raw_dir, f"{chunk}.parquet")
+        stats["bytes_read"] += os.path.getsize(raw_path)
+        raw = pd.read_parquet(raw_path)
+        bars = clean_columns(raw).dropna(subset=OHLCV)
+        if bars.empty:
+            bars = bars.assign(**{name: np.array([], dtype="float64") for name in INDICATORS})
+            state = {**(state or {"n": 0}), "raw_rows": len(raw)}
+        else:
+            bars, state = add_indicators_incremental(bars, tail, state)
+            state["raw_rows"] = len(raw)
+
+        table = pa.Table.from_pandas(bars)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), STATE_KEY: json.dumps(state)})
+        out_path = os.path.join(out_dir, f"{chunk}.parquet")
+        _write_atomic(table, out_path)
+        stats["bytes_written"] += os.path.getsize(out_path)
+        stats["chunks"] += 1
+        stats["rows"] += len(bars)
+        if len(bars):
+            tail = pd.concat([tail[OHLCV], bars[OHLCV]]).tail(TAIL_ROWS) if tail is not None else bars[OHLCV].tail(TAIL_ROWS)
+    return stats
+
+
+# ------------------------
+# Forecast Helpers
+# ------------------------
+def future_bars(history_index: pd.DatetimeIndex, n_bars: int) -> pd.DatetimeIndex:
+    """The next `n_bars` bar times: weekdays after the last bar, at the session times seen in the history."""
+    times = sorted(set(history_index.time))
+    last = history_index.max()
+    days = pd.bdate_range(last.normalize() + pd.Timedelta(days=1), periods=n_bars // max(len(times), 1) + 2)
+    candidates = [last.normalize() + pd.Timedelta(hours=t.hour, minutes=t.minute) for t in times]
+    candidates += [d + pd.Timedelta(hours=t.hour, minutes=t.minute) for d in days for t in times]
+    return pd.DatetimeIndex([c for c in candidates if c > last][:n_bars], name="ds")
@@ -0,0 +1,273 @@
+# Per-stage, per-ticker performance metrics (JSONL) and run report
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import threading
+from contextlib import contextmanager
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.snapshots import new_run_id
+
+# ------------------------
+# Config
+# ------------------------
+METRICS_DIR = os.environ.get("PIPELINE_METRICS_DIR", "logs/metrics")
+METRICS_ENABLED = os.environ.get("PIPELINE_METRICS", "1") != "0"
+
+# Current run: runner and daemon call start_run() per run/refresh and hand the
+# id to their workers with each task; anything else gets one on first use
+RUN_ID = None
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+# The kernel's RSS high-water mark is process-wide: it is reset when the first
+# tracked unit starts, so a unit running alone gets its own peak
+_rss_lock = threading.Lock()
+_rss_units = set()
+_rss_resettable = sys.platform.startswith("linux")
+
+
+def start_run(run_id=None):
+    """
+    Record under `run_id` (a new id by default) from now on and export it for
+    processes spawned later. Workers call it with the id handed to them, since a
+    long-lived worker outlives the run it was spawned in. Returns the id.
+    """
+    global RUN_ID
+    RUN_ID = run_id or new_run_id()
+    os.environ["PIPELINE_RUN_ID"] = RUN_ID
+    return RUN_ID
+
+
+def current_run_id():
+    """The current run's id: the one exported by a parent process, else a new one for this process."""
+    return RUN_ID or start_run(os.environ.get("PIPELINE_RUN_ID"))
+
+
+# ------------------------
+# Recording
+# ------------------------
+class StageRecord:
+    """Counters for one (stage, ticker) unit of work; filled in by the stage code."""
+
+    def __init__(self, stage, ticker):
+        self.stage = stage
+        self.ticker = ticker
+        self.status = "ok"
+        self.error = None
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.retries = 0
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _peak_rss_mb():
+    """Highest RSS since the last reset (VmHWM on Linux, the lifetime peak elsewhere)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def current_rss_mb():
+    """Resident set size right now (Linux /proc; the peak so far elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return _peak_rss_mb()
+
+
+def _rss_begin(token):
+    """Reset the high-water mark when no other unit is running; returns the RSS now."""
+    global _rss_resettable
+    with _rss_lock:
+        if not _rss_units and _rss_resettable:
+            try:
+                with open("/proc/self/clear_refs", "w") as f:
+                    f.write("5")
+            except OSError:
+                _rss_resettable = False
+        _rss_units.add(token)
+        return current_rss_mb()
+
+
+def _rss_end(token, start_mb):
+    """
+    Peak RSS while the unit ran: the reset high-water mark (shared with units
+    that overlapped it on other threads), or the larger of the start/end samples
+    where it cannot be reset.
+    """
+    with _rss_lock:
+        _rss_units.discard(token)
+        end_mb = current_rss_mb()
+        peak = _peak_rss_mb() if _rss_resettable else 0.0
+    return round(max(peak, start_mb, end_mb), 1)
+
+
+def add(**counts):
+    """Add to the counters of the record currently being tracked on this thread (if any)."""
+    record = getattr(_local, "record", None)
+    if record is None:
+        return
+    for name, value in counts.items():
+        setattr(record, name, getattr(record, name) + value)
+
+
+@contextmanager
+def track(stage, ticker, path=None):
+    """
+    Time one unit of work and append it to logs/metrics/<run_id>.jsonl with
+    wall time, thread CPU time, rows, bytes read/written, retries and the peak
+    RSS of the process while the unit ran. Exceptions are recorded as status "failed" and re-raised.
+    """
+    record = StageRecord(stage, ticker)
+    previous = getattr(_local, "record", None)
+    _local.record = record
+    rss0 = _rss_begin(record)
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    except BaseException as e:
+        record.status = "failed"
+        record.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _local.record = previous
+        row = {
+            "run_id": current_run_id(),
+            "ts": time.time(),
+            "pid": os.getpid(),
+            **record.to_dict(),
+            "wall_s": round(time.perf_counter() - wall0, 4),
+            "cpu_s": round(time.thread_time() - cpu0, 4),
+            "peak_rss_mb": _rss_end(record, rss0),
+        }
+        write(row, path)
+
+
+def write(row, path=None):
+    if not METRICS_ENABLED:
+        return
+    path = path or os.path.join(METRICS_DIR, f"{row['run_id']}.jsonl")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    line = json.dumps(row) + "\n"
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)  # single append per row, safe across worker processes
+
+
+# ------------------------
+# Report
+# ------------------------
+def list_runs(metrics_dir=METRICS_DIR):
+    if not os.path.isdir(metrics_dir):
+        return []
+    return sorted(f[:-len(".jsonl")] for f in os.listdir(metrics_dir) if f.endswith(".jsonl"))
+
+
+def load_run(run_id, metrics_dir=METRICS_DIR):
+    import pandas as pd
+    return pd.read_json(os.path.join(metrics_dir, f"{run_id}.jsonl"), lines=True)
+
+
+def stage_summary(df):
+    """Per-stage counts and wall/CPU percentiles, rows and bytes."""
+    import pandas as pd
+    g = df.groupby("stage")
+    summary = pd.DataFrame({
+        "n": g.size(),
+        "failed": g["status"].apply(lambda s: int((s == "failed").sum())),
+        "wall_p50": g["wall_s"].quantile(0.5),
+        "wall_p90": g["wall_s"].quantile(0.9),
+        "wall_p99": g["wall_s"].quantile(0.99),
+        "wall_max": g["wall_s"].max(),
+        "wall_total": g["wall_s"].sum(),
+        "cpu_total": g["cpu_s"].sum(),
+        "rows": g["rows"].sum(),
+        "mb_read": g["bytes_read"].sum() / 1e6,
+        "mb_written": g["bytes_written"].sum() / 1e6,
+        "retries": g["retries"].sum(),
+        "peak_rss_mb": g["peak_rss_mb"].max(),
+    })
+    return summary.round(3)
+
+
+def regressions(current, previous, threshold=1.5, min_seconds=0.1):
+    """(stage, ticker) rows whose wall time grew by more than `threshold`× since the previous run."""
+    cols = ["stage", "ticker", "wall_s"]
+    merged = current[cols].merge(previous[cols], on=["stage", "ticker"], suffixes=("", "_prev"))
+    merged["ratio"] = merged["wall_s"] / merged["wall_s_prev"].clip(lower=1e-6)
+    slow = merged[(merged["ratio"] > threshold) & (merged["wall_s"] > min_seconds)]
+    return slow.sort_values("ratio", ascending=False).round(3)
+
+
+def report(run_id=None, compare_to=None, top=10, threshold=1.5, metrics_dir=METRICS_DIR):
+    runs = list_runs(metrics_dir)
+    if not runs:
+        print(f"⚠️ No metrics found in {metrics_dir}")
+        return
+    run_id = run_id or runs[-1]
+    df = load_run(run_id, metrics_dir)
+
+    print(f"📊 Run {run_id}: {len(df)} records, {df['ticker'].nunique()} tickers")
+    print(stage_summary(df).to_string())
+
+    print(f"\n🐢 Slowest {top} (stage, ticker):")
+    print(df.nlargest(top, "wall_s")[["stage", "ticker", "status", "wall_s", "cpu_s", "rows", "retries"]]
+          .to_string(index=False))
+
+    failed = df[df["status"] == "failed"]
+    if not failed.empty:
+        print(f"\n❌ {len(failed)} failures:")
+        print(failed[["stage", "ticker", "error"]].head(top).to_string(index=False))
+
+    if compare_to is None:
+        earlier = [r for r in runs if r < run_id]
+        compare_to = earlier[-1] if earlier else None
+    if compare_to:
+        prev = load_run(compare_to, metrics_dir)
+        cur_p50 = df.groupby("stage")["wall_s"].median()
+        prev_p50 = prev.groupby("stage")["wall_s"].median()
+        print(f"\n🔁 Compared with {compare_to} (p50 wall per stage):")
+        for stage in cur_p50.index:
+            if stage in prev_p50.index:
+                change = (cur_p50[stage] / max(prev_p50[stage], 1e-6) - 1) * 100
+                flag = " ⚠️" if change > (threshold - 1) * 100 else ""
+                print(f"   {stage:<13} {prev_p50[stage]:.3f}s → {cur_p50[stage]:.3f}s ({change:+.0f}%){flag}")
+        slow = regressions(df, prev, threshold)
+        if not slow.empty:
+            print(f"\n⚠️ {len(slow)} regressions over {threshold}×:")
+            print(slow.head(top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline performance metrics")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rep = sub.add_parser("report", help="summarise a run and compare it with the previous one")
+    rep.add_argument("--run", default=None, help="run id (default: latest)")
+    rep.add_argument("--compare", default=None, help="run id to compare against (default: previous)")
+    rep.add_argument("--top", type=int, default=10)
+    rep.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio flagged as a regression")
+    rep.add_argument("--dir", default=METRICS_DIR)
+    sub.add_parser("runs", help="list recorded runs")
+    args = parser.parse_args()
+
+    if args.command == "runs":
+        print("\n".join(list_runs()))
+    else:
+        report(args.run, args.compare, args.top, args.threshold, args.dir)
@@ -0,0 +1,267 @@
+# Opt-in profiling hooks for pipeline stages and dashboard reruns
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import argparse
+import threading
+import tracemalloc
+import collections
+from contextlib import contextmanager
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import metrics
+
+# ------------------------
+# Config (read at call time so CLI flags can set them before workers start)
+# ------------------------
+PROFILE_MODES = ["cprofile", "sample"]
+PROFILE_DIR = os.environ.get("PIPELINE_PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = 0.005      # seconds between stack samples
+MEMORY_TOP = 30              # allocation sites written per profile
+
+_local = threading.local()
+
+# tracemalloc is process-wide: profiled units on other threads share it, so it is
+# started by the first active unit and stopped by the last one
+_trace_lock = threading.Lock()
+_trace_units = {}            # id → unit, for the units being measured right now
+_trace_started = False       # tracing was started here (not by the caller)
+
+
+def _env_set(name):
+    return {v.strip() for v in os.environ.get(name, "").split(",") if v.strip()}
+
+
+def profile_mode():
+    """Active mode from PIPELINE_PROFILE ("cprofile", "sample") or None."""
+    mode = os.environ.get("PIPELINE_PROFILE", "").strip().lower()
+    return mode if mode in PROFILE_MODES else None
+
+
+def enabled(stage, ticker=None):
+    """Profiling is on and `stage`/`ticker` pass the PIPELINE_PROFILE_STAGES/_TICKERS filters."""
+    if profile_mode() is None:
+        return False
+    stages, tickers = _env_set("PIPELINE_PROFILE_STAGES"), _env_set("PIPELINE_PROFILE_TICKERS")
+    if ticker is None:
+        # Whole-stage profiles only when not narrowed to specific tickers
+        return (not stages or stage in stages) and not tickers
+    return (not stages or stage in stages) and (not tickers or ticker in tickers)
+
+
+# ------------------------
+# Sampling Profiler
+# ------------------------
+class _Sampler(threading.Thread):
+    """Samples one thread's Python stack every `interval` seconds into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = collections.Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def write(self, path):
+        """Collapsed stacks ("a;b;c count"), readable by flamegraph.pl and speedscope."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _trace_begin() -> dict:
+    global _trace_started
+    unit = {"shared": False}
+    with _trace_lock:
+        if not _trace_units:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _trace_started = True
+            tracemalloc.reset_peak()   # only while no other unit is being measured
+        else:
+            # Overlapping units: the peak covers all of them
+            unit["shared"] = True
+            for other in _trace_units.values():
+                other["shared"] = True
+        _trace_units[id(unit)] = unit
+    return unit
+
+
+def _trace_end(unit: dict):
+    """(snapshot, peak bytes) for `unit`; stops tracing when it was the last active unit."""
+    global _trace_started
+    with _trace_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        del _trace_units[id(unit)]
+        if not _trace_units and _trace_started:
+            tracemalloc.stop()
+            _trace_started = False
+    return snapshot, peak
+
+
+def _write_memory(snapshot, peak, path, shared=False):
+    stats = snapshot.statistics("lineno")
+    with open(path, "w", encoding="utf-8") as f:
+        scope = " (process-wide: other profiled units ran at the same time)" if shared else ""
+        f.write(f"peak traced memory: {peak / 1e6:.2f} MB{scope}\n\n")
+        for stat in stats[:MEMORY_TOP]:
+            f.write(f"{stat}\n")
+
+
+# ------------------------
+# Hooks
+# ------------------------
+@contextmanager
+def profile(stage, ticker=None, mode=None):
+    """
+    Profile the enclosed block when PIPELINE_PROFILE is set (or `mode` is given).
+    Writes profiles/<run_id>/<stage>/<ticker>.prof (cProfile) or .collapsed
+    (sampling), plus .mem.txt with tracemalloc's top allocation sites.
+    Nested hooks on the same thread are no-ops. tracemalloc is shared by the
+    whole process: when profiled units overlap on several threads, their
+    allocation sites and peak are not separated (the .mem.txt says so).
+    """
+    mode = mode or (profile_mode() if enabled(stage, ticker) else None)
+    if mode is None or getattr(_local, "active", False):
+        yield
+        return
+
+    out_dir = os.path.join(PROFILE_DIR, metrics.current_run_id(), stage)
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, (ticker or "_stage").replace("/", "_"))
+
+    unit = _trace_begin()
+    _local.active = True
+    profiler = sampler = None
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        sampler = _Sampler(threading.get_ident())
+        sampler.start()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(base + ".prof")
+        else:
+            sampler.stop()
+            sampler.write(base + ".collapsed")
+        snapshot, peak = _trace_end(unit)
+        _write_memory(snapshot, peak, base + ".mem.txt", unit["shared"])
+        _local.active = False
+
+
+class SectionTimer:
+    """
+    Times named sections of one Streamlit rerun (KPIs, tabs, data loads).
+    When enabled, each section is also wrapped in `profile("dashboard", name)` and
+    the rerun's timings are appended to profiles/dashboard/reruns.jsonl.
+    """
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get("DASHBOARD_PROFILE", "0") == "1" or profile_mode() is not None
+        self.enabled = enabled
+        self.sections = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            with profile("dashboard", name.replace(":", "_")):
+                yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + time.perf_counter() - t0
+
+    def finish(self, path=None):
+        """Append this rerun's timings; returns {section: seconds} (empty when disabled)."""
+        if not self.enabled:
+            return {}
+        row = {
+            "ts": time.time(),
+            "total_s": round(time.perf_counter() - self.started, 4),
+            "sections": {k: round(v, 4) for k, v in self.sections.items()},
+        }
+        path = path or os.path.join(PROFILE_DIR, "dashboard", "reruns.jsonl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
+        return row["sections"]
+
+
+# ------------------------
+# CLI
+# ------------------------
+def profile_call(stage, ticker, mode="cprofile", days=7):
+    """Profile a single process_file / forecast_ticker / extract_ticker call."""
+    with profile(stage, ticker, mode=mode):
+        if stage == "transform":
+            from pipeline.transform import RAW_DIR, process_file
+            process_file(os.path.join(RAW_DIR, f"{ticker}_raw.csv"))
+        elif stage == "forecast":
+            from pipeline.forecast import forecast_ticker
+            forecast_ticker(ticker, days)
+        elif stage == "extract":
+            from pipeline.extract import extract_ticker
+            extract_ticker(ticker, skip_existing=False)
+        else:
+            raise ValueError(f"Unknown stage {stage!r}")
+    print(f"🔬 Profile written under {os.path.join(PROFILE_DIR, metrics.current_run_id(), stage)}")
+
+
+def merge_profiles(folder, sort="cumulative", top=30):
+    """Combine every .prof under `folder` (e.g. one stage of one run) and print the top functions."""
+    paths = [os.path.join(dirpath, f) for dirpath, _, files in os.walk(folder) for f in files if f.endswith(".prof")]
+    if not paths:
+        print(f"⚠️ No .prof files under {folder}")
+        return None
+    stats = pstats.Stats(*paths)
+    print(f"🔬 {len(paths)} profiles merged from {folder}")
+    stats.sort_stats(sort).print_stats(top)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline profiling tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    call = sub.add_parser("call", help="profile one stage call for one ticker")
+    call.add_argument("stage", choices=["extract", "transform", "forecast"])
+    call.add_argument("ticker")
+    call.add_argument("--mode", choices=PROFILE_MODES, default="cprofile")
+    merge = sub.add_parser("merge", help="merge and print .prof files under a folder")
+    merge.add_argument("folder", help="e.g. profiles/<run_id>/forecast")
+    merge.add_argument("--sort", default="cumulative")
+    merge.add_argument("--top", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.command == "call":
+        profile_call(args.stage, args.ticker, args.mode)
+    else:
+        merge_profiles(args.folder, args.sort, args.top)
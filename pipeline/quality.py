@@ -0,0 +1,374 @@
+# Data-quality validation and repair: vectorized checks over the aligned processed panel
+
+import os
+import sys
+import time
+import warnings
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ------------------------
+# Config
+# ------------------------
+PROCESSED_DIR = "data/processed"
+QUALITY_DIR = "data/quality"
+REPORT_PATH = os.path.join(QUALITY_DIR, "quality_report.parquet")   # one row per ticker, merged across runs
+LOAD_WORKERS = 8
+PRICES = ["Open", "High", "Low", "Close"]
+FIELDS = PRICES + ["Volume", "splits"]
+
+CALENDAR_QUORUM = 0.5       # a date is a trading day when at least this share of the panel has a bar
+OUTLIER_Z = 10.0            # robust z-score of a log return (median / MAD of the ticker's returns) ...
+OUTLIER_MIN_MOVE = 0.15     # ... that is also at least this large in absolute terms
+SPIKE_REVERSAL = 0.5        # an outlier the next bar undoes by at least this share is a bad tick
+SPLIT_TOLERANCE = 0.1       # close ratio within this (log) distance of 1 / split ratio: prices not split-adjusted
+STALE_BARS = 5              # the same close this many bars in a row is stale
+
+# Repairs, applied in this order (QUALITY_REPAIRS or --repairs: comma-separated names, or "none"):
+#   splits       – back-adjust prices (and volume) before a split the data was not adjusted for
+#   ohlc         – widen High / Low to cover Open and Close; drop bars with non-positive prices
+#   spikes       – drop single-bar outliers that the next bar reverses
+#   zero_volume  – drop bars without volume
+REPAIRS = ("splits", "ohlc", "spikes", "zero_volume")
+DEFAULT_REPAIRS = os.environ.get("QUALITY_REPAIRS", ",".join(REPAIRS))
+
+# Quarantine (checked on the repaired series): forecasts skip these tickers
+QUARANTINE = {
+    "min_rows": 60,
+    "max_gap_share": 0.05,      # missing trading days / trading days in the ticker's span
+    "max_outliers": 3,          # outlier returns left after repairs
+    "max_stale_tail": 10,       # close unchanged over the last N bars (halted or delisted)
+    "max_bad_share": 0.01,      # OHLC inconsistencies or zero-volume bars left after repairs
+}
+REPORT_COLUMNS = ["rows", "first", "last", "gaps", "gap_share", "zero_volume", "ohlc", "split_jumps", "outliers",
+                  "spikes", "stale_bars", "stale_tail", "repaired_rows", "status", "reasons", "checked_at"]
+
+
+def parse_repairs(text: str | None = None) -> tuple:
+    text = DEFAULT_REPAIRS if text is None else text
+    names = [n.strip() for n in text.split(",") if n.strip()]
+    if names in ([], ["none"]):
+        return ()
+    unknown = sorted(set(names) - set(REPAIRS))
+    if unknown:
+        raise ValueError(f"Unknown repairs {unknown} (choose from {', '.join(REPAIRS)} or none)")
+    return tuple(n for n in REPAIRS if n in names)
+
+
+# ------------------------
+# Panel
+# ------------------------
+def load_panel(tickers, processed_dir: str = PROCESSED_DIR, max_workers: int = LOAD_WORKERS) -> dict:
+    """Aligned OHLCV + splits panels (dates × tickers), one per field, from the processed files."""
+    def read(ticker):
+        path = os.path.join(processed_dir, f"{ticker}.parquet")
+        if not os.path.exists(path):
+            return ticker, None
+        columns = [c for c in FIELDS if c in pq.read_schema(path).names]
+        df = pd.read_parquet(path, columns=columns)
+        return ticker, df[~df.index.duplicated(keep="last")]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = {t: df for t, df in pool.map(read, tickers) if df is not None and not df.empty}
+    if not frames:
+        return {}
+    panel = {}
+    for field in FIELDS:
+        series = {t: df[field] for t, df in frames.items() if field in df}
+        panel[field] = pd.concat(series, axis=1, sort=True).astype(float) if series else pd.DataFrame()
+    index = panel["Close"].index
+    return {f: p.reindex(index=index, columns=list(frames)) for f, p in panel.items()}
+
+
+def _ffill(a: np.ndarray) -> np.ndarray:
+    """Forward-fill NaNs down each column."""
+    idx = np.where(np.isnan(a), 0, np.arange(a.shape[0])[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return a[idx, np.arange(a.shape[1])]
+
+
+def _bfill(a: np.ndarray) -> np.ndarray:
+    return _ffill(a[::-1])[::-1]
+
+
+# ------------------------
+# Checks
+# ------------------------
+def trading_calendar(panel: dict) -> np.ndarray:
+    """Dates (panel rows) on which at least CALENDAR_QUORUM of the panel traded."""
+    return (~np.isnan(panel["Close"].to_numpy(float))).mean(axis=1) >= CALENDAR_QUORUM
+
+
+def check(panel: dict, calendar: np.ndarray | None = None) -> dict:
+    """
+    Every check as one pass over the whole panel: boolean masks (dates × tickers)
+    for calendar gaps, zero volume, OHLC inconsistencies, split-unadjusted jumps,
+    outlier returns and single-bar spikes, and stale closes. The trading
+    calendar is `calendar` (a mask over the panel's dates), by default the
+    panel's own trading_calendar.
+    """
+    o, h, l, c, v = (panel[f].to_numpy(float) for f in ["Open", "High", "Low", "Close", "Volume"])
+    s = panel["splits"].to_numpy(float) if not panel["splits"].empty else np.zeros_like(c)
+    present = ~np.isnan(c)
+    rows = np.arange(c.shape[0])[:, None]
+    first, last = np.argmax(present, axis=0), c.shape[0] - 1 - np.argmax(present[::-1], axis=0)
+    in_span = (rows >= first) & (rows <= last)
+    calendar = trading_calendar(panel) if calendar is None else calendar
+
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)   # all-NaN columns in the medians
+        ohlc = present & ((h < np.fmax(o, c)) | (l > np.fmin(o, c)) | (l > h)
+                          | (np.fmin(np.fmin(o, h), np.fmin(l, c)) <= 0))
+
+        # Log returns bar over bar, across gaps (from the ticker's previous bar)
+        prev = np.vstack([np.full((1, c.shape[1]), np.nan), _ffill(c)[:-1]])
+        r = np.where(present & (c > 0) & (prev > 0), np.log(c / prev), np.nan)
+        split_jump = present & (s > 0) & (s != 1) & (np.abs(r + np.log(s)) < SPLIT_TOLERANCE)
+
+        rr = np.where(split_jump, np.nan, r)
+        med = np.nanmedian(rr, axis=0)
+        mad = np.nanmedian(np.abs(rr - med), axis=0) * 1.4826
+        outlier = (np.abs(rr - med) > OUTLIER_Z * mad) & (np.abs(rr) > OUTLIER_MIN_MOVE)
+        r_next = np.vstack([_bfill(rr)[1:], np.full((1, c.shape[1]), np.nan)])
+        spike = outlier & (rr * r_next < 0) & (np.abs(rr + r_next) <= (1 - SPIKE_REVERSAL) * np.abs(rr))
+
+    # Length of the current run of unchanged closes, without a per-ticker loop
+    same = present & (c == prev)
+    count = np.cumsum(same, axis=0)
+    run = count - np.maximum.accumulate(np.where(same, 0, count), axis=0)
+
+    return {
+        "present": present, "in_calendar": in_span & calendar[:, None],
+        "gaps": in_span & calendar[:, None] & ~present,
+        "zero_volume": present & ~(v > 0),
+        "ohlc": ohlc, "split_jump": split_jump, "split_ratio": s,
+        "outlier": outlier, "spike": spike,
+        "stale": run >= STALE_BARS - 1, "stale_tail": run[last, np.arange(c.shape[1])],
+    }
+
+
+def summarize(found: dict, index, columns) -> pd.DataFrame:
+    """Per-ticker counts of every check."""
+    present = found["present"]
+    first = np.argmax(present, axis=0)
+    last = present.shape[0] - 1 - np.argmax(present[::-1], axis=0)
+    return pd.DataFrame({
+        "rows": present.sum(axis=0),
+        "first": index[first], "last": index[last],
+        "gaps": found["gaps"].sum(axis=0),
+        "gap_share": found["gaps"].sum(axis=0) / np.maximum(found["in_calendar"].sum(axis=0), 1),
+        "zero_volume": found["zero_volume"].sum(axis=0),
+        "ohlc": found["ohlc"].sum(axis=0),
+        "split_jumps": found["split_jump"].sum(axis=0),
+        "outliers": found["outlier"].sum(axis=0),
+        "spikes": found["spike"].sum(axis=0),
+        "stale_bars": found["stale"].sum(axis=0),
+        "stale_tail": found["stale_tail"],
+    }, index=pd.Index(columns, name="ticker"))
+
+
+def quarantine_reasons(summary: pd.DataFrame, rules: dict = QUARANTINE) -> pd.Series:
+    """Comma-separated reasons a ticker is quarantined ("" when it is not)."""
+    bad_rows = rules["max_bad_share"] * summary["rows"]
+    flags = pd.DataFrame({
+        "short_history": summary["rows"] < rules["min_rows"],
+        "gaps": summary["gap_share"] > rules["max_gap_share"],
+        "outliers": summary["outliers"] > rules["max_outliers"],
+        "stale": summary["stale_tail"] >= rules["max_stale_tail"],
+        "ohlc": summary["ohlc"] > bad_rows,
+        "zero_volume": summary["zero_volume"] > bad_rows,
+    })
+    return flags.dot(flags.columns + ",").str.rstrip(",")
+
+
+# ------------------------
+# Repairs
+# ------------------------
+def repair(panel: dict, found: dict, repairs=REPAIRS) -> tuple[dict, np.ndarray, np.ndarray]:
+    """
+    Apply `repairs` to the whole panel at once. Returns the repaired panel
+    (dropped bars are NaN), the dropped-bar mask and the per-ticker count of
+    changed or dropped bars.
+    """
+    prices = {f: panel[f].to_numpy(float).copy() for f in PRICES}
+    volume = panel["Volume"].to_numpy(float).copy()
+    present = found["present"]
+    changed = np.zeros_like(present)
+    drop = np.zeros_like(present)
+
+    if "splits" in repairs:
+        # Each bar is divided by the product of the unadjusted splits after it
+        log_ratio = np.where(found["split_jump"], np.log(np.where(found["split_jump"], found["split_ratio"], 1.0)), 0.0)
+        after = np.cumsum(log_ratio[::-1], axis=0)[::-1] - log_ratio
+        factor = np.exp(after)
+        for f in PRICES:
+            prices[f] /= factor
+        volume *= factor
+        changed |= present & (factor != 1)
+    if "ohlc" in repairs:
+        o, h, l, c = (prices[f] for f in PRICES)
+        top, bottom = np.fmax(np.fmax(o, h), np.fmax(l, c)), np.fmin(np.fmin(o, h), np.fmin(l, c))
+        changed |= present & ((h != top) | (l != bottom))
+        prices["High"], prices["Low"] = np.where(present, top, h), np.where(present, bottom, l)
+        drop |= present & ~(bottom > 0)
+    if "spikes" in repairs:
+        drop |= found["spike"]
+    if "zero_volume" in repairs:
+        drop |= found["zero_volume"]
+
+    index, columns = panel["Close"].index, panel["Close"].columns
+    repaired = {f: pd.DataFrame(np.where(drop, np.nan, prices[f]), index=index, columns=columns) for f in PRICES}
+    repaired["Volume"] = pd.DataFrame(np.where(drop, np.nan, volume), index=index, columns=columns)
+    repaired["splits"] = panel["splits"]
+    return repaired, drop, (changed | drop).sum(axis=0)
+
+
+def write_repaired(tickers, repaired: dict, drop: pd.DataFrame, processed_dir: str = PROCESSED_DIR):
+    """Rewrite the repaired tickers' processed files (atomically), indicators recomputed on the repaired bars."""
+    from pipeline.transform import add_indicators
+    for t in tickers:
+        path = os.path.join(processed_dir, f"{t}.parquet")
+        df = pd.read_parquet(path)
+        df = df[~df.index.duplicated(keep="last")]
+        for f in PRICES + ["Volume"]:
+            values = repaired[f][t].reindex(df.index)
+            if pd.api.types.is_integer_dtype(df[f].dtype):   # dropped bars (NaN) are removed below
+                values = values.round().fillna(0).astype(df[f].dtype)
+            df[f] = values
+        df = add_indicators(df[~drop[t].reindex(df.index, fill_value=False).to_numpy()].copy())
+        tmp = f"{path}.tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+
+# ------------------------
+# Stage
+# ------------------------
+def validate(tickers=None, repairs=None, processed_dir: str = PROCESSED_DIR, report_path: str = REPORT_PATH,
+             rules: dict = QUARANTINE, save: bool = True, reference=()) -> pd.DataFrame:
+    """
+    Check `tickers` (default: every processed file) as one aligned panel, apply
+    `repairs` (names from REPAIRS, default QUALITY_REPAIRS) and rewrite the
+    repaired processed files, then quarantine the series that still break the
+    `rules`. The report holds the issues as found, the bars repaired and each
+    ticker's status (ok / repaired / quarantined); it is merged into
+    `report_path` and returned.
+    `reference` tickers are only read to take the trading calendar from a wider
+    panel (a small batch cannot tell its own gaps); they are not checked.
+    """
+    t0 = time.perf_counter()
+    repairs = parse_repairs(repairs) if repairs is None or isinstance(repairs, str) else tuple(repairs)
+    if tickers is None:
+        if not os.path.isdir(processed_dir):
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        tickers = sorted(f[:-len(".parquet")] for f in os.listdir(processed_dir) if f.endswith(".parquet"))
+    tickers = list(tickers)
+    reference = [t for t in reference if t not in set(tickers)]
+    panel = load_panel(tickers + reference, processed_dir)
+    calendar = None
+    if panel and reference:
+        calendar = trading_calendar(panel)
+        panel = {f: p.drop(columns=reference, errors="ignore") for f, p in panel.items()}
+    if not panel or panel["Close"].empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    index, columns = panel["Close"].index, panel["Close"].columns
+    load_s = time.perf_counter() - t0
+
+    found = check(panel, calendar)
+    report = summarize(found, index, columns)
+    report["repaired_rows"] = 0
+    final = report
+    if repairs:
+        repaired, drop, changed = repair(panel, found, repairs)
+        report["repaired_rows"] = changed
+        touched = list(columns[changed > 0])
+        if touched:
+            write_repaired(touched, repaired, pd.DataFrame(drop, index=index, columns=columns), processed_dir)
+            final = summarize(check(repaired, calendar), index, columns)
+
+    report["reasons"] = quarantine_reasons(final, rules)
+    report["status"] = np.where(report["reasons"] != "", "quarantined",
+                                np.where(report["repaired_rows"] > 0, "repaired", "ok"))
+    report["checked_at"] = pd.Timestamp.now(tz="UTC")
+    report = report[REPORT_COLUMNS]
+
+    if save:
+        save_report(report, report_path)
+
+    counts = report["status"].value_counts()
+    print(f"🩺 Quality check: {len(report)} tickers × {len(index)} dates ({load_s:.2f}s to load), "
+          f"{counts.get('repaired', 0)} repaired, {counts.get('quarantined', 0)} quarantined "
+          f"in {time.perf_counter() - t0:.2f}s")
+    return report
+
+
+@contextlib.contextmanager
+def _report_lock(path: str):
+    """Exclusive lock next to the report: sharded workers validate their own tickers concurrently."""
+    try:
+        import fcntl
+    except ImportError:   # no flock (Windows): single-writer only
+        yield
+        return
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def save_report(report: pd.DataFrame, path: str = REPORT_PATH):
+    """Merge `report` into the report file (rows of other tickers are kept), under the report lock."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _report_lock(path):
+        previous = read_report(path)
+        if not previous.empty:
+            report = pd.concat([previous.drop(report.index, errors="ignore"), report]).sort_index()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        report.to_parquet(tmp)
+        os.replace(tmp, path)
+
+
+def read_report(path: str = REPORT_PATH) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.read_parquet(path)
+
+
+_quarantine_cache = {"key": None, "tickers": frozenset()}
+
+
+def quarantined(path: str = REPORT_PATH) -> frozenset:
+    """Tickers the last quality check quarantined (re-read only when the report changes)."""
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        return frozenset()
+    if _quarantine_cache["key"] != key:
+        status = pd.read_parquet(path, columns=["status"])["status"]
+        _quarantine_cache.update(key=key, tickers=frozenset(status.index[status == "quarantined"]))
+    return _quarantine_cache["tickers"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate and repair the processed universe; quarantine bad series")
+    parser.add_argument("--tickers", default=None, help="comma-separated tickers (default: all processed)")
+    parser.add_argument("--repairs", default=None,
+                        help=f"comma-separated repairs from {','.join(REPAIRS)}, or none (default: $QUALITY_REPAIRS or all)")
+    parser.add_argument("--show", type=int, default=20, help="print the N worst tickers of the report")
+    args = parser.parse_args()
+
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers else None
+    report = validate(tickers, args.repairs)
+    flagged = report[report["status"] != "ok"]
+    if args.show and not flagged.empty:
+        worst = flagged.sort_values(["status", "repaired_rows"], ascending=[False, False])
+        print(worst.drop(columns=["checked_at"]).head(args.show).to_string())
@@ -0,0 +1,261 @@
+# Embedded SQL (DuckDB) over the processed, forecast, fundamentals and alert datasets
+
+import os
+import sys
+import glob
+import argparse
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.snapshots import SNAPSHOT_DIR
+
+# ------------------------
+# Config
+# ------------------------
+QUERY_THREADS = int(os.environ.get("QUERY_THREADS", "0")) or os.cpu_count() or 1
+MAX_ROWS = 10000               # rows returned by query(..., limit=True) / the dashboard tab
+
+# view name → (path under the data root, reader)
+DATASETS = {
+    "prices": ("processed/*.parquet", "parquet"),
+    "forecasts": ("forecasts/*_forecast.csv", "csv"),
+    "fundamentals": ("fundamentals/fundamentals.parquet", "parquet"),
+    "alerts": ("alerts/alerts.parquet", "parquet"),
+    "sectors": ("sectors/ticker_summary.parquet", "parquet"),
+}
+
+EXAMPLE_QUERIES = {
+    "Average ATR over the last month": """
+SELECT ticker, round(avg(Volatility_ATR), 3) AS avg_atr
+FROM prices
+WHERE date >= (SELECT max(date) FROM prices) - INTERVAL 1 MONTH
+GROUP BY ticker
+ORDER BY avg_atr DESC
+LIMIT 20""",
+    "Forecast upper band below the last close": """
+WITH last AS (SELECT ticker, arg_max(Close, date) AS last_close FROM prices GROUP BY ticker),
+     fc AS (SELECT ticker, max(yhat_upper) AS max_upper FROM forecasts GROUP BY ticker)
+SELECT ticker, round(last_close, 2) AS last_close, round(max_upper, 2) AS max_upper
+FROM last JOIN fc USING (ticker)
+WHERE max_upper < last_close
+ORDER BY max_upper / last_close""",
+    "Overbought large caps": """
+SELECT p.ticker, f.Company, round(p.RSI_14, 1) AS rsi, round(f.Market_Cap / 1e9, 1) AS market_cap_bn
+FROM (SELECT ticker, arg_max(RSI_14, date) AS RSI_14 FROM prices GROUP BY ticker) p
+JOIN fundamentals f ON f.Ticker = p.ticker
+WHERE p.RSI_14 > 70
+ORDER BY f.Market_Cap DESC""",
+    "Catalog": "SELECT * FROM catalog ORDER BY dataset, ticker",
+}
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("The SQL layer needs duckdb: pip install duckdb") from e
+    return duckdb
+
+
+def data_root(store=None) -> str:
+    """Folder (or s3:// prefix) holding the current datasets, resolved through CURRENT."""
+    if store is None:
+        from pipeline.storage import get_storage
+        store = get_storage()
+    snapshot = store.current_snapshot()
+    if hasattr(store, "bucket"):
+        base = f"s3://{store.bucket}"
+    else:
+        base = store.root
+    return f"{base}/{SNAPSHOT_DIR}/{snapshot}" if snapshot else base
+
+
+def _has_files(pattern: str) -> bool:
+    return pattern.startswith("s3://") or bool(glob.glob(pattern))
+
+
+def _view_sql(name: str, pattern: str, reader: str) -> str:
+    ticker = r"regexp_extract(filename, '([^/\\]+?)(_forecast)?\.(parquet|csv)$', 1)"
+    if reader == "csv":
+        source = f"read_csv('{pattern}', filename = true, union_by_name = true)"
+    else:
+        source = f"read_parquet('{pattern}', filename = true)"
+    if name in ("prices", "forecasts"):
+        return f"CREATE OR REPLACE VIEW {name} AS SELECT {ticker} AS ticker, * EXCLUDE (filename) FROM {source}"
+    return f"CREATE OR REPLACE VIEW {name} AS SELECT * EXCLUDE (filename) FROM {source}"
+
+
+# ------------------------
+# Catalog
+# ------------------------
+def _build_catalog(con, root: str):
+    """
+    Per-ticker row counts and date ranges for prices (from Parquet footers, no data
+    scan) and forecasts, joined with local file sizes and modification times.
+    """
+    parts = []
+    processed = f"{root}/{DATASETS['prices'][0]}"
+    if _has_files(processed):
+        parts.append(f"""
+            SELECT 'prices' AS dataset,
+                   regexp_extract(file_name, '([^/\\\\]+)\\.parquet$', 1) AS ticker,
+                   file_name AS path,
+                   sum(row_group_num_rows)::BIGINT AS rows,
+                   min(TRY_CAST(stats_min AS TIMESTAMP)) AS first_date,
+                   max(TRY_CAST(stats_max AS TIMESTAMP)) AS last_date,
+                   count(*)::BIGINT AS row_groups
+            FROM parquet_metadata('{processed}')
+            WHERE path_in_schema IN ('date', 'Date')
+            GROUP BY file_name""")
+    forecasts = f"{root}/{DATASETS['forecasts'][0]}"
+    if _has_files(forecasts):
+        parts.append("""
+            SELECT 'forecasts' AS dataset, ticker, NULL AS path, count(*)::BIGINT AS rows,
+                   min(ds)::TIMESTAMP AS first_date, max(ds)::TIMESTAMP AS last_date, NULL::BIGINT AS row_groups
+            FROM forecasts GROUP BY ticker""")
+    if not parts:
+        con.execute("CREATE OR REPLACE TABLE catalog (dataset VARCHAR, ticker VARCHAR, rows BIGINT, "
+                    "first_date TIMESTAMP, last_date TIMESTAMP, row_groups BIGINT, "
+                    "size_bytes BIGINT, modified TIMESTAMP)")
+        return
+
+    files = pd.DataFrame(columns=["dataset", "ticker", "size_bytes", "modified"])
+    if not root.startswith("s3://"):
+        rows = []
+        for dataset, suffix in (("prices", ".parquet"), ("forecasts", "_forecast.csv")):
+            folder = os.path.dirname(f"{root}/{DATASETS[dataset][0]}")
+            if not os.path.isdir(folder):
+                continue
+            for entry in os.scandir(folder):
+                if entry.name.endswith(suffix):
+                    st = entry.stat()
+                    rows.append((dataset, entry.name[:-len(suffix)], st.st_size, pd.Timestamp(st.st_mtime, unit="s")))
+        files = pd.DataFrame(rows, columns=files.columns)
+    con.register("_catalog_files", files)
+    con.execute(f"""
+        CREATE OR REPLACE TABLE catalog AS
+        SELECT m.dataset, m.ticker, m.rows, m.first_date, m.last_date, m.row_groups,
+               f.size_bytes::BIGINT AS size_bytes, f.modified::TIMESTAMP AS modified
+        FROM ({' UNION ALL '.join(parts)}) m
+        LEFT JOIN _catalog_files f USING (dataset, ticker)
+        ORDER BY m.dataset, m.ticker""")
+    con.unregister("_catalog_files")
+
+
+# ------------------------
+# API
+# ------------------------
+def connect(root: str | None = None, threads: int = QUERY_THREADS, sandbox: bool = False, catalog: bool = True):
+    """
+    In-memory DuckDB connection with one view per dataset (prices, forecasts,
+    fundamentals, alerts, sectors) over the current data root, plus a `catalog` table.
+    Views scan the files directly: DuckDB parallelises across files and row
+    groups and pushes column selection and filters into the Parquet reader.
+    With `sandbox=True` the connection can only read under `root` and its
+    configuration is locked (for SQL typed into the dashboard). The sandbox
+    does not stop DDL: shared connections must only run SQL that passed
+    check_read_only.
+    """
+    duckdb = _duckdb()
+    root = (root or data_root()).rstrip("/")
+    con = duckdb.connect(database=":memory:")
+    con.execute(f"SET threads = {int(threads)}")
+    if root.startswith("s3://"):
+        con.execute("INSTALL httpfs; LOAD httpfs")
+        # Loaded up front: with external access disabled below, extensions can no longer be autoloaded
+        con.execute("INSTALL aws; LOAD aws")
+        con.execute(f"SET s3_region = '{os.environ.get('AWS_DEFAULT_REGION', 'eu-west-2')}'")
+        con.execute("CREATE OR REPLACE SECRET s3_chain (TYPE S3, PROVIDER CREDENTIAL_CHAIN)")
+
+    for name, (pattern, reader) in DATASETS.items():
+        path = f"{root}/{pattern}"
+        if _has_files(path):
+            con.execute(_view_sql(name, path, reader))
+    if catalog:
+        _build_catalog(con, root)
+
+    if sandbox:
+        allowed = root if root.startswith("s3://") else os.path.abspath(root)
+        con.execute(f"SET allowed_directories = ['{allowed}/']")
+        con.execute("SET enable_external_access = false")
+        con.execute("SET lock_configuration = true")
+        _check_sandbox(con)
+    return con
+
+
+def _check_sandbox(con):
+    """Read one row of each view under the locked configuration, so a sandbox that blocks its own data root fails here."""
+    for name in views(con):
+        if name in DATASETS:
+            try:
+                con.execute(f"SELECT * FROM {name} LIMIT 1").fetchall()
+            except Exception as e:
+                raise RuntimeError(f"The SQL sandbox cannot read the {name!r} view: {e}") from e
+
+
+def check_read_only(sql: str) -> str:
+    """The single SELECT (or WITH … SELECT) statement in `sql`; anything else raises ValueError."""
+    duckdb = _duckdb()
+    statements = duckdb.extract_statements(sql)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Only a single SELECT (or WITH … SELECT) query is allowed")
+    return statements[0].query
+
+
+def views(con) -> list[str]:
+    return [r[0] for r in con.execute(
+        "SELECT table_name FROM information_schema.tables ORDER BY table_name").fetchall()]
+
+
+def query(sql: str, con=None, limit: int | None = None, read_only: bool = False) -> pd.DataFrame:
+    """Run `sql` and return a DataFrame (at most `limit` rows when given; with `read_only`, SELECT only)."""
+    if read_only:
+        sql = check_read_only(sql)
+    con = con or connect()
+    rel = con.sql(sql)
+    if rel is None:   # DDL / SET statements return nothing
+        return pd.DataFrame()
+    return (rel.limit(limit) if limit else rel).df()
+
+
+def catalog(con=None) -> pd.DataFrame:
+    return query("SELECT * FROM catalog ORDER BY dataset, ticker", con)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the pipeline datasets with SQL (DuckDB)")
+    parser.add_argument("sql", nargs="?", help="SQL to run (views: prices, forecasts, fundamentals, alerts, sectors, catalog)")
+    parser.add_argument("-f", "--file", help="read SQL from a file")
+    parser.add_argument("--root", default=None, help="data root (default: current snapshot of DATA_BACKEND)")
+    parser.add_argument("--catalog", action="store_true", help="print the per-ticker catalog")
+    parser.add_argument("--example", choices=list(EXAMPLE_QUERIES), help="run a bundled example query")
+    parser.add_argument("--explain", action="store_true", help="print the query plan instead of results")
+    parser.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    sql = args.sql
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            sql = f.read()
+    elif args.example:
+        sql = EXAMPLE_QUERIES[args.example]
+    elif args.catalog:
+        sql = EXAMPLE_QUERIES["Catalog"]
+    if not sql:
+        parser.error("give SQL, --file, --example or --catalog")
+
+    con = connect(args.root)
+    print(f"🦆 Views: {', '.join(views(con))}", file=sys.stderr)
+    if args.explain:
+        print(con.sql(f"EXPLAIN {sql}").fetchall()[0][1])
+        sys.exit(0)
+    result = query(sql, con, args.limit)
+    if args.format == "csv":
+        print(result.to_csv(index=False), end="")
+    elif args.format == "json":
+        print(result.to_json(orient="records", date_format="iso"))
+    else:
+        print(result.to_string(index=False))
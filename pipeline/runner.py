@@ -0,0 +1,507 @@
+# Streaming per-ticker pipeline runner (extract → transform → forecast)
+
+import os
+import sys
+import time
+import queue
+import argparse
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import metrics
+
+# ------------------------
+# Config
+# ------------------------
+STAGES = ["extract", "transform", "forecast"]
+DAILY = "1d"
+INTERVALS = [DAILY, "1h", "5m"]   # intraday intervals use the chunked store in pipeline/intraday.py
+CPU_COUNT = os.cpu_count() or 2
+
+# Workers per stage: extraction is I/O-bound (threads, kept low to respect
+# Yahoo rate limits), transform and forecast are CPU-bound (processes).
+DEFAULT_WORKERS = {
+    "extract": 4,
+    "transform": max(1, CPU_COUNT // 2),
+    "forecast": max(1, CPU_COUNT // 2),
+}
+QUEUE_SIZE = 32          # max tickers waiting between two stages (backpressure)
+QUALITY_BATCH = 64       # transformed tickers validated together before they go on to forecast
+QUALITY_MIN_BATCH = 4    # smaller runs validate in batches of a quarter of their tickers, down to this
+QUALITY_IDLE_S = 2.0     # a smaller batch is validated once transform output pauses this long
+
+_STOP = object()
+
+
+# ------------------------
+# Stage Tasks (top-level so they can run in worker processes)
+# ------------------------
+def _run_task(stage, ticker, opts):
+    # Pooled workers may outlive a run: record under the run that submitted the task
+    metrics.start_run(opts["run_id"])
+    return STAGE_TASKS[stage](ticker, opts)
+
+
+def _extract_task(ticker, opts):
+    from pipeline.extract import YEARS, extract_ticker
+    return extract_ticker(ticker, skip_existing=opts["skip_existing"], start=opts["start"], end=opts["end"],
+                          interval=opts["interval"], years=opts["years"] or YEARS)
+
+
+def _up_to_date(source, output):
+    """Output at least as new as its input: another universe already produced it this round."""
+    return os.path.exists(output) and os.path.getmtime(output) >= os.path.getmtime(source)
+
+
+def _transform_task(ticker, opts):
+    from pipeline.transform import RAW_DIR, PROCESSED_DIR, process_file, process_file_chunked, process_intraday
+    if opts["interval"] != DAILY:
+        return process_intraday(ticker, opts["interval"])
+    path = os.path.join(RAW_DIR, f"{ticker}_raw.csv")
+    if not os.path.exists(path):
+        return None
+    out_path = os.path.join(PROCESSED_DIR, f"{ticker}.parquet")
+    if opts["universe"] and opts["skip_existing"] and _up_to_date(path, out_path):
+        return out_path
+    if opts["long_history"]:
+        return process_file_chunked(path, **{k: opts[k] for k in ("chunk_rows", "memory_mb") if opts[k]})
+    return process_file(path)
+
+
+def _forecast_task(ticker, opts):
+    from pipeline.forecast import PROCESSED_DIR, forecast_path, save_forecast
+    out_path = forecast_path(ticker, opts["interval"])
+    if (opts["universe"] and opts["skip_existing"] and opts["interval"] == DAILY
+            and _up_to_date(os.path.join(PROCESSED_DIR, f"{ticker}.parquet"), out_path)):
+        return out_path
+    return save_forecast(ticker, days=opts["days"], interval=opts["interval"],
+                         window_days=opts["forecast_window_days"], resample=opts["forecast_resample"])
+
+
+STAGE_TASKS = {
+    "extract": _extract_task,
+    "transform": _transform_task,
+    "forecast": _forecast_task,
+}
+PROCESS_STAGES = {"transform", "forecast"}
+
+
+def discover_tickers(first_stage, interval=DAILY, universe=None):
+    """Tickers available as input to `first_stage` when none are given explicitly."""
+    if universe:
+        from pipeline import universes
+        return universes.tickers(universe)
+    if first_stage == "extract":
+        from pipeline.config_sp500 import SP500_TICKERS
+        return list(SP500_TICKERS)
+    if interval != DAILY:
+        from pipeline import intraday
+        root = intraday.RAW_ROOT if first_stage == "transform" else intraday.PROCESSED_ROOT
+        return intraday.list_tickers(root, interval)
+    if first_stage == "transform":
+        from pipeline.transform import RAW_DIR
+        folder, suffix = RAW_DIR, "_raw.csv"
+    else:
+        from pipeline.forecast import PROCESSED_DIR
+        folder, suffix = PROCESSED_DIR, ".parquet"
+    if not os.path.isdir(folder):
+        return []
+    return sorted(f[:-len(suffix)] for f in os.listdir(folder) if f.endswith(suffix))
+
+
+# ------------------------
+# Runner
+# ------------------------
+def _stage_worker(stage, pool, opts, in_q, out_q, results, lock):
+    """Pull tickers from in_q, run the stage, pass successes to out_q (blocking when full)."""
+    while True:
+        ticker = in_q.get()
+        if ticker is _STOP:
+            in_q.put(_STOP)   # let sibling workers see it too
+            return
+
+        t0 = time.perf_counter()
+        try:
+            output = pool.submit(_run_task, stage, ticker, opts).result()
+            status, error = ("ok" if output else "skipped"), None
+        except Exception as e:
+            output, status, error = None, "failed", f"{type(e).__name__}: {e}"
+            print(f"❌ [{stage}] {ticker}: {error}")
+
+        with lock:
+            results.append({
+                "ticker": ticker, "stage": stage, "status": status,
+                "seconds": round(time.perf_counter() - t0, 3), "error": error,
+            })
+        # Failure isolation: only successful tickers flow downstream
+        if status == "ok" and out_q is not None:
+            out_q.put(ticker)
+
+
+def run_pipeline(tickers=None, stages=STAGES, workers=None, queue_size=QUEUE_SIZE,
+                 start=None, end=None, days=7, skip_existing=True, scan_alerts=True, build_sectors=True,
+                 interval=DAILY, universe=None, forecast_deadline=None, forecast_weights=None,
+                 years=None, long_history=False, chunk_rows=None, memory_mb=None, forecast_window_days=None,
+                 forecast_resample=None, validate=True, repairs=None, run_id=None):
+    """
+    Stream each ticker through the selected stages. Every stage has its own
+    worker pool and a bounded input queue, so extraction, transformation and
+    forecasting of different tickers overlap. When transform runs, the alert
+    scanner then checks the freshly processed tickers and the sector indices are
+    rebuilt. With a `universe`, its members are the default tickers, symbols
+    another universe already brought up to date are not processed again, and the
+    alerts and sector indices go to the universe's own root. Intraday intervals (`interval="1h"`/`"5m"`) update the chunked
+    intraday store instead and skip the daily-only alert and sector stages.
+    With a `forecast_deadline` (seconds from the start of the run), forecasts
+    are not streamed: once the other stages finish, the scheduler fits the most
+    important tickers in the time left (pipeline/scheduler.py).
+    `long_history` is for multi-decade backfills (`years` or `start`): transform
+    works out of core in `chunk_rows` chunks under a per-worker RSS cap
+    (`memory_mb`), and forecasts train on a trailing window (`forecast_window_days`,
+    by default LONG_HISTORY_WINDOW_DAYS) and/or a downsampled series.
+    With `validate` (daily runs that transform), the data-quality check
+    (pipeline/quality.py) runs over the transformed tickers before anything
+    reads them and `repairs` are applied. When forecasts follow, it sits between
+    the two stages: transformed tickers are validated in batches (QUALITY_BATCH,
+    smaller for small runs) and the healthy ones flow on to forecast (quarantined
+    ones are skipped), so forecasting starts before the whole universe is transformed.
+    Metrics are recorded under a new run id, or under `run_id` when given (a
+    sharded run shares one).
+    Returns per-ticker, per-stage results.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval {interval!r} (choose from {INTERVALS})")
+    stages = [s for s in STAGES if s in stages]
+    if not stages:
+        raise ValueError(f"No valid stages selected (choose from {STAGES})")
+    run_start = time.perf_counter()
+    run_id = metrics.start_run(run_id)
+    scheduled = forecast_deadline is not None and "forecast" in stages
+    if scheduled:
+        if interval != DAILY:
+            raise ValueError("The forecast deadline schedules daily forecasts only")
+        stages = [s for s in stages if s != "forecast"]
+    validating = validate and interval == DAILY and "transform" in stages
+    gated = validating and "forecast" in stages   # forecasts take validated batches as they pass
+    if long_history and forecast_window_days is None:
+        from pipeline.forecast import LONG_HISTORY_WINDOW_DAYS
+        forecast_window_days = LONG_HISTORY_WINDOW_DAYS
+    workers = {**DEFAULT_WORKERS, **(workers or {})}
+    tickers = list(tickers) if tickers else discover_tickers(stages[0] if stages else "forecast", interval, universe)
+    if not stages:
+        return run_scheduled_forecasts(tickers, forecast_deadline, forecast_weights, workers["forecast"], days,
+                                       forecast_window_days, forecast_resample)
+    opts = {"start": start, "end": end, "days": days, "skip_existing": skip_existing, "interval": interval,
+            "universe": universe, "years": years, "long_history": long_history, "chunk_rows": chunk_rows,
+            "memory_mb": memory_mb, "forecast_window_days": forecast_window_days,
+            "forecast_resample": forecast_resample, "run_id": run_id}
+
+    scope = f"{universe}, {interval}" if universe else interval
+    print(f"🚀 Run {run_id}: streaming {len(tickers)} tickers ({scope}) through {' → '.join(stages)} "
+          f"(workers: {', '.join(f'{s}={workers[s]}' for s in stages)})")
+    quarantined = set()
+    gate = None
+    if gated:
+        gate = functools.partial(_quality_gate, repairs=repairs, quarantined=quarantined,
+                                 batch_size=quality_batch_size(len(tickers)), reference=calendar_reference(tickers))
+    results, elapsed = _stream(tickers, stages, workers, opts, queue_size, gate)
+
+    transformed = [r["ticker"] for r in results if r["stage"] == "transform" and r["status"] == "ok"]
+    if validating and not gated:
+        quarantined = run_validation(transformed, repairs)
+    if gated:
+        results += [{"ticker": t, "stage": "forecast", "status": "skipped", "seconds": 0.0, "error": "quarantined"}
+                    for t in transformed if t in quarantined]
+    print_summary(results, stages, elapsed)
+
+    if interval == DAILY:
+        run_universe_steps(transformed, universe, scan_alerts, build_sectors)
+    if scheduled:
+        remaining = forecast_deadline - (time.perf_counter() - run_start)
+        results += run_scheduled_forecasts(tickers, remaining, forecast_weights, workers["forecast"], days,
+                                           forecast_window_days, forecast_resample)
+    return results
+
+
+def _stream(tickers, stages, workers, opts, queue_size=QUEUE_SIZE, gate=None):
+    """
+    Run `tickers` through `stages`, one pool and bounded queue per stage. A
+    `gate(in_q, out_q)` runs on its own thread between transform and the next
+    stage and decides which transformed tickers go on. Returns (results, seconds).
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results, lock = [], threading.Lock()
+    pools, stage_threads = [], []
+    spawn = multiprocessing.get_context("spawn")
+    gate_at = stages.index("transform") if gate and "transform" in stages[:-1] else None
+    gate_q = queue.Queue(maxsize=queue_size) if gate_at is not None else None
+
+    for i, stage in enumerate(stages):
+        n = workers[stage]
+        if stage in PROCESS_STAGES:
+            pool = ProcessPoolExecutor(max_workers=n, mp_context=spawn)
+        else:
+            pool = ThreadPoolExecutor(max_workers=n)
+        pools.append(pool)
+        out_q = queues[i + 1] if i + 1 < len(stages) else None
+        if i == gate_at:
+            out_q = gate_q
+        threads = [
+            threading.Thread(target=_stage_worker, args=(stage, pool, opts, queues[i], out_q, results, lock),
+                             name=f"{stage}-{j}", daemon=True)
+            for j in range(n)
+        ]
+        for t in threads:
+            t.start()
+        stage_threads.append(threads)
+    gate_thread = None
+    if gate_at is not None:
+        gate_thread = threading.Thread(target=gate, args=(gate_q, queues[gate_at + 1]), name="quality-gate", daemon=True)
+        gate_thread.start()
+
+    t0 = time.perf_counter()
+    try:
+        for ticker in tickers:
+            queues[0].put(ticker)
+        queues[0].put(_STOP)
+
+        # Close stages in order: once a stage's workers finish, stop the next one
+        for i, threads in enumerate(stage_threads):
+            for t in threads:
+                t.join()
+            if i == gate_at:
+                gate_q.put(_STOP)
+                gate_thread.join()
+            if i + 1 < len(stages):
+                queues[i + 1].put(_STOP)
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return results, time.perf_counter() - t0
+
+
+def quality_batch_size(n_tickers: int) -> int:
+    """Gate batch size for a run of `n_tickers`: at least four batches, so forecasts overlap transform."""
+    return min(QUALITY_BATCH, max(QUALITY_MIN_BATCH, n_tickers // 4))
+
+
+def calendar_reference(tickers, limit=QUALITY_BATCH, processed_dir=None) -> list:
+    """Processed tickers outside this run (from earlier runs): they widen the first batches' trading calendar."""
+    from pipeline import quality
+    processed_dir = processed_dir or quality.PROCESSED_DIR
+    if not os.path.isdir(processed_dir):
+        return []
+    running = set(tickers)
+    others = sorted(f[:-len(".parquet")] for f in os.listdir(processed_dir) if f.endswith(".parquet"))
+    return [t for t in others if t not in running][-limit:]
+
+
+def _quality_gate(in_q, out_q, repairs=None, quarantined=None, batch_size=QUALITY_BATCH, idle_s=QUALITY_IDLE_S,
+                  reference=()):
+    """
+    Between transform and forecast: validate transformed tickers in batches and
+    pass the healthy ones on, adding the quarantined ones to `quarantined`. A
+    batch is checked when it is full, when transform output pauses and the
+    batch plus the reference (the tickers already passed, else `reference`
+    from earlier runs) make a full panel for the trading calendar, and at the end.
+    """
+    batch, passed, done = [], list(reference), False
+    while not done:
+        try:
+            ticker = in_q.get(timeout=idle_s)
+        except queue.Empty:
+            ticker = None
+        if ticker is _STOP:
+            done = True
+        elif ticker is not None:
+            batch.append(ticker)
+        reference = passed[-batch_size:]
+        ready = len(batch) >= batch_size or (ticker is None and len(batch) + len(reference) >= batch_size)
+        if batch and (ready or done):
+            bad = run_validation(batch, repairs, reference)
+            if quarantined is not None:
+                quarantined |= bad
+            healthy = [t for t in batch if t not in bad]
+            passed += healthy
+            batch = []
+            for t in healthy:
+                out_q.put(t)
+
+
+def run_validation(transformed, repairs=None, reference=()) -> set:
+    """
+    Data-quality check of the transformed tickers (pipeline/quality.py): repairs
+    their processed files and returns the quarantined ones. `reference` tickers
+    only widen the trading calendar. A check that fails keeps the quarantine of
+    the last report.
+    """
+    if not transformed:
+        return set()
+    from pipeline import quality
+    try:
+        with metrics.track("quality", "_universe") as m:
+            report = quality.validate(transformed, repairs, reference=reference)
+            m.rows = len(report)
+    except Exception as e:
+        print(f"❌ [quality] check failed: {type(e).__name__}: {e}")
+        return set(transformed) & quality.quarantined()
+    return set(report.index[report["status"] == "quarantined"])
+
+
+def run_scheduled_forecasts(tickers, deadline_s, weights=None, workers=DEFAULT_WORKERS["forecast"], days=7,
+                            window_days=None, resample=None):
+    """Deadline-scheduled forecast stage, as runner results (deferred and stopped tickers count as skipped)."""
+    from pipeline import scheduler
+    if deadline_s <= 0:
+        print("⏰ No time left for forecasts: keeping the previous ones")
+    report = scheduler.run_scheduled(tickers, max(deadline_s, 0.0), weights, workers, days,
+                                     window_days=window_days, resample=resample)
+    status = {"refreshed": "ok", "failed": "failed"}
+    return [{"ticker": t, "stage": "forecast", "status": status.get(r["outcome"], "skipped"),
+             "seconds": r["seconds"] or 0.0, "error": None} for t, r in report["by_ticker"].items()]
+
+
+def run_universe_steps(transformed, universe=None, scan_alerts=True, build_sectors=True):
+    """
+    Universe-wide steps after transform: scan the transformed tickers for alerts and
+    rebuild the sector indices (over the universe's members when one is given,
+    written under its root). Advisory: failures are reported, never raised.
+    """
+    if not transformed:
+        return
+    if scan_alerts:
+        from pipeline import alerts
+        paths = {}
+        if universe:
+            from pipeline import universes
+            paths = {"feed_path": universes.dataset_path(universe, "alerts", os.path.basename(alerts.FEED_PATH)),
+                     "state_path": universes.dataset_path(universe, "state", os.path.basename(alerts.STATE_PATH))}
+        try:
+            with metrics.track("alerts", "_universe") as m:
+                m.rows = len(alerts.scan(transformed, **paths))
+        except Exception as e:   # alerts are advisory: never fail the run over them
+            print(f"❌ [alerts] scan failed: {type(e).__name__}: {e}")
+    if build_sectors:
+        from pipeline import sectors
+        kwargs = {}
+        if universe:
+            from pipeline import universes
+            kwargs = {"tickers": universes.tickers(universe), "out_dir": universes.dataset_path(universe, "sectors")}
+        try:
+            with metrics.track("sectors", "_universe") as m:
+                m.rows = len(sectors.build(**kwargs).get(sectors.TICKER_SUMMARY_FILE, ()))
+        except Exception as e:   # derived dataset: never fail the run over it
+            print(f"❌ [sectors] build failed: {type(e).__name__}: {e}")
+
+
+def print_summary(results, stages, elapsed):
+    print(f"\n📊 Pipeline finished in {elapsed:.1f}s")
+    for stage in stages:
+        rows = [r for r in results if r["stage"] == stage]
+        counts = {s: sum(r["status"] == s for r in rows) for s in ("ok", "skipped", "failed")}
+        busy = sum(r["seconds"] for r in rows)
+        print(f"   {stage:<10} ✅ {counts['ok']:>4}  ⏭️ {counts['skipped']:>4}  ❌ {counts['failed']:>4}  "
+              f"busy {busy:.1f}s")
+    failed = [r for r in results if r["status"] == "failed"]
+    if failed:
+        print(f"⚠️ {len(failed)} failures: " + ", ".join(f"{r['ticker']}[{r['stage']}]" for r in failed[:20])
+              + (" ..." if len(failed) > 20 else ""))
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Run the S&P 500 pipeline as a per-ticker stream")
+    parser.add_argument("--stages", default="transform,forecast",
+                        help=f"comma-separated subset of {','.join(STAGES)} (default: transform,forecast)")
+    parser.add_argument("--tickers", default=None,
+                        help="comma-separated tickers (default: everything available to the first stage)")
+    parser.add_argument("--start", default=None, help="extraction start date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="extraction end date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=7, help="forecast horizon in days (sessions for intraday)")
+    parser.add_argument("--universe", default=None,
+                        help="universe file under universes/ (e.g. sp500, ftse100); outputs go to data/universes/<name>")
+    parser.add_argument("--interval", choices=INTERVALS, default=DAILY,
+                        help="bar size; 1h/5m use the chunked intraday store (default: 1d)")
+    parser.add_argument("--deadline", default=None,
+                        help="wall-clock budget for the run, e.g. 45m or 2h: forecasts are scheduled by priority "
+                             "in the time left (daily only)")
+    parser.add_argument("--forecast-weights", default=None,
+                        help="scheduler priority weights, e.g. views=0.5,market_cap=0.3,staleness=0.2")
+    parser.add_argument("--years", type=int, default=None,
+                        help="years of daily history to extract when --start is not given (default: 2)")
+    parser.add_argument("--long-history", action="store_true",
+                        help="multi-decade histories: out-of-core transform under a per-worker RSS cap, "
+                             "forecasts on a trailing window")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="bars per transform chunk with --long-history (default: 2520, ~10 years)")
+    parser.add_argument("--worker-memory-mb", type=float, default=None,
+                        help="RSS cap per transform worker with --long-history (default: PIPELINE_WORKER_MEMORY_MB or 512)")
+    parser.add_argument("--forecast-window", type=int, default=None,
+                        help="train forecasts on the last N days of history (default with --long-history: 5 years)")
+    parser.add_argument("--forecast-resample", default=None, help="downsample forecast training data, e.g. W or M")
+    parser.add_argument("--refresh", action="store_true", help="re-download tickers that already have raw data")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--no-alerts", action="store_true", help="skip the alert scan after transform")
+    parser.add_argument("--no-sectors", action="store_true", help="skip rebuilding the sector indices after transform")
+    parser.add_argument("--no-validate", action="store_true",
+                        help="skip the data-quality check between transform and forecast (checked in batches of "
+                             f"up to {QUALITY_BATCH}; healthy tickers go on to forecast as each batch passes)")
+    parser.add_argument("--repairs", default=None,
+                        help="data-quality repairs, comma-separated from splits,ohlc,spikes,zero_volume, or none "
+                             "(default: $QUALITY_REPAIRS or all)")
+    for stage in STAGES:
+        parser.add_argument(f"--{stage}-workers", type=int, default=DEFAULT_WORKERS[stage])
+    parser.add_argument("--profile", choices=["cprofile", "sample"], default=None,
+                        help="profile every (stage, ticker) into profiles/<run_id>/ (same as PIPELINE_PROFILE)")
+    parser.add_argument("--profile-stages", default=None, help="only profile these stages (comma-separated)")
+    parser.add_argument("--profile-tickers", default=None, help="only profile these tickers (comma-separated)")
+    return parser
+
+
+def run_from_args(args):
+    # Exported so spawned worker processes inherit the profiling settings
+    for flag, env in (("profile", "PIPELINE_PROFILE"), ("profile_stages", "PIPELINE_PROFILE_STAGES"),
+                      ("profile_tickers", "PIPELINE_PROFILE_TICKERS")):
+        if getattr(args, flag):
+            os.environ[env] = getattr(args, flag)
+    return run_pipeline(
+        tickers=[t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers else None,
+        stages=[s.strip() for s in args.stages.split(",")],
+        workers={s: getattr(args, f"{s}_workers") for s in STAGES},
+        queue_size=args.queue_size,
+        start=args.start,
+        end=args.end,
+        days=args.days,
+        skip_existing=not args.refresh,
+        scan_alerts=not args.no_alerts,
+        build_sectors=not args.no_sectors,
+        interval=args.interval,
+        universe=args.universe,
+        forecast_deadline=_deadline(args.deadline),
+        forecast_weights=_weights(args.forecast_weights),
+        years=args.years,
+        long_history=args.long_history,
+        chunk_rows=args.chunk_rows,
+        memory_mb=args.worker_memory_mb,
+        forecast_window_days=args.forecast_window,
+        forecast_resample=args.forecast_resample,
+        validate=not args.no_validate,
+        repairs=args.repairs,
+    )
+
+
+def _deadline(text):
+    from pipeline.scheduler import parse_duration
+    return parse_duration(text) if text else None
+
+
+def _weights(text):
+    from pipeline.scheduler import parse_weights
+    return parse_weights(text) if text else None
+
+
+if __name__ == "__main__":
+    run_from_args(build_arg_parser().parse_args())
@@ -0,0 +1,430 @@
+# Deadline-aware forecast scheduler: cost estimates, weighted priorities, stale marking, coverage report
+
+import io
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import metrics, quality
+
+# ------------------------
+# Config
+# ------------------------
+PROCESSED_DIR = "data/processed"
+FORECAST_DIR = "data/forecasts"
+STATUS_PATH = os.path.join(FORECAST_DIR, "forecast_status.parquet")   # published with the forecasts
+FUNDAMENTALS_PATH = "data/fundamentals/fundamentals.parquet"
+VIEWS_PATH = os.environ.get("DASHBOARD_VIEWS_PATH", "logs/views.jsonl")   # appended by the dashboard
+VIEWS_PREFIX = "views"                  # published view logs, <prefix>/<host>.jsonl next to the snapshots
+VIEWS_BACKEND = os.environ.get("DASHBOARD_VIEWS_BACKEND", "")   # "s3": read the logs the dashboard hosts publish
+VIEWS_PUBLISH_SECS = 300                # a dashboard on S3 uploads its view log at most this often
+SCHEDULE_DIR = "logs/schedule"          # one coverage report per run
+
+# Priority = weighted sum of scores in [0, 1]; weights need not sum to 1
+DEFAULT_WEIGHTS = {"views": 0.5, "market_cap": 0.3, "staleness": 0.2}
+VIEW_WINDOW_DAYS = 30                   # dashboard views counted over this window
+STALENESS_HORIZON_DAYS = 7              # a forecast this old (or missing) scores 1.0
+
+COST_HISTORY_RUNS = 20                  # past metric runs used for fit-time estimates
+DEFAULT_FIT_S = 2.0                     # Prophet fit with no history at all: fixed part ...
+DEFAULT_S_PER_ROW = 0.002               # ... plus this per training row
+COST_SAFETY = 1.25                      # only start a ticker if estimate × safety fits before the deadline
+BARS_PER_PERIOD = {"W": 5, "M": 21}      # daily bars per downsampled forecast bar (FORECAST_RESAMPLE)
+POLL_SECONDS = 0.2
+WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+
+# ------------------------
+# Inputs
+# ------------------------
+def history_rows(tickers, window_days=None, resample=None) -> pd.Series:
+    """
+    Rows each fit will see: the processed file's row count (from the Parquet
+    footer, no data read), within the forecast window and resampling the fits
+    use (`window_days` / `resample`, default FORECAST_WINDOW_DAYS / FORECAST_RESAMPLE).
+    """
+    window = window_days or int(os.environ.get("FORECAST_WINDOW_DAYS", "0"))
+    per_bar = BARS_PER_PERIOD.get(resample or os.environ.get("FORECAST_RESAMPLE") or "", 1)
+    rows = {}
+    for t in tickers:
+        path = os.path.join(PROCESSED_DIR, f"{t}.parquet")
+        n = pq.read_metadata(path).num_rows if os.path.exists(path) else 0
+        if window:
+            n = min(n, window * 252 // 365)
+        rows[t] = n // per_bar
+    return pd.Series(rows, dtype="int64").rename_axis("ticker")
+
+
+def fit_history(metrics_dir=None, runs: int = COST_HISTORY_RUNS) -> pd.DataFrame:
+    """Successful forecast fits of the last `runs` metric logs: ticker, rows, wall_s."""
+    metrics_dir = metrics_dir or metrics.METRICS_DIR
+    frames = []
+    for run_id in metrics.list_runs(metrics_dir)[-runs:]:
+        try:
+            df = metrics.load_run(run_id, metrics_dir)
+        except ValueError:
+            continue
+        if {"stage", "status", "rows", "wall_s"} <= set(df.columns):
+            frames.append(df.loc[(df["stage"] == "forecast") & (df["status"] == "ok") & (df["rows"] > 0),
+                                 ["ticker", "rows", "wall_s"]])
+    if not frames:
+        return pd.DataFrame(columns=["ticker", "rows", "wall_s"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def estimate_costs(rows: pd.Series, history: pd.DataFrame) -> pd.Series:
+    """
+    Expected fit seconds per ticker. Tickers fitted before scale their own
+    seconds-per-row to today's history length; others use a line fitted through
+    every past (rows, seconds) pair, or the defaults when there is no history.
+    """
+    if len(history) >= 2 and history["rows"].nunique() >= 2:
+        slope, intercept = np.polyfit(history["rows"], history["wall_s"], 1)
+        slope, intercept = max(slope, 0.0), max(intercept, 0.0)
+    elif len(history):
+        slope, intercept = 0.0, float(history["wall_s"].median())
+    else:
+        slope, intercept = DEFAULT_S_PER_ROW, DEFAULT_FIT_S
+    costs = intercept + slope * rows.astype(float)
+    if len(history):
+        per_row = (history["wall_s"] / history["rows"]).groupby(history["ticker"]).median()
+        known = per_row.reindex(rows.index) * rows
+        costs = known.where(known.notna() & (rows > 0), costs)
+    return costs.clip(lower=0.01)
+
+
+def _read_views(text: str) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(text), lines=True) if text.strip() else pd.DataFrame(columns=["ts", "ticker"])
+
+
+def view_counts(path: str = VIEWS_PATH, window_days: int = VIEW_WINDOW_DAYS, backend: str = VIEWS_BACKEND) -> pd.Series:
+    """
+    Dashboard views per ticker over the last `window_days`: the local view log
+    plus, with a `backend` ("s3" when the dashboard runs elsewhere), the logs the
+    dashboard hosts publish under VIEWS_PREFIX.
+    """
+    frames = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            frames.append(_read_views(f.read()))
+    if backend:
+        from pipeline.storage import get_storage
+        store = get_storage(backend)
+        frames += [_read_views(store.read_text(k) or "") for k in store.list_keys(VIEWS_PREFIX, ".jsonl")]
+    views = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["ts", "ticker"])
+    views = views[views["ts"].astype(float) >= time.time() - window_days * 86400]
+    return views.groupby("ticker").size().astype("int64")
+
+
+def record_view(ticker: str, path: str = VIEWS_PATH):
+    """Append one dashboard view (the app calls this when the selected company changes)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"ts": round(time.time(), 3), "ticker": ticker}) + "\n")
+
+
+_views_published_at = 0.0
+
+
+def publish_views(path: str = VIEWS_PATH, window_days: int = VIEW_WINDOW_DAYS, client=None, bucket: str | None = None,
+                  every: float = VIEWS_PUBLISH_SECS) -> str | None:
+    """
+    Upload this host's view log (the last `window_days`) to
+    s3://<bucket>/<VIEWS_PREFIX>/<host>.jsonl, where the pipeline host reads it
+    (DASHBOARD_VIEWS_BACKEND=s3). Skipped within `every` seconds of the last
+    upload; returns the key written.
+    """
+    global _views_published_at
+    if time.time() - _views_published_at < every or not os.path.exists(path):
+        return None
+    from pipeline import storage
+    if client is None:
+        import boto3
+        client = boto3.client("s3", region_name=storage.AWS_REGION)
+    cutoff = time.time() - window_days * 86400
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line for line in f if line.strip() and json.loads(line)["ts"] >= cutoff]
+    key = f"{VIEWS_PREFIX}/{socket.gethostname()}.jsonl"
+    _views_published_at = time.time()   # a failed upload is retried on the next window, not on every view
+    from botocore.exceptions import BotoCoreError, ClientError
+    try:
+        client.put_object(Bucket=bucket or storage.BUCKET_NAME, Key=key, Body="".join(lines).encode("utf-8"))
+    except (BotoCoreError, ClientError) as e:
+        print(f"⚠️ View log not published: {type(e).__name__}: {e}")
+        return None
+    return key
+
+
+def market_caps(path: str = FUNDAMENTALS_PATH) -> pd.Series:
+    if not os.path.exists(path):
+        return pd.Series(dtype="float64")
+    df = pd.read_parquet(path, columns=["Ticker", "Market_Cap"]).drop_duplicates("Ticker")
+    return df.set_index("Ticker")["Market_Cap"].astype(float)
+
+
+def file_times(tickers) -> pd.DataFrame:
+    """mtime of each ticker's processed file and forecast (NaN when missing)."""
+    def mtime(path):
+        return os.path.getmtime(path) if os.path.exists(path) else np.nan
+    return pd.DataFrame({
+        "data_at": [mtime(os.path.join(PROCESSED_DIR, f"{t}.parquet")) for t in tickers],
+        "forecast_at": [mtime(os.path.join(FORECAST_DIR, f"{t}_forecast.csv")) for t in tickers],
+    }, index=pd.Index(list(tickers), name="ticker"))
+
+
+def parse_weights(text: str | None) -> dict:
+    """"views=1,market_cap=0.5" → weights (unnamed factors keep their default)."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in (text or "").split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        if name.strip() not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown weight {name.strip()!r} (choose from {list(DEFAULT_WEIGHTS)})")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+# ------------------------
+# Planning
+# ------------------------
+def _scaled(values: pd.Series, index) -> pd.Series:
+    """Min-max scale to [0, 1] over `index`; missing values score 0."""
+    values = values.reindex(index).astype(float)
+    lo, hi = values.min(), values.max()
+    if not np.isfinite(hi) or hi <= lo:
+        return values.notna().astype(float)
+    return ((values - lo) / (hi - lo)).fillna(0.0)
+
+
+def plan(tickers, weights: dict | None = None, force: bool = False, metrics_dir=None, now: float | None = None,
+         window_days=None, resample=None) -> pd.DataFrame:
+    """
+    One row per ticker with a processed file that is not quarantined (pipeline/quality.py):
+    estimated cost, priority score and its components, and whether its forecast
+    is already up to date ("fresh").
+    Candidates (not fresh, or all with `force`) come first, highest priority first.
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    now = now or time.time()
+    rows = history_rows(tickers, window_days, resample)
+    rows = rows[(rows > 0) & ~rows.index.isin(quality.quarantined())]
+    df = file_times(rows.index)
+    df["rows"] = rows
+    df["est_s"] = estimate_costs(rows, fit_history(metrics_dir))
+    df["fresh"] = df["forecast_at"] >= df["data_at"]
+    if force:
+        df["fresh"] = False
+
+    age_days = (now - df["forecast_at"]) / 86400
+    df["views"] = view_counts().reindex(df.index).fillna(0).astype(int)
+    df["market_cap"] = market_caps().reindex(df.index)
+    scores = pd.DataFrame({
+        "views": np.log1p(df["views"]) / np.log1p(max(df["views"].max(), 1)),
+        "market_cap": _scaled(np.log(df["market_cap"].where(df["market_cap"] > 0)), df.index),
+        "staleness": (age_days / STALENESS_HORIZON_DAYS).clip(0, 1).fillna(1.0),   # no forecast yet → 1
+    })
+    df["priority"] = sum(scores[name] * weights.get(name, 0.0) for name in scores.columns)
+    for name in scores.columns:
+        df[f"score_{name}"] = scores[name].round(3)
+    return df.sort_values(["fresh", "priority", "est_s"], ascending=[True, False, True])
+
+
+# ------------------------
+# Execution
+# ------------------------
+def _forecast_one(ticker, days, run_id, window_days=None, resample=None):
+    from pipeline.forecast import save_forecast
+    metrics.start_run(run_id)
+    return save_forecast(ticker, days, window_days=window_days, resample=resample)
+
+
+def run_scheduled(tickers, deadline_s: float, weights: dict | None = None, workers: int = WORKERS, days: int = 7,
+                  force: bool = False, status_path: str = STATUS_PATH, save: bool = True,
+                  window_days=None, resample=None) -> dict:
+    """
+    Forecast `tickers` highest priority first on `workers` processes until
+    `deadline_s` seconds from now. A ticker is only started when its estimated
+    fit (× COST_SAFETY, recalibrated on this run's finished fits) still fits,
+    so cheaper tickers further down fill the tail; fits still running at the
+    deadline are stopped. Tickers that don't make it keep their previous forecast and are
+    marked stale in the status file. Fits train on `window_days` / `resample`
+    (forecast.save_forecast). Returns the coverage report.
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + deadline_s
+    table = plan(tickers, weights, force, window_days=window_days, resample=resample)
+    candidates = table[~table["fresh"]]
+    print(f"🗓️  Forecast schedule: {len(candidates)} of {len(table)} tickers due, "
+          f"estimated {candidates['est_s'].sum():.0f}s of work for a {deadline_s:.0f}s budget on {workers} workers")
+
+    outcome, actual = {}, {}
+    order, running = list(candidates.index), {}
+    est = candidates["est_s"]
+    pool = multiprocessing.get_context("spawn").Pool(workers)
+    try:
+        while (order or running) and time.perf_counter() < deadline:
+            # Fill free workers with the highest-priority tickers whose (calibrated) estimate still fits
+            scale = calibration(actual, est)
+            while order and len(running) < workers:
+                left = deadline - time.perf_counter()
+                pick = next((t for t in order if est[t] * scale * COST_SAFETY <= left), None)
+                if pick is None:
+                    break
+                order.remove(pick)
+                running[pick] = (pool.apply_async(_forecast_one, (pick, days, metrics.current_run_id(), window_days, resample)), time.perf_counter())
+            if not running:
+                break   # nothing left fits in the time remaining
+            for ticker, (result, started) in list(running.items()):
+                if not result.ready():
+                    continue
+                del running[ticker]
+                actual[ticker] = time.perf_counter() - started
+                try:
+                    outcome[ticker] = "refreshed" if result.get() else "skipped"
+                except Exception as e:
+                    outcome[ticker] = "failed"
+                    print(f"❌ [forecast] {ticker}: {type(e).__name__}: {e}")
+            time.sleep(POLL_SECONDS)
+    finally:
+        if running:
+            pool.terminate()   # hard deadline: in-flight fits are abandoned (forecasts are written atomically)
+        else:
+            pool.close()
+        pool.join()
+    for ticker in running:
+        outcome[ticker] = "stopped"
+    for ticker in order:
+        outcome[ticker] = "deferred"
+    elapsed = time.perf_counter() - t0
+
+    table["outcome"] = pd.Series(outcome).reindex(table.index).fillna("fresh")
+    table["actual_s"] = pd.Series(actual, dtype="float64").reindex(table.index)
+    if save:
+        write_status(table, status_path)
+    report = coverage_report(table, deadline_s, elapsed, workers)
+    print_report(report)
+    if save:
+        os.makedirs(SCHEDULE_DIR, exist_ok=True)
+        with open(os.path.join(SCHEDULE_DIR, f"{metrics.current_run_id()}.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def calibration(actual: dict, est: pd.Series, min_samples: int = 3) -> float:
+    """Median actual/estimated seconds of this run's finished fits (1.0 until a few have finished)."""
+    if len(actual) < min_samples:
+        return 1.0
+    ratios = [actual[t] / est[t] for t in actual]
+    return float(np.clip(np.median(ratios), 0.2, 5.0))
+
+
+def write_status(table: pd.DataFrame, path: str = STATUS_PATH):
+    """
+    Per-ticker forecast status, merged into the existing file: when the forecast
+    was written, when its input last changed, and whether it is stale (older than
+    its input, i.e. deferred by the scheduler).
+    """
+    times = file_times(table.index)
+    status = pd.DataFrame({
+        "run_id": metrics.current_run_id(),
+        "outcome": table["outcome"],
+        "priority": table["priority"].round(4),
+        "est_s": table["est_s"].round(3),
+        "forecast_at": pd.to_datetime(times["forecast_at"], unit="s", utc=True),
+        "data_at": pd.to_datetime(times["data_at"], unit="s", utc=True),
+    })
+    status["stale"] = status["forecast_at"].notna() & (status["forecast_at"] < status["data_at"])
+    if os.path.exists(path):
+        previous = pd.read_parquet(path)
+        status = pd.concat([previous[~previous.index.isin(status.index)], status]).sort_index()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    status.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def coverage_report(table: pd.DataFrame, budget_s: float, elapsed_s: float, workers: int) -> dict:
+    due = table[table["outcome"] != "fresh"]
+    done = due["outcome"] == "refreshed"
+    counts = due["outcome"].value_counts().to_dict()
+    fitted = due.dropna(subset=["actual_s"])
+    return {
+        "run_id": metrics.current_run_id(),
+        "budget_s": round(budget_s, 1),
+        "elapsed_s": round(elapsed_s, 1),
+        "workers": workers,
+        "tickers": len(table),
+        "fresh": int((table["outcome"] == "fresh").sum()),
+        "due": len(due),
+        "outcomes": {k: int(v) for k, v in counts.items()},
+        "coverage": round(float(done.mean()), 4) if len(due) else 1.0,
+        "priority_coverage": round(float(due.loc[done, "priority"].sum() / due["priority"].sum()), 4)
+        if len(due) and due["priority"].sum() > 0 else 1.0,
+        "estimated_due_s": round(float(due["est_s"].sum()), 1),
+        "estimate_ratio_p50": round(float((fitted["actual_s"] / fitted["est_s"]).median()), 2) if len(fitted) else None,
+        "stale": sorted(due.index[due["outcome"].isin(["deferred", "stopped", "failed"])
+                                  & due["forecast_at"].notna()])[:50],
+        "by_ticker": {t: {"outcome": r.outcome, "seconds": None if pd.isna(r.actual_s) else round(r.actual_s, 3)}
+                      for t, r in due.iterrows()},
+    }
+
+
+def print_report(report: dict):
+    outcomes = report["outcomes"]
+    print(f"\n📊 Forecast coverage: {outcomes.get('refreshed', 0)}/{report['due']} due tickers refreshed "
+          f"({report['coverage']:.0%}, {report['priority_coverage']:.0%} of priority) "
+          f"in {report['elapsed_s']:.0f}s of {report['budget_s']:.0f}s; {report['fresh']} already fresh")
+    print(f"   est. work {report['estimated_due_s']:.0f}s on {report['workers']} workers; "
+          f"actual/estimate p50 {report['estimate_ratio_p50']}")
+    left = {k: v for k, v in outcomes.items() if k != "refreshed"}
+    if left:
+        print(f"⏳ Kept previous forecasts (marked stale where one exists): "
+              + ", ".join(f"{k} {v}" for k, v in sorted(left.items())))
+
+
+def parse_duration(text: str) -> float:
+    """"90", "45m", "2h", "1d" → seconds."""
+    text = str(text).strip().lower()
+    scale = {"s": 1, "m": 60, "h": 3600, "d": 86400}.get(text[-1:], None)
+    return float(text[:-1]) * scale if scale else float(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forecast the most important tickers within a wall-clock deadline")
+    parser.add_argument("--deadline", required=True, help="wall-clock budget, e.g. 900, 45m, 2h")
+    parser.add_argument("--weights", default=None,
+                        help=f"priority weights, e.g. views=0.5,market_cap=0.3,staleness=0.2 (default: {DEFAULT_WEIGHTS})")
+    parser.add_argument("--tickers", default=None, help="comma-separated tickers (default: every processed file)")
+    parser.add_argument("--universe", default=None, help="only this universe's members")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--force", action="store_true", help="also refit tickers whose forecast is up to date")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan (priority order, estimates) and exit")
+    args = parser.parse_args()
+
+    if args.tickers:
+        tickers = [t.strip() for t in args.tickers.split(",") if t.strip()]
+    elif args.universe:
+        from pipeline import universes
+        tickers = universes.tickers(args.universe)
+    else:
+        tickers = sorted(f[:-len(".parquet")] for f in os.listdir(PROCESSED_DIR) if f.endswith(".parquet"))
+    weights = parse_weights(args.weights)
+    if args.dry_run:
+        table = plan(tickers, weights, args.force)
+        print(table[["fresh", "rows", "est_s", "priority", "views", "market_cap", "score_staleness"]]
+              .head(50).round(3).to_string())
+        print(f"\n{(~table['fresh']).sum()} due, estimated {table.loc[~table['fresh'], 'est_s'].sum():.0f}s of work")
+    else:
+        run_scheduled(tickers, parse_duration(args.deadline), weights, args.workers, args.days, args.force)
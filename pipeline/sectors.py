@@ -0,0 +1,216 @@
+# Sector indices: GICS sector returns, index levels and sector-relative performance per ticker
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import universes
+
+# ------------------------
+# Config
+# ------------------------
+PROCESSED_DIR = "data/processed"
+FUNDAMENTALS_PATH = "data/fundamentals/fundamentals.parquet"
+SECTORS_DIR = "data/sectors"                     # published with the other datasets
+INDICES_FILE = "sector_indices.parquet"          # dates × sectors, index levels (base 100)
+SECTOR_SUMMARY_FILE = "sector_summary.parquet"   # per sector: members, weight, period returns
+RELATIVE_FILE = "ticker_relative.parquet"        # dates × tickers, ticker / sector index (base 100)
+TICKER_SUMMARY_FILE = "ticker_summary.parquet"   # per ticker: sector, weight, returns vs sector
+WEIGHTING = os.environ.get("SECTOR_WEIGHTING", "cap")   # "cap" or "equal"
+WEIGHTINGS = ("cap", "equal")
+UNIVERSE = "All sectors"                         # extra column: the whole universe as one index
+UNCLASSIFIED = "Unclassified"
+BASE_LEVEL = 100.0
+PERIODS = {"1W": 5, "1M": 21, "3M": 63, "6M": 126, "1Y": 252}
+LOAD_WORKERS = 8
+
+
+def sector_of(ticker: str) -> str:
+    """GICS sector from the universe files (any universe listing the symbol)."""
+    return universes.sector_map().get(ticker, UNCLASSIFIED)
+
+
+# ------------------------
+# Inputs
+# ------------------------
+def load_close(tickers, processed_dir: str = PROCESSED_DIR, max_workers: int = LOAD_WORKERS) -> pd.DataFrame:
+    """Close panel (dates × tickers) from the working processed folder, Close column only."""
+    def read(ticker):
+        path = os.path.join(processed_dir, f"{ticker}.parquet")
+        if not os.path.exists(path):
+            return ticker, None
+        return ticker, pd.read_parquet(path, columns=["Close"])["Close"]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        series = {t: s for t, s in pool.map(read, tickers) if s is not None}
+    if not series:
+        return pd.DataFrame()
+    panel = pd.concat(series, axis=1).sort_index()
+    return panel[~panel.index.duplicated(keep="last")]
+
+
+def market_caps(tickers, path: str = FUNDAMENTALS_PATH) -> pd.Series:
+    """Latest market cap per ticker from the fundamentals file (NaN where unknown)."""
+    caps = pd.Series(np.nan, index=pd.Index(tickers, name="ticker"), dtype="float64")
+    if os.path.exists(path):
+        fundamentals = pd.read_parquet(path, columns=["Ticker", "Market_Cap"]).drop_duplicates("Ticker", keep="last")
+        known = pd.to_numeric(fundamentals.set_index("Ticker")["Market_Cap"], errors="coerce")
+        caps.update(known[known > 0])
+    return caps
+
+
+# ------------------------
+# Computation
+# ------------------------
+def compute(close: pd.DataFrame, sectors: pd.Series, caps: pd.Series | None = None) -> dict:
+    """
+    Sector indices and sector-relative performance for every ticker, in one pass
+    over the close panel. Sector returns are weighted sums of member returns,
+    computed for all sectors at once as matrix products with a ticker × sector
+    membership matrix.
+
+    Cap weighting uses the previous close times an implied share count
+    (latest market cap / latest close), so weights drift with prices like a
+    real cap-weighted index; tickers without a market cap get the median cap.
+    `caps=None` gives equal weights. Returns frames keyed like the output files.
+    """
+    tickers = close.columns
+    price = close.to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = price[1:] / price[:-1] - 1
+    valid = np.isfinite(rets)
+    rets0 = np.where(valid, rets, 0.0)
+
+    if caps is None:
+        weights = valid.astype("float64")
+    else:
+        caps = caps.reindex(tickers).to_numpy(dtype="float64")
+        caps = np.where(np.isfinite(caps), caps, np.nanmedian(caps) if np.isfinite(caps).any() else 1.0)
+        last_close = close.ffill().iloc[-1].to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = np.where(last_close > 0, caps / last_close, 0.0)
+        weights = np.where(valid, price[:-1] * shares, 0.0)
+
+    names = sorted(sectors.reindex(tickers).fillna(UNCLASSIFIED).unique())
+    codes = pd.Categorical(sectors.reindex(tickers).fillna(UNCLASSIFIED), categories=names).codes
+    members = np.zeros((len(tickers), len(names) + 1))
+    members[np.arange(len(tickers)), codes] = 1.0
+    members[:, -1] = 1.0                                   # the universe column
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total = weights @ members
+        group_rets = np.where(total > 0, ((weights * rets0) @ members) / total, 0.0)
+    levels = BASE_LEVEL * np.vstack([np.ones((1, members.shape[1])), np.cumprod(1 + group_rets, axis=0)])
+    indices = pd.DataFrame(levels, index=close.index, columns=names + [UNIVERSE])
+    indices.index.name = "date"
+
+    # Each ticker against its own sector: growth relative to the sector index, from its first bar
+    growth = np.vstack([np.ones((1, len(tickers))), np.cumprod(1 + rets0, axis=0)])
+    listed = np.maximum.accumulate(np.isfinite(price), axis=0)
+    own_sector = levels[:, codes]
+    first = np.argmax(listed, axis=0)
+    relative = np.where(listed, BASE_LEVEL * growth / own_sector * own_sector[first, np.arange(len(tickers))], np.nan)
+    relative = pd.DataFrame(relative, index=indices.index, columns=tickers)
+
+    def period_returns(curve: np.ndarray) -> dict:
+        out = {}
+        for label, days in PERIODS.items():
+            out[label] = curve[-1] / curve[-1 - days] - 1 if len(curve) > days else np.full(curve.shape[1], np.nan)
+        return out
+
+    ticker_growth = np.where(listed, growth, np.nan)
+    own = period_returns(ticker_growth)
+    bench = period_returns(own_sector)
+    last_weights = weights[-1] if len(weights) else np.zeros(len(tickers))
+    sector_weight_total = (last_weights @ members)[codes]
+    ticker_summary = pd.DataFrame({
+        "sector": np.asarray(names)[codes],
+        "sub_industry": [universes.sub_industry_map().get(t) for t in tickers],
+        "weight_in_sector": np.divide(last_weights, sector_weight_total, out=np.full(len(tickers), np.nan),
+                                      where=sector_weight_total > 0),
+        **{f"return_{p}": own[p] for p in PERIODS},
+        **{f"sector_{p}": bench[p] for p in PERIODS},
+        **{f"excess_{p}": own[p] - bench[p] for p in PERIODS},
+    }, index=pd.Index(tickers, name="ticker"))
+
+    sector_returns = period_returns(levels)
+    universe_total = (last_weights @ members)[-1]
+    sector_summary = pd.DataFrame({
+        "members": np.append(np.bincount(codes, minlength=len(names)), len(tickers)),
+        "weight": (last_weights @ members) / universe_total if universe_total > 0 else np.nan,
+        **{f"return_{p}": sector_returns[p] for p in PERIODS},
+    }, index=pd.Index(indices.columns, name="sector"))
+    sector_summary["weighting"] = "equal" if caps is None else "cap"
+
+    return {
+        INDICES_FILE: indices,
+        SECTOR_SUMMARY_FILE: sector_summary,
+        RELATIVE_FILE: relative,
+        TICKER_SUMMARY_FILE: ticker_summary,
+    }
+
+
+# ------------------------
+# Stage
+# ------------------------
+def _write_atomic(df: pd.DataFrame, path: str):
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def build(tickers=None, weighting: str = WEIGHTING, processed_dir: str = PROCESSED_DIR,
+          fundamentals_path: str = FUNDAMENTALS_PATH, out_dir: str = SECTORS_DIR) -> dict:
+    """
+    Recompute the sector datasets from the processed universe and write them to
+    `out_dir`. The dashboard reads these small files instead of every member's
+    processed file. Cap weighting falls back to equal weights without fundamentals.
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"Unknown weighting {weighting!r} (choose from {WEIGHTINGS})")
+    t0 = time.perf_counter()
+    if tickers is None:
+        if not os.path.isdir(processed_dir):
+            return {}
+        tickers = sorted(f[:-len(".parquet")] for f in os.listdir(processed_dir) if f.endswith(".parquet"))
+    close = load_close(tickers, processed_dir)
+    if close.shape[0] < 2:
+        return {}
+
+    caps = None
+    if weighting == "cap":
+        caps = market_caps(close.columns, fundamentals_path)
+        if caps.isna().all():
+            print("⚠️ No market caps in fundamentals: sector indices fall back to equal weights")
+            caps = None
+
+    sectors = pd.Series({t: sector_of(t) for t in close.columns})
+    outputs = compute(close, sectors, caps)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, frame in outputs.items():
+        _write_atomic(frame, os.path.join(out_dir, name))
+
+    n_sectors = outputs[SECTOR_SUMMARY_FILE].shape[0] - 1
+    print(f"🏭 Sector indices: {close.shape[1]} tickers × {close.shape[0]} days, {n_sectors} sectors "
+          f"({'cap' if caps is not None else 'equal'}-weighted) in {time.perf_counter() - t0:.2f}s")
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build GICS sector indices and sector-relative performance")
+    parser.add_argument("--tickers", default=None, help="comma-separated tickers (default: all processed)")
+    parser.add_argument("--weighting", choices=WEIGHTINGS, default=WEIGHTING)
+    parser.add_argument("--show", action="store_true", help="print the sector summary")
+    args = parser.parse_args()
+
+    tickers = [t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers else None
+    outputs = build(tickers, args.weighting)
+    if args.show and outputs:
+        print(outputs[SECTOR_SUMMARY_FILE].round(4).to_string())
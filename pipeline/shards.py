@@ -0,0 +1,430 @@
+# Sharded execution: deterministic ticker shards claimed by workers from a shared SQLite queue
+
+import os
+import sys
+import json
+import time
+import heapq
+import socket
+import sqlite3
+import hashlib
+import argparse
+import threading
+import multiprocessing
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ------------------------
+# Config
+# ------------------------
+QUEUE_PATH = os.environ.get("SHARD_QUEUE", "data/state/shards.sqlite")   # must be on storage every worker sees
+STAGES = ["extract", "transform", "forecast"]
+LEASE_SECONDS = 300            # a shard whose lease is not renewed for this long is handed to another worker
+HEARTBEAT_SECONDS = LEASE_SECONDS / 5
+MAX_ATTEMPTS = 3               # claims per shard before it is marked failed
+POLL_SECONDS = 2.0
+COST_HISTORY_RUNS = 5          # past metric runs used for cost estimates
+DEFAULT_COST = 1.0             # seconds, for tickers never seen in the metrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS shards (
+    shard INTEGER PRIMARY KEY,
+    tickers TEXT NOT NULL,          -- JSON list
+    cost REAL NOT NULL,
+    status TEXT NOT NULL,           -- pending | leased | done | failed
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    started REAL,
+    finished REAL,
+    error TEXT,
+    results TEXT                    -- JSON list of runner results
+);
+"""
+
+
+# ------------------------
+# Partitioning
+# ------------------------
+def stable_hash(ticker: str) -> int:
+    """Same value on every machine and Python process (unlike the salted built-in hash())."""
+    return int.from_bytes(hashlib.md5(ticker.encode("utf-8")).digest()[:8], "big")
+
+
+def estimate_costs(tickers, stages=STAGES, metrics_dir=None, runs: int = COST_HISTORY_RUNS) -> dict:
+    """
+    Expected seconds per ticker for `stages`: the median wall time of each
+    (stage, ticker) over the last `runs` metric logs. Tickers never seen get the
+    median of the known ones.
+    """
+    import pandas as pd
+    from pipeline import metrics
+    metrics_dir = metrics_dir or metrics.METRICS_DIR
+    frames = []
+    for run_id in metrics.list_runs(metrics_dir)[-runs:]:
+        try:
+            frames.append(metrics.load_run(run_id, metrics_dir)[["stage", "ticker", "wall_s"]])
+        except (ValueError, KeyError):
+            continue
+    costs = pd.Series(0.0, index=pd.Index(list(tickers), name="ticker"))
+    if frames:
+        history = pd.concat(frames)
+        history = history[history["stage"].isin(stages)]
+        per_stage = history.groupby(["ticker", "stage"])["wall_s"].median().unstack("stage")
+        known = per_stage.sum(axis=1).reindex(costs.index)
+        costs = known.fillna(known.median() if known.notna().any() else DEFAULT_COST)
+    else:
+        costs[:] = DEFAULT_COST
+    return costs.to_dict()
+
+
+def partition(tickers, n_shards: int, by: str = "hash", costs: dict | None = None) -> list[list[str]]:
+    """
+    Split tickers into `n_shards` deterministic shards.
+    "hash": shard = stable hash mod n (a ticker stays on its shard as the universe changes).
+    "cost": longest-processing-time first, so shards carry similar estimated work.
+    """
+    tickers = sorted(set(tickers))
+    n_shards = max(1, min(n_shards, len(tickers)))
+    shards = [[] for _ in range(n_shards)]
+    if by == "hash":
+        for t in tickers:
+            shards[stable_hash(t) % n_shards].append(t)
+    elif by == "cost":
+        costs = costs or {}
+        heap = [(0.0, i) for i in range(n_shards)]
+        for t in sorted(tickers, key=lambda t: (-costs.get(t, DEFAULT_COST), t)):
+            load, i = heapq.heappop(heap)
+            shards[i].append(t)
+            heapq.heappush(heap, (load + costs.get(t, DEFAULT_COST), i))
+    else:
+        raise ValueError(f"Unknown partitioning {by!r} (choose 'hash' or 'cost')")
+    return [s for s in shards if s]
+
+
+# ------------------------
+# Queue
+# ------------------------
+def connect(path: str = QUEUE_PATH) -> sqlite3.Connection:
+    # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE takes the write lock up front)
+    con = sqlite3.connect(path, timeout=30, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA busy_timeout=30000")
+    con.executescript(_SCHEMA)
+    return con
+
+
+def create_plan(tickers, stages, n_shards: int, by: str = "hash", options: dict | None = None,
+                path: str = QUEUE_PATH, run_id: str | None = None) -> dict:
+    """Partition `tickers` and (re)create the queue at `path` with one pending row per shard."""
+    from pipeline.snapshots import new_run_id
+    stages = [s for s in STAGES if s in stages]
+    costs = estimate_costs(tickers, stages)
+    shards = partition(tickers, n_shards, by, costs)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    plan = {"run_id": run_id or new_run_id(), "stages": stages, "by": by, "options": options or {},
+            "created": time.time()}
+    con = connect(path)
+    con.execute("BEGIN IMMEDIATE")
+    con.executemany("INSERT INTO plan VALUES (?, ?)", [(k, json.dumps(v)) for k, v in plan.items()])
+    con.executemany(
+        "INSERT INTO shards (shard, tickers, cost, status) VALUES (?, ?, ?, 'pending')",
+        [(i, json.dumps(s), round(sum(costs.get(t, DEFAULT_COST) for t in s), 3)) for i, s in enumerate(shards)],
+    )
+    con.execute("COMMIT")
+    con.close()
+    loads = [sum(costs.get(t, DEFAULT_COST) for t in s) for s in shards]
+    print(f"🧩 Plan {plan['run_id']}: {len(tickers)} tickers → {len(shards)} shards by {by} "
+          f"(estimated {min(loads):.1f}–{max(loads):.1f}s per shard) in {path}")
+    return plan
+
+
+def read_plan(con) -> dict:
+    return {k: json.loads(v) for k, v in con.execute("SELECT key, value FROM plan")}
+
+
+def claim(con, worker: str, lease: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+    """
+    Lease the most expensive available shard: pending, or leased by a worker whose
+    lease expired (presumed dead). Returns (shard, tickers) or None when nothing is left.
+    """
+    while True:
+        now = time.time()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            row = con.execute(
+                "SELECT shard, tickers, attempts FROM shards "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY cost DESC, shard LIMIT 1", (now,)).fetchone()
+            if row is None:
+                con.execute("COMMIT")
+                return None
+            shard, tickers, attempts = row
+            if attempts >= max_attempts:
+                con.execute("UPDATE shards SET status = 'failed', finished = ?, "
+                            "error = coalesce(error, 'lease expired') || ' (attempts exhausted)' WHERE shard = ?",
+                            (now, shard))
+                con.execute("COMMIT")
+                continue
+            con.execute("UPDATE shards SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                        "started = ? WHERE shard = ?", (worker, now + lease, now, shard))
+            con.execute("COMMIT")
+            return shard, json.loads(tickers)
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+
+def renew(con, shard: int, worker: str, lease: float = LEASE_SECONDS) -> bool:
+    """Extend our lease; False if another worker has taken the shard over."""
+    cur = con.execute("UPDATE shards SET lease_until = ? WHERE shard = ? AND worker = ? AND status = 'leased'",
+                      (time.time() + lease, shard, worker))
+    return cur.rowcount == 1
+
+
+def finish(con, shard: int, worker: str, results=None, error: str | None = None,
+           max_attempts: int = MAX_ATTEMPTS) -> bool:
+    """Mark a shard done (or back to pending / failed after an error). False if the lease was lost."""
+    now = time.time()
+    if error is None:
+        cur = con.execute("UPDATE shards SET status = 'done', finished = ?, lease_until = NULL, results = ?, "
+                          "error = NULL WHERE shard = ? AND worker = ? AND status = 'leased'",
+                          (now, json.dumps(results or []), shard, worker))
+    else:
+        cur = con.execute("UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                          "finished = ?, lease_until = NULL, error = ? "
+                          "WHERE shard = ? AND worker = ? AND status = 'leased'",
+                          (max_attempts, now, error, shard, worker))
+    return cur.rowcount == 1
+
+
+def status(con) -> dict:
+    counts = dict(con.execute("SELECT status, count(*) FROM shards GROUP BY status").fetchall())
+    return {s: counts.get(s, 0) for s in ("pending", "leased", "done", "failed")}
+
+
+# ------------------------
+# Worker
+# ------------------------
+class _Heartbeat(threading.Thread):
+    """Renews the lease of the shard being processed until stopped."""
+
+    def __init__(self, path, shard, worker, lease):
+        super().__init__(daemon=True)
+        self.path, self.shard, self.worker, self.lease = path, shard, worker, lease
+        self.lost = False
+        self._done = threading.Event()
+
+    def run(self):
+        con = connect(self.path)
+        while not self._done.wait(min(HEARTBEAT_SECONDS, self.lease / 5)):
+            if not renew(con, self.shard, self.worker, self.lease):
+                self.lost = True
+                print(f"⚠️ [{self.worker}] lost the lease on shard {self.shard}")
+                break
+        con.close()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def work(path: str = QUEUE_PATH, worker: str | None = None, stage_workers: dict | None = None,
+         lease: float = LEASE_SECONDS, max_shards: int | None = None) -> int:
+    """
+    Claim and run shards until every shard is done or failed; returns the number
+    completed here. While other workers hold leases this worker keeps polling, so it
+    picks up their shards if they die.
+    Each shard streams through the planned stages with the regular runner. Per-ticker
+    outputs are independent files, so a shard re-run after a dead worker simply
+    overwrites the same files.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    con = connect(path)
+    plan = read_plan(con)
+    from pipeline import metrics
+    from pipeline.runner import run_pipeline
+    # One metrics log for the whole sharded run, whichever node a shard runs on
+    metrics.start_run(plan["run_id"])
+
+    done = 0
+    while max_shards is None or done < max_shards:
+        claimed = claim(con, worker, lease)
+        if claimed is None:
+            if status(con)["leased"]:   # another worker may still die: wait for its lease
+                time.sleep(POLL_SECONDS)
+                continue
+            break
+        shard, tickers = claimed
+        print(f"🧩 [{worker}] shard {shard}: {len(tickers)} tickers")
+        heartbeat = _Heartbeat(path, shard, worker, lease)
+        heartbeat.start()
+        try:
+            results = run_pipeline(tickers=tickers, stages=plan["stages"], workers=stage_workers,
+                                   scan_alerts=False, build_sectors=False, run_id=plan["run_id"],
+                                   **plan["options"])
+            error = None
+        except Exception as e:
+            results, error = None, f"{type(e).__name__}: {e}"
+            print(f"❌ [{worker}] shard {shard}: {error}")
+        finally:
+            heartbeat.stop()
+        if finish(con, shard, worker, results, error) and error is None:
+            done += 1
+    con.close()
+    return done
+
+
+def _work_process(path, index, stage_workers, lease):
+    work(path, worker=f"{socket.gethostname()}:{os.getpid()}:{index}", stage_workers=stage_workers, lease=lease)
+
+
+def run_workers(path: str = QUEUE_PATH, processes: int = 2, stage_workers: dict | None = None,
+                lease: float = LEASE_SECONDS):
+    """Start `processes` local worker processes on the queue and wait for them (one node's share)."""
+    spawn = multiprocessing.get_context("spawn")
+    procs = [spawn.Process(target=_work_process, args=(path, i, stage_workers, lease), name=f"shard-worker-{i}")
+             for i in range(processes)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return [p.exitcode for p in procs]
+
+
+# ------------------------
+# Merge
+# ------------------------
+def merge(path: str = QUEUE_PATH, wait: bool = False, timeout: float | None = None,
+          scan_alerts: bool = True, build_sectors: bool = True) -> dict:
+    """
+    Combine the shard results once every shard is done or failed: per-stage counts,
+    failed tickers and shard balance. Then run the universe-wide steps the shards
+    skip (alert scan, sector indices) once over everything that was transformed.
+    """
+    con = connect(path)
+    t0 = time.time()
+    while wait and (status(con)["pending"] or status(con)["leased"]):
+        if timeout is not None and time.time() - t0 > timeout:
+            raise TimeoutError(f"shards still running after {timeout}s: {status(con)}")
+        time.sleep(POLL_SECONDS)
+    counts = status(con)
+    if counts["pending"] or counts["leased"]:
+        raise RuntimeError(f"Cannot merge: shards still outstanding {counts} (use wait=True / --wait)")
+
+    plan = read_plan(con)
+    rows = con.execute("SELECT shard, worker, attempts, started, finished, status, error, results FROM shards "
+                       "ORDER BY shard").fetchall()
+    con.close()
+    results, shard_rows = [], []
+    for shard, worker, attempts, started, finished, state, error, shard_results in rows:
+        results.extend(json.loads(shard_results) if shard_results else [])
+        shard_rows.append({"shard": shard, "worker": worker, "attempts": attempts, "status": state, "error": error,
+                           "seconds": round(finished - started, 2) if started and finished else None})
+
+    from pipeline.runner import print_summary, run_universe_steps
+    timed = [r["seconds"] for r in shard_rows if r["seconds"] is not None]
+    print(f"\n🧩 Merged {len(rows)} shards of run {plan['run_id']} "
+          f"({counts['done']} done, {counts['failed']} failed, "
+          f"{sum(r['attempts'] for r in shard_rows) - len(rows)} re-claims)")
+    if timed:
+        print(f"   shard time min {min(timed):.1f}s  max {max(timed):.1f}s  "
+              f"imbalance {max(timed) / (sum(timed) / len(timed)):.2f}×")
+    print_summary(results, plan["stages"], max(timed) if timed else 0.0)
+    for r in shard_rows:
+        if r["status"] == "failed":
+            print(f"❌ shard {r['shard']} failed after {r['attempts']} attempts: {r['error']}")
+
+    transformed = [r["ticker"] for r in results if r["stage"] == "transform" and r["status"] == "ok"]
+    if plan["options"].get("interval", "1d") == "1d":   # alerts and sectors are built from daily bars only
+        run_universe_steps(transformed, plan["options"].get("universe"), scan_alerts, build_sectors)
+    return {"run_id": plan["run_id"], "options": plan["options"], "counts": counts, "shards": shard_rows,
+            "results": results}
+
+
+# ------------------------
+# CLI
+# ------------------------
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Sharded pipeline execution over a shared SQLite work queue")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="queue file, on a filesystem shared by all workers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    plan = sub.add_parser("plan", help="partition tickers into shards and create the queue")
+    run = sub.add_parser("run", help="plan, run local worker processes, then merge (single-node test)")
+    work_p = sub.add_parser("work", help="claim and run shards until the queue is empty")
+    for p in (plan, run):
+        p.add_argument("--shards", type=int, default=16)
+        p.add_argument("--by", choices=["hash", "cost"], default="cost")
+        p.add_argument("--stages", default="transform,forecast")
+        p.add_argument("--tickers", default=None, help="comma-separated tickers (default: inputs of the first stage)")
+        p.add_argument("--days", type=int, default=7, help="forecast horizon in days")
+        p.add_argument("--interval", choices=["1d", "1h", "5m"], default="1d")
+        p.add_argument("--universe", default=None, help="universe file under universes/ (default: SP500_TICKERS)")
+        p.add_argument("--refresh", action="store_true", help="re-download tickers that already have raw data")
+    for p in (work_p, run):
+        p.add_argument("--processes", type=int, default=1, help="worker processes on this node")
+        p.add_argument("--lease", type=float, default=LEASE_SECONDS)
+        for stage in STAGES:
+            p.add_argument(f"--{stage}-workers", type=int, default=None,
+                           help="per worker process (CPU stages default to the runner's count ÷ processes)")
+
+    merge_p = sub.add_parser("merge", help="combine shard results and run the universe-wide steps")
+    merge_p.add_argument("--wait", action="store_true", help="wait for outstanding shards first")
+    merge_p.add_argument("--timeout", type=float, default=None)
+    merge_p.add_argument("--publish", action="store_true", help="publish a snapshot after merging")
+    sub.add_parser("status", help="shard counts by status")
+    return parser
+
+
+def _stage_workers(args):
+    from pipeline.runner import DEFAULT_WORKERS, PROCESS_STAGES
+    workers = {}
+    for stage in STAGES:
+        n = getattr(args, f"{stage}_workers")
+        if n is None and stage in PROCESS_STAGES:
+            n = max(1, DEFAULT_WORKERS[stage] // args.processes)
+        if n is not None:
+            workers[stage] = n
+    return workers
+
+
+def _plan_from_args(args):
+    from pipeline.runner import discover_tickers
+    stages = [s.strip() for s in args.stages.split(",")]
+    tickers = ([t.strip() for t in args.tickers.split(",") if t.strip()] if args.tickers
+               else discover_tickers([s for s in STAGES if s in stages][0], args.interval, args.universe))
+    return create_plan(tickers, stages, args.shards, args.by, path=args.queue,
+                       options={"days": args.days, "skip_existing": not args.refresh, "interval": args.interval,
+                                "universe": args.universe})
+
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    if args.command == "plan":
+        _plan_from_args(args)
+    elif args.command == "work":
+        if args.processes > 1:
+            run_workers(args.queue, args.processes, _stage_workers(args), args.lease)
+        else:
+            work(args.queue, stage_workers=_stage_workers(args), lease=args.lease)
+    elif args.command == "run":
+        _plan_from_args(args)
+        run_workers(args.queue, args.processes, _stage_workers(args), args.lease)
+        merge(args.queue)
+    elif args.command == "merge":
+        merged = merge(args.queue, wait=args.wait, timeout=args.timeout)
+        if args.publish:
+            universe = merged["options"].get("universe")
+            if universe:
+                from pipeline.universes import publish
+                publish(universe)
+            else:
+                from pipeline.snapshots import publish_local_snapshot
+                publish_local_snapshot()
+    else:
+        print(status(connect(args.queue)))
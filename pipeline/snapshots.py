@@ -0,0 +1,160 @@
+# Immutable dataset snapshots with an atomic CURRENT manifest
+
+import os
+import json
+import shutil
+import argparse
+import datetime
+
+# ------------------------
+# Config
+# ------------------------
+DATA_ROOT = "data"
+SNAPSHOT_DIR = "snapshots"           # data/snapshots/<run_id>/... or s3://bucket/snapshots/<run_id>/...
+MANIFEST_NAME = "CURRENT"
+SNAPSHOT_RETENTION = int(os.environ.get("SNAPSHOT_RETENTION", "3"))
+
+# Datasets published into each snapshot (snapshot sub-folder -> working folder)
+DATA_DIRS = {
+    "processed": "data/processed",
+    "forecasts": "data/forecasts",
+    "fundamentals": "data/fundamentals",
+    "alerts": "data/alerts",
+    "sectors": "data/sectors",
+    "processed_intraday": "data/processed_intraday",
+    "figures": "data/figures",
+}
+
+
+# ------------------------
+# Manifest Helpers
+# ------------------------
+_last_run_id = ""
+
+
+def new_run_id() -> str:
+    """
+    Sortable, UTC-timestamped run/snapshot id with microseconds, e.g.
+    20250930T221500.123456Z. Unique within a process even when called twice
+    in the same microsecond.
+    """
+    global _last_run_id
+    now = datetime.datetime.now(datetime.timezone.utc)
+    run_id = now.strftime("%Y%m%dT%H%M%S.%fZ")
+    while run_id <= _last_run_id:
+        now += datetime.timedelta(microseconds=1)
+        run_id = now.strftime("%Y%m%dT%H%M%S.%fZ")
+    _last_run_id = run_id
+    return run_id
+
+
+def build_manifest(run_id: str, datasets, previous: str | None = None) -> dict:
+    return {
+        "snapshot": run_id,
+        "prefix": f"{SNAPSHOT_DIR}/{run_id}",
+        "datasets": sorted(datasets),
+        "previous": previous,
+        "published_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def snapshots_to_remove(snapshot_ids, current: str | None, keep: int = SNAPSHOT_RETENTION) -> list[str]:
+    """Snapshot ids outside the newest `keep` (the current snapshot is always kept)."""
+    ordered = sorted(snapshot_ids, reverse=True)
+    kept = set(ordered[:keep])
+    if current:
+        kept.add(current)
+    return [s for s in ordered if s not in kept]
+
+
+def read_local_manifest(root: str = DATA_ROOT) -> dict | None:
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_local_manifest(manifest: dict, root: str = DATA_ROOT):
+    """Flip CURRENT atomically (write temp file, then rename over the old one)."""
+    path = os.path.join(root, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# ------------------------
+# Local Snapshots
+# ------------------------
+def publish_local_snapshot(data_dirs=DATA_DIRS, root: str = DATA_ROOT, run_id: str | None = None,
+                           keep: int = SNAPSHOT_RETENTION, include=None) -> str:
+    """
+    Copy the working folders into data/snapshots/<run_id>/ and flip CURRENT.
+    Files identical (size + mtime) to the previous snapshot are hard-linked
+    instead of copied; snapshot files are never written in place.
+    `include(dataset, relative_path)` can restrict which files are published.
+    """
+    run_id = run_id or new_run_id()
+    previous = (read_local_manifest(root) or {}).get("snapshot")
+    snap_root = os.path.join(root, SNAPSHOT_DIR, run_id)
+    prev_root = os.path.join(root, SNAPSHOT_DIR, previous) if previous else None
+
+    copied = linked = 0
+    datasets = []
+    for name, folder in data_dirs.items():
+        if not os.path.exists(folder):
+            print(f"⚠️ Skipping {folder} (not found)")
+            continue
+        datasets.append(name)
+        for dirpath, _, files in os.walk(folder):
+            for file in files:
+                src = os.path.join(dirpath, file)
+                rel = os.path.relpath(src, folder)
+                if include is not None and not include(name, rel):
+                    continue
+                dst = os.path.join(snap_root, name, rel)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+                prev = os.path.join(prev_root, name, rel) if prev_root else None
+                if prev and os.path.exists(prev):
+                    s, p = os.stat(src), os.stat(prev)
+                    if s.st_size == p.st_size and s.st_mtime_ns == p.st_mtime_ns:
+                        os.link(prev, dst)
+                        linked += 1
+                        continue
+                shutil.copy2(src, dst)
+                copied += 1
+
+    write_local_manifest(build_manifest(run_id, datasets, previous), root)
+    print(f"📸 Published snapshot {run_id} → {snap_root} ({copied} copied, {linked} unchanged)")
+    gc_local_snapshots(root, keep)
+    return run_id
+
+
+def gc_local_snapshots(root: str = DATA_ROOT, keep: int = SNAPSHOT_RETENTION) -> list[str]:
+    """Delete local snapshots outside the retention window."""
+    snap_dir = os.path.join(root, SNAPSHOT_DIR)
+    if not os.path.isdir(snap_dir):
+        return []
+    current = (read_local_manifest(root) or {}).get("snapshot")
+    removed = snapshots_to_remove(os.listdir(snap_dir), current, keep)
+    for snap in removed:
+        shutil.rmtree(os.path.join(snap_dir, snap), ignore_errors=True)
+        print(f"🗑️ Removed old snapshot {snap}")
+    return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage local dataset snapshots")
+    parser.add_argument("command", choices=["publish", "gc", "current"])
+    parser.add_argument("--root", default=DATA_ROOT)
+    parser.add_argument("--keep", type=int, default=SNAPSHOT_RETENTION)
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        publish_local_snapshot(root=args.root, keep=args.keep)
+    elif args.command == "gc":
+        gc_local_snapshots(args.root, args.keep)
+    else:
+        print(json.dumps(read_local_manifest(args.root), indent=2))
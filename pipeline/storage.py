@@ -0,0 +1,459 @@
+# Storage backends for the dashboard data (local folder or S3 on demand)
+
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+from pipeline.snapshots import SNAPSHOT_DIR, MANIFEST_NAME
+
+# ------------------------
+# Config
+# ------------------------
+DATA_BACKEND = os.environ.get("DATA_BACKEND", "local")      # "local" or "s3"
+LOCAL_ROOT = os.environ.get("DATA_ROOT", "data")
+AWS_REGION = os.environ.get("AWS_DEFAULT_REGION", "eu-west-2")
+BUCKET_NAME = os.environ.get("S3_BUCKET", "sp500-dashboard-data")
+
+CACHE_DIR = os.environ.get("DATA_CACHE_DIR", "data/.cache")
+CACHE_MAX_BYTES = int(os.environ.get("DATA_CACHE_MAX_MB", "512")) * 1024 * 1024
+REVALIDATE_SECS = float(os.environ.get("DATA_CACHE_REVALIDATE_SECS", "300"))
+LIVE_DATASETS = {"views"}               # written in place by the dashboard hosts, never inside a snapshot
+
+
+# ------------------------
+# Local backend
+# ------------------------
+class LocalStorage:
+    """
+    Read dataset objects from a local folder laid out like the S3 bucket.
+    If the folder has a CURRENT manifest, keys resolve inside the snapshot it names
+    (except LIVE_DATASETS, which sit next to the snapshots).
+    """
+
+    def __init__(self, root: str = LOCAL_ROOT):
+        self.root = root
+        self._manifest_mtime = None
+        self._snapshot = None
+
+    def current_snapshot(self) -> str | None:
+        """Snapshot id named by <root>/CURRENT (None for the flat legacy layout)."""
+        path = os.path.join(self.root, MANIFEST_NAME)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._manifest_mtime, self._snapshot = None, None
+            return None
+        if mtime != self._manifest_mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                self._snapshot = json.load(f).get("snapshot")
+            self._manifest_mtime = mtime
+        return self._snapshot
+
+    def resolve(self, key: str) -> str:
+        if key.split("/")[0] in LIVE_DATASETS:
+            return key
+        snapshot = self.current_snapshot()
+        return f"{SNAPSHOT_DIR}/{snapshot}/{key}" if snapshot else key
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, self.resolve(key))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def version(self, key: str) -> str | None:
+        """Identifier that changes whenever `key`'s content does (None if it is missing)."""
+        resolved = self.resolve(key)
+        try:
+            st = os.stat(os.path.join(self.root, resolved))
+        except FileNotFoundError:
+            return None
+        return f"{resolved}:{st.st_mtime_ns}:{st.st_size}"
+
+    def list_keys(self, prefix: str, suffix: str = "") -> list[str]:
+        folder = self._path(prefix)
+        if not os.path.isdir(folder):
+            return []
+        return [f"{prefix}/{f}" for f in os.listdir(folder) if f.endswith(suffix)]
+
+    def read_parquet(self, key: str, columns: list[str] | None = None) -> pd.DataFrame | None:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path, columns=columns)
+
+    def read_csv(self, key: str, **kwargs) -> pd.DataFrame | None:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        return pd.read_csv(path, **kwargs)
+
+    def read_text(self, key: str) -> str | None:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+
+# ------------------------
+# Disk cache
+# ------------------------
+class DiskCache:
+    """
+    Size-bounded local cache of whole S3 objects.
+    Each entry is `<sha1>.data` plus a `<sha1>.json` sidecar holding key, ETag and
+    last validation time. Least-recently-used entries are evicted past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return base + ".data", base + ".json"
+
+    def get_meta(self, key: str) -> dict | None:
+        data_path, meta_path = self._paths(key)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def data_path(self, key: str) -> str:
+        return self._paths(key)[0]
+
+    def touch(self, key: str, validated: bool = False) -> bool:
+        """Mark an entry as recently used (and optionally freshly validated). False if it was evicted meanwhile."""
+        data_path, meta_path = self._paths(key)
+        try:
+            os.utime(data_path)
+        except FileNotFoundError:
+            return False
+        if validated:
+            meta = self.get_meta(key) or {}
+            meta["validated_at"] = time.time()
+            self._write_meta(meta_path, meta)
+        return True
+
+    def put(self, key: str, body: bytes, etag: str) -> bool:
+        """Cache `body` and evict older entries; an object larger than the whole cache is not stored (returns False)."""
+        if len(body) > self.max_bytes:
+            return False
+        data_path, meta_path = self._paths(key)
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, data_path)
+        self._write_meta(meta_path, {"key": key, "etag": etag, "size": len(body), "validated_at": time.time()})
+        self.evict(keep=data_path)
+        return True
+
+    def _write_meta(self, meta_path: str, meta: dict):
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def evict(self, keep: str | None = None):
+        """Drop least-recently-used entries (other than `keep`) until the cache fits in `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".data"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:   # evicted by another process meanwhile
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            for p in (path, path[:-len(".data")] + ".json"):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+
+# ------------------------
+# Hot cache
+# ------------------------
+class HotCache:
+    """
+    Thread-safe in-memory LRU bounded by bytes (the data API's decoded frames and
+    response bodies, the dashboard's figures). Keys carry the object version, so
+    entries for replaced files are never served again and simply age out.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes: int):
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "mb": round(self.bytes / 1e6, 1),
+                    "hit_rate": round(self.hits / total, 3) if total else None}
+
+
+# ------------------------
+# S3 backend
+# ------------------------
+class _S3RangeFile(io.RawIOBase):
+    """Seekable read-only file over one S3 object; every read is a ranged GET."""
+
+    def __init__(self, client, bucket: str, key: str, size: int):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.pos = 0
+        self.bytes_fetched = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        else:
+            self.pos = self.size + offset
+        return self.pos
+
+    def readinto(self, buffer):
+        if self.pos >= self.size:
+            return 0
+        end = min(self.pos + len(buffer), self.size) - 1
+        resp = self.client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={self.pos}-{end}")
+        chunk = resp["Body"].read()
+        n = len(chunk)
+        buffer[:n] = chunk
+        self.pos += n
+        self.bytes_fetched += n
+        return n
+
+
+class S3Storage:
+    """
+    Read dataset objects straight from S3 on demand.
+    Keys resolve through the CURRENT manifest (re-read every `revalidate_secs`).
+    Objects inside a snapshot are immutable, so cached copies are served without
+    revalidation; legacy flat-layout objects are revalidated by ETag instead.
+    Column-subset Parquet reads of uncached objects use ranged GETs so only the
+    footer and the requested column chunks are transferred; the subset is then
+    cached as its own entry, so later reads of the same columns skip S3.
+    Objects larger than the cache are read in memory without being cached.
+    """
+
+    def __init__(self, bucket: str = BUCKET_NAME, client=None, cache: DiskCache | None = None,
+                 revalidate_secs: float = REVALIDATE_SECS):
+        if client is None:
+            import boto3
+            client = boto3.client("s3", region_name=AWS_REGION)
+        self.bucket = bucket
+        self.client = client
+        self.cache = cache or DiskCache()
+        self.revalidate_secs = revalidate_secs
+        self._manifest_checked = 0.0
+        self._snapshot = None
+
+    def current_snapshot(self) -> str | None:
+        """Snapshot id named by s3://bucket/CURRENT (None for the flat legacy layout)."""
+        if time.time() - self._manifest_checked < self.revalidate_secs:
+            return self._snapshot
+        from botocore.exceptions import ClientError
+        try:
+            resp = self.client.get_object(Bucket=self.bucket, Key=MANIFEST_NAME)
+            self._snapshot = json.loads(resp["Body"].read()).get("snapshot")
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey"):
+                raise
+            self._snapshot = None
+        self._manifest_checked = time.time()
+        return self._snapshot
+
+    def resolve(self, key: str) -> str:
+        if key.split("/")[0] in LIVE_DATASETS:
+            return key
+        snapshot = self.current_snapshot()
+        return f"{SNAPSHOT_DIR}/{snapshot}/{key}" if snapshot else key
+
+    def _is_fresh(self, key: str, meta: dict | None) -> bool:
+        if meta is None:
+            return False
+        if key.startswith(f"{SNAPSHOT_DIR}/"):
+            return True
+        return time.time() - meta.get("validated_at", 0) < self.revalidate_secs
+
+    def _head(self, key: str) -> dict | None:
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        key = self.resolve(key)
+        if self._is_fresh(key, self.cache.get_meta(key)):
+            return True
+        return self._head(key) is not None
+
+    def version(self, key: str) -> str | None:
+        """Identifier that changes whenever `key`'s content does (snapshot keys are immutable)."""
+        key = self.resolve(key)
+        if key.startswith(f"{SNAPSHOT_DIR}/"):
+            return key
+        meta = self.cache.get_meta(key)
+        if self._is_fresh(key, meta):
+            return f"{key}:{meta['etag']}"
+        head = self._head(key)
+        return None if head is None else f"{key}:{head['ETag']}"
+
+    def list_keys(self, prefix: str, suffix: str = "") -> list[str]:
+        resolved = self.resolve(prefix)
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{resolved}/"):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith(suffix):
+                    keys.append(prefix + obj["Key"][len(resolved):])
+        return keys
+
+    def fetch(self, key: str):
+        """
+        A validated copy of `key`: a local cache path, or the body in memory
+        (BytesIO) when the object is too large to cache. None if it is missing.
+        """
+        key = self.resolve(key)
+        meta = self.cache.get_meta(key)
+        if self._is_fresh(key, meta) and self.cache.touch(key):
+            return self.cache.data_path(key)
+
+        head = self._head(key)
+        if head is None:
+            return None
+        if meta and meta.get("etag") == head["ETag"] and self.cache.touch(key, validated=True):
+            return self.cache.data_path(key)
+
+        resp = self.client.get_object(Bucket=self.bucket, Key=key)
+        body = resp["Body"].read()
+        if self.cache.put(key, body, resp["ETag"]):
+            return self.cache.data_path(key)
+        return io.BytesIO(body)
+
+    def _read(self, key: str, reader):
+        """`reader(source)` on fetch(key); an entry evicted by another session before it is read counts as a miss."""
+        for _ in range(2):
+            source = self.fetch(key)
+            if source is None:
+                return None
+            try:
+                return reader(source)
+            except FileNotFoundError:
+                continue
+        resolved = self.resolve(key)
+        return reader(io.BytesIO(self.client.get_object(Bucket=self.bucket, Key=resolved)["Body"].read()))
+
+    def _read_columns(self, resolved: str, columns: list[str]) -> pd.DataFrame | None:
+        """Column subset of an uncached Parquet object by ranged GETs, cached as its own entry."""
+        import pyarrow.parquet as pq
+        sub_key = f"{resolved}?columns={','.join(columns)}"
+        meta = self.cache.get_meta(sub_key)
+        head = None
+        if not self._is_fresh(sub_key, meta):
+            head = self._head(resolved)
+            if head is None:
+                return None
+            if not (meta and meta.get("etag") == head["ETag"] and self.cache.touch(sub_key, validated=True)):
+                meta = None
+        if meta is not None and self.cache.touch(sub_key):
+            try:
+                return pd.read_parquet(self.cache.data_path(sub_key))
+            except FileNotFoundError:   # evicted meanwhile: read it again below
+                pass
+
+        head = head or self._head(resolved)
+        if head is None:
+            return None
+        f = _S3RangeFile(self.client, self.bucket, resolved, head["ContentLength"])
+        table = pq.read_table(f, columns=columns, use_pandas_metadata=True)
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        self.cache.put(sub_key, buffer.getvalue(), head["ETag"])
+        return table.to_pandas()
+
+    def read_parquet(self, key: str, columns: list[str] | None = None) -> pd.DataFrame | None:
+        resolved = self.resolve(key)
+        if columns is not None and self.cache.get_meta(resolved) is None:
+            return self._read_columns(resolved, columns)
+        return self._read(key, lambda source: pd.read_parquet(source, columns=columns))
+
+    def read_csv(self, key: str, **kwargs) -> pd.DataFrame | None:
+        return self._read(key, lambda source: pd.read_csv(source, **kwargs))
+
+    def read_text(self, key: str) -> str | None:
+        def read(source):
+            if isinstance(source, io.BytesIO):
+                return source.getvalue().decode("utf-8")
+            with open(source, "r", encoding="utf-8") as f:
+                return f.read()
+        return self._read(key, read)
+
+
+def get_storage(backend: str = DATA_BACKEND):
+    """Build the storage backend selected by DATA_BACKEND ("local" or "s3")."""
+    if backend == "s3":
+        return S3Storage()
+    return LocalStorage()
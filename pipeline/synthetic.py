@@ -0,0 +1,199 @@
+# Deterministic synthetic S&P 500-shaped data for offline benchmarks
+
+import os
+import sys
+import argparse
+import zlib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.config_sp500 import SP500_TICKERS, SP500_COMPANIES
+from pipeline.universes import exchange
+
+# ------------------------
+# Config
+# ------------------------
+DEFAULT_END = "2025-09-30"     # fixed so output is identical run to run
+TRADING_DAYS = 504             # ~2 years, matches extract.YEARS
+SEED = 42
+
+
+def pick_tickers(n: int) -> list[str]:
+    """
+    First `n` real S&P 500 symbols (AAPL and MSFT first, since the dashboard
+    defaults to them), padded with SYN00001-style symbols beyond the index size.
+    """
+    head = ["AAPL", "MSFT"]
+    real = head + [t for t in SP500_TICKERS if t not in head]
+    if n <= len(real):
+        return real[:n]
+    return real + [f"SYN{i:05d}" for i in range(1, n - len(real) + 1)]
+
+
+def _ticker_rng(ticker: str, seed: int) -> np.random.Generator:
+    return np.random.default_rng([seed, zlib.crc32(ticker.encode("utf-8"))])
+
+
+def generate_prices(ticker: str, days: int = TRADING_DAYS, seed: int = SEED, end: str = DEFAULT_END,
+                    freq: str = "B", periods_per_year: int = 252) -> pd.DataFrame:
+    """
+    OHLCV for one ticker in the exact shape `extract.save_raw` writes:
+    a `date` index and yahooquery's lower-case columns.
+    Geometric Brownian motion with per-ticker drift/volatility, fat-tailed
+    jumps, overnight gaps, an intraday high/low envelope and quarterly dividends.
+    """
+    rng = _ticker_rng(ticker, seed)
+    index = pd.date_range(end=end, periods=days, freq=freq, name="date")
+
+    start_price = float(np.exp(rng.uniform(np.log(15), np.log(600))))
+    annual_vol = rng.uniform(0.15, 0.6)
+    annual_drift = rng.normal(0.08, 0.1)
+    vol = annual_vol / np.sqrt(periods_per_year)
+    drift = annual_drift / periods_per_year
+
+    returns = rng.normal(drift - 0.5 * vol ** 2, vol, days)
+    jumps = rng.random(days) < 0.01
+    returns[jumps] += rng.standard_t(3, jumps.sum()) * vol * 3
+    close = start_price * np.exp(np.cumsum(returns))
+
+    gap = rng.normal(0, vol * 0.3, days)
+    open_ = np.concatenate([[start_price], close[:-1]]) * np.exp(gap)
+    spread = np.abs(rng.normal(0, vol * 0.6, (2, days)))
+    high = np.maximum(open_, close) * (1 + spread[0])
+    low = np.minimum(open_, close) * (1 - spread[1])
+
+    base_volume = rng.uniform(5e5, 5e7) * (100 / start_price) ** 0.5
+    volume = np.round(base_volume * rng.lognormal(0, 0.4, days) * (1 + 5 * np.abs(returns) / vol * 0.1))
+
+    dividends = np.zeros(days)
+    if rng.random() < 0.6:
+        payout = close * rng.uniform(0.002, 0.008)
+        quarter_ends = np.flatnonzero(np.diff(index.quarter, prepend=index.quarter[0]) != 0)
+        dividends[quarter_ends] = np.round(payout[quarter_ends], 2)
+
+    return pd.DataFrame({
+        "open": open_.round(4),
+        "high": high.round(4),
+        "low": low.round(4),
+        "close": close.round(4),
+        "adjclose": close.round(4),
+        "volume": volume,
+        "dividends": dividends,
+        "splits": np.zeros(days),
+    }, index=index)
+
+
+def session_index(interval_freq: str, days: int, end: str = DEFAULT_END, ticker: str | None = None) -> pd.DatetimeIndex:
+    """
+    Bar start times over the last `days` weekdays up to `end`, regular session of
+    `ticker`'s exchange only (exchange-local, naive).
+    """
+    sessions = pd.bdate_range(end=end, periods=days)
+    hours = exchange(ticker)
+    open_, close = pd.Timedelta(f"{hours['open']}:00"), pd.Timedelta(f"{hours['close']}:00")
+    offsets = pd.timedelta_range(open_, close - pd.Timedelta("1min"), freq=interval_freq)
+    index = (sessions.values[:, None] + offsets.values[None, :]).ravel()
+    return pd.DatetimeIndex(index, name="date")
+
+
+def generate_intraday(ticker: str, interval_freq: str = "5min", days: int = 60, seed: int = SEED,
+                      end: str = DEFAULT_END) -> pd.DataFrame:
+    """Intraday OHLCV in yahooquery's lower-case shape (no dividends), `days` sessions of `interval_freq` bars."""
+    index = session_index(interval_freq, days, end, ticker)
+    bars_per_day = len(index) // days
+    prices = generate_prices(ticker, len(index), seed, end, periods_per_year=252 * bars_per_day)
+    prices.index = index
+    prices["dividends"] = 0.0
+    return prices
+
+
+def download_prices(ticker: str, years: int = 2, start: str | None = None, end: str | None = None,
+                    interval: str = "1d") -> pd.DataFrame:
+    """
+    Offline stand-in for `extract.download_ticker` (same signature): one bar per
+    weekday from `start` (default `years` back) to `end`, ending on `end`, or
+    the session bars of an intraday `interval` over those days.
+    """
+    import datetime
+    end = datetime.date.fromisoformat(end) if end else datetime.date.today()
+    start = datetime.date.fromisoformat(start) if start else end - datetime.timedelta(days=365 * years)
+    days = int(np.busday_count(start, end))
+    if interval != "1d":
+        from pipeline.intraday import INTERVALS
+        return generate_intraday(ticker, INTERVALS[interval]["freq"], max(days, 1), end=end.isoformat())
+    return generate_prices(ticker, days, end=end.isoformat())
+
+
+def generate_forecast(prices: pd.DataFrame, days: int = 7) -> pd.DataFrame:
+    """Forecast CSV shape written by `forecast.save_forecast` (ds, yhat, yhat_lower, yhat_upper)."""
+    last = prices["close"].iloc[-1]
+    ds = pd.date_range(prices.index[-1] + pd.Timedelta(days=1), periods=days, freq="D")
+    yhat = last * (1 + np.linspace(0.001, 0.01, days))
+    width = last * 0.02 * np.sqrt(np.arange(1, days + 1))
+    return pd.DataFrame({"ds": ds, "yhat": yhat, "yhat_lower": yhat - width, "yhat_upper": yhat + width})
+
+
+def generate_fundamentals(tickers, seed: int = SEED) -> pd.DataFrame:
+    """Fundamentals table with the columns `fundamentals.fetch_fundamentals` produces."""
+    rows = []
+    for t in tickers:
+        rng = _ticker_rng(t, seed + 1)
+        eps = rng.uniform(0.5, 15)
+        pe = rng.uniform(8, 60)
+        price = eps * pe
+        rows.append({
+            "Ticker": t,
+            "Company": SP500_COMPANIES.get(t, f"Synthetic {t}"),
+            "PE_Ratio": pe,
+            "Forward_PE": pe * rng.uniform(0.7, 1.1),
+            "EPS": eps,
+            "Dividend_Yield": round(rng.uniform(0, 4), 2),
+            "Market_Cap": float(np.exp(rng.uniform(np.log(5e9), np.log(3e12)))),
+            "Beta": rng.uniform(0.4, 2.0),
+            "52W_High": price * rng.uniform(1.05, 1.4),
+            "52W_Low": price * rng.uniform(0.6, 0.95),
+        })
+    return pd.DataFrame(rows)
+
+
+def write_universe(root: str = "data", n_tickers: int = 50, days: int = TRADING_DAYS, seed: int = SEED,
+                   end: str = DEFAULT_END, forecasts: bool = True, fundamentals: bool = True) -> list[str]:
+    """
+    Write raw CSVs to <root>/raw (plus optional forecasts and fundamentals) for
+    `n_tickers` tickers. Returns the ticker list.
+    """
+    tickers = pick_tickers(n_tickers)
+    raw_dir = os.path.join(root, "raw")
+    os.makedirs(raw_dir, exist_ok=True)
+    if forecasts:
+        os.makedirs(os.path.join(root, "forecasts"), exist_ok=True)
+
+    for t in tickers:
+        prices = generate_prices(t, days, seed, end)
+        prices.to_csv(os.path.join(raw_dir, f"{t}_raw.csv"))
+        if forecasts:
+            generate_forecast(prices).to_csv(os.path.join(root, "forecasts", f"{t}_forecast.csv"), index=False)
+
+    if fundamentals:
+        os.makedirs(os.path.join(root, "fundamentals"), exist_ok=True)
+        generate_fundamentals(tickers, seed).to_parquet(os.path.join(root, "fundamentals", "fundamentals.parquet"))
+
+    print(f"🧪 Wrote synthetic data for {len(tickers)} tickers × {days} bars → {root}")
+    return tickers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic OHLCV universe")
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--days", type=int, default=TRADING_DAYS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--end", default=DEFAULT_END)
+    parser.add_argument("--root", default="data")
+    parser.add_argument("--no-forecasts", action="store_true")
+    parser.add_argument("--no-fundamentals", action="store_true")
+    args = parser.parse_args()
+
+    write_universe(args.root, args.tickers, args.days, args.seed, args.end,
+                   forecasts=not args.no_forecasts, fundamentals=not args.no_fundamentals)
@@ -1,11 +1,21 @@
 # Indicators, cleaning
 import os
+import sys
 import pandas as pd
-import ta  # technical indicators
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import metrics, profiling
 
 RAW_DIR = "data/raw"
 PROCESSED_DIR = "data/processed"
 
+# Out-of-core mode (long histories): bars per chunk, and the RSS cap of each worker process
+CHUNK_ROWS = 2520                        # ~10 years of daily bars
+MIN_CHUNK_ROWS = 252
+WORKER_MEMORY_MB = float(os.environ.get("PIPELINE_WORKER_MEMORY_MB", "512"))
+MEMORY_SOFT_LIMIT = 0.8                  # share of the cap above which chunks are halved
+
 
 def clean_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Standardize column names to Open, High, Low, Close, Adj Close, Volume."""
@@ -23,6 +33,7 @@ def clean_columns(df: pd.DataFrame) -> pd.DataFrame:
 
 def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """Add basic technical indicators using ta library."""
+    import ta  # technical indicators (deferred: slow to import)
     df["EMA_20"] = ta.trend.EMAIndicator(close=df["Close"], window=20).ema_indicator()
     df["EMA_50"] = ta.trend.EMAIndicator(close=df["Close"], window=50).ema_indicator()
     df["RSI_14"] = ta.momentum.RSIIndicator(close=df["Close"], window=14).rsi()
@@ -37,38 +48,162 @@ def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
 
 def process_file(file_path: str, output_dir: str = PROCESSED_DIR):
     """Process a single raw CSV into cleaned + enriched Parquet."""
-    try:
-        df = pd.read_csv(file_path, parse_dates=["date"], index_col="date")
-    except Exception:
-        df = pd.read_csv(file_path, parse_dates=["Date"], index_col="Date")
+    ticker = os.path.basename(file_path).replace("_raw.csv", "")
+    with metrics.track("transform", ticker) as m, profiling.profile("transform", ticker):
+        m.bytes_read = os.path.getsize(file_path)
+        try:
+            df = pd.read_csv(file_path, parse_dates=["date"], index_col="date")
+        except Exception:
+            df = pd.read_csv(file_path, parse_dates=["Date"], index_col="Date")
 
-    df = clean_columns(df)
+        df = clean_columns(df)
 
-    # Drop rows with NaN in OHLCV
-    df = df.dropna(subset=["Open", "High", "Low", "Close", "Volume"])
+        # Drop rows with NaN in OHLCV
+        df = df.dropna(subset=["Open", "High", "Low", "Close", "Volume"])
 
-    # Add indicators
-    df = add_indicators(df)
+        # Add indicators
+        df = add_indicators(df)
 
-    # Ensure output folder
-    os.makedirs(output_dir, exist_ok=True)
+        # Ensure output folder
+        os.makedirs(output_dir, exist_ok=True)
 
-    # Save as Parquet
-    ticker = os.path.basename(file_path).replace("_raw.csv", "")
-    out_path = os.path.join(output_dir, f"{ticker}.parquet")
-    df.to_parquet(out_path)
+        # Save as Parquet
+        out_path = os.path.join(output_dir, f"{ticker}.parquet")
+        df.to_parquet(out_path)
+        m.rows = len(df)
+        m.bytes_written = os.path.getsize(out_path)
     print(f"✅ Processed {ticker} → {out_path}")
+    return out_path
+
+
+def process_file_chunked(file_path: str, output_dir: str = PROCESSED_DIR, chunk_rows: int = CHUNK_ROWS,
+                         memory_mb: float | None = WORKER_MEMORY_MB):
+    """
+    Out-of-core process_file for long histories. The raw CSV is read `chunk_rows`
+    bars at a time, indicators continue across chunks from the previous chunk's
+    last bars and state (same values as add_indicators over the whole file), and
+    each chunk is written as its own Parquet row group, so memory is bounded by
+    the chunk size. Chunks are halved when RSS nears `memory_mb`; past it the
+    ticker fails with MemoryError. A raw file that is not date-ordered is
+    processed in memory instead.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from pipeline.intraday import OHLCV, TAIL_ROWS, add_indicators_incremental
 
+    ticker = os.path.basename(file_path).replace("_raw.csv", "")
+    os.makedirs(output_dir, exist_ok=True)
+    out_path = os.path.join(output_dir, f"{ticker}.parquet")
+    tmp = f"{out_path}.tmp"
+    date_col = "date" if "date" in pd.read_csv(file_path, nrows=0).columns else "Date"
+    ordered = True
+    with metrics.track("transform", ticker) as m, profiling.profile("transform", ticker):
+        m.bytes_read = os.path.getsize(file_path)
+        writer, schema, tail, state, last, row_groups = None, None, None, None, None, 0
+        finished = False
+        try:
+            with pd.read_csv(file_path, parse_dates=[date_col], index_col=date_col, iterator=True) as reader:
+                while True:
+                    try:
+                        chunk = reader.get_chunk(chunk_rows)
+                    except StopIteration:
+                        break
+                    if not chunk.index.is_monotonic_increasing or (last is not None and len(chunk) and chunk.index[0] <= last):
+                        ordered = False
+                        break
+                    if len(chunk):
+                        last = chunk.index[-1]
+                    bars = clean_columns(chunk).dropna(subset=OHLCV)
+                    if bars.empty:
+                        continue
+                    bars, state = add_indicators_incremental(bars, tail, state)
+                    table = pa.Table.from_pandas(bars, schema=schema, preserve_index=True)
+                    if writer is None:
+                        schema = table.schema
+                        writer = pq.ParquetWriter(tmp, schema)
+                    writer.write_table(table)
+                    row_groups += 1
+                    m.rows += len(bars)
+                    tail = bars[OHLCV].tail(TAIL_ROWS) if tail is None else pd.concat([tail, bars[OHLCV]]).tail(TAIL_ROWS)
+                    del chunk, bars, table
+
+                    rss = metrics.current_rss_mb()
+                    if memory_mb and rss > memory_mb:
+                        raise MemoryError(f"{ticker}: RSS {rss:.0f} MB over the {memory_mb:.0f} MB worker cap")
+                    if memory_mb and rss > memory_mb * MEMORY_SOFT_LIMIT and chunk_rows > MIN_CHUNK_ROWS:
+                        chunk_rows = max(MIN_CHUNK_ROWS, chunk_rows // 2)
+            finished = True
+        finally:
+            if writer is not None:
+                writer.close()
+            if not finished and os.path.exists(tmp):
+                os.remove(tmp)   # failed part-way (e.g. over the memory cap): leave no partial file
+        if not ordered or writer is None:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            if not ordered:
+                m.status = "skipped"   # recorded again by process_file
+        else:
+            os.replace(tmp, out_path)
+            m.bytes_written = os.path.getsize(out_path)
+    if not ordered:
+        print(f"⚠️ {ticker}: raw bars are not date-ordered, processing the whole file in memory")
+        return process_file(file_path, output_dir)
+    if writer is None:
+        print(f"⚠️ {ticker}: no complete bars in {file_path}")
+        return None
+    print(f"✅ Processed {ticker} → {out_path} ({m.rows} rows in {row_groups} chunks)")
+    return out_path
+
+
+def process_intraday(ticker: str, interval: str):
+    """Update one ticker's processed intraday chunks (only chunks with new bars are recomputed)."""
+    from pipeline import intraday
+    with metrics.track("transform", ticker) as m, profiling.profile("transform", ticker):
+        stats = intraday.process_ticker(ticker, interval)
+        m.rows = stats["rows"]
+        m.bytes_read = stats["bytes_read"]
+        m.bytes_written = stats["bytes_written"]
+        if not stats["chunks"] and not stats["unchanged"]:
+            m.status = "skipped"
+            return None
+    out_dir = intraday.chunk_dir(intraday.PROCESSED_ROOT, interval, ticker)
+    print(f"✅ Processed {ticker} {interval}: {stats['chunks']} chunks updated, {stats['unchanged']} unchanged → {out_dir}")
+    return out_dir
+
+
+def run_transformation(interval: str = "1d", chunk_rows: int | None = None, memory_mb: float | None = WORKER_MEMORY_MB):
+    """
+    Process all raw CSVs into Parquet files (or, for an intraday interval, every
+    ticker's chunks). With `chunk_rows`, long histories are processed out of core
+    (process_file_chunked).
+    """
+    if interval != "1d":
+        from pipeline.intraday import RAW_ROOT, list_tickers
+        tickers = list_tickers(RAW_ROOT, interval)
+        print(f"📊 Found {len(tickers)} tickers with {interval} bars")
+        with profiling.profile("transform"):
+            for ticker in tickers:
+                process_intraday(ticker, interval)
+        return
 
-def run_transformation():
-    """Process all raw CSVs into Parquet files."""
     raw_files = [os.path.join(RAW_DIR, f) for f in os.listdir(RAW_DIR) if f.endswith("_raw.csv")]
     print(f"📊 Found {len(raw_files)} raw files to process")
 
-    for file_path in raw_files:
-        process_file(file_path)
+    with profiling.profile("transform"):
+        for file_path in raw_files:
+            if chunk_rows:
+                process_file_chunked(file_path, chunk_rows=chunk_rows, memory_mb=memory_mb)
+            else:
+                process_file(file_path)
 
 
 if __name__ == "__main__":
-    run_transformation()
+    import argparse
+    parser = argparse.ArgumentParser(description="Add indicators to the raw CSVs and write Parquet")
+    parser.add_argument("--long-history", action="store_true", help="process out of core, in date-ordered chunks")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="bars per chunk with --long-history")
+    parser.add_argument("--memory-mb", type=float, default=WORKER_MEMORY_MB, help="RSS cap with --long-history")
+    args = parser.parse_args()
+    run_transformation(chunk_rows=args.chunk_rows if args.long_history else None, memory_mb=args.memory_mb)
 
@@ -0,0 +1,222 @@
+# Ticker universes (S&P 500, FTSE 100, ...) defined as data files, with per-universe data roots
+
+import os
+import sys
+import csv
+import argparse
+import functools
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ------------------------
+# Config
+# ------------------------
+# One CSV per universe: ticker,company,sector,sub_industry (Yahoo symbols, e.g. BP.L for London)
+UNIVERSE_DIR = os.environ.get("UNIVERSE_DIR",
+                              os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "universes"))
+DEFAULT_UNIVERSE = "sp500"
+COLUMNS = ["ticker", "company", "sector", "sub_industry"]
+
+# Exchange of a symbol by its Yahoo suffix ("": US listings). Intraday bars are stored as
+# naive times in the exchange's timezone; charts hide the hours outside its regular session.
+EXCHANGES = {
+    "": {"tz": "America/New_York", "open": "09:30", "close": "16:00"},
+    ".L": {"tz": "Europe/London", "open": "08:00", "close": "16:30"},
+}
+
+# Per-symbol datasets (data/raw, data/processed, data/forecasts, ...) are shared by every
+# universe, so a symbol in several universes is fetched and processed once. Universe-level
+# datasets (alerts, sector indices, fundamentals subset) and snapshots live under the root.
+UNIVERSES_ROOT = "data/universes"   # <root>/<name>/{alerts,sectors,fundamentals,state,snapshots,CURRENT}
+SHARED_FUNDAMENTALS = "data/fundamentals/fundamentals.parquet"
+SYMBOL_DATASETS = {
+    "processed": "data/processed",
+    "forecasts": "data/forecasts",
+    "processed_intraday": "data/processed_intraday",
+    "figures": "data/figures",
+}
+UNIVERSE_DATASETS = ["fundamentals", "alerts", "sectors"]
+
+
+# ------------------------
+# Definitions
+# ------------------------
+def available(folder: str | None = None) -> list[str]:
+    """Universe names with a definition file."""
+    folder = folder or UNIVERSE_DIR
+    if not os.path.isdir(folder):
+        return []
+    return sorted(f[:-len(".csv")] for f in os.listdir(folder) if f.endswith(".csv"))
+
+
+@functools.lru_cache(maxsize=None)
+def load(name: str, folder: str | None = None) -> tuple:
+    """Rows of one universe file as (ticker, company, sector, sub_industry) tuples, file order."""
+    folder = folder or UNIVERSE_DIR
+    path = os.path.join(folder, f"{name}.csv")
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown universe {name!r} (choose from {available(folder)})")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in COLUMNS[:2] if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path}: missing columns {missing}")
+        rows = tuple((r["ticker"].strip(), r["company"].strip(), (r.get("sector") or "").strip(),
+                      (r.get("sub_industry") or "").strip()) for r in reader if r["ticker"].strip())
+    tickers = [r[0] for r in rows]
+    if len(set(tickers)) != len(tickers):
+        raise ValueError(f"{path}: duplicate tickers")
+    return rows
+
+
+def exchange(ticker: str | None = None) -> dict:
+    """Timezone and regular session hours (local "HH:MM") of the exchange `ticker` trades on."""
+    suffix = "." + ticker.rsplit(".", 1)[1] if ticker and "." in ticker else ""
+    return EXCHANGES.get(suffix, EXCHANGES[""])
+
+
+def tickers(name: str) -> list[str]:
+    return [r[0] for r in load(name)]
+
+
+def companies(name: str) -> dict:
+    return {r[0]: r[1] for r in load(name)}
+
+
+def sectors(name: str) -> dict:
+    return {r[0]: r[2] for r in load(name) if r[2]}
+
+
+def sub_industries(name: str) -> dict:
+    return {r[0]: r[3] for r in load(name) if r[3]}
+
+
+@functools.lru_cache(maxsize=None)
+def _merged(column: int) -> dict:
+    merged = {}
+    for name in available():
+        for row in load(name):
+            if row[column]:
+                merged.setdefault(row[0], row[column])
+    return merged
+
+
+def company_map() -> dict:
+    """Company name per ticker across every universe (a symbol is one company wherever it is listed)."""
+    return _merged(1)
+
+
+def sector_map() -> dict:
+    return _merged(2)
+
+
+def sub_industry_map() -> dict:
+    return _merged(3)
+
+
+def membership(names=None) -> dict:
+    """Ticker -> universes it belongs to."""
+    members = {}
+    for name in names or available():
+        for t in tickers(name):
+            members.setdefault(t, []).append(name)
+    return members
+
+
+def data_root(name: str) -> str:
+    """Root for a universe's own datasets and snapshots (point DATA_ROOT here to serve it)."""
+    return os.path.join(UNIVERSES_ROOT, name)
+
+
+def dataset_path(name: str, dataset: str, *parts) -> str:
+    return os.path.join(data_root(name), dataset, *parts)
+
+
+def published(root: str = UNIVERSES_ROOT) -> list[str]:
+    """Universes with a published snapshot (a CURRENT manifest under their root)."""
+    from pipeline.snapshots import MANIFEST_NAME
+    if not os.path.isdir(root):
+        return []
+    return sorted(n for n in os.listdir(root) if os.path.exists(os.path.join(root, n, MANIFEST_NAME)))
+
+
+# ------------------------
+# Publishing
+# ------------------------
+def ticker_of(dataset: str, rel: str) -> str | None:
+    """Ticker a per-symbol dataset file belongs to (paths relative to the dataset folder)."""
+    if dataset == "processed":
+        return os.path.basename(rel)[:-len(".parquet")] if rel.endswith(".parquet") else None
+    if dataset == "forecasts":
+        return os.path.basename(rel)[:-len("_forecast.csv")] if rel.endswith("_forecast.csv") else None
+    if dataset == "processed_intraday":
+        parts = rel.split(os.sep)
+        return parts[1] if len(parts) == 3 else None   # <interval>/<ticker>/<chunk>.parquet
+    if dataset == "figures":
+        parts = rel.split(os.sep)
+        return parts[0] if len(parts) == 2 else None   # <ticker>/<view>.json
+    return None
+
+
+def write_fundamentals(name: str, source: str = SHARED_FUNDAMENTALS) -> str | None:
+    """The universe's rows of the shared fundamentals file, under its root."""
+    import pandas as pd
+    if not os.path.exists(source):
+        return None
+    df = pd.read_parquet(source)
+    df = df[df["Ticker"].isin(set(tickers(name)))]
+    out_path = dataset_path(name, "fundamentals", "fundamentals.parquet")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp = f"{out_path}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def publish(name: str, keep: int | None = None) -> str:
+    """
+    Publish a snapshot of one universe under its root: the shared per-symbol files
+    of its members plus its own universe-level datasets. Serve it with
+    DATA_ROOT=data/universes/<name> or the dashboard's universe selector.
+    """
+    from pipeline import snapshots
+    os.makedirs(data_root(name), exist_ok=True)
+    write_fundamentals(name)
+    members = set(tickers(name))
+    data_dirs = {**SYMBOL_DATASETS, **{d: dataset_path(name, d) for d in UNIVERSE_DATASETS}}
+
+    def include(dataset, rel):
+        if dataset not in SYMBOL_DATASETS:
+            return True
+        ticker = ticker_of(dataset, rel)
+        return ticker is None or ticker in members   # dataset-level files (forecast status) are kept
+
+    return snapshots.publish_local_snapshot(data_dirs, root=data_root(name), include=include,
+                                            keep=snapshots.SNAPSHOT_RETENTION if keep is None else keep)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List, inspect and publish ticker universes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="universes, sizes and published snapshots")
+    show = sub.add_parser("show", help="print one universe's members")
+    show.add_argument("name")
+    sub.add_parser("overlap", help="symbols shared between universes (fetched and processed once)")
+    pub = sub.add_parser("publish", help="publish a universe snapshot under data/universes/<name>")
+    pub.add_argument("name")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        live = set(published())
+        for name in available():
+            print(f"{name:<16} {len(load(name)):>6} tickers  {'📸 published' if name in live else ''}")
+    elif args.command == "show":
+        for ticker, company, sector, _ in load(args.name):
+            print(f"{ticker:<10} {company:<40} {sector}")
+    elif args.command == "overlap":
+        shared = {t: u for t, u in membership().items() if len(u) > 1}
+        print(f"🔗 {len(shared)} symbols in more than one universe")
+        for t, u in sorted(shared.items())[:50]:
+            print(f"   {t:<10} {', '.join(u)}")
+    elif args.command == "publish":
+        publish(args.name)
@@ -1,7 +1,23 @@
+# Publish the data folders to S3: immutable snapshots, incremental sync or full replace
+
 import os
+import sys
+import json
+import argparse
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import boto3
+from boto3.s3.transfer import TransferConfig
+from boto3.exceptions import S3UploadFailedError
 from botocore.exceptions import ClientError
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline.snapshots import (
+    SNAPSHOT_DIR, MANIFEST_NAME, SNAPSHOT_RETENTION,
+    new_run_id, build_manifest, snapshots_to_remove,
+)
+
 # ------------------------
 # Config
 # ------------------------
@@ -12,23 +28,58 @@ BUCKET_NAME = "sp500-dashboard-data"  # 🔹 your bucket name
 DATA_DIRS = {
     "processed": "data/processed",
     "forecasts": "data/forecasts",
-    "fundamentals": "data/fundamentals"
+    "fundamentals": "data/fundamentals",
+    "alerts": "data/alerts",
+    "sectors": "data/sectors",
+    "processed_intraday": "data/processed_intraday",
+    "figures": "data/figures",
 }
 
+# Sync tuning
+MAX_WORKERS = 16               # concurrent uploads
+DELETE_BATCH_SIZE = 1000       # S3 delete_objects limit per request
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_CHUNKSIZE,
+    multipart_chunksize=MULTIPART_CHUNKSIZE,
+)
+
 
 # ------------------------
 # S3 Helper Functions
 # ------------------------
+def delete_keys(s3_client, keys, bucket=BUCKET_NAME):
+    """Delete keys with batched delete_objects calls (up to 1000 keys each)."""
+    deleted = 0
+    for i in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys[i:i + DELETE_BATCH_SIZE]
+        resp = s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+        )
+        for err in resp.get("Errors", []):
+            print(f"   ⚠️ Could not delete {err['Key']}: {err.get('Message')}")
+        deleted += len(batch) - len(resp.get("Errors", []))
+    return deleted
+
+
+def list_remote(s3_client, prefix, bucket=BUCKET_NAME):
+    """Return {key: (size, etag)} for every object under a prefix."""
+    remote = {}
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/"):
+        for obj in page.get("Contents", []):
+            remote[obj["Key"]] = (obj["Size"], obj["ETag"].strip('"'))
+    return remote
+
+
 def clear_s3_prefix(s3_client, prefix):
     """Delete all objects in S3 under a given prefix (folder)."""
     try:
         print(f"🧹 Clearing old files from s3://{BUCKET_NAME}/{prefix}/ ...")
-        paginator = s3_client.get_paginator("list_objects_v2")
-        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix):
-            if "Contents" in page:
-                for obj in page["Contents"]:
-                    s3_client.delete_object(Bucket=BUCKET_NAME, Key=obj["Key"])
-                    print(f"   ❌ Deleted {obj['Key']}")
+        keys = list(list_remote(s3_client, prefix))
+        deleted = delete_keys(s3_client, keys)
+        print(f"   ❌ Deleted {deleted} objects")
     except ClientError as e:
         print(f"⚠️ Could not clear prefix {prefix}: {e}")
 
@@ -44,20 +95,204 @@ def upload_directory_to_s3(local_dir, s3_prefix, s3_client):
             try:
                 print(f"⬆️ Uploading {local_path} → s3://{BUCKET_NAME}/{s3_path}")
                 s3_client.upload_file(local_path, BUCKET_NAME, s3_path)
-            except ClientError as e:
+            except (ClientError, S3UploadFailedError) as e:
                 print(f"❌ Upload failed for {local_path}: {e}")
 
 
+# ------------------------
+# Incremental Sync
+# ------------------------
+def local_etag(path, config=TRANSFER_CONFIG):
+    """
+    ETag S3 will report for `path` when uploaded with `config`: plain MD5 when
+    the file is below the multipart threshold, otherwise MD5-of-part-MD5s + "-N".
+    """
+    whole, part_digests = hashlib.md5(), []
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(config.multipart_chunksize)
+            if not chunk:
+                break
+            whole.update(chunk)
+            part_digests.append(hashlib.md5(chunk).digest())
+
+    # boto3 switches to multipart at size >= threshold, even when that is a single part
+    if os.path.getsize(path) < config.multipart_threshold:
+        return whole.hexdigest()
+    combined = hashlib.md5(b"".join(part_digests)).hexdigest()
+    return f"{combined}-{len(part_digests)}"
+
+
+def list_local(local_dir, s3_prefix):
+    """Return {key: local_path} for every file under a local folder."""
+    local = {}
+    for root, _, files in os.walk(local_dir):
+        for file in files:
+            local_path = os.path.join(root, file)
+            relative_path = os.path.relpath(local_path, local_dir).replace(os.sep, "/")
+            local[f"{s3_prefix}/{relative_path}"] = local_path
+    return local
+
+
+def _matches(entry, local_path, size):
+    return entry is not None and entry[0] == size and entry[1] == local_etag(local_path)
+
+
+def sync_directory_to_s3(local_dir, s3_prefix, s3_client, bucket=BUCKET_NAME,
+                         max_workers=MAX_WORKERS, delete=True, copy_from_prefix=None):
+    """
+    Upload only new/changed files (by size + ETag) concurrently and remove
+    remote keys with no local counterpart. With `copy_from_prefix`, files that
+    match the object under that prefix are copied server-side instead of
+    uploaded (used to seed a new snapshot from the previous one).
+    Returns a stats dict.
+    """
+    local = list_local(local_dir, s3_prefix)
+    remote = list_remote(s3_client, s3_prefix, bucket=bucket)
+    base = list_remote(s3_client, copy_from_prefix, bucket=bucket) if copy_from_prefix else {}
+
+    to_upload, to_copy = [], []
+    stats = {"uploaded": 0, "uploaded_bytes": 0, "copied": 0, "copied_bytes": 0,
+             "skipped": 0, "skipped_bytes": 0, "deleted": 0, "failed": 0}
+    for key, local_path in local.items():
+        size = os.path.getsize(local_path)
+        base_key = f"{copy_from_prefix}{key[len(s3_prefix):]}" if copy_from_prefix else None
+        if _matches(remote.get(key), local_path, size):
+            stats["skipped"] += 1
+            stats["skipped_bytes"] += size
+        elif base_key and _matches(base.get(base_key), local_path, size):
+            to_copy.append((key, base_key, size))
+        else:
+            to_upload.append((key, local_path, size))
+
+    def _upload(key, local_path):
+        s3_client.upload_file(local_path, bucket, key, Config=TRANSFER_CONFIG)
+
+    def _copy(key, base_key):
+        s3_client.copy({"Bucket": bucket, "Key": base_key}, bucket, key, Config=TRANSFER_CONFIG)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_upload, key, path): ("uploaded", key, path, size) for key, path, size in to_upload}
+        futures.update({pool.submit(_copy, key, src): ("copied", key, src, size) for key, src, size in to_copy})
+        for fut in as_completed(futures):
+            kind, key, source, size = futures[fut]
+            try:
+                fut.result()
+                stats[kind] += 1
+                stats[f"{kind}_bytes"] += size
+            except (ClientError, S3UploadFailedError) as e:
+                print(f"❌ Transfer failed for {source}: {e}")
+                stats["failed"] += 1
+
+    if delete:
+        stale = [k for k in remote if k not in local]
+        if stale:
+            stats["deleted"] = delete_keys(s3_client, stale, bucket=bucket)
+
+    print(
+        f"🔁 s3://{bucket}/{s3_prefix}/: "
+        f"⬆️ {stats['uploaded']} objects ({stats['uploaded_bytes'] / 1e6:.2f} MB) uploaded, "
+        + (f"📋 {stats['copied']} objects ({stats['copied_bytes'] / 1e6:.2f} MB) copied server-side, " if copy_from_prefix else "")
+        + f"⏭️ {stats['skipped']} objects ({stats['skipped_bytes'] / 1e6:.2f} MB) unchanged, "
+        f"❌ {stats['deleted']} stale removed"
+        + (f", ⚠️ {stats['failed']} failed" if stats["failed"] else "")
+    )
+    return stats
+
+
+# ------------------------
+# Snapshot Publishing
+# ------------------------
+def read_s3_manifest(s3_client, bucket=BUCKET_NAME):
+    """Return the CURRENT manifest dict, or None if the bucket has no snapshots yet."""
+    try:
+        resp = s3_client.get_object(Bucket=bucket, Key=MANIFEST_NAME)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            return None
+        raise
+    return json.loads(resp["Body"].read())
+
+
+def publish_snapshot(s3_client, data_dirs=DATA_DIRS, bucket=BUCKET_NAME, run_id=None,
+                     max_workers=MAX_WORKERS, keep=SNAPSHOT_RETENTION):
+    """
+    Publish every data folder under the immutable prefix snapshots/<run_id>/,
+    then flip CURRENT with a single PUT so readers switch atomically.
+    Unchanged files are copied server-side from the previous snapshot.
+    """
+    run_id = run_id or new_run_id()
+    previous = (read_s3_manifest(s3_client, bucket) or {}).get("snapshot")
+    snap_prefix = f"{SNAPSHOT_DIR}/{run_id}"
+    print(f"📸 Publishing snapshot s3://{bucket}/{snap_prefix}/ (previous: {previous or 'none'})")
+
+    datasets = []
+    failed = 0
+    for prefix, folder in data_dirs.items():
+        if not os.path.exists(folder):
+            print(f"⚠️ Skipping {folder} (not found)")
+            continue
+        datasets.append(prefix)
+        copy_from = f"{SNAPSHOT_DIR}/{previous}/{prefix}" if previous else None
+        stats = sync_directory_to_s3(folder, f"{snap_prefix}/{prefix}", s3_client, bucket=bucket,
+                                     max_workers=max_workers, copy_from_prefix=copy_from)
+        failed += stats["failed"]
+
+    if failed:
+        print(f"❌ {failed} transfers failed; CURRENT still points to {previous}")
+        return None
+
+    manifest = build_manifest(run_id, datasets, previous)
+    s3_client.put_object(Bucket=bucket, Key=MANIFEST_NAME, Body=json.dumps(manifest, indent=2).encode("utf-8"),
+                         ContentType="application/json", CacheControl="no-cache")
+    print(f"🔀 CURRENT → {run_id}")
+    gc_s3_snapshots(s3_client, bucket=bucket, keep=keep)
+    return run_id
+
+
+def gc_s3_snapshots(s3_client, bucket=BUCKET_NAME, keep=SNAPSHOT_RETENTION):
+    """Delete snapshots outside the retention window (never the current one)."""
+    snapshot_ids = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{SNAPSHOT_DIR}/", Delimiter="/"):
+        for cp in page.get("CommonPrefixes", []):
+            snapshot_ids.append(cp["Prefix"].rstrip("/").split("/")[-1])
+
+    current = (read_s3_manifest(s3_client, bucket) or {}).get("snapshot")
+    removed = snapshots_to_remove(snapshot_ids, current, keep)
+    for snap in removed:
+        keys = list(list_remote(s3_client, f"{SNAPSHOT_DIR}/{snap}", bucket=bucket))
+        delete_keys(s3_client, keys, bucket=bucket)
+        print(f"🗑️ Removed old snapshot {snap} ({len(keys)} objects)")
+    return removed
+
+
 # ------------------------
 # Main
 # ------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish processed/forecast/fundamentals data to S3")
+    parser.add_argument("--mode", choices=["snapshot", "sync", "replace"], default="snapshot",
+                        help="snapshot: publish an immutable snapshot and flip CURRENT; "
+                             "sync: upload only changed files and prune stale keys in place; "
+                             "replace: clear prefix and re-upload everything")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="concurrent transfers")
+    parser.add_argument("--keep", type=int, default=SNAPSHOT_RETENTION, help="snapshots to retain")
+    args = parser.parse_args()
+
     s3 = boto3.client("s3", region_name=AWS_REGION)
 
+    if args.mode == "snapshot":
+        publish_snapshot(s3, max_workers=args.workers, keep=args.keep)
+        sys.exit(0)
+
     for prefix, folder in DATA_DIRS.items():
         if os.path.exists(folder):
-            clear_s3_prefix(s3, prefix)  # Clean old files
-            upload_directory_to_s3(folder, prefix, s3)  # Upload new
+            if args.mode == "sync":
+                sync_directory_to_s3(folder, prefix, s3, max_workers=args.workers)
+            else:
+                clear_s3_prefix(s3, prefix)  # Clean old files
+                upload_directory_to_s3(folder, prefix, s3)  # Upload new
         else:
             print(f"⚠️ Skipping {folder} (not found)")
 
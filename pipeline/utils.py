@@ -1,13 +1,38 @@
 import pandas as pd
 
+FTSE100_URL = "https://en.wikipedia.org/wiki/FTSE_100_Index"
+
+
+def lse_to_yahoo(epic):
+    """LSE EPIC → Yahoo Finance symbol: "BP." → "BP.L", "BT.A" → "BT-A.L"."""
+    return epic.strip().rstrip(".").replace(".", "-") + ".L"
+
+
+def get_ftse100_constituents(source=FTSE100_URL):
+    """
+    Current FTSE 100 constituents from Wikipedia (or a saved copy of the page /
+    a CSV export of its constituents table): ticker (Yahoo `.L` symbol),
+    company and ICB sector.
+    """
+    if str(source).endswith(".csv"):
+        tables = [pd.read_csv(source)]
+    else:
+        tables = pd.read_html(source)
+    for df in tables:
+        symbol = next((c for c in ("Ticker", "EPIC") if c in df.columns), None)
+        if symbol and "Company" in df.columns and len(df) >= 90:   # the constituents table
+            sector = next((c for c in df.columns if "sector" in str(c).lower()), None)
+            return pd.DataFrame({
+                "ticker": df[symbol].astype(str).map(lse_to_yahoo),
+                "company": df["Company"].astype(str).str.strip(),
+                "icb_sector": df[sector].astype(str).str.strip() if sector else "",
+            })
+    raise ValueError(f"No FTSE 100 constituents table found in {source}")
+
+
 def get_ftse100_tickers():
     """
     Scrape current FTSE 100 tickers from Wikipedia.
     Returns a list of Yahoo Finance tickers with `.L` suffix.
     """
-    url = "https://en.wikipedia.org/wiki/FTSE_100_Index"
-    tables = pd.read_html(url)
-    df = tables[3]  # Constituents table (check Wikipedia index)
-    tickers = df["EPIC"].tolist()
-    tickers = [t + ".L" for t in tickers]
-    return tickers
+    return get_ftse100_constituents()["ticker"].tolist()
@@ -2,6 +2,11 @@
 # =========================================================
 # sync_s3.sh - Sync S&P 500 dashboard data from S3 → EC2
 # =========================================================
+# Resolves the snapshot named by s3://$BUCKET_NAME/CURRENT, syncs it into
+# $LOCAL_DIR/snapshots/<id>/ and only then flips the local CURRENT file, so the
+# dashboard never sees a half-synced dataset. The datasets synced are the ones
+# the manifest lists. Falls back to the flat layout (one prefix per dataset)
+# when the bucket has no CURRENT yet.
 
 # Exit on error
 set -e
@@ -12,21 +17,51 @@ BUCKET_NAME="sp500-dashboard-data"
 # Local project data directory (inside EC2 repo)
 LOCAL_DIR="$HOME/SP500_Dashboard/data"
 
+# Local snapshots to keep (the current one is always kept)
+SNAPSHOT_RETENTION="${SNAPSHOT_RETENTION:-3}"
+
+# Flat-layout datasets (same names as DATA_DIRS in pipeline/upload_to_s3.py)
+LEGACY_DATASETS="processed forecasts fundamentals alerts sectors processed_intraday figures"
+
 echo "🔄 Syncing data from s3://$BUCKET_NAME to $LOCAL_DIR ..."
 
-# Make sure local data directory exists
-mkdir -p "$LOCAL_DIR/processed"
-mkdir -p "$LOCAL_DIR/forecasts"
-mkdir -p "$LOCAL_DIR/fundamentals"
+mkdir -p "$LOCAL_DIR"
+
+if aws s3 cp "s3://$BUCKET_NAME/CURRENT" "$LOCAL_DIR/CURRENT.tmp" --only-show-errors 2>/dev/null; then
+    SNAPSHOT=$(python3 -c "import json,sys; print(json.load(open(sys.argv[1]))['snapshot'])" "$LOCAL_DIR/CURRENT.tmp")
+    DATASETS=$(python3 -c "import json,sys; print(' '.join(json.load(open(sys.argv[1]))['datasets']))" "$LOCAL_DIR/CURRENT.tmp")
+    SNAP_DIR="$LOCAL_DIR/snapshots/$SNAPSHOT"
+    echo "📸 Current snapshot: $SNAPSHOT ($DATASETS)"
+
+    # Snapshots are immutable: an already-synced one needs no transfer
+    if [ ! -f "$SNAP_DIR/.complete" ]; then
+        for dataset in $DATASETS; do
+            mkdir -p "$SNAP_DIR/$dataset"
+            aws s3 sync "s3://$BUCKET_NAME/snapshots/$SNAPSHOT/$dataset" "$SNAP_DIR/$dataset" --only-show-errors
+        done
+        touch "$SNAP_DIR/.complete"
+    fi
 
-# Sync processed stock data
-aws s3 sync "s3://$BUCKET_NAME/processed" "$LOCAL_DIR/processed" --exact-timestamps
+    # Atomic flip of the local pointer
+    mv -f "$LOCAL_DIR/CURRENT.tmp" "$LOCAL_DIR/CURRENT"
 
-# Sync forecast files
-aws s3 sync "s3://$BUCKET_NAME/forecasts" "$LOCAL_DIR/forecasts" --exact-timestamps
+    # Retention: drop old local snapshots, newest first, never the current one
+    ls -1 "$LOCAL_DIR/snapshots" | sort -r | tail -n +"$((SNAPSHOT_RETENTION + 1))" | while read -r old; do
+        if [ "$old" != "$SNAPSHOT" ]; then
+            echo "🗑️ Removing old snapshot $old"
+            rm -rf "$LOCAL_DIR/snapshots/$old"
+        fi
+    done
+else
+    rm -f "$LOCAL_DIR/CURRENT.tmp"
+    echo "⚠️ No CURRENT manifest in bucket, syncing legacy flat layout"
 
-# Sync fundamentals
-aws s3 sync "s3://$BUCKET_NAME/fundamentals" "$LOCAL_DIR/fundamentals" --exact-timestamps
+    # Sync every dataset prefix (missing ones sync nothing)
+    for dataset in $LEGACY_DATASETS; do
+        mkdir -p "$LOCAL_DIR/$dataset"
+        aws s3 sync "s3://$BUCKET_NAME/$dataset" "$LOCAL_DIR/$dataset" --exact-timestamps
+    done
+fi
 
 echo "✅ Sync complete!"
-echo "You can now run the dashboard with: python app.py"
\ No newline at end of file
+echo "You can now run the dashboard with: python app.py"
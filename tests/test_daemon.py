@@ -0,0 +1,84 @@
+# Daemon refreshes: the raw CSV never gets a date twice, whatever happened to the processed file
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("ta")
+
+from pipeline import daemon, extract, metrics
+from pipeline.synthetic import generate_prices
+from pipeline.transform import RAW_DIR, PROCESSED_DIR, process_file
+
+TICKERS = ["AAA", "BBB", "CCC"]
+LAST = "2025-06-30"
+END = "2025-07-04"   # four new business days
+
+
+@pytest.fixture
+def pipeline_daemon(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    monkeypatch.delenv("PIPELINE_RUN_ID", raising=False)
+    # Offline bars: the whole history up to `end`, the daemon keeps what it does not have yet
+    monkeypatch.setattr(extract, "download_ticker",
+                        lambda ticker, start=None, end=None, **kw: generate_prices(ticker, 300, end=end))
+    os.makedirs(RAW_DIR)
+    for t in TICKERS:
+        generate_prices(t, 250, end=LAST).to_csv(daemon.raw_path(t))
+        process_file(daemon.raw_path(t), PROCESSED_DIR)
+    return daemon.PipelineDaemon(TICKERS, every=None, publish=False)
+
+
+def _raw_dates(ticker):
+    return pd.read_csv(daemon.raw_path(ticker), index_col="date", parse_dates=True).index
+
+
+def test_refresh_after_repair_dropped_last_bar(pipeline_daemon):
+    path = daemon.processed_path("AAA")
+    pd.read_parquet(path).iloc[:-1].to_parquet(path)   # e.g. a zero-volume last bar dropped by quality repairs
+
+    summary = pipeline_daemon.refresh(end=END)
+    assert not summary["failed"]
+    dates = _raw_dates("AAA")
+    assert dates.is_unique and dates[-1] == pd.Timestamp(END) and len(dates) == 254
+    assert pd.read_parquet(path).index[-1] == pd.Timestamp(END)
+
+    again = pipeline_daemon.refresh(end=END)
+    assert again["new_bars"] == 0 and _raw_dates("AAA").is_unique
+
+
+def test_failed_append_leaves_raw_untouched(pipeline_daemon, monkeypatch):
+    append = daemon.Panel.append
+
+    def failing(self, ticker, raw):
+        if ticker == "BBB":
+            raise OSError("disk full")
+        return append(self, ticker, raw)
+
+    monkeypatch.setattr(daemon.Panel, "append", failing)
+    summary = pipeline_daemon.refresh(end=END)
+    assert [f.split("[")[0] for f in summary["failed"]] == ["BBB"]
+    assert _raw_dates("BBB")[-1] == pd.Timestamp(LAST)
+
+    monkeypatch.setattr(daemon.Panel, "append", append)
+    summary = pipeline_daemon.refresh(end=END)
+    assert summary["updated"] == 1 and summary["new_bars"] == 4
+    assert _raw_dates("BBB").is_unique and len(_raw_dates("BBB")) == 254
+
+
+def test_small_refresh_validates_against_the_rest_of_the_panel(pipeline_daemon, monkeypatch):
+    from pipeline import runner
+    seen = {}
+
+    def run_validation(transformed, repairs=None, reference=()):
+        seen["transformed"], seen["reference"] = list(transformed), list(reference)
+        return set()
+
+    monkeypatch.setattr(runner, "run_validation", run_validation)
+    pipeline_daemon.refresh(["CCC"], end=END)
+    assert seen == {"transformed": ["CCC"], "reference": ["AAA", "BBB"]}
@@ -0,0 +1,49 @@
+# Intraday chunk store: a month with no clean bars is processed once, not on every run
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import intraday
+from pipeline.synthetic import generate_intraday
+
+INTERVAL = "1h"
+
+
+def _build(tmp_path, name, raw):
+    raw_root, out_root = str(tmp_path / name / "raw"), str(tmp_path / name / "processed")
+    intraday.append_raw(raw, "AAA", INTERVAL, root=raw_root)
+    return raw_root, out_root
+
+
+def test_chunk_without_clean_bars_is_not_reprocessed(tmp_path):
+    raw = generate_intraday("AAA", intraday.INTERVALS[INTERVAL]["freq"], days=60, end="2025-03-31")
+    february = raw.index.strftime(intraday.CHUNK_FORMAT) == "2025-02"
+    broken = raw.copy()
+    broken.loc[february, ["open", "high", "low", "close", "volume"]] = np.nan
+    raw_root, out_root = _build(tmp_path, "broken", broken)
+
+    first = intraday.process_ticker("AAA", INTERVAL, raw_root, out_root)
+    assert first["chunks"] == 3
+    assert intraday.process_ticker("AAA", INTERVAL, raw_root, out_root)["chunks"] == 0
+    assert intraday.read_range("AAA", INTERVAL, root=out_root).index.strftime("%m").unique().tolist() == ["01", "03"]
+
+    # Indicators carry over the empty month as if it were not there
+    ref_raw, ref_out = _build(tmp_path, "reference", raw[~february])
+    intraday.process_ticker("AAA", INTERVAL, ref_raw, ref_out)
+    pd.testing.assert_frame_equal(intraday.read_range("AAA", INTERVAL, root=out_root),
+                                  intraday.read_range("AAA", INTERVAL, root=ref_out))
+
+    # New bars in the next month resume from the empty chunk's state
+    april = generate_intraday("AAA", intraday.INTERVALS[INTERVAL]["freq"], days=80, end="2025-04-30")
+    april = april[april.index.strftime(intraday.CHUNK_FORMAT) == "2025-04"]
+    for root in (raw_root, ref_raw):
+        intraday.append_raw(april, "AAA", INTERVAL, root=root)
+    assert intraday.process_ticker("AAA", INTERVAL, raw_root, out_root)["chunks"] == 1
+    intraday.process_ticker("AAA", INTERVAL, ref_raw, ref_out)
+    pd.testing.assert_frame_equal(intraday.read_range("AAA", INTERVAL, root=out_root),
+                                  intraday.read_range("AAA", INTERVAL, root=ref_out))
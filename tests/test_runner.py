@@ -0,0 +1,97 @@
+# Streaming runner: per-run options stay with the run, not the process
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import forecast, metrics, runner, scheduler
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PIPELINE_METRICS", "0")       # inherited by the spawned workers
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    monkeypatch.delenv("FORECAST_WINDOW_DAYS", raising=False)
+    monkeypatch.delenv("FORECAST_RESAMPLE", raising=False)
+    monkeypatch.delenv("PIPELINE_RUN_ID", raising=False)   # set by each run on purpose
+
+
+def test_long_history_run_leaves_the_environment_alone():
+    before = dict(os.environ)
+    results = runner.run_pipeline(["NOPE"], stages=["forecast"], workers={"forecast": 1}, long_history=True,
+                                  forecast_resample="W")
+    assert [r["status"] for r in results] == ["skipped"]
+    os.environ.pop("PIPELINE_RUN_ID")
+    assert dict(os.environ) == before
+
+
+def test_forecast_window_is_passed_to_each_fit(monkeypatch):
+    calls = []
+    monkeypatch.setattr(forecast, "save_forecast", lambda ticker, **kwargs: calls.append(kwargs) or "out.csv")
+    opts = {"universe": None, "skip_existing": True, "interval": runner.DAILY, "days": 7,
+            "forecast_window_days": 365, "forecast_resample": "W"}
+    assert runner._forecast_task("AAPL", opts) == "out.csv"
+    assert calls == [{"days": 7, "interval": runner.DAILY, "window_days": 365, "resample": "W"}]
+    assert "FORECAST_WINDOW_DAYS" not in os.environ
+
+
+def test_scheduler_sizes_fits_with_the_run_window(tmp_path, monkeypatch):
+    import pandas as pd
+    os.makedirs(scheduler.PROCESSED_DIR)
+    pd.DataFrame({"Close": range(2520)}).to_parquet(os.path.join(scheduler.PROCESSED_DIR, "LONG.parquet"))
+    assert scheduler.history_rows(["LONG"])["LONG"] == 2520
+    assert scheduler.history_rows(["LONG"], window_days=365, resample="W")["LONG"] == 252 // 5
+
+
+def test_importing_metrics_does_not_pin_a_run_id():
+    import subprocess
+    code = ("import os, sys; sys.path.insert(0, sys.argv[1]); import pipeline.metrics as m; "
+            "print(os.environ.get('PIPELINE_RUN_ID')); print(m.current_run_id() == os.environ['PIPELINE_RUN_ID'])")
+    env = {k: v for k, v in os.environ.items() if k != "PIPELINE_RUN_ID"}
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    out = subprocess.run([sys.executable, "-c", code, root], env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["None", "True"]
+    # A child spawned after start_run() logs under the parent's run
+    run_id = metrics.start_run()
+    out = subprocess.run([sys.executable, "-c", code, root], capture_output=True, text=True, check=True)
+    assert out.stdout.split() == [run_id, "True"]
+
+
+def _gate_passes_before_stop(monkeypatch, tickers, **kwargs):
+    import queue
+    import threading
+    checked = []
+    monkeypatch.setattr(runner, "run_validation",
+                        lambda batch, repairs=None, reference=(): checked.append((list(batch), list(reference))) or set())
+    in_q, out_q = queue.Queue(), queue.Queue()
+    gate = threading.Thread(target=runner._quality_gate, args=(in_q, out_q), kwargs={"idle_s": 0.05, **kwargs})
+    gate.start()
+    for t in tickers:
+        in_q.put(t)
+    passed = [out_q.get(timeout=5) for _ in tickers]   # transform has not finished: no _STOP yet
+    in_q.put(runner._STOP)
+    gate.join()
+    return passed, checked
+
+
+def test_small_run_reaches_forecast_before_transform_ends(monkeypatch):
+    tickers = [f"T{i}" for i in range(8)]
+    passed, checked = _gate_passes_before_stop(monkeypatch, tickers, batch_size=runner.quality_batch_size(len(tickers)))
+    assert passed == tickers and [b for b, _ in checked] == [tickers[:4], tickers[4:]]
+    assert checked[1][1] == tickers[:4]
+
+
+def test_partial_batch_checked_against_earlier_runs(tmp_path, monkeypatch):
+    import pandas as pd
+    from pipeline import quality
+    os.makedirs(quality.PROCESSED_DIR)
+    for t in ["OLD1", "OLD2", "OLD3", "OLD4", "NEW"]:
+        pd.DataFrame({"Close": [1.0]}).to_parquet(os.path.join(quality.PROCESSED_DIR, f"{t}.parquet"))
+    reference = runner.calendar_reference(["NEW"])
+    assert reference == ["OLD1", "OLD2", "OLD3", "OLD4"]
+    passed, checked = _gate_passes_before_stop(monkeypatch, ["NEW"], batch_size=4, reference=reference)
+    assert passed == ["NEW"] and checked == [(["NEW"], reference)]
@@ -0,0 +1,53 @@
+# Forecast priorities: dashboard views published to S3 reach the pipeline host's scheduler
+
+import os
+import sys
+import json
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+
+from pipeline import scheduler, storage
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)                       # the S3 backend's disk cache goes under data/.cache
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name=storage.AWS_REGION)
+        client.create_bucket(Bucket=storage.BUCKET_NAME,
+                             CreateBucketConfiguration={"LocationConstraint": storage.AWS_REGION})
+        # A published snapshot: view logs sit next to it, not inside
+        client.put_object(Bucket=storage.BUCKET_NAME, Key="CURRENT", Body=json.dumps({"snapshot": "s1"}).encode())
+        yield client
+
+
+def _log(path, views):
+    now = time.time()
+    with open(path, "w", encoding="utf-8") as f:
+        for ticker, age_days in views:
+            f.write(json.dumps({"ts": now - age_days * 86400, "ticker": ticker}) + "\n")
+
+
+def test_published_views_reach_the_scheduler(s3, tmp_path, monkeypatch):
+    dashboard_log, pipeline_log = str(tmp_path / "dashboard.jsonl"), str(tmp_path / "pipeline.jsonl")
+    _log(dashboard_log, [("AAPL", 1), ("AAPL", 2), ("MSFT", 3), ("NVDA", 45)])   # NVDA: outside the window
+    monkeypatch.setattr(scheduler, "_views_published_at", 0.0)
+
+    key = scheduler.publish_views(dashboard_log, client=s3)
+    assert key.startswith(f"{scheduler.VIEWS_PREFIX}/")
+    assert scheduler.publish_views(dashboard_log, client=s3) is None   # throttled
+    body = s3.get_object(Bucket=storage.BUCKET_NAME, Key=key)["Body"].read().decode()
+    assert "NVDA" not in body
+
+    # The pipeline host never sees the dashboard's file, only the bucket
+    assert scheduler.view_counts(pipeline_log, backend="").empty
+    counts = scheduler.view_counts(pipeline_log, backend="s3")
+    assert counts.to_dict() == {"AAPL": 2, "MSFT": 1}
@@ -0,0 +1,61 @@
+# Sharded execution on a temporary SQLite queue: leases of dead workers expire and are re-claimed
+
+import os
+import sys
+import json
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import shards
+
+TICKERS = [f"T{i:02d}" for i in range(6)]
+
+
+def _plan(tmp_path, monkeypatch, n_shards=3):
+    monkeypatch.chdir(tmp_path)                       # metrics history and outputs stay in the temp folder
+    monkeypatch.setenv("PIPELINE_METRICS", "0")       # inherited by the spawned workers
+    path = str(tmp_path / "shards.sqlite")
+    # No raw files: every transform is a quick "skipped", which is all the queue needs
+    shards.create_plan(TICKERS, ["transform"], n_shards, by="cost", options={"validate": False}, path=path)
+    return path
+
+
+def test_partition_is_deterministic():
+    first = shards.partition(TICKERS, 3)
+    assert first == shards.partition(list(reversed(TICKERS)), 3)
+    assert sorted(t for s in first for t in s) == TICKERS
+
+
+def test_expired_lease_is_reclaimed_by_run_workers(tmp_path, monkeypatch):
+    path = _plan(tmp_path, monkeypatch)
+    con = shards.connect(path)
+    # A worker claims a shard with a short lease and dies without renewing it
+    dead_shard, _ = shards.claim(con, "dead-worker", lease=1.0)
+    other_shard, _ = shards.claim(con, "live-worker", lease=60.0)
+    assert other_shard != dead_shard                  # still leased: not handed out again
+    assert shards.finish(con, other_shard, "live-worker", results=[])
+
+    time.sleep(1.1)
+    exitcodes = shards.run_workers(path, processes=2, stage_workers={"transform": 1}, lease=5.0)
+    assert exitcodes == [0, 0]
+
+    assert shards.status(con) == {"pending": 0, "leased": 0, "done": 3, "failed": 0}
+    worker, attempts, results = con.execute(
+        "SELECT worker, attempts, results FROM shards WHERE shard = ?", (dead_shard,)).fetchone()
+    assert worker != "dead-worker" and attempts == 2
+    assert {r["status"] for r in json.loads(results)} == {"skipped"}
+    # The dead worker coming back cannot overwrite the shard it lost
+    assert not shards.finish(con, dead_shard, "dead-worker", results=[])
+    con.close()
+
+
+def test_shard_fails_after_max_attempts(tmp_path, monkeypatch):
+    path = _plan(tmp_path, monkeypatch, n_shards=1)
+    con = shards.connect(path)
+    for i in range(shards.MAX_ATTEMPTS):
+        assert shards.claim(con, f"dying-{i}", lease=-1.0) is not None     # lease expires at once
+    assert shards.claim(con, "late", lease=60.0) is None
+    assert shards.status(con)["failed"] == 1
+    con.close()
+
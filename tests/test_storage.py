@@ -0,0 +1,189 @@
+# S3 storage backend against a moto-mocked bucket: revalidation, cache eviction, ranged reads, CURRENT
+
+import io
+import os
+import sys
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+
+from pipeline.storage import DiskCache, LocalStorage, S3Storage
+
+BUCKET = "storage-test-bucket"
+CURRENT_KEY = "CURRENT"
+
+
+@pytest.fixture
+def s3():
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def gets(s3):
+    """Keys of every GetObject call other than the CURRENT manifest, in order."""
+    calls = []
+
+    def record(params, **kwargs):
+        if params["Key"] != CURRENT_KEY:
+            calls.append(params["Key"])
+
+    s3.meta.events.register("provide-client-params.s3.GetObject", record)
+    return calls
+
+
+def _storage(s3, tmp_path, max_bytes=10 * 1024 * 1024, revalidate_secs=0.0):
+    return S3Storage(BUCKET, client=s3, cache=DiskCache(str(tmp_path / "cache"), max_bytes),
+                     revalidate_secs=revalidate_secs)
+
+
+def _frame(seed=0, rows=2000):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2015-01-01", periods=rows, freq="B", name="date")
+    return pd.DataFrame(rng.normal(100, 5, (rows, 6)), index=index,
+                        columns=["Open", "High", "Low", "Close", "Volume", "RSI"])
+
+
+def _put_parquet(s3, key, df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer)
+    s3.put_object(Bucket=BUCKET, Key=key, Body=buffer.getvalue())
+
+
+def test_overwritten_object_is_revalidated_by_etag(s3, tmp_path, gets):
+    storage = _storage(s3, tmp_path)
+    s3.put_object(Bucket=BUCKET, Key="alerts/alerts.csv", Body=b"ticker,rule\nAAPL,rsi\n")
+    assert storage.read_csv("alerts/alerts.csv")["ticker"].tolist() == ["AAPL"]
+    assert storage.read_csv("alerts/alerts.csv")["ticker"].tolist() == ["AAPL"]
+    assert gets.count("alerts/alerts.csv") == 1          # same ETag: served from the cache
+    version = storage.version("alerts/alerts.csv")
+
+    s3.put_object(Bucket=BUCKET, Key="alerts/alerts.csv", Body=b"ticker,rule\nMSFT,macd\n")
+    assert storage.read_csv("alerts/alerts.csv")["ticker"].tolist() == ["MSFT"]
+    assert gets.count("alerts/alerts.csv") == 2
+    assert storage.version("alerts/alerts.csv") != version
+
+
+def test_lru_eviction_under_the_size_cap(s3, tmp_path):
+    storage = _storage(s3, tmp_path, max_bytes=2500)
+    for name in "ABC":
+        s3.put_object(Bucket=BUCKET, Key=f"forecasts/{name}.csv", Body=f"x\n{name * 996}\n".encode())
+
+    for name in ["A", "B", "A", "C"]:      # A is used again before C arrives: B is the least recently used
+        path = storage.fetch(f"forecasts/{name}.csv")
+        assert os.path.exists(path)
+        time.sleep(0.01)
+    cached = {m["key"] for m in map(storage.cache.get_meta, ["forecasts/A.csv", "forecasts/B.csv", "forecasts/C.csv"])
+              if m}
+    assert cached == {"forecasts/A.csv", "forecasts/C.csv"}
+    sizes = [os.path.getsize(os.path.join(storage.cache.cache_dir, f))
+             for f in os.listdir(storage.cache.cache_dir) if f.endswith(".data")]
+    assert sum(sizes) <= 2500
+
+
+def test_evicted_entry_is_never_handed_out(s3, tmp_path, monkeypatch):
+    storage = _storage(s3, tmp_path, revalidate_secs=3600)
+    s3.put_object(Bucket=BUCKET, Key="snapshots/s1/forecasts/A.csv", Body=b"x\n1\n")
+    s3.put_object(Bucket=BUCKET, Key=CURRENT_KEY, Body=json.dumps({"snapshot": "s1"}).encode())
+    path = storage.fetch("forecasts/A.csv")
+    get_meta, fetch = storage.cache.get_meta, storage.fetch
+
+    # Another session evicts the entry after its metadata was read, before it is touched
+    def get_meta_then_evict(key):
+        meta = get_meta(key)
+        if os.path.exists(path):
+            os.remove(path)
+        return meta
+
+    monkeypatch.setattr(storage.cache, "get_meta", get_meta_then_evict)
+    again = storage.fetch("forecasts/A.csv")
+    assert isinstance(again, str) and os.path.exists(again)
+    monkeypatch.setattr(storage.cache, "get_meta", get_meta)
+
+    # ... or after fetch() handed out the path, before it is opened
+    def fetch_then_evict(key):
+        source = fetch(key)
+        if isinstance(source, str) and os.path.exists(source):
+            os.remove(source)
+        return source
+
+    monkeypatch.setattr(storage, "fetch", fetch_then_evict)
+    assert storage.read_csv("forecasts/A.csv")["x"].tolist() == [1]
+
+
+def test_object_larger_than_the_cache_is_read_in_memory(s3, tmp_path):
+    storage = _storage(s3, tmp_path, max_bytes=100)
+    s3.put_object(Bucket=BUCKET, Key="alerts/big.csv", Body=b"x\n" + b"1\n" * 200)
+    assert isinstance(storage.fetch("alerts/big.csv"), io.BytesIO)
+    assert len(storage.read_csv("alerts/big.csv")) == 200
+    assert not [f for f in os.listdir(storage.cache.cache_dir) if f.endswith(".data")]
+
+
+def test_ranged_column_read_matches_full_read(s3, tmp_path, gets):
+    storage = _storage(s3, tmp_path)
+    df = _frame()
+    _put_parquet(s3, "processed/AAPL.parquet", df)
+    size = s3.head_object(Bucket=BUCKET, Key="processed/AAPL.parquet")["ContentLength"]
+    ranges = []
+    s3.meta.events.register("provide-client-params.s3.GetObject",
+                            lambda params, **kwargs: ranges.append(params.get("Range")))
+    columns = ["Close", "RSI"]
+
+    subset = storage.read_parquet("processed/AAPL.parquet", columns=columns)
+    pd.testing.assert_frame_equal(subset, df[columns], check_freq=False)
+    ranged = len(gets)
+    assert ranged > 0 and all(k == "processed/AAPL.parquet" for k in gets)
+    fetched = sum(int(r.split("-")[1]) - int(r[len("bytes="):].split("-")[0]) + 1 for r in ranges if r)
+    assert None not in ranges[-ranged:] and fetched < size   # footer and two column chunks, not the object
+    pd.testing.assert_frame_equal(storage.read_parquet("processed/AAPL.parquet", columns=columns), subset)
+    assert len(gets) == ranged             # the subset is cached as its own entry
+
+    # A rewritten object invalidates the cached subset
+    _put_parquet(s3, "processed/AAPL.parquet", _frame(seed=1))
+    pd.testing.assert_frame_equal(storage.read_parquet("processed/AAPL.parquet", columns=columns),
+                                  _frame(seed=1)[columns], check_freq=False)
+
+    full = storage.read_parquet("processed/AAPL.parquet")
+    pd.testing.assert_frame_equal(full, _frame(seed=1), check_freq=False)
+
+
+def test_resolve_follows_current(s3, tmp_path):
+    storage = _storage(s3, tmp_path)
+    assert storage.resolve("processed/AAPL.parquet") == "processed/AAPL.parquet"   # flat legacy layout
+
+    for snapshot, seed in (("s1", 1), ("s2", 2)):
+        _put_parquet(s3, f"snapshots/{snapshot}/processed/AAPL.parquet", _frame(seed, rows=50))
+    s3.put_object(Bucket=BUCKET, Key=CURRENT_KEY, Body=json.dumps({"snapshot": "s1"}).encode())
+    assert storage.resolve("processed/AAPL.parquet") == "snapshots/s1/processed/AAPL.parquet"
+    pd.testing.assert_frame_equal(storage.read_parquet("processed/AAPL.parquet"), _frame(1, rows=50),
+                                  check_freq=False)
+    assert storage.list_keys("processed", ".parquet") == ["processed/AAPL.parquet"]
+
+    s3.put_object(Bucket=BUCKET, Key=CURRENT_KEY, Body=json.dumps({"snapshot": "s2"}).encode())
+    assert storage.version("processed/AAPL.parquet") == "snapshots/s2/processed/AAPL.parquet"
+    pd.testing.assert_frame_equal(storage.read_parquet("processed/AAPL.parquet"), _frame(2, rows=50),
+                                  check_freq=False)
+
+
+def test_local_resolve_follows_current(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    for snapshot in ("s1", "s2"):
+        os.makedirs(tmp_path / "snapshots" / snapshot / "alerts")
+        (tmp_path / "snapshots" / snapshot / "alerts" / "alerts.csv").write_text(f"snapshot\n{snapshot}\n")
+    assert storage.read_csv("alerts/alerts.csv") is None
+    for i, snapshot in enumerate(("s1", "s2")):
+        (tmp_path / CURRENT_KEY).write_text(json.dumps({"snapshot": snapshot}))
+        os.utime(tmp_path / CURRENT_KEY, ns=(time.time_ns(), time.time_ns() + i))   # flips within one mtime tick
+        assert storage.read_csv("alerts/alerts.csv")["snapshot"].tolist() == [snapshot]
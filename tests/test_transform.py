@@ -0,0 +1,92 @@
+# Out-of-core transform: process_file_chunked must write what process_file writes
+
+import os
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("ta")
+
+from pipeline import metrics, transform
+from pipeline.synthetic import generate_prices
+
+BARS = 1200
+
+
+@pytest.fixture(autouse=True)
+def no_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+
+
+def _raw(tmp_path, prices, ticker="LONG"):
+    path = tmp_path / f"{ticker}_raw.csv"
+    prices.to_csv(path)
+    return str(path)
+
+
+def _both(path, tmp_path, chunk_rows, memory_mb=None):
+    full = pd.read_parquet(transform.process_file(path, str(tmp_path / "full")))
+    chunked = pd.read_parquet(transform.process_file_chunked(path, str(tmp_path / "chunked"), chunk_rows, memory_mb))
+    return full, chunked
+
+
+# Smaller than the 50-bar indicator tail, equal to it, just over it, uneven, and one chunk for the whole file
+@pytest.mark.parametrize("chunk_rows", [7, 50, 51, 333, BARS * 2])
+def test_chunked_matches_in_memory(tmp_path, chunk_rows):
+    path = _raw(tmp_path, generate_prices("LONG", BARS))
+    full, chunked = _both(path, tmp_path, chunk_rows)
+    pd.testing.assert_frame_equal(full, chunked, check_exact=False, rtol=1e-9)
+
+
+def test_incomplete_bars_across_chunk_boundaries(tmp_path):
+    prices = generate_prices("GAPS", BARS)
+    prices.iloc[95:110, prices.columns.get_loc("close")] = np.nan    # a whole 10-bar chunk and its neighbours
+    prices.iloc[[0, 333, BARS - 1], prices.columns.get_loc("volume")] = np.nan
+    path = _raw(tmp_path, prices, "GAPS")
+    full, chunked = _both(path, tmp_path, chunk_rows=10)
+    assert len(full) == BARS - 18
+    pd.testing.assert_frame_equal(full, chunked, check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("disorder", ["within_chunk", "across_chunks", "duplicate_at_boundary"])
+def test_unordered_raw_falls_back_to_in_memory(tmp_path, disorder):
+    prices = generate_prices("MESSY", BARS)
+    order = np.arange(BARS)
+    if disorder == "within_chunk":
+        order[[10, 20]] = order[[20, 10]]
+    elif disorder == "across_chunks":
+        order[[99, 100]] = order[[100, 99]]          # chunk_rows=100: last bar of one chunk, first of the next
+    else:
+        order[100] = 99
+    path = _raw(tmp_path, prices.iloc[order], "MESSY")
+    full, chunked = _both(path, tmp_path, chunk_rows=100)
+    pd.testing.assert_frame_equal(full, chunked)
+    assert not os.path.exists(tmp_path / "chunked" / "MESSY.parquet.tmp")
+
+
+def test_over_the_memory_cap_fails_without_output(tmp_path):
+    path = _raw(tmp_path, generate_prices("CAP", BARS), "CAP")
+    with pytest.raises(MemoryError):
+        transform.process_file_chunked(path, str(tmp_path / "chunked"), 100, memory_mb=1)
+    assert os.listdir(tmp_path / "chunked") == []
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/clear_refs"), reason="needs a resettable RSS high-water mark")
+def test_peak_rss_is_recorded_per_unit(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path / "metrics"))
+    run_id = metrics.start_run()
+    path = _raw(tmp_path, generate_prices("RSS", BARS), "RSS")
+
+    with metrics.track("transform", "BIG"):
+        block = np.ones(40_000_000)                  # ~300 MB, freed before the next unit
+        del block
+    transform.process_file_chunked(path, str(tmp_path / "chunked"), 100, memory_mb=None)
+
+    rows = {r["ticker"]: r for r in map(json.loads, open(tmp_path / "metrics" / f"{run_id}.jsonl"))}
+    assert rows["BIG"]["peak_rss_mb"] - rows["RSS"]["peak_rss_mb"] > 200
@@ -0,0 +1,101 @@
+# Incremental S3 sync against a moto-mocked bucket: skip, re-upload, delete and failure accounting
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+
+from boto3.exceptions import S3UploadFailedError
+
+from pipeline import upload_to_s3
+from pipeline.upload_to_s3 import MULTIPART_CHUNKSIZE, local_etag, sync_directory_to_s3
+
+BUCKET = "sync-test-bucket"
+PREFIX = "processed"
+
+
+@pytest.fixture
+def s3():
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _sync(folder, s3, **kwargs):
+    return sync_directory_to_s3(str(folder), PREFIX, s3, bucket=BUCKET, max_workers=2, **kwargs)
+
+
+def test_unchanged_files_are_skipped(tmp_path, s3):
+    _write(tmp_path / "AAPL.parquet", b"a" * 1000)
+    _write(tmp_path / "sub" / "MSFT.parquet", b"m" * 1000)
+
+    first = _sync(tmp_path, s3)
+    assert first["uploaded"] == 2 and first["skipped"] == 0
+
+    second = _sync(tmp_path, s3)
+    assert second["uploaded"] == 0 and second["skipped"] == 2
+
+
+@pytest.mark.parametrize("size", [MULTIPART_CHUNKSIZE - 1, MULTIPART_CHUNKSIZE, MULTIPART_CHUNKSIZE + 1])
+def test_etag_matches_s3_around_multipart_threshold(tmp_path, s3, size):
+    path = tmp_path / "big.bin"
+    _write(path, os.urandom(size))
+
+    _sync(tmp_path, s3)
+    remote = upload_to_s3.list_remote(s3, PREFIX, bucket=BUCKET)
+    assert remote[f"{PREFIX}/big.bin"][1] == local_etag(str(path))
+    assert _sync(tmp_path, s3)["skipped"] == 1
+
+
+def test_changed_file_is_reuploaded(tmp_path, s3):
+    _write(tmp_path / "AAPL.parquet", b"a" * 1000)
+    _sync(tmp_path, s3)
+
+    _write(tmp_path / "AAPL.parquet", b"b" * 1000)    # same size, new content
+    stats = _sync(tmp_path, s3)
+    assert stats["uploaded"] == 1 and stats["skipped"] == 0
+    body = s3.get_object(Bucket=BUCKET, Key=f"{PREFIX}/AAPL.parquet")["Body"].read()
+    assert body == b"b" * 1000
+
+
+def test_stale_remote_keys_are_deleted(tmp_path, s3):
+    _write(tmp_path / "AAPL.parquet", b"a")
+    _write(tmp_path / "GONE.parquet", b"g")
+    _sync(tmp_path, s3)
+
+    os.remove(tmp_path / "GONE.parquet")
+    stats = _sync(tmp_path, s3)
+    assert stats["deleted"] == 1
+    assert set(upload_to_s3.list_remote(s3, PREFIX, bucket=BUCKET)) == {f"{PREFIX}/AAPL.parquet"}
+
+    kept = _sync(tmp_path, s3, delete=False)
+    assert kept["deleted"] == 0
+
+
+def test_failed_upload_is_counted_not_raised(tmp_path, s3, monkeypatch):
+    _write(tmp_path / "AAPL.parquet", b"a")
+    _write(tmp_path / "BAD.parquet", b"b")
+    upload_file = s3.upload_file
+
+    def flaky_upload(path, bucket, key, **kwargs):
+        if key.endswith("BAD.parquet"):
+            raise S3UploadFailedError("simulated failure")
+        return upload_file(path, bucket, key, **kwargs)
+
+    monkeypatch.setattr(s3, "upload_file", flaky_upload)
+    stats = _sync(tmp_path, s3)
+    assert stats["uploaded"] == 1 and stats["failed"] == 1